@@ -340,6 +340,8 @@ class ADB_Mainwindow(QMainWindow):
         # 启动时自动检查更新（延迟3秒执行，避免阻塞启动）
         from PyQt5.QtCore import QTimer
         QTimer.singleShot(3000, self.check_for_updates_silent)
+        # 检查上次中断的批量任务（任务日志），询问是否继续
+        QTimer.singleShot(1000, self.datong_manager.check_unfinished_jobs)
 
     def init_window_scaling(self):
         """初始化窗口缩放功能"""
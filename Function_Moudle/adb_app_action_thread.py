@@ -25,7 +25,7 @@ class ADBAppActionThread(QThread):
     def _check_app_installed(self):
         """检查应用是否已安装"""
         try:
-            result = adb_utils.run_adb_command(f"shell pm list packages {self.package_name}", self.device_id)
+            result = adb_utils.run_adb_query(f"shell pm list packages {self.package_name}", self.device_id)
             
             # 确保stdout是字符串类型
             stdout = result.stdout
@@ -1,12 +1,18 @@
 from PyQt5.QtCore import QThread, pyqtSignal
-import subprocess
 import os
 import sys
-import re
+import uuid
+import shlex
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# 导入日志管理器
+from logger_manager import get_logger
+
 try:
     from adb_utils import adb_utils
 except ImportError:
@@ -20,6 +26,24 @@ except ImportError:
     from fallbacks import ConfigManagerFallback
     config_manager = ConfigManagerFallback()
 
+from Function_Moudle.apk_metadata_cache import apk_metadata_cache, ApkMetadataError
+from Function_Moudle.device_apk_cache import device_apk_cache, pm_install_command, push_to_device
+from Function_Moudle.device_capabilities import device_capabilities
+from Function_Moudle.folder_transfer import run_device_shell
+from Function_Moudle.install_planner import (
+    compute_plan, format_plan, should_execute, ACTION_DOWNGRADE
+)
+from Function_Moudle.job_journal import start_job, unit_key
+from Function_Moudle.multi_package_install import (
+    MultiPackageInstaller, MultiPackageInstallError, MultiPackageNotSupported
+)
+
+# 流水线模式下不放入设备端缓存的APK的暂存目录（安装后删除）
+PIPELINE_STAGE_DIR = "/data/local/tmp/adbtools-stage"
+
+# 创建日志记录器
+logger = get_logger("ADBTools.BatchInstallThread")
+
 
 class ADBBatchInstallThread(QThread):
     """批量安装APK文件的线程"""
@@ -30,8 +54,12 @@ class ADBBatchInstallThread(QThread):
     file_progress_signal = pyqtSignal(str, str)  # (文件名, 状态)
     overall_progress_signal = pyqtSignal(int, int)  # (当前进度, 总文件数)
     realtime_output_signal = pyqtSignal(str)  # 实时输出信号
+    result_matrix_signal = pyqtSignal(dict)  # 多设备结果矩阵 {设备ID: {文件名: 状态}}
+    plan_signal = pyqtSignal(dict)  # 安装计划 {设备ID: 计划条目列表或 None}
 
-    def __init__(self, device_id, folder_path, connection_mode='adb', u2_device=None, allow_downgrade=False, selected_files=None):
+    def __init__(self, device_id, folder_path, connection_mode='adb', u2_device=None, allow_downgrade=False, selected_files=None,
+                 device_ids=None, max_workers=None, per_device_concurrency=None, sort_by_size=None,
+                 skip_installed=None, plan_only=False, plan=None, install_mode=None, resume_job=None):
         """
         初始化线程
         
@@ -42,6 +70,17 @@ class ADBBatchInstallThread(QThread):
             u2_device: u2设备对象（仅当connection_mode='u2'时使用）
             allow_downgrade: 是否允许降级安装，默认为False
             selected_files: 选中的APK文件列表，如果为None则处理文件夹中所有APK
+            device_ids: 多设备模式下的设备ID列表，包含多台设备时并行安装到所有设备
+            max_workers: 多设备模式的最大并发任务数，None 时读取配置
+            per_device_concurrency: 单台设备同时进行的任务数，None 时读取配置
+            sort_by_size: 是否按APK大小从大到小调度，None 时读取配置
+            skip_installed: 是否先计算安装计划，跳过设备上已是相同版本的APK，None 时读取配置
+            plan_only: 只计算安装计划并通过 plan_signal 发出，不执行安装（用于预览）
+            plan: 预览时已计算的安装计划，非 None 时直接使用，不再查询设备
+            install_mode: 安装方式 'per_apk'（逐个 adb install）、'multi_package'
+                          （每台设备一个多包会话原子安装）或 'pipeline'（并行传输到设备后
+                          依次 pm install，传输与安装重叠进行），None 时读取配置
+            resume_job: 要恢复的未完成任务（任务日志），上次已完成且核对通过的APK不再执行
         """
         super(ADBBatchInstallThread, self).__init__()
         self.device_id = device_id
@@ -51,6 +90,34 @@ class ADBBatchInstallThread(QThread):
         self.allow_downgrade = allow_downgrade
         self.selected_files = selected_files
         
+        # 多设备并行安装配置
+        self.device_ids = list(dict.fromkeys(device_ids or ([device_id] if device_id else [])))
+        if not self.device_id and self.device_ids:
+            self.device_id = self.device_ids[0]
+        self.multi_device = len(self.device_ids) > 1
+        self.max_workers = max_workers or config_manager.get("batch_install.parallel.max_workers", 8)
+        self.per_device_concurrency = per_device_concurrency or config_manager.get(
+            "batch_install.parallel.per_device_concurrency", 1)
+        self.sort_by_size = sort_by_size if sort_by_size is not None else config_manager.get(
+            "batch_install.parallel.sort_by_size", True)
+        
+        # 安装计划配置
+        self.skip_installed = skip_installed if skip_installed is not None else config_manager.get(
+            "batch_install.plan.skip_installed", True)
+        self.plan_only = plan_only
+        self.plan = plan
+        self.install_mode = install_mode or config_manager.get("batch_install.install_mode", "per_apk")
+        
+        # 任务日志：记录每个 (设备, APK) 的结果，中断后可以恢复
+        self.resume_job = resume_job
+        self._journal = None
+        self._resumed_done = {}  # {设备ID: 恢复任务时不再执行的APK路径集合}
+        
+        # 流水线模式配置：单台设备的并行传输数，以及所有设备合计的传输数上限（共享主机 USB 带宽）
+        self.transfer_streams = max(1, config_manager.get("batch_install.pipeline.transfer_streams", 2))
+        self._transfer_slots = threading.Semaphore(
+            max(1, config_manager.get("batch_install.pipeline.max_total_streams", 4)))
+        
         # 从配置文件读取特殊处理的包名配置
         self.special_packages_config = config_manager.get("batch_install.special_packages", {
             "@com.saicmotor.voiceservice": {
@@ -63,30 +130,48 @@ class ADBBatchInstallThread(QThread):
             }
         })
 
-    def _execute_adb_command(self, command, realtime=False):
+    def _format_message(self, message, device_id=None):
+        """多设备模式下为输出加上设备前缀，便于区分并发任务的输出"""
+        if self.multi_device and device_id:
+            return f"[{device_id}] {message}"
+        return message
+
+    def _emit_progress(self, message, device_id=None):
+        self.progress_signal.emit(self._format_message(message, device_id))
+
+    def _emit_error(self, message, device_id=None):
+        self.error_signal.emit(self._format_message(message, device_id))
+
+    def _uses_u2(self, device_id):
+        """u2 设备对象只对应当前选中的设备"""
+        return self.connection_mode == 'u2' and self.u2_device is not None and device_id == self.device_id
+
+    def _execute_adb_command(self, command, realtime=False, device_id=None):
         """执行ADB命令
         
         Args:
             command: ADB命令
             realtime: 是否实时输出，默认为False
+            device_id: 目标设备ID，None 时使用 self.device_id
         """
+        device_id = device_id or self.device_id
         try:
             if realtime:
                 # 实时输出模式
                 def output_callback(line):
-                    self.realtime_output_signal.emit(line)
+                    self.realtime_output_signal.emit(self._format_message(line, device_id))
                 
                 result = adb_utils.run_adb_command_realtime(
                     command, 
-                    self.device_id,
+                    device_id,
                     output_callback=output_callback
                 )
             else:
                 # 普通模式
-                result = adb_utils.run_adb_command(command, self.device_id)
+                result = adb_utils.run_adb_command(command, device_id)
             return result
         except Exception as e:
-            self.error_signal.emit(f"执行ADB命令失败: {str(e)}")
+            self._emit_error(f"执行ADB命令失败: {str(e)}", device_id)
             return None
 
     def _execute_u2_command(self, command):
@@ -94,161 +179,122 @@ class ADBBatchInstallThread(QThread):
         try:
             # u2模式下，使用shell命令执行
             result = self.u2_device.shell(command)
+            # 绕过了 ADBUtils，需要手动通知命令钩子（如使包信息快照失效）
+            adb_utils.notify_command_executed(command, getattr(self.u2_device, 'serial', None) or self.device_id)
             return result
         except Exception as e:
             self.error_signal.emit(f"执行u2命令失败: {str(e)}")
             return None
 
-    def _execute_command(self, command, realtime=False):
+    def _execute_command(self, command, realtime=False, device_id=None):
         """根据连接模式执行命令
         
         Args:
             command: 命令
             realtime: 是否实时输出，默认为False
+            device_id: 目标设备ID，None 时使用 self.device_id
         """
+        device_id = device_id or self.device_id
         # 对于 install 命令，始终使用本地 ADB 命令，因为 u2.shell() 无法执行安装
         if command.strip().startswith('install'):
-            return self._execute_adb_command(command, realtime=realtime)
-        elif self.connection_mode == 'u2' and self.u2_device:
+            return self._execute_adb_command(command, realtime=realtime, device_id=device_id)
+        elif self._uses_u2(device_id):
             return self._execute_u2_command(command)
         else:
-            return self._execute_adb_command(command, realtime=realtime)
+            return self._execute_adb_command(command, realtime=realtime, device_id=device_id)
 
     def _get_apk_package_name(self, apk_path):
-        """获取APK文件的包名"""
+        """获取APK文件的包名（结果由APK元数据缓存提供）"""
         try:
-            # 使用aapt工具获取包名
-            quoted_apk_path = f'"{apk_path}"'
-            command = f"aapt dump badging {quoted_apk_path} | findstr name"
-            
-            result = subprocess.run(
-                command, 
-                shell=True, 
-                capture_output=True, 
-                text=True, 
-                encoding='utf-8', 
-                errors='ignore'
-            )
-            
-            if result.returncode != 0:
-                self.error_signal.emit(f"获取APK包名失败: {result.stderr}")
-                return None
-            
-            # 解析包名
-            output = result.stdout.strip()
-            match = re.search(r"name='([^']+)'", output)
-            if match:
-                package_name = match.group(1)
-                return package_name
-            else:
-                self.error_signal.emit(f"无法解析APK包名: {output}")
-                return None
-                
+            return apk_metadata_cache.get(apk_path)["package_name"]
+        except ApkMetadataError as e:
+            self.error_signal.emit(f"获取APK包名失败: {str(e)}")
+            return None
         except Exception as e:
             self.error_signal.emit(f"获取APK包名时发生错误: {str(e)}")
             return None
 
-    def _get_package_install_path(self, package_name):
+    def _get_package_install_path(self, package_name, device_id=None):
         """获取包名的安装路径和文件名
         
         Returns:
             tuple: (完整apk路径, apk文件名) 或 None
         """
+        device_id = device_id or self.device_id
         try:
             command = f"shell pm path {package_name}"
             
             # 显示要执行的adb命令
-            self.progress_signal.emit(f"执行命令: adb -s {self.device_id} {command}")
+            self._emit_progress(f"执行命令: adb -s {device_id} {command}", device_id)
             
             # 执行adb shell pm path <包名> 命令
-            result = self._execute_command(command)
+            result = self._execute_command(command, device_id=device_id)
             
             if result is None:
                 return None
             
-            if self.connection_mode == 'u2':
+            if self._uses_u2(device_id):
                 output = str(result).strip()
             else:
                 output = result.stdout.strip() if hasattr(result, 'stdout') else str(result).strip()
             
             # 显示完整的返回结果
-            self.progress_signal.emit(f"命令返回: {output}")
+            self._emit_progress(f"命令返回: {output}", device_id)
             
             # 解析路径，格式通常是：package:/data/app/包名-xxx/base.apk
             if output.startswith("package:"):
                 apk_path = output.replace("package:", "").strip()
                 # 获取文件名
                 apk_filename = os.path.basename(apk_path)
-                self.progress_signal.emit(f"解析出的安装路径: {apk_path}")
-                self.progress_signal.emit(f"APK文件名: {apk_filename}")
+                self._emit_progress(f"解析出的安装路径: {apk_path}", device_id)
+                self._emit_progress(f"APK文件名: {apk_filename}", device_id)
                 return (apk_path, apk_filename)
             else:
-                self.progress_signal.emit(f"未找到包 {package_name} 的安装路径")
+                self._emit_progress(f"未找到包 {package_name} 的安装路径", device_id)
                 return None
                 
         except Exception as e:
-            self.error_signal.emit(f"获取包安装路径失败: {str(e)}")
+            self._emit_error(f"获取包安装路径失败: {str(e)}", device_id)
             return None
 
-    def _install_apk(self, apk_path, allow_downgrade=False):
+    def _install_apk(self, apk_path, allow_downgrade=False, device_id=None, use_device_cache=True):
         """安装APK文件
         
         Args:
             apk_path: APK文件路径
             allow_downgrade: 是否允许降级安装，默认为False
+            device_id: 目标设备ID，None 时使用 self.device_id
+            use_device_cache: 是否先尝试设备端APK缓存；调用方已经试过缓存时传 False，直接 adb install
         """
+        device_id = device_id or self.device_id
+        if use_device_cache:
+            cached_result = self._install_from_device_cache(apk_path, allow_downgrade, device_id)
+            if cached_result is not None:
+                return cached_result
         try:
             # 规范化路径，将反斜杠转换为正斜杠，避免 shell 转义问题
             normalized_path = apk_path.replace('\\', '/')
             quoted_apk_path = f'"{normalized_path}"'
             
-            # 首先尝试带 -r 的命令
-            if allow_downgrade:
-                command = f"install -r -d {quoted_apk_path}"
-                mode_desc = "降级安装模式 (-r -d)"
-            else:
-                command = f"install -r {quoted_apk_path}"
-                mode_desc = "普通安装模式 (-r)"
-            
-            self.progress_signal.emit(f"使用{mode_desc}")
-            self.progress_signal.emit(f"执行命令: adb -s {self.device_id} {command}")
-            
-            # 使用实时输出执行命令
-            result = self._execute_command(command, realtime=True)
+            # 按设备能力选择选项：已知不支持 -r 的设备直接省略，支持流式安装时不先 push 到临时目录
+            replace = device_capabilities.is_supported(device_id, "install_replace")
+            streaming = self._supports_streaming(device_id)
             
-            if result is None:
-                return False
-            
-            # 获取输出内容
-            if hasattr(result, 'stdout'):
-                output = result.stdout.strip()
-            else:
-                output = str(result)
-            
-            # 显示完整的返回结果
-            self.progress_signal.emit(f"命令返回: {output}")
-            
-            # 检查是否成功
-            if "Success" in output or "success" in output.lower():
-                self.progress_signal.emit("安装成功！")
-                return True
-            
-            # 检查是否是因为不支持 -r 选项
-            if "Unknown option 'r'" in output or "Unknown option" in output:
-                self.progress_signal.emit("设备不支持 -r 选项，尝试使用不带 -r 的命令...")
-                
-                # 重试不带 -r 的命令
+            while True:
+                options = (["-r"] if replace else []) + (["-d"] if allow_downgrade else [])
+                if streaming:
+                    options.append("--streaming")
+                command = " ".join(["install"] + options + [quoted_apk_path])
                 if allow_downgrade:
-                    command = f"install -d {quoted_apk_path}"
-                    mode_desc = "降级安装模式 (-d)"
+                    mode_desc = f"降级安装模式 ({' '.join(options)})"
                 else:
-                    command = f"install {quoted_apk_path}"
-                    mode_desc = "普通安装模式"
+                    mode_desc = f"普通安装模式 ({' '.join(options)})" if options else "普通安装模式"
                 
-                self.progress_signal.emit(f"使用{mode_desc}")
-                self.progress_signal.emit(f"执行命令: adb -s {self.device_id} {command}")
+                self._emit_progress(f"使用{mode_desc}", device_id)
+                self._emit_progress(f"执行命令: adb -s {device_id} {command}", device_id)
                 
-                result = self._execute_command(command, realtime=True)
+                # 使用实时输出执行命令
+                result = self._execute_command(command, realtime=True, device_id=device_id)
                 
                 if result is None:
                     return False
@@ -259,91 +305,158 @@ class ADBBatchInstallThread(QThread):
                 else:
                     output = str(result)
                 
-                self.progress_signal.emit(f"命令返回: {output}")
+                # 显示完整的返回结果
+                self._emit_progress(f"命令返回: {output}", device_id)
                 
+                # 检查是否成功
                 if "Success" in output or "success" in output.lower():
-                    self.progress_signal.emit("安装成功！")
+                    self._emit_progress("安装成功！", device_id)
                     return True
-                else:
-                    self.error_signal.emit(f"安装失败: {output}")
-                    return False
-            else:
-                self.error_signal.emit(f"安装失败: {output}")
+                
+                # 不支持的选项记录到设备能力缓存，本次连接内后续安装不再试错
+                if streaming and "streaming" in output and "Unknown option" in output:
+                    self._emit_progress("adb 不支持 --streaming 选项，改用默认安装方式...", device_id)
+                    device_capabilities.mark_unsupported(device_id, "install_streaming")
+                    streaming = False
+                    continue
+                
+                # 检查是否是因为不支持 -r 选项
+                if replace and ("Unknown option 'r'" in output or "Unknown option" in output):
+                    self._emit_progress("设备不支持 -r 选项，尝试使用不带 -r 的命令...", device_id)
+                    device_capabilities.mark_unsupported(device_id, "install_replace")
+                    replace = False
+                    continue
+                
+                self._emit_error(f"安装失败: {output}", device_id)
                 return False
                 
         except Exception as e:
-            self.error_signal.emit(f"安装APK时发生错误: {str(e)}")
+            self._emit_error(f"安装APK时发生错误: {str(e)}", device_id)
             return False
 
-    def _push_apk_to_path(self, apk_path, target_path):
+    @staticmethod
+    def _supports_streaming(device_id):
+        """设备和本机 adb 都支持 `adb install --streaming`（本次连接内未被判定为不支持）"""
+        return (device_capabilities.supports_streaming_install(device_id)
+                and device_capabilities.is_supported(device_id, "install_streaming"))
+
+    def _install_from_device_cache(self, apk_path, allow_downgrade, device_id):
+        """通过设备端APK缓存安装（同一APK再次安装时不重新传输）
+        
+        Returns:
+            True/False: 安装结果；None: 无法使用缓存，调用方改用 adb install
+        """
+        try:
+            remote_path = device_apk_cache.lookup(
+                device_id, apk_path, self._supports_streaming(device_id),
+                progress_callback=lambda message: self._emit_progress(message, device_id))
+        except Exception as e:
+            self._emit_progress(f"设备APK缓存不可用，直接安装: {str(e)}", device_id)
+            return None
+        if not remote_path:
+            return None
+        result = self._install_device_file(remote_path, allow_downgrade, device_id)
+        if result is None:
+            # 缓存文件无法读取（被删除、损坏等），丢弃该条目后改用 adb install
+            device_apk_cache.invalidate(device_id, apk_path)
+        return result
+
+    def _install_device_file(self, remote_path, allow_downgrade, device_id):
+        """对设备上已有的APK文件执行 pm install
+        
+        Returns:
+            True/False: 安装结果；None: 设备文件无法读取
+        """
+        package_command = device_capabilities.package_command(device_id)
+        command = f"shell {pm_install_command(remote_path, allow_downgrade, package_command=package_command)}"
+        self._emit_progress(f"执行命令: adb -s {device_id} {command}", device_id)
+        result = self._execute_adb_command(command, realtime=True, device_id=device_id)
+        if result is None:
+            return None
+        output = result.stdout.strip() if hasattr(result, 'stdout') else str(result)
+        self._emit_progress(f"命令返回: {output}", device_id)
+        
+        if "Success" in output:
+            self._emit_progress("安装成功！", device_id)
+            return True
+        if "Failure [" in output:
+            # 安装本身被系统拒绝（签名冲突、禁止降级等），重新传输也不会成功
+            self._emit_error(f"安装失败: {output}", device_id)
+            return False
+        self._emit_progress("设备上的APK文件不可用，改用 adb install", device_id)
+        return None
+
+    def _push_apk_to_path(self, apk_path, target_path, device_id=None):
         """将APK文件push到指定路径"""
+        device_id = device_id or self.device_id
         try:
             quoted_apk_path = f'"{apk_path}"'
             command = f"push {quoted_apk_path} {target_path}"
             
             # 显示要执行的adb命令
-            self.progress_signal.emit(f"执行命令: adb -s {self.device_id} {command}")
+            self._emit_progress(f"执行命令: adb -s {device_id} {command}", device_id)
             
             # 使用实时输出执行命令
-            result = self._execute_command(command, realtime=True)
+            result = self._execute_command(command, realtime=True, device_id=device_id)
             
             if result is None:
                 return False
             
-            if self.connection_mode == 'u2':
+            if self._uses_u2(device_id):
                 output = str(result)
             else:
                 output = result.stdout.strip() if hasattr(result, 'stdout') else str(result)
             
             # 显示完整的返回结果
-            self.progress_signal.emit(f"命令返回: {output}")
+            self._emit_progress(f"命令返回: {output}", device_id)
             
             if "pushed" in output.lower() or "success" in output.lower():
-                self.progress_signal.emit("push成功！")
+                self._emit_progress("push成功！", device_id)
                 return True
             else:
-                self.error_signal.emit(f"push失败: {output}")
+                self._emit_error(f"push失败: {output}", device_id)
                 return False
                 
         except Exception as e:
-            self.error_signal.emit(f"push APK时发生错误: {str(e)}")
+            self._emit_error(f"push APK时发生错误: {str(e)}", device_id)
             return False
 
-    def _delete_device_apk(self, apk_path):
+    def _delete_device_apk(self, apk_path, device_id=None):
         """删除设备上的APK文件"""
+        device_id = device_id or self.device_id
         try:
             command = f"shell rm -f {apk_path}"
             
             # 显示要执行的adb命令
-            self.progress_signal.emit(f"执行命令: adb -s {self.device_id} {command}")
+            self._emit_progress(f"执行命令: adb -s {device_id} {command}", device_id)
             
             # 执行删除命令
-            result = self._execute_command(command)
+            result = self._execute_command(command, device_id=device_id)
             
             if result is None:
                 return False
             
-            if self.connection_mode == 'u2':
+            if self._uses_u2(device_id):
                 output = str(result)
             else:
                 output = result.stdout.strip() if hasattr(result, 'stdout') else str(result)
             
             # 显示完整的返回结果
-            self.progress_signal.emit(f"命令返回: {output}")
+            self._emit_progress(f"命令返回: {output}", device_id)
             
             # 检查是否删除成功
             if "No such file or directory" in output:
-                self.progress_signal.emit(f"文件不存在: {apk_path}")
+                self._emit_progress(f"文件不存在: {apk_path}", device_id)
                 return True  # 文件不存在也算成功
             elif "Permission denied" in output:
-                self.error_signal.emit(f"权限不足，无法删除文件: {apk_path}")
+                self._emit_error(f"权限不足，无法删除文件: {apk_path}", device_id)
                 return False
             else:
-                self.progress_signal.emit("删除成功！")
+                self._emit_progress("删除成功！", device_id)
                 return True
                 
         except Exception as e:
-            self.error_signal.emit(f"删除设备APK时发生错误: {str(e)}")
+            self._emit_error(f"删除设备APK时发生错误: {str(e)}", device_id)
             return False
 
     def _scan_apk_files(self):
@@ -372,143 +485,566 @@ class ADBBatchInstallThread(QThread):
             self.error_signal.emit(f"扫描APK文件时发生错误: {str(e)}")
             return []
 
+    def _collect_apk_files(self):
+        """扫描APK文件并按选择过滤，未找到时返回空列表"""
+        self.progress_signal.emit("开始扫描文件夹中的APK文件...")
+        
+        # 扫描APK文件
+        apk_files = self._scan_apk_files()
+        
+        if not apk_files:
+            self.error_signal.emit("未找到APK文件")
+            return []
+        
+        # 如果指定了选中的文件，则过滤文件列表
+        if self.selected_files:
+            filtered_apk_files = []
+            for apk_path in apk_files:
+                file_name = os.path.basename(apk_path)
+                if file_name in self.selected_files:
+                    filtered_apk_files.append(apk_path)
+            
+            if not filtered_apk_files:
+                self.error_signal.emit("未找到选中的APK文件")
+                return []
+            
+            apk_files = filtered_apk_files
+            self.progress_signal.emit(f"根据选择过滤，找到 {len(apk_files)} 个APK文件")
+        else:
+            self.progress_signal.emit(f"找到 {len(apk_files)} 个APK文件")
+        
+        return apk_files
+
+    def _get_special_config(self, package_name):
+        """获取特殊包名的配置信息，非特殊包返回 None"""
+        for config_key, config_value in self.special_packages_config.items():
+            if package_name == config_key.replace("@", ""):
+                return config_value
+        return None
+
+    def _process_apk(self, apk_path, package_name, device_id=None):
+        """
+        将单个APK安装（或按特殊包配置push）到指定设备
+        
+        Returns:
+            tuple: (是否成功, 是否为特殊包)
+        """
+        device_id = device_id or self.device_id
+        special_config = self._get_special_config(package_name)
+        
+        if not special_config:
+            self._emit_progress(f"  执行普通安装", device_id)
+            # 执行普通安装
+            return self._install_apk(apk_path, self.allow_downgrade, device_id), False
+        
+        # 从配置中获取是否删除原文件
+        delete_before_push = special_config.get("delete_before_push", False)
+        description = special_config.get("description", "")
+        
+        self._emit_progress(f"  检测到特殊包名: {package_name}", device_id)
+        if description:
+            self._emit_progress(f"  配置说明: {description}", device_id)
+        self._emit_progress(f"  删除原文件: {'是' if delete_before_push else '否'}", device_id)
+        
+        # 获取安装路径和文件名
+        install_info = self._get_package_install_path(package_name, device_id)
+        
+        if install_info is None:
+            self._emit_progress(f"  无法获取安装路径，尝试普通安装", device_id)
+            # 如果无法获取路径，回退到普通安装
+            return self._install_apk(apk_path, self.allow_downgrade, device_id), True
+        
+        device_apk_path, device_apk_filename = install_info
+        self._emit_progress(f"  设备APK路径: {device_apk_path}", device_id)
+        self._emit_progress(f"  设备APK文件名: {device_apk_filename}", device_id)
+        
+        # 获取目标路径（目录路径），使用原文件名
+        target_dir = os.path.dirname(device_apk_path)
+        target_path = f"{target_dir}/{device_apk_filename}"
+        
+        # 根据配置决定是否删除原文件
+        if delete_before_push:
+            self._emit_progress(f"  步骤1: 删除设备上的APK文件", device_id)
+            delete_success = self._delete_device_apk(device_apk_path, device_id)
+            
+            if not delete_success:
+                self._emit_progress(f"  删除设备APK失败，尝试普通安装", device_id)
+                return self._install_apk(apk_path, self.allow_downgrade, device_id), True
+            
+            # 2. 将本地apk push到设备
+            self._emit_progress(f"  步骤2: 将本地APK push到设备", device_id)
+            self._emit_progress(f"  目标路径: {target_path}", device_id)
+        else:
+            # 不删除原文件，直接push
+            self._emit_progress(f"  执行push操作（不删除原文件）", device_id)
+            self._emit_progress(f"  目标路径: {target_path}", device_id)
+        
+        return self._push_apk_to_path(apk_path, target_path, device_id), True
+
     def run(self):
         """线程主函数"""
         try:
-            self.progress_signal.emit("开始扫描文件夹中的APK文件...")
+            apk_files = self._collect_apk_files()
+            if not apk_files:
+                return
             
-            # 扫描APK文件
-            apk_files = self._scan_apk_files()
+            # 并行解析未缓存的APK，后续逐个获取包名时直接命中缓存
+            apk_metadata_cache.prefetch(apk_files)
             
-            if not apk_files:
-                self.error_signal.emit("未找到APK文件")
+            plans = self._prepare_plans(apk_files)
+            if self.plan_only:
+                self.plan_signal.emit(plans)
                 return
+            # 设备可能已恢复出厂或清理过临时目录，本轮第一次使用缓存前重新核对
+            device_apk_cache.begin_session(self.device_ids)
+            self._journal = self._open_journal(apk_files)
             
-            # 如果指定了选中的文件，则过滤文件列表
-            if self.selected_files:
-                filtered_apk_files = []
-                for apk_path in apk_files:
-                    file_name = os.path.basename(apk_path)
-                    if file_name in self.selected_files:
-                        filtered_apk_files.append(apk_path)
-                
-                if not filtered_apk_files:
-                    self.error_signal.emit("未找到选中的APK文件")
-                    return
-                
-                apk_files = filtered_apk_files
-                self.progress_signal.emit(f"根据选择过滤，找到 {len(apk_files)} 个APK文件")
+            if self.install_mode == "multi_package":
+                self._run_device_batches(apk_files, plans, self._install_multi_package, "多包原子安装")
+            elif self.install_mode == "pipeline":
+                self._run_device_batches(apk_files, plans, self._install_pipeline, "流水线安装")
+            elif self.multi_device:
+                self._run_multi_device(apk_files, plans)
             else:
-                self.progress_signal.emit(f"找到 {len(apk_files)} 个APK文件")
+                self._run_single_device(apk_files, plans.get(self.device_id))
+            # 中途出现异常时不结束任务日志，下次启动时可以恢复
+            self._journal.finish()
+            
+        except Exception as e:
+            self.error_signal.emit(f"批量安装过程中发生错误: {str(e)}")
+
+    def _prepare_plans(self, apk_files):
+        """
+        计算各设备的安装计划（一次包信息查询比较全部APK的 versionCode）
+        
+        Returns:
+            {设备ID: 计划条目列表}；未启用计划时为空字典，无法获取设备包信息的设备对应 None
+        """
+        if self.plan is not None:
+            return self.plan
+        if not (self.skip_installed or self.plan_only):
+            return {}
+        
+        self.progress_signal.emit("正在计算安装计划（比较设备已安装版本）...")
+        plans = {}
+        for device_id in self.device_ids:
+            plans[device_id] = compute_plan(device_id, apk_files)
+            if plans[device_id] is None:
+                self._emit_error("无法获取设备包信息，将安装全部APK", device_id)
+        self.progress_signal.emit(format_plan(plans, self.allow_downgrade))
+        return plans
+
+    def _open_journal(self, apk_files):
+        """创建任务日志；恢复任务时沿用原日志并核对上次已完成的APK"""
+        if self.resume_job is not None:
+            self._resumed_done = self._revalidate_done(apk_files)
+            return self.resume_job
+        params = {
+            "title": f"批量安装 {len(apk_files)} 个APK（{len(self.device_ids)} 台设备）",
+            "device_id": self.device_id,
+            "device_ids": self.device_ids,
+            "folder_path": self.folder_path,
+            "selected_files": self.selected_files,
+            "allow_downgrade": self.allow_downgrade,
+            "install_mode": self.install_mode,
+        }
+        return start_job("batch_install", params,
+                         [unit_key(device_id, apk_path) for device_id in self.device_ids for apk_path in apk_files])
+    
+    def _revalidate_done(self, apk_files):
+        """
+        恢复任务：上次已完成的APK用一次包信息查询核对（中断期间设备可能被刷机或卸载了应用），
+        设备上仍是该版本的不再安装，其余重新执行
+        
+        Returns:
+            {设备ID: 不需要再执行的APK路径集合}
+        """
+        done_units = self.resume_job.done_units()
+        resumed = {}
+        for device_id in self.device_ids:
+            done_paths = [apk_path for apk_path in apk_files if unit_key(device_id, apk_path) in done_units]
+            if not done_paths:
+                continue
+            # 启用安装计划时刚刚获取过快照，直接复用
+            plan = compute_plan(device_id, done_paths, refresh=False)
+            if plan is None:
+                self._emit_error("无法获取设备包信息，上次已完成的APK将重新执行", device_id)
+                continue
+            confirmed = set()
+            for entry in plan:
+                # 特殊包 push 到系统目录，重启前版本号不会变化，以任务日志为准
+                special = entry["package_name"] and self._get_special_config(entry["package_name"])
+                if special or not should_execute(entry, self.allow_downgrade):
+                    confirmed.add(entry["apk_path"])
+            resumed[device_id] = confirmed
+            self._emit_progress(f"恢复任务: 上次已完成 {len(done_paths)} 个APK，核对通过 {len(confirmed)} 个", device_id)
+        return resumed
+    
+    def _record_result(self, device_id, apk_path, status):
+        """把APK的最终状态写入任务日志（成功和跳过的在恢复任务时不再执行）"""
+        if self._journal is not None:
+            self._journal.record(unit_key(device_id, apk_path), status,
+                                 ok=status == "成功" or status.startswith("跳过"))
+    
+    def _planned_skip_status(self, plan_entries, apk_path, device_id):
+        """按安装计划（或恢复任务时已完成）不需要执行时返回文件状态，需要执行时返回 None"""
+        if apk_path in self._resumed_done.get(device_id, ()):
+            return "跳过（已完成）"
+        entry = plan_entries.get(apk_path) if plan_entries else None
+        if entry is None or should_execute(entry, self.allow_downgrade):
+            return None
+        if entry["action"] == ACTION_DOWNGRADE:
+            return "跳过（需降级）"
+        return "跳过"
+
+    def _run_single_device(self, apk_files, plan=None):
+        """逐个安装到单台设备"""
+        total_files = len(apk_files)
+        self.overall_progress_signal.emit(0, total_files)
+        
+        success_count = 0
+        fail_count = 0
+        special_count = 0
+        skip_count = 0
+        plan_entries = {entry["apk_path"]: entry for entry in plan} if plan else None
+        
+        for index, apk_path in enumerate(apk_files):
+            file_name = os.path.basename(apk_path)
             
-            total_files = len(apk_files)
-            self.overall_progress_signal.emit(0, total_files)
+            # 更新总体进度
+            self.overall_progress_signal.emit(index + 1, total_files)
             
-            success_count = 0
-            fail_count = 0
-            special_count = 0
+            skip_status = self._planned_skip_status(plan_entries, apk_path, self.device_id)
+            if skip_status:
+                self.file_progress_signal.emit(file_name, skip_status)
+                self._record_result(self.device_id, apk_path, skip_status)
+                skip_count += 1
+                continue
             
-            for index, apk_path in enumerate(apk_files):
-                file_name = os.path.basename(apk_path)
-                self.progress_signal.emit(f"处理文件 ({index+1}/{total_files}): {file_name}")
-                self.file_progress_signal.emit(file_name, "开始处理")
-                
-                # 更新总体进度
-                self.overall_progress_signal.emit(index + 1, total_files)
-                
-                # 获取包名
-                package_name = self._get_apk_package_name(apk_path)
-                
+            self.progress_signal.emit(f"处理文件 ({index+1}/{total_files}): {file_name}")
+            self.file_progress_signal.emit(file_name, "开始处理")
+            
+            # 获取包名
+            package_name = self._get_apk_package_name(apk_path)
+            
+            if package_name is None:
+                self.file_progress_signal.emit(file_name, "获取包名失败")
+                self._record_result(self.device_id, apk_path, "获取包名失败")
+                fail_count += 1
+                continue
+            
+            self.progress_signal.emit(f"  包名: {package_name}")
+            
+            success, is_special = self._process_apk(apk_path, package_name)
+            if is_special:
+                special_count += 1
+            
+            # 更新文件状态
+            if success:
+                self.file_progress_signal.emit(file_name, "成功")
+                success_count += 1
+            else:
+                self.file_progress_signal.emit(file_name, "失败")
+                fail_count += 1
+            self._record_result(self.device_id, apk_path, "成功" if success else "失败")
+        
+        # 输出最终结果
+        self.result_signal.emit(self._format_single_result(total_files, success_count, fail_count,
+                                                           skip_count, special_count))
+
+    def _format_single_result(self, total_files, success_count, fail_count, skip_count, special_count):
+        """生成单设备安装结果汇总文本"""
+        return (f"批量安装完成！\n"
+                f"{'选择文件数' if self.selected_files else '总文件数'}: {total_files}\n"
+                f"成功: {success_count}\n"
+                f"失败: {fail_count}\n"
+                f"跳过: {skip_count}\n"
+                f"特殊处理: {special_count}")
+
+    def _run_multi_device(self, apk_files, plans=None):
+        """
+        并行安装到多台设备
+        
+        每个 (设备, APK) 组合作为一个任务提交到有界线程池，
+        每台设备用信号量限制同时进行的任务数，避免单台设备的 pm 同时处理过多安装。
+        """
+        device_ids = self.device_ids
+        self.progress_signal.emit(f"多设备并行安装: {len(device_ids)} 台设备 ({', '.join(device_ids)})")
+        
+        # 包名只与APK相关，先解析一次供所有设备复用
+        packages = []
+        for apk_path in apk_files:
+            package_name = self._get_apk_package_name(apk_path)
+            packages.append((apk_path, package_name))
+            if package_name:
+                self.progress_signal.emit(f"  {os.path.basename(apk_path)} 包名: {package_name}")
+        
+        # 大文件优先调度，缩短整体完成时间
+        if self.sort_by_size:
+            packages.sort(key=lambda item: os.path.getsize(item[0]) if os.path.exists(item[0]) else 0, reverse=True)
+        
+        plan_entries = {
+            device_id: {entry["apk_path"]: entry for entry in plan}
+            for device_id, plan in (plans or {}).items() if plan
+        }
+        
+        total_jobs = len(packages) * len(device_ids)
+        matrix = {device_id: {} for device_id in device_ids}
+        device_done = {device_id: 0 for device_id in device_ids}
+        special_names = set()
+        semaphores = {device_id: threading.Semaphore(max(1, self.per_device_concurrency)) for device_id in device_ids}
+        lock = threading.Lock()
+        completed = 0
+        
+        self.overall_progress_signal.emit(0, total_jobs)
+        
+        def install_job(device_id, apk_path, package_name):
+            file_name = os.path.basename(apk_path)
+            skip_status = self._planned_skip_status(plan_entries.get(device_id), apk_path, device_id)
+            if skip_status:
+                return device_id, file_name, skip_status, False
+            with semaphores[device_id]:
+                self.file_progress_signal.emit(f"[{device_id}] {file_name}", "开始处理")
                 if package_name is None:
-                    self.file_progress_signal.emit(file_name, "获取包名失败")
-                    fail_count += 1
-                    continue
-                
-                self.progress_signal.emit(f"  包名: {package_name}")
-                
-                # 检查是否为特殊包名，并获取配置信息
-                special_config = None
-                for config_key, config_value in self.special_packages_config.items():
-                    if package_name == config_key.replace("@", ""):
-                        special_config = config_value
-                        break
+                    return device_id, file_name, "获取包名失败", False
+                success, is_special = self._process_apk(apk_path, package_name, device_id)
+                return device_id, file_name, "成功" if success else "失败", is_special
+        
+        workers = max(1, min(self.max_workers, total_jobs))
+        self.progress_signal.emit(f"共 {total_jobs} 个安装任务，并发数: {workers}，"
+                                  f"单设备并发数: {max(1, self.per_device_concurrency)}")
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="BatchInstall") as executor:
+            # 按 APK 轮流提交到各设备，使所有设备同时开始工作
+            futures = {}
+            for apk_path, package_name in packages:
+                for device_id in device_ids:
+                    future = executor.submit(install_job, device_id, apk_path, package_name)
+                    futures[future] = (device_id, apk_path)
+            
+            for future in as_completed(futures):
+                device_id, apk_path = futures[future]
+                file_name = os.path.basename(apk_path)
+                try:
+                    device_id, file_name, status, is_special = future.result()
+                except Exception as e:
+                    self._emit_error(f"安装 {file_name} 时发生错误: {str(e)}", device_id)
+                    status, is_special = "失败", False
+                self._record_result(device_id, apk_path, status)
                 
-                if special_config:
-                    special_count += 1
-                    
-                    # 从配置中获取是否删除原文件
-                    delete_before_push = special_config.get("delete_before_push", False)
-                    description = special_config.get("description", "")
-                    
-                    self.progress_signal.emit(f"  检测到特殊包名: {package_name}")
-                    if description:
-                        self.progress_signal.emit(f"  配置说明: {description}")
-                    self.progress_signal.emit(f"  删除原文件: {'是' if delete_before_push else '否'}")
-                    
-                    # 获取安装路径和文件名
-                    install_info = self._get_package_install_path(package_name)
-                    
-                    if install_info is None:
-                        self.progress_signal.emit(f"  无法获取安装路径，尝试普通安装")
-                        # 如果无法获取路径，回退到普通安装
-                        success = self._install_apk(apk_path, self.allow_downgrade)
-                    else:
-                        device_apk_path, device_apk_filename = install_info
-                        self.progress_signal.emit(f"  设备APK路径: {device_apk_path}")
-                        self.progress_signal.emit(f"  设备APK文件名: {device_apk_filename}")
-                        
-                        # 根据配置决定是否删除原文件
-                        if delete_before_push:
-                            self.progress_signal.emit(f"  步骤1: 删除设备上的APK文件")
-                            delete_success = self._delete_device_apk(device_apk_path)
-                            
-                            if not delete_success:
-                                self.progress_signal.emit(f"  删除设备APK失败，尝试普通安装")
-                                success = self._install_apk(apk_path, self.allow_downgrade)
-                            else:
-                                # 2. 将本地apk push到设备，使用原文件名
-                                # 获取目标路径（目录路径）
-                                target_dir = os.path.dirname(device_apk_path)
-                                target_path = f"{target_dir}/{device_apk_filename}"
-                                
-                                self.progress_signal.emit(f"  步骤2: 将本地APK push到设备")
-                                self.progress_signal.emit(f"  目标路径: {target_path}")
-                                success = self._push_apk_to_path(apk_path, target_path)
-                        else:
-                            # 不删除原文件，直接push
-                            # 获取目标路径（目录路径）
-                            target_dir = os.path.dirname(device_apk_path)
-                            target_path = f"{target_dir}/{device_apk_filename}"
-                            
-                            self.progress_signal.emit(f"  执行push操作（不删除原文件）")
-                            self.progress_signal.emit(f"  目标路径: {target_path}")
-                            success = self._push_apk_to_path(apk_path, target_path)
-                else:
-                    self.progress_signal.emit(f"  执行普通安装")
-                    # 执行普通安装
-                    success = self._install_apk(apk_path, self.allow_downgrade)
+                with lock:
+                    matrix[device_id][file_name] = status
+                    device_done[device_id] += 1
+                    completed += 1
+                    if is_special:
+                        special_names.add(file_name)
+                    done_on_device = device_done[device_id]
+                    done_total = completed
                 
-                # 更新文件状态
-                if success:
-                    self.file_progress_signal.emit(file_name, "成功")
-                    success_count += 1
+                self.file_progress_signal.emit(f"[{device_id}] {file_name}", status)
+                self._emit_progress(f"设备进度: {done_on_device}/{len(packages)}", device_id)
+                self.overall_progress_signal.emit(done_total, total_jobs)
+        
+        self.result_matrix_signal.emit(matrix)
+        self.result_signal.emit(self._format_result_matrix(matrix, len(packages), len(special_names)))
+
+    def _file_label(self, file_name, device_id):
+        """文件状态显示名称，多设备模式下带设备前缀"""
+        return f"[{device_id}] {file_name}" if self.multi_device else file_name
+
+    def _run_device_batches(self, apk_files, plans, install_batch, title):
+        """
+        各设备并行，每台设备把需要安装的普通APK作为一批交给 install_batch 处理
+        
+        特殊包仍按配置单独 push，按计划跳过的APK不执行。
+        
+        Args:
+            install_batch: (APK路径列表, 设备ID) -> {文件名: 状态}
+            title: 输出中的安装方式名称
+        """
+        device_ids = self.device_ids
+        self.progress_signal.emit(f"{title}: {len(device_ids)} 台设备")
+        packages = [(apk_path, self._get_apk_package_name(apk_path)) for apk_path in apk_files]
+        special_names = set()
+        
+        def device_job(device_id):
+            plan_entries = {entry["apk_path"]: entry for entry in (plans or {}).get(device_id) or []}
+            results = {}
+            batch = []
+            for apk_path, package_name in packages:
+                file_name = os.path.basename(apk_path)
+                skip_status = self._planned_skip_status(plan_entries, apk_path, device_id)
+                if skip_status:
+                    results[file_name] = skip_status
+                elif package_name is None:
+                    results[file_name] = "获取包名失败"
+                elif self._get_special_config(package_name):
+                    success, _ = self._process_apk(apk_path, package_name, device_id)
+                    results[file_name] = "成功" if success else "失败"
+                    special_names.add(file_name)
                 else:
-                    self.file_progress_signal.emit(file_name, "失败")
-                    fail_count += 1
-            
-            # 输出最终结果
-            if self.selected_files:
-                self.result_signal.emit(f"批量安装完成！\n"
-                                      f"选择文件数: {total_files}\n"
-                                      f"成功: {success_count}\n"
-                                      f"失败: {fail_count}\n"
-                                      f"特殊处理: {special_count}")
-            else:
-                self.result_signal.emit(f"批量安装完成！\n"
-                                      f"总文件数: {total_files}\n"
-                                      f"成功: {success_count}\n"
-                                      f"失败: {fail_count}\n"
-                                      f"特殊处理: {special_count}")
+                    batch.append(apk_path)
+                if file_name in results:
+                    self.file_progress_signal.emit(self._file_label(file_name, device_id), results[file_name])
+                    self._record_result(device_id, apk_path, results[file_name])
+            if batch:
+                results.update(install_batch(batch, device_id))
+            return results
+        
+        matrix = {}
+        self.overall_progress_signal.emit(0, len(device_ids))
+        workers = max(1, min(self.max_workers, len(device_ids)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="DeviceInstall") as executor:
+            futures = {executor.submit(device_job, device_id): device_id for device_id in device_ids}
+            for done, future in enumerate(as_completed(futures), 1):
+                device_id = futures[future]
+                try:
+                    matrix[device_id] = future.result()
+                except Exception as e:
+                    self._emit_error(f"{title}时发生错误: {str(e)}", device_id)
+                    matrix[device_id] = {os.path.basename(apk_path): "失败" for apk_path, _ in packages}
+                self.overall_progress_signal.emit(done, len(device_ids))
+        
+        if self.multi_device:
+            self.result_matrix_signal.emit(matrix)
+            self.result_signal.emit(self._format_result_matrix(matrix, len(packages), len(special_names)))
+            return
+        statuses = list(matrix[self.device_id].values())
+        success_count = statuses.count("成功")
+        skip_count = sum(1 for status in statuses if status.startswith("跳过"))
+        self.result_signal.emit(self._format_single_result(
+            len(statuses), success_count, len(statuses) - success_count - skip_count, skip_count, len(special_names)))
+
+    def _install_multi_package(self, apk_paths, device_id):
+        """在一个多包会话中安装一组APK（设备不支持多包会话时逐个安装），返回 {文件名: 状态}"""
+        self._emit_progress(f"创建多包安装会话: {len(apk_paths)} 个APK", device_id)
+        installer = MultiPackageInstaller(
+            device_id, self.allow_downgrade,
+            output_callback=lambda line: self.realtime_output_signal.emit(self._format_message(line, device_id))
+        )
+        try:
+            installer.install(apk_paths, progress_callback=lambda apk_path, status: self.file_progress_signal.emit(
+                self._file_label(os.path.basename(apk_path), device_id), status))
+        except MultiPackageNotSupported as e:
+            self._emit_progress(f"{str(e)}，改为逐个安装", device_id)
+            results = {}
+            for apk_path in apk_paths:
+                file_name = os.path.basename(apk_path)
+                results[file_name] = "成功" if self._install_apk(apk_path, self.allow_downgrade, device_id) else "失败"
+                self.file_progress_signal.emit(self._file_label(file_name, device_id), results[file_name])
+                self._record_result(device_id, apk_path, results[file_name])
+            return results
+        except MultiPackageInstallError as e:
+            self._emit_error(f"多包安装失败，全部APK已回滚: {str(e)}", device_id)
+            status = "失败（已回滚）"
+        else:
+            self._emit_progress(f"多包安装成功！共 {len(apk_paths)} 个APK", device_id)
+            status = "成功"
+        
+        results = {}
+        for apk_path in apk_paths:
+            file_name = os.path.basename(apk_path)
+            results[file_name] = status
+            self.file_progress_signal.emit(self._file_label(file_name, device_id), status)
+            self._record_result(device_id, apk_path, status)
+        return results
+
+    def _stage_apk(self, apk_path, device_id):
+        """
+        把APK传输到设备（流水线第一阶段，在传输线程中执行）
+        
+        Returns:
+            tuple: (设备端路径, 安装后是否需要删除)
+        """
+        with self._transfer_slots:
+            self.file_progress_signal.emit(self._file_label(os.path.basename(apk_path), device_id), "传输中")
+            # 优先放入设备端APK缓存，下次安装同一APK时无需再传输
+            remote_path = device_apk_cache.ensure(
+                device_id, apk_path, progress_callback=lambda message: self._emit_progress(message, device_id))
+            if remote_path:
+                return remote_path, False
+            remote_path = f"{PIPELINE_STAGE_DIR}/{uuid.uuid4().hex}.apk"
+            run_device_shell(device_id, f"mkdir -p {PIPELINE_STAGE_DIR}", timeout=30)
+            push_to_device(device_id, apk_path, remote_path)
+            return remote_path, True
+
+    def _install_pipeline(self, apk_paths, device_id):
+        """
+        流水线安装一组APK，返回 {文件名: 状态}
+        
+        多个传输线程把APK推送到设备，主循环按顺序对已传输完成的APK执行 pm install；
+        安装（dexopt）进行时后面的APK继续传输。传输最多领先安装 transfer_streams + 1 个，
+        避免设备端暂存过多文件、缓存淘汰掉尚未安装的APK。
+        """
+        self._emit_progress(f"流水线安装: {len(apk_paths)} 个APK，并行传输数 {self.transfer_streams}", device_id)
+        results = {}
+        remaining = iter(apk_paths)
+        pending = deque()
+        
+        with ThreadPoolExecutor(max_workers=self.transfer_streams, thread_name_prefix="ApkStage") as executor:
+            def submit_next():
+                apk_path = next(remaining, None)
+                if apk_path is not None:
+                    pending.append((apk_path, executor.submit(self._stage_apk, apk_path, device_id)))
             
-        except Exception as e:
-            self.error_signal.emit(f"批量安装过程中发生错误: {str(e)}")
\ No newline at end of file
+            for _ in range(self.transfer_streams + 1):
+                submit_next()
+            
+            while pending:
+                apk_path, future = pending.popleft()
+                file_name = os.path.basename(apk_path)
+                try:
+                    remote_path, temporary = future.result()
+                except Exception as e:
+                    self._emit_error(f"传输 {file_name} 失败，改用 adb install: {str(e)}", device_id)
+                    remote_path, temporary = None, False
+                # 先补充传输任务，再执行安装，使传输与安装重叠
+                submit_next()
+                
+                self.file_progress_signal.emit(self._file_label(file_name, device_id), "安装中")
+                success = None
+                if remote_path:
+                    success = self._install_device_file(remote_path, self.allow_downgrade, device_id)
+                    if temporary:
+                        # 删除暂存文件失败不影响安装结果
+                        try:
+                            run_device_shell(device_id, f"rm -f {shlex.quote(remote_path)}", timeout=30)
+                        except Exception as e:
+                            logger.warning(f"删除设备暂存文件失败 [{device_id}]: {remote_path} - {e}")
+                    elif success is None:
+                        device_apk_cache.invalidate(device_id, apk_path)
+                if success is None:
+                    # 传输或设备端文件已失败过一次，不再经过设备缓存重新上传
+                    success = self._install_apk(apk_path, self.allow_downgrade, device_id, use_device_cache=False)
+                
+                results[file_name] = "成功" if success else "失败"
+                self.file_progress_signal.emit(self._file_label(file_name, device_id), results[file_name])
+                self._record_result(device_id, apk_path, results[file_name])
+        return results
+
+    def _format_result_matrix(self, matrix, file_count, special_count):
+        """生成多设备安装结果汇总文本"""
+        success_count = sum(1 for results in matrix.values() for status in results.values() if status == "成功")
+        skip_count = sum(1 for results in matrix.values() for status in results.values() if status.startswith("跳过"))
+        total_jobs = sum(len(results) for results in matrix.values())
+        
+        lines = [
+            "多设备批量安装完成！",
+            f"设备数: {len(matrix)}",
+            f"{'选择文件数' if self.selected_files else '总文件数'}: {file_count}",
+            f"成功: {success_count}",
+            f"失败: {total_jobs - success_count - skip_count}",
+            f"跳过: {skip_count}",
+            f"特殊处理: {special_count}",
+            "",
+            "各设备结果:"
+        ]
+        for device_id, results in matrix.items():
+            failed = sorted(name for name, status in results.items()
+                            if status != "成功" and not status.startswith("跳过"))
+            device_skipped = sum(1 for status in results.values() if status.startswith("跳过"))
+            device_success = len(results) - len(failed) - device_skipped
+            lines.append(f"  {device_id}: 成功 {device_success}/{len(results)}，跳过 {device_skipped}")
+            for name in failed:
+                lines.append(f"    ✗ {name} ({results[name]})")
+        return "\n".join(lines)
@@ -13,6 +13,10 @@ except ImportError:
     from fallbacks import ADBUtilsFallback
     adb_utils = ADBUtilsFallback()
 
+from Function_Moudle.apk_metadata_cache import apk_metadata_cache, ApkMetadataError
+from Function_Moudle.job_journal import start_job, unit_key
+from Function_Moudle.package_snapshot import package_snapshot_cache
+
 
 class ADBBatchVerifyVersionThread(QThread):
     """批量验证APK版本号线程 - 检查APK文件版本号与设备中版本号是否一致"""
@@ -23,7 +27,8 @@ class ADBBatchVerifyVersionThread(QThread):
     verify_result_signal = pyqtSignal(str)  # 验证结果信号
     debug_signal = pyqtSignal(str)  # 调试信号，用于打印详细命令和值
 
-    def __init__(self, device_id, folder_path, connection_mode='adb', u2_device=None, selected_files=None):
+    def __init__(self, device_id, folder_path, connection_mode='adb', u2_device=None, selected_files=None,
+                 resume_job=None):
         """
         初始化验证线程
         
@@ -33,6 +38,7 @@ class ADBBatchVerifyVersionThread(QThread):
             connection_mode: 连接模式 ('u2' 或 'adb')
             u2_device: u2设备对象（仅当connection_mode='u2'时使用）
             selected_files: 选中的APK文件列表，如果为None则处理文件夹中所有APK
+            resume_job: 要恢复的未完成任务（任务日志），设备版本未变化的APK沿用上次的验证结果
         """
         super(ADBBatchVerifyVersionThread, self).__init__()
         self.device_id = device_id
@@ -40,60 +46,24 @@ class ADBBatchVerifyVersionThread(QThread):
         self.connection_mode = connection_mode
         self.u2_device = u2_device
         self.selected_files = selected_files
+        self.resume_job = resume_job
 
     def _get_apk_package_and_version(self, apk_path):
-        """获取APK文件的包名和版本号"""
+        """获取APK文件的包名和版本号（结果由APK元数据缓存提供）"""
         try:
-            # 检查aapt工具是否可用
             try:
-                aapt_check = subprocess.run(
-                    "aapt version",
-                    shell=True,
-                    capture_output=True,
-                    text=True,
-                    encoding='utf-8',
-                    errors='ignore'
-                )
-                if aapt_check.returncode != 0:
-                    self.error_signal.emit("[警告] aapt工具可能未安装或不在PATH中")
-            except (subprocess.SubprocessError, FileNotFoundError):
-                self.error_signal.emit("[警告] 无法检查aapt工具，可能未安装")
-            
-            # 使用aapt工具获取包名和版本号
-            quoted_apk_path = f'"{apk_path}"'
-            command = f"aapt dump badging {quoted_apk_path}"
-            
-            self.progress_signal.emit(f"[获取APK信息] 执行命令: {command}")
-            
-            # 执行命令
-            result = subprocess.run(
-                command, 
-                shell=True, 
-                capture_output=True, 
-                text=True, 
-                encoding='utf-8', 
-                errors='ignore'
-            )
-            
-            if result.returncode != 0:
-                error_msg = result.stderr.strip()
-                if "不是内部或外部命令" in error_msg or "command not found" in error_msg:
+                metadata = apk_metadata_cache.get(apk_path)
+            except ApkMetadataError as e:
+                error_msg = str(e)
+                if "未找到aapt工具" in error_msg:
                     self.error_signal.emit(f"[获取APK信息] aapt工具未找到，请安装Android SDK Build Tools")
                     self.error_signal.emit(f"[获取APK信息] 或者将aapt.exe添加到系统PATH中")
                 else:
-                    self.error_signal.emit(f"[获取APK信息] 命令执行失败: {error_msg}")
+                    self.error_signal.emit(f"[获取APK信息] 解析失败: {error_msg}")
                 return None, None
             
-            # 解析包名和版本号
-            output = result.stdout.strip()
-            
-            # 查找包名
-            package_match = re.search(r"name='([^']+)'", output)
-            package_name = package_match.group(1) if package_match else None
-            
-            # 查找版本号
-            version_match = re.search(r"versionName='([^']+)'", output)
-            version_name = version_match.group(1) if version_match else None
+            package_name = metadata.get("package_name")
+            version_name = metadata.get("version_name")
             
             if package_name:
                 self.progress_signal.emit(f"[获取APK信息] 包名: {package_name}")
@@ -217,6 +187,42 @@ class ADBBatchVerifyVersionThread(QThread):
         # 简单字符串比较
         return apk_version.strip() == device_version.strip()
 
+    def _open_journal(self, apk_files):
+        """
+        创建任务日志；恢复任务时用一次包信息查询核对上次的验证结果
+        
+        Returns:
+            (任务日志, {APK路径: 可以沿用的验证结果})
+        """
+        if self.resume_job is None:
+            params = {
+                "title": f"验证 {len(apk_files)} 个APK的版本号",
+                "device_id": self.device_id,
+                "device_ids": [self.device_id],
+                "folder_path": self.folder_path,
+                "selected_files": self.selected_files,
+            }
+            return start_job("batch_verify", params, [unit_key(self.device_id, apk_path) for apk_path in apk_files]), {}
+        
+        snapshot = package_snapshot_cache.get_snapshot(self.device_id, refresh=True)
+        if snapshot is None:
+            self.error_signal.emit("[恢复任务] 无法获取设备包信息，重新验证全部APK")
+            return self.resume_job, {}
+        reusable = {}
+        for apk_path in apk_files:
+            record = self.resume_job.records.get(unit_key(self.device_id, apk_path))
+            if not record or not record.get("ok"):
+                continue
+            previous = record["verification"]
+            installed = snapshot.get(previous['package_name'])
+            # 中断期间设备上的版本没有变化时，上次的验证结果仍然有效
+            current_version = installed.get("version_name") if installed else 'N/A'
+            if previous['package_name'] != '未知' and current_version == previous['device_version']:
+                reusable[apk_path] = previous
+        self.progress_signal.emit(f"[恢复任务] 上次已验证 {len(self.resume_job.done_units())} 个，"
+                                  f"沿用结果 {len(reusable)} 个")
+        return self.resume_job, reusable
+
     def run(self):
         """线程主函数 - 验证版本号"""
         try:
@@ -254,23 +260,38 @@ class ADBBatchVerifyVersionThread(QThread):
             total_files = len(apk_files)
             self.progress_signal.emit(f"{'选中' if self.selected_files else '找到'} {total_files} 个APK文件")
             
+            # 并行解析未缓存的APK，未变化的APK直接使用缓存结果
+            self.progress_signal.emit("[获取APK信息] 并行解析APK元数据...")
+            misses_before = apk_metadata_cache.get_statistics()['misses']
+            apk_metadata_cache.prefetch(apk_files)
+            parsed_count = apk_metadata_cache.get_statistics()['misses'] - misses_before
+            self.progress_signal.emit(f"[获取APK信息] 缓存命中: {total_files - parsed_count}, 新解析: {parsed_count}")
+            
             # 存储验证结果
             verification_results = []
-            success_count = 0
-            fail_count = 0
             skip_count = 0
+            journal, reusable = self._open_journal(apk_files)
+            
+            def add_result(apk_path, result):
+                verification_results.append(result)
+                journal.record(unit_key(self.device_id, apk_path), result['result'], verification=result)
             
             for index, apk_path in enumerate(apk_files):
                 file_name = os.path.basename(apk_path)
                 self.progress_signal.emit(f"\n处理文件 ({index+1}/{total_files}): {file_name}")
                 
+                if apk_path in reusable:
+                    self.progress_signal.emit(f"[恢复任务] 设备版本未变化，沿用上次结果: {reusable[apk_path]['result']}")
+                    verification_results.append(reusable[apk_path])
+                    continue
+                
                 # 获取APK包名和版本号
                 self.progress_signal.emit(f"[步骤1] 提取APK包名和版本号...")
                 package_name, apk_version = self._get_apk_package_and_version(apk_path)
                 
                 if package_name is None or apk_version is None:
                     self.error_signal.emit(f"[步骤1] 无法获取APK信息，跳过此文件")
-                    verification_results.append({
+                    add_result(apk_path, {
                         'file_name': file_name,
                         'package_name': package_name or '未知',
                         'apk_version': apk_version or '未知',
@@ -278,7 +299,6 @@ class ADBBatchVerifyVersionThread(QThread):
                         'result': '失败',
                         'reason': '无法提取APK信息'
                     })
-                    fail_count += 1
                     continue
                 
                 # 从设备获取版本号
@@ -287,7 +307,7 @@ class ADBBatchVerifyVersionThread(QThread):
                 
                 if device_version is None:
                     self.error_signal.emit(f"[步骤2] 设备上未找到此包或无法获取版本号")
-                    verification_results.append({
+                    add_result(apk_path, {
                         'file_name': file_name,
                         'package_name': package_name,
                         'apk_version': apk_version,
@@ -295,7 +315,6 @@ class ADBBatchVerifyVersionThread(QThread):
                         'result': '失败',
                         'reason': '设备上未找到此包'
                     })
-                    fail_count += 1
                     continue
                 
                 # 比较版本号
@@ -307,7 +326,7 @@ class ADBBatchVerifyVersionThread(QThread):
                 
                 if is_match:
                     self.progress_signal.emit(f"[步骤3] 版本号匹配 ✓")
-                    verification_results.append({
+                    add_result(apk_path, {
                         'file_name': file_name,
                         'package_name': package_name,
                         'apk_version': apk_version,
@@ -315,10 +334,9 @@ class ADBBatchVerifyVersionThread(QThread):
                         'result': '成功',
                         'reason': '版本号一致'
                     })
-                    success_count += 1
                 else:
                     self.error_signal.emit(f"[步骤3] 版本号不匹配 ✗")
-                    verification_results.append({
+                    add_result(apk_path, {
                         'file_name': file_name,
                         'package_name': package_name,
                         'apk_version': apk_version,
@@ -326,7 +344,9 @@ class ADBBatchVerifyVersionThread(QThread):
                         'result': '失败',
                         'reason': '版本号不一致'
                     })
-                    fail_count += 1
+            
+            success_count = sum(1 for result in verification_results if result['result'] == '成功')
+            fail_count = len(verification_results) - success_count
             
             # 输出验证结果
             if self.selected_files:
@@ -380,6 +400,7 @@ class ADBBatchVerifyVersionThread(QThread):
                 self.result_signal.emit("⚠ 验证完成，但未找到可验证的文件")
             
             self.result_signal.emit(f"{'='*80}")
+            journal.finish({"success": success_count, "fail": fail_count})
             
         except Exception as e:
             self.error_signal.emit(f"批量验证版本号过程中发生错误: {str(e)}")
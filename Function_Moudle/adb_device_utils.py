@@ -6,6 +6,22 @@ ADB工具函数模块
 import subprocess
 import re
 
+try:
+    from Function_Moudle.device_health import device_health, REASON_TIMEOUT
+except ImportError:
+    device_health = None
+
+try:
+    from Function_Moudle.adb_query_cache import adb_query_cache
+except ImportError:
+    adb_query_cache = None
+
+# 前台应用信息的行匹配器
+_ACTIVITY_LINE_RE = re.compile(r'^\s*ACTIVITY\s+\S+')
+_WINDOW_FOCUS_LINE_RE = re.compile(r'mCurrentFocus|mFocusedApp')
+# 版本号匹配器
+_VERSION_NAME_RE = re.compile(r'versionName=(\S+)')
+
 
 def safe_subprocess_run(command, shell=True, **kwargs):
     """
@@ -39,33 +55,41 @@ def check_device_connection(device_id):
     """
     检查设备连接状态
     
+    读取设备健康状态（由命令结果和设备跟踪器维护），不再执行 shell echo：
+    已知不可用的设备立即返回失败，其余情况由随后的实际命令反馈结果。
+    
     Args:
         device_id (str): 设备ID
         
     Returns:
         tuple: (is_connected, error_message)
     """
-    try:
-        check_command = f"adb -s {device_id} shell echo 'connection_test'"
-        check_result = safe_subprocess_run(check_command, capture_output=True, text=True, timeout=10)
-        
-        if check_result.returncode != 0:
-            error_msg = check_result.stderr.lower()
-            if "device not found" in error_msg:
-                return False, f"设备 {device_id} 未连接，请检查设备连接状态"
-            elif "offline" in error_msg:
-                return False, f"设备 {device_id} 处于离线状态，请重新连接"
-            elif "no devices" in error_msg:
-                return False, "未找到任何设备，请确保设备已连接"
-            else:
-                return False, f"ADB连接失败: {check_result.stderr}"
-        
+    if not device_id:
+        return False, "未找到任何设备，请确保设备已连接"
+    if device_health is None:
         return True, "连接正常"
-        
-    except subprocess.TimeoutExpired:
-        return False, "连接超时，请检查网络连接"
-    except Exception as e:
-        return False, f"设备连接检查失败: {str(e)}"
+    is_connected, error_msg = device_health.check(device_id)
+    return is_connected, error_msg or "连接正常"
+
+
+def _read_foreground_focus(device_id):
+    """读取前台应用所在的行（ACTIVITY 或 mCurrentFocus），读取不到时返回 None"""
+    # 设备已知不可用时 ADBUtils 直接抛出 DeviceUnavailableError，不再预先执行连接检查
+    from adb_utils import ADBUtils
+    
+    # 方法1: 使用 dumpsys activity top (更可靠)
+    # 输出包含完整的视图层级，找到第一行 ACTIVITY 后立即结束命令
+    with ADBUtils.stream_adb_command("shell dumpsys activity top", device_id, timeout=30) as stream:
+        match = stream.first_match(_ACTIVITY_LINE_RE)
+        if match:
+            return match.string.strip()
+    
+    # 方法2: 如果方法1失败，尝试 dumpsys window
+    with ADBUtils.stream_adb_command("shell dumpsys window windows", device_id, timeout=30) as stream:
+        match = stream.first_match(_WINDOW_FOCUS_LINE_RE)
+        if match:
+            return match.string.strip()
+    return None
 
 
 def get_foreground_app_info(device_id):
@@ -79,33 +103,12 @@ def get_foreground_app_info(device_id):
         tuple: (success, result_info)
     """
     try:
-        # 首先检查设备连接
-        is_connected, error_msg = check_device_connection(device_id)
-        if not is_connected:
-            return False, error_msg
-        
-        # 方法1: 使用 dumpsys activity top (更可靠)
-        command = f"adb -s {device_id} shell dumpsys activity top"
-        result = safe_subprocess_run(command, capture_output=True, text=True, timeout=30)
-        
-        focus_info = None
-        if result.returncode == 0 and result.stdout:
-            # 在 Python 中过滤包含 ACTIVITY 的行
-            for line in result.stdout.split('\n'):
-                if 'ACTIVITY' in line:
-                    focus_info = line.strip()
-                    break
-        
-        # 方法2: 如果方法1失败，尝试 dumpsys window
-        if not focus_info:
-            command2 = f"adb -s {device_id} shell dumpsys window windows"
-            result2 = safe_subprocess_run(command2, capture_output=True, text=True, timeout=30)
-            
-            if result2.returncode == 0 and result2.stdout:
-                for line in result2.stdout.split('\n'):
-                    if 'mCurrentFocus' in line or 'mFocusedApp' in line:
-                        focus_info = line.strip()
-                        break
+        # 多个面板同时查询时只执行一次；前台应用随时可能变化，不缓存结果
+        if adb_query_cache is not None:
+            focus_info = adb_query_cache.call(device_id, "foreground_focus",
+                                              lambda: _read_foreground_focus(device_id), ttl=0)
+        else:
+            focus_info = _read_foreground_focus(device_id)
         
         if not focus_info:
             return False, "无法获取前台应用信息"
@@ -157,26 +160,32 @@ def get_app_version(device_id, package_name):
     Returns:
         tuple: (success, version_info)
     """
+    # 优先从设备包信息快照读取，整台设备只需一次 dumpsys
     try:
-        # 首先检查设备连接
-        is_connected, error_msg = check_device_connection(device_id)
-        if not is_connected:
-            return False, error_msg
+        from Function_Moudle.package_snapshot import package_snapshot_cache
+        snapshot = package_snapshot_cache.get_snapshot(device_id)
+    except ImportError:
+        snapshot = None
+    if snapshot is not None:
+        package_info = snapshot.get(package_name)
+        if package_info is None:
+            return False, f"应用 {package_name} 不存在或无法访问"
+        if package_info.get("version_name"):
+            return True, package_info["version_name"]
+        return False, "无法获取版本信息"
+    
+    try:
+        from adb_utils import ADBUtils
         
-        # 获取应用版本信息
-        command = f"adb -s {device_id} shell dumpsys package {package_name}"
-        result = safe_subprocess_run(command, capture_output=True, text=True, timeout=15)
+        # 获取应用版本信息，读到第一处 versionName 即结束命令
+        with ADBUtils.stream_adb_command(f"shell dumpsys package {package_name}", device_id, timeout=15) as stream:
+            version_match = stream.first_match(_VERSION_NAME_RE)
         
-        if result.returncode == 0:
-            # 提取版本号
-            version_match = re.search(r'versionName=(\S+)', result.stdout)
-            if version_match:
-                version_name = version_match.group(1)
-                return True, version_name
-            else:
-                return False, "无法获取版本信息"
-        else:
-            return False, f"应用 {package_name} 不存在或无法访问"
+        if version_match:
+            return True, version_match.group(1)
+        if stream.returncode == 0:
+            return False, "无法获取版本信息"
+        return False, f"应用 {package_name} 不存在或无法访问"
             
     except subprocess.TimeoutExpired:
         return False, "获取应用版本信息超时"
@@ -196,14 +205,17 @@ def execute_adb_command(device_id, command, timeout=30):
     Returns:
         tuple: (success, result_info)
     """
-    try:
-        # 首先检查设备连接
-        is_connected, error_msg = check_device_connection(device_id)
-        if not is_connected:
+    # 已知不可用的设备直接返回失败，不等待超时
+    if device_health is not None:
+        allowed, error_msg = device_health.allow(device_id)
+        if not allowed:
             return False, error_msg
-        
+    
+    try:
         full_command = f"adb -s {device_id} {command}"
         result = safe_subprocess_run(full_command, capture_output=True, text=True, timeout=timeout)
+        if device_health is not None:
+            device_health.record_result(device_id, result.returncode, result.stderr)
         
         if result.returncode == 0:
             return True, result.stdout.strip()
@@ -211,6 +223,8 @@ def execute_adb_command(device_id, command, timeout=30):
             return False, result.stderr.strip()
             
     except subprocess.TimeoutExpired:
+        if device_health is not None:
+            device_health.record_failure(device_id, REASON_TIMEOUT)
         return False, f"命令执行超时 ({timeout}秒)"
     except Exception as e:
         return False, f"命令执行失败: {str(e)}"
\ No newline at end of file
@@ -1,6 +1,22 @@
 from PyQt5.QtCore import QThread, pyqtSignal
 import subprocess
 import re
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from adb_utils import adb_utils
+except ImportError:
+    from fallbacks import ADBUtilsFallback
+    adb_utils = ADBUtilsFallback()
+
+try:
+    from Function_Moudle.package_snapshot import package_snapshot_cache
+except ImportError:
+    package_snapshot_cache = None
 
 class ADBListPackageThread(QThread):
     progress_signal = pyqtSignal(str)
@@ -17,16 +33,9 @@ class ADBListPackageThread(QThread):
         try:
             self.progress_signal.emit("正在获取应用列表...")
             
-            # 首先检查设备连接
-            from Function_Moudle.adb_device_utils import check_device_connection
-            is_connected, error_msg = check_device_connection(self.device_id)
-            if not is_connected:
-                self.error_signal.emit(error_msg)
-                return
-            
-            # 使用ADB命令列出所有包名
-            command = f"adb -s {self.device_id} shell pm list packages"
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+            # 使用ADB命令列出所有包名（经由 adb_utils，可复用常驻 shell 会话）
+            # 设备已知不可用时 adb_utils 直接返回失败，不再预先执行连接检查
+            result = adb_utils.run_adb_query("shell pm list packages", self.device_id)
             
             if result.returncode != 0:
                 self.error_signal.emit(f"获取应用列表失败: {result.stderr}")
@@ -49,6 +58,11 @@ class ADBListPackageThread(QThread):
             else:
                 self.progress_signal.emit(f"设备上共有 {total_apps} 个应用")
             
+            # 一次 dumpsys 获取全部包的版本信息，失败时退回逐包查询
+            snapshot = None
+            if package_snapshot_cache is not None:
+                snapshot = package_snapshot_cache.get_snapshot(self.device_id, refresh=True)
+            
             # 批量发送结果
             batch_size = 50
             for i in range(0, len(packages), batch_size):
@@ -56,9 +70,17 @@ class ADBListPackageThread(QThread):
                 # 为每个包添加版本信息
                 batch_with_version = []
                 for package in batch:
+                    if snapshot is not None:
+                        package_info = snapshot.get(package)
+                        if package_info is None:
+                            batch_with_version.append(f"{package}, 版本号: 获取失败")
+                        else:
+                            batch_with_version.append(f"{package}, 版本号: {package_info.get('version_name') or '未知版本'}")
+                        continue
                     try:
-                        version_command = f"adb -s {self.device_id} shell dumpsys package {package}"
-                        version_result = subprocess.run(version_command, shell=True, check=True, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+                        version_result = adb_utils.run_adb_command(f"shell dumpsys package {package}", self.device_id)
+                        if version_result.returncode != 0:
+                            raise subprocess.CalledProcessError(version_result.returncode, f"dumpsys package {package}")
                         
                         # 提取版本信息
                         version_match = re.search(r'versionName=(\S+)', version_result.stdout)
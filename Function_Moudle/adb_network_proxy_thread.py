@@ -83,7 +83,7 @@ class GetProxyThread(QThread):
     def _get_proxy_adb(self):
         """ADB模式下获取代理"""
         try:
-            result = adb_utils.run_adb_command(
+            result = adb_utils.run_adb_query(
                 command="shell settings get global http_proxy",
                 device_id=self.device_id
             )
@@ -158,6 +158,8 @@ class SetProxyThread(QThread):
 
             d = self.u2_device
             result = d.shell(f"settings put global http_proxy {proxy_string}")
+            # 绕过 ADBUtils 修改了设置，通知命令钩子（使查询缓存失效）
+            adb_utils.notify_command_executed(f"shell settings put global http_proxy {proxy_string}", self.device_id)
 
             # 处理不同格式的返回值
             if hasattr(result, 'exit_code'):
@@ -241,6 +243,8 @@ class ClearProxyThread(QThread):
         try:
             d = self.u2_device
             result = d.shell("settings put global http_proxy :0")
+            # 绕过 ADBUtils 修改了设置，通知命令钩子（使查询缓存失效）
+            adb_utils.notify_command_executed("shell settings put global http_proxy :0", self.device_id)
 
             # 处理不同格式的返回值
             if hasattr(result, 'exit_code'):
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+ADB 命令流式输出 - 边读边解析，不再把完整输出缓存到内存后再做正则匹配
+
+功能：
+1. 逐行迭代命令输出（dumpsys、logcat 等可能有数 MB）
+2. 可注册预编译的行匹配器，全部命中或满足停止条件后立即结束
+3. 提前结束时终止命令（结束本地 adb 进程或关闭到 adb server 的连接，设备端命令随之退出）
+4. 子进程与 adb server 协议两种实现，接口一致
+
+使用示例：
+    with ADBUtils.stream_adb_command("shell dumpsys package com.xx", device_id) as stream:
+        matches = stream.search({"version": re.compile(r'versionName=(\\S+)')})
+"""
+
+import os
+import sys
+import uuid
+import socket
+import struct
+import threading
+import subprocess
+from collections import deque
+from typing import Callable, Dict, Iterator, Optional, Pattern
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+
+try:
+    from Function_Moudle.adb_socket_client import (
+        AdbProtocolError, SHELL_V2_STDOUT, SHELL_V2_STDERR, SHELL_V2_EXIT, SHELL_V2_CLOSE_STDIN
+    )
+except ImportError:
+    AdbProtocolError = OSError
+
+# 创建日志记录器
+logger = get_logger("ADBTools.AdbOutputStream")
+
+# 单次读取的最大字节数
+READ_CHUNK_SIZE = 64 * 1024
+# 保留的末尾输出行数（命令失败时用于错误提示）
+TAIL_LINES = 20
+
+
+class AdbOutputStream:
+    """
+    ADB 命令输出流（基类）
+
+    迭代得到去掉换行符的文本行；读完后 returncode 为命令退出码，
+    提前 close() 时 terminated 为 True、returncode 为 None。
+    """
+
+    def __init__(self, command: str, timeout: Optional[float] = None,
+                 on_finish: Optional[Callable[["AdbOutputStream"], None]] = None):
+        """
+        Args:
+            command: 命令（用于日志和异常信息）
+            timeout: 超时时间（秒），超时抛出 subprocess.TimeoutExpired
+            on_finish: 流结束（读完或被终止）时的回调
+        """
+        self.command = command
+        self.timeout = timeout
+        self.returncode: Optional[int] = None
+        self.terminated = False
+        self.line_count = 0
+        self.tail = deque(maxlen=TAIL_LINES)
+        self._on_finish = on_finish
+        self._finished = False
+        self._timed_out = False
+
+    # ---------- 子类实现 ----------
+
+    def _read_chunk(self) -> bytes:
+        """读取一块输出，结束时返回空字节串"""
+        raise NotImplementedError
+
+    def _wait(self) -> Optional[int]:
+        """输出读完后取得退出码"""
+        raise NotImplementedError
+
+    def _terminate(self):
+        """终止仍在运行的命令"""
+        raise NotImplementedError
+
+    def _filter_line(self, line: str):
+        """过滤实现相关的内部输出行，返回实际要产出的行"""
+        return (line,)
+
+    def _flush_filter(self):
+        """输出结束时返回 _filter_line 暂缓的行"""
+        return ()
+
+    # ---------- 读取接口 ----------
+
+    def lines(self) -> Iterator[str]:
+        """逐行迭代输出"""
+        pending = bytearray()
+        try:
+            while True:
+                try:
+                    chunk = self._read_chunk()
+                except socket.timeout:
+                    self._timed_out = True
+                    chunk = b""
+                if not chunk:
+                    break
+                pending += chunk
+                start = 0
+                while True:
+                    newline = pending.find(b"\n", start)
+                    if newline == -1:
+                        break
+                    line = pending[start:newline].rstrip(b"\r").decode('utf-8', errors='ignore')
+                    start = newline + 1
+                    for output_line in self._filter_line(line):
+                        yield self._record(output_line)
+                del pending[:start]
+
+            if pending:
+                line = pending.rstrip(b"\r").decode('utf-8', errors='ignore')
+                for output_line in self._filter_line(line):
+                    yield self._record(output_line)
+            for output_line in self._flush_filter():
+                yield self._record(output_line)
+
+            if self._timed_out:
+                self.close()
+                raise subprocess.TimeoutExpired(self.command, self.timeout)
+            self.returncode = self._wait()
+            self._finish()
+        finally:
+            # 调用方中途 break 或异常时终止命令
+            self.close()
+
+    __iter__ = lines
+
+    def _record(self, line: str) -> str:
+        self.line_count += 1
+        self.tail.append(line)
+        return line
+
+    def search(self, matchers: Dict[str, Pattern],
+               stop_when: Optional[Callable[[Dict[str, "re.Match"]], bool]] = None) -> Dict[str, "re.Match"]:
+        """
+        用预编译的正则逐行匹配输出，每个匹配器只保留第一次命中的结果
+
+        Args:
+            matchers: {名称: 预编译正则}
+            stop_when: 停止条件，参数为当前已命中的结果；默认所有匹配器都命中后停止
+
+        Returns:
+            {名称: re.Match}，未命中的名称不在结果中
+        """
+        results = {}
+        remaining = dict(matchers)
+        for line in self.lines():
+            for name, pattern in list(remaining.items()):
+                match = pattern.search(line)
+                if match:
+                    results[name] = match
+                    del remaining[name]
+            if (stop_when(results) if stop_when else not remaining):
+                break
+        self.close()
+        return results
+
+    def first_match(self, pattern: Pattern) -> Optional["re.Match"]:
+        """返回第一处匹配，命中后立即结束命令"""
+        return self.search({"match": pattern}).get("match")
+
+    def error_text(self) -> str:
+        """命令失败时的错误提示（末尾几行输出）"""
+        return '\n'.join(self.tail).strip()
+
+    # ---------- 生命周期 ----------
+
+    def close(self):
+        """结束流；命令仍在运行时终止它"""
+        if self._finished:
+            return
+        self.terminated = True
+        try:
+            self._terminate()
+        except Exception as e:
+            logger.debug(f"终止命令失败: {self.command} | {e}")
+        self._finish()
+
+    def _finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        if self._on_finish:
+            try:
+                self._on_finish(self)
+            except Exception as e:
+                logger.warning(f"流结束回调失败: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ProcessOutputStream(AdbOutputStream):
+    """通过本地 adb 子进程读取输出（stderr 合并到 stdout）"""
+
+    def __init__(self, args, command: str, shell: bool = False, timeout: Optional[float] = None,
+                 on_finish=None):
+        super().__init__(command, timeout, on_finish)
+        self._process = subprocess.Popen(
+            args,
+            shell=shell,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT
+        )
+        self._timer = None
+        if timeout:
+            # 管道读取在 Windows 上无法 select，超时由定时器结束进程来打断阻塞的读取
+            self._timer = threading.Timer(timeout, self._on_timeout)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timeout(self):
+        self._timed_out = True
+        self._kill()
+
+    def _read_chunk(self) -> bytes:
+        return self._process.stdout.read1(READ_CHUNK_SIZE)
+
+    def _wait(self) -> Optional[int]:
+        if self._timer:
+            self._timer.cancel()
+        returncode = self._process.wait()
+        self._process.stdout.close()
+        return returncode
+
+    def _kill(self):
+        if self._process.poll() is None:
+            self._process.kill()
+
+    def _terminate(self):
+        if self._timer:
+            self._timer.cancel()
+        self._kill()
+        self._process.wait()
+        self._process.stdout.close()
+
+
+class SocketShellStream(AdbOutputStream):
+    """通过 adb server 协议读取设备端 shell 命令输出"""
+
+    def __init__(self, client, device_id: str, device_command: str, command: str,
+                 timeout: Optional[float] = None, on_finish=None):
+        super().__init__(command, timeout, on_finish)
+        try:
+            self._use_v2 = "shell_v2" in client.get_features(device_id)
+        except AdbProtocolError:
+            self._use_v2 = False
+        self._exit_code = None
+        self._marker = None
+        self._held_empty_line = False
+
+        if self._use_v2:
+            self._connection = client.open_service(device_id, f"shell,v2,raw:{device_command}", timeout)
+            self._connection.sock.sendall(struct.pack('<BI', SHELL_V2_CLOSE_STDIN, 0))
+        else:
+            # 与 AdbSocketClient._shell_legacy 相同，用哨兵行取得退出码
+            self._marker = f"__ADBTOOLS_{uuid.uuid4().hex}__"
+            self._connection = client.open_service(
+                device_id, f"shell:( {device_command}\n)\nprintf '\\n{self._marker}:%d\\n' $?", timeout)
+
+    def _read_chunk(self) -> bytes:
+        if not self._use_v2:
+            return self._connection.sock.recv(READ_CHUNK_SIZE)
+
+        while self._exit_code is None:
+            try:
+                header = self._connection.read_exact(5)
+            except AdbProtocolError:
+                return b""
+            packet_id, length = struct.unpack('<BI', header)
+            data = self._connection.read_exact(length) if length else b""
+            if packet_id in (SHELL_V2_STDOUT, SHELL_V2_STDERR):
+                if data:
+                    return data
+            elif packet_id == SHELL_V2_EXIT:
+                self._exit_code = data[0] if data else 0
+        return b""
+
+    def _filter_line(self, line: str):
+        if self._marker is None:
+            return (line,)
+        if line.startswith(self._marker + ":"):
+            try:
+                self._exit_code = int(line[len(self._marker) + 1:].strip())
+            except ValueError:
+                pass
+            # 哨兵行前的空行是 printf 补的换行，丢弃
+            self._held_empty_line = False
+            return ()
+        # 空行暂缓输出，确认后面不是哨兵行再补上
+        output = ("",) if self._held_empty_line else ()
+        self._held_empty_line = line == ""
+        return output if self._held_empty_line else output + (line,)
+
+    def _flush_filter(self):
+        return ("",) if self._held_empty_line else ()
+
+    def _wait(self) -> Optional[int]:
+        self._connection.close()
+        return 1 if self._exit_code is None else self._exit_code
+
+    def _terminate(self):
+        # 关闭连接后 adbd 会结束设备端命令
+        self._connection.close()
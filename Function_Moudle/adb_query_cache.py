@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+设备查询去重 - 同一设备上同时发起的相同只读查询只执行一次，结果短时间缓存
+
+启动和切换标签页时，多个面板和线程会同时向同一设备查询 getprop、settings get、
+pm path、dumpsys activity top 等状态，每个都单独启动一次 adb 命令。经过本模块后：
+1. 正在执行的查询（in-flight）：相同的请求等待这次执行，共享同一个结果
+2. 执行成功的结果按 TTL 缓存，过期前的相同查询直接返回
+3. 失效：ADBUtils 命令钩子在设备上执行非只读命令（settings put、install、am start 等）后
+   使该设备的缓存失效；也可以调用 invalidate 显式失效。失效前已经发起的查询结果不再写入缓存
+
+只有调用方明确标记为幂等的查询（ADBUtils.run_adb_query 或直接调用 call）才会去重和缓存。
+
+使用示例：
+    result = ADBUtils.run_adb_query("shell settings get global http_proxy", device_id)
+
+    info = adb_query_cache.call(device_id, "foreground_app", fetch_foreground, ttl=0)
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+# 创建日志记录器
+logger = get_logger("ADBTools.QueryCache")
+
+# 不改变设备状态的 adb 命令，执行后不需要使查询缓存失效
+_READ_ONLY_ADB_COMMANDS = ('devices', 'version', 'get-state', 'get-serialno', 'get-devpath',
+                           'features', 'host-features', 'pull', 'wait-for-device')
+_READ_ONLY_SHELL_RE = re.compile(
+    r'^shell\s+(?:getprop\b|settings\s+(?:get|list)\b|(?:pm|cmd\s+package)\s+(?:path|list|dump)\b|'
+    r'dumpsys\b|cat\b|ls\b|stat\b|echo\b|id\b|ps\b|df\b|du\b|uname\b|pidof\b|md5sum\b|sha256sum\b|'
+    r'wm\s+(?:size|density)\s*$|date\s*$)'
+)
+# 含有这些字符的 shell 命令可能带有写入、后台或多条命令，一律视为非只读（管道仍视为只读）
+_SHELL_WRITE_CHARS = set(';&>`$')
+
+
+def is_read_only_command(command: str) -> bool:
+    """判断 adb 命令是否只读（不改变设备状态）"""
+    command = command.strip()
+    first_word = command.split(None, 1)[0] if command else ""
+    if first_word in _READ_ONLY_ADB_COMMANDS:
+        return True
+    if first_word != "shell" or _SHELL_WRITE_CHARS & set(command):
+        return False
+    return bool(_READ_ONLY_SHELL_RE.match(command))
+
+
+class _Flight:
+    """一次正在执行的查询"""
+
+    def __init__(self, generation: tuple):
+        self.generation = generation
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class QueryCache:
+    """按设备的查询去重和结果缓存（线程安全）"""
+
+    def __init__(self, ttl: float = 2, max_entries: int = 256):
+        """
+        Args:
+            ttl: 默认缓存时间（秒），0 表示只合并同时发起的查询，不缓存结果
+            max_entries: 最多缓存的结果数
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: Dict[tuple, tuple] = {}       # (设备ID, 键) -> (过期时间, 结果)
+        self._flights: Dict[tuple, _Flight] = {}   # (设备ID, 键) -> 正在执行的查询
+        self._global_generation = 0
+        self._generations: Dict[Optional[str], int] = {}  # 设备ID -> 失效次数
+        self._statistics = {"executed": 0, "shared": 0, "hits": 0, "invalidations": 0}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _generation(self, device_id: Optional[str]) -> tuple:
+        return self._global_generation, self._generations.get(device_id, 0)
+
+    def call(self, device_id: Optional[str], key: Hashable, fn: Callable[[], Any],
+             ttl: Optional[float] = None, cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        执行幂等查询：有未过期的缓存时直接返回，相同查询正在执行时等待并共享结果
+
+        Args:
+            device_id: 设备ID（失效按设备进行）
+            key: 查询标识，相同标识视为相同查询
+            fn: 实际执行查询的函数
+            ttl: 缓存时间（秒），None 使用默认值，0 表示不缓存
+            cacheable: 判断结果是否可以缓存（如只缓存成功的结果），None 表示都可以
+        """
+        ttl = self.ttl if ttl is None else ttl
+        cache_key = (device_id, key)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached and time.time() < cached[0]:
+                self._statistics["hits"] += 1
+                return cached[1]
+            flight = self._flights.get(cache_key)
+            leader = flight is None
+            if leader:
+                flight = _Flight(self._generation(device_id))
+                self._flights[cache_key] = flight
+                self._statistics["executed"] += 1
+            else:
+                self._statistics["shared"] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._local.depth -= 1
+            with self._lock:
+                if self._flights.get(cache_key) is flight:
+                    del self._flights[cache_key]
+                # 执行期间发生过失效的结果可能已经过时，只返回给本次的调用方
+                if flight.error is None and ttl > 0 and flight.generation == self._generation(device_id) \
+                        and (cacheable is None or cacheable(flight.result)):
+                    self._cache[cache_key] = (time.time() + ttl, flight.result)
+                    self._evict()
+            flight.event.set()
+
+    def _evict(self):
+        """超过上限时先清除过期结果，仍然超过则清除最早过期的结果（调用方持有锁）"""
+        if len(self._cache) <= self.max_entries:
+            return
+        now = time.time()
+        for cache_key in [k for k, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[cache_key]
+        overflow = len(self._cache) - self.max_entries
+        if overflow > 0:
+            for cache_key in sorted(self._cache, key=lambda k: self._cache[k][0])[:overflow]:
+                del self._cache[cache_key]
+
+    def invalidate(self, device_id: Optional[str] = None):
+        """使设备的查询结果失效，device_id 为 None 时清空所有设备"""
+        with self._lock:
+            self._statistics["invalidations"] += 1
+            if device_id is None:
+                self._global_generation += 1
+                self._cache.clear()
+                self._flights.clear()
+                return
+            self._generations[device_id] = self._generations.get(device_id, 0) + 1
+            for cache_key in [k for k in self._cache if k[0] == device_id]:
+                del self._cache[cache_key]
+            # 正在执行的查询继续返回给已在等待的调用方，之后的相同查询重新执行
+            for cache_key in [k for k in self._flights if k[0] == device_id]:
+                del self._flights[cache_key]
+
+    def on_adb_command(self, command: str, device_id: Optional[str]):
+        """ADBUtils 命令钩子：设备上执行了非只读命令后使其查询结果失效"""
+        if getattr(self._local, "depth", 0) or is_read_only_command(command):
+            # 标记为幂等的查询本身，或只读命令
+            return
+        with self._lock:
+            has_entries = any(k[0] == device_id or device_id is None for k in self._cache) \
+                or any(k[0] == device_id or device_id is None for k in self._flights)
+        if has_entries:
+            logger.debug(f"命令可能改变设备状态，查询缓存失效 [{device_id or '全部'}]: {command}")
+            self.invalidate(device_id)
+
+    def get_statistics(self) -> Dict[str, int]:
+        """执行次数、共享次数、缓存命中次数、失效次数和当前缓存数"""
+        with self._lock:
+            return dict(self._statistics, cached=len(self._cache))
+
+
+# 全局查询缓存
+adb_query_cache = QueryCache(
+    ttl=config_manager.get("adb.query_cache.ttl", 2),
+    max_entries=config_manager.get("adb.query_cache.max_entries", 256),
+)
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+ADB Shell 会话池 - 为每个设备维护常驻的 `adb -s <serial> shell` 会话
+
+功能：
+1. 每个设备保持若干个长连接 shell 会话，避免每条命令都启动 host shell + adb 客户端 + adbd 会话
+2. 通过带随机标记的哨兵行划分每条命令的输出，并取回命令的退出码
+3. 以租借（lease）的方式把会话分配给工作线程，同一会话同一时刻只执行一条命令
+4. 会话进程退出（设备断开、adbd 重启）时自动丢弃并重新建立连接
+"""
+
+import os
+import sys
+import uuid
+import queue
+import atexit
+import threading
+import subprocess
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+
+# 创建日志记录器
+logger = get_logger("ADBTools.ShellSessionPool")
+
+
+class ShellSessionError(Exception):
+    """Shell 会话异常（会话已失效，需要重建）"""
+
+
+class ADBShellSession:
+    """单个常驻的 adb shell 会话"""
+
+    # 建立会话时等待设备响应的最长时间（秒）
+    HANDSHAKE_TIMEOUT = 5
+
+    def __init__(self, adb_path: str, device_id: str):
+        self.adb_path = adb_path
+        self.device_id = device_id
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.command_count = 0
+        self._process = None
+        self._stdout_queue = queue.Queue()
+        self._stderr_queue = queue.Queue()
+        # 设备支持 shell_v2 时 stderr 单独传输，否则 adbd 会把 stderr 合并进 stdout
+        self._separate_stderr = True
+        self._start()
+        self._handshake()
+
+    def _start(self):
+        """启动 adb shell 进程以及 stdout/stderr 读取线程"""
+        creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        self._process = subprocess.Popen(
+            [self.adb_path, '-s', self.device_id, 'shell'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='ignore',
+            bufsize=1,
+            creationflags=creationflags
+        )
+
+        # stdout 和 stderr 分别由独立线程读取，避免一侧管道写满导致死锁
+        for stream, line_queue in ((self._process.stdout, self._stdout_queue),
+                                   (self._process.stderr, self._stderr_queue)):
+            reader = threading.Thread(
+                target=self._pump, args=(stream, line_queue),
+                name=f"ShellSessionReader-{self.device_id}", daemon=True
+            )
+            reader.start()
+
+    def _handshake(self):
+        """确认会话可用，并探测 stderr 是否与 stdout 分开传输"""
+        marker = f"__ADBTOOLS_READY_{uuid.uuid4().hex}__"
+        try:
+            self._process.stdin.write(f"printf '{marker}\\n' >&2\n")
+            self._process.stdin.flush()
+        except (OSError, ValueError) as e:
+            self.close()
+            raise ShellSessionError(f"写入会话失败: {e}")
+
+        deadline = time.time() + self.HANDSHAKE_TIMEOUT
+        while time.time() < deadline:
+            for line_queue, separate in ((self._stderr_queue, True), (self._stdout_queue, False)):
+                try:
+                    line = line_queue.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if line is None:
+                    self.close()
+                    raise ShellSessionError(f"会话建立失败: {self.device_id}")
+                if line.strip() == marker:
+                    self._separate_stderr = separate
+                    return
+
+        self.close()
+        raise ShellSessionError(f"会话建立超时: {self.device_id}")
+
+    @staticmethod
+    def _pump(stream, line_queue):
+        """把管道中的行转存到队列，EOF 时放入 None"""
+        try:
+            for line in iter(stream.readline, ''):
+                line_queue.put(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            line_queue.put(None)
+
+    def is_alive(self) -> bool:
+        """会话进程是否仍在运行"""
+        return self._process is not None and self._process.poll() is None
+
+    def run(self, command: str, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        """
+        在会话中执行一条设备端 shell 命令
+
+        Args:
+            command: 设备端命令（不含 `shell` 前缀）
+            timeout: 超时时间（秒），超时后会话会被关闭
+
+        Returns:
+            subprocess.CompletedProcess 对象
+        """
+        if not self.is_alive():
+            raise ShellSessionError(f"会话已断开: {self.device_id}")
+
+        marker = f"__ADBTOOLS_{uuid.uuid4().hex}__"
+        # 命令在子 shell 中执行，`exit`、`cd` 等不会影响会话本身；
+        # stdin 重定向到 /dev/null，防止读取 stdin 的命令吞掉后续命令；
+        # 哨兵前补一个换行，保证没有以换行结尾的输出也能被正确切分
+        script = f"( {command}\n) </dev/null\nprintf '\\n{marker}:%d\\n' $?\n"
+        if self._separate_stderr:
+            script += f"printf '\\n{marker}\\n' >&2\n"
+        try:
+            self._process.stdin.write(script)
+            self._process.stdin.flush()
+        except (OSError, ValueError) as e:
+            self.close()
+            raise ShellSessionError(f"写入会话失败: {e}")
+
+        deadline = time.time() + timeout if timeout else None
+        stdout, returncode = self._collect(self._stdout_queue, marker, deadline, command, timeout)
+        stderr = ""
+        if self._separate_stderr:
+            stderr, _ = self._collect(self._stderr_queue, marker, deadline, command, timeout)
+
+        self.last_used = time.time()
+        self.command_count += 1
+        return subprocess.CompletedProcess(command, returncode, stdout, stderr)
+
+    def _collect(self, line_queue, marker, deadline, command, timeout):
+        """从队列中收集输出，直到遇到哨兵行"""
+        lines = []
+        while True:
+            wait = None
+            if deadline is not None:
+                wait = deadline - time.time()
+                if wait <= 0:
+                    self.close()
+                    raise subprocess.TimeoutExpired(command, timeout)
+            try:
+                line = line_queue.get(timeout=wait)
+            except queue.Empty:
+                self.close()
+                raise subprocess.TimeoutExpired(command, timeout)
+
+            if line is None:
+                self.close()
+                raise ShellSessionError(f"会话在命令执行期间断开: {self.device_id}")
+
+            if line.startswith(marker):
+                returncode = 0
+                tail = line.strip()[len(marker):]
+                if tail.startswith(':'):
+                    try:
+                        returncode = int(tail[1:])
+                    except ValueError:
+                        returncode = 1
+                output = ''.join(lines)
+                # 去掉哨兵前补上的换行
+                if output.endswith('\n'):
+                    output = output[:-1]
+                return output, returncode
+            lines.append(line)
+
+    def close(self):
+        """关闭会话进程"""
+        process = self._process
+        if process is None:
+            return
+        try:
+            if process.poll() is None:
+                try:
+                    process.stdin.write("exit\n")
+                    process.stdin.flush()
+                except (OSError, ValueError):
+                    pass
+                try:
+                    process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        except Exception as e:
+            logger.debug(f"关闭会话时出错 [{self.device_id}]: {e}")
+
+
+class ShellSessionPool:
+    """按设备管理常驻 shell 会话的会话池"""
+
+    def __init__(self, max_sessions_per_device: int = 2, idle_timeout: float = 300,
+                 lease_timeout: float = 5):
+        """
+        初始化会话池
+
+        Args:
+            max_sessions_per_device: 每个设备最多同时存在的会话数
+            idle_timeout: 空闲会话的最长保留时间（秒）
+            lease_timeout: 所有会话都被占用时，等待空闲会话的最长时间（秒）
+        """
+        self.max_sessions_per_device = max_sessions_per_device
+        self.idle_timeout = idle_timeout
+        self.lease_timeout = lease_timeout
+        self._idle: Dict[str, List[ADBShellSession]] = {}
+        self._busy_count: Dict[str, int] = {}
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def _acquire(self, adb_path: str, device_id: str) -> Optional[ADBShellSession]:
+        """租借一个会话，所有会话都繁忙且等待超时时返回 None"""
+        deadline = time.time() + self.lease_timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    return None
+
+                idle_sessions = self._idle.setdefault(device_id, [])
+                self._evict_idle(device_id)
+                while idle_sessions:
+                    session = idle_sessions.pop()
+                    if session.is_alive():
+                        self._busy_count[device_id] = self._busy_count.get(device_id, 0) + 1
+                        return session
+                    session.close()
+
+                busy = self._busy_count.get(device_id, 0)
+                if busy < self.max_sessions_per_device:
+                    self._busy_count[device_id] = busy + 1
+                    break
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+        # 在锁外创建新会话，避免阻塞其他设备
+        try:
+            session = ADBShellSession(adb_path, device_id)
+            logger.debug(f"创建新的shell会话: {device_id}")
+            return session
+        except Exception as e:
+            logger.warning(f"创建shell会话失败 [{device_id}]: {e}")
+            with self._condition:
+                self._busy_count[device_id] -= 1
+                self._condition.notify()
+            return None
+
+    def _release(self, device_id: str, session: ADBShellSession):
+        """归还会话，失效的会话直接丢弃"""
+        with self._condition:
+            self._busy_count[device_id] = max(0, self._busy_count.get(device_id, 1) - 1)
+            if session.is_alive() and not self._closed:
+                self._idle.setdefault(device_id, []).append(session)
+            else:
+                session.close()
+            self._condition.notify()
+
+    def _evict_idle(self, device_id: str):
+        """关闭空闲过久的会话（调用方需持有锁）"""
+        now = time.time()
+        idle_sessions = self._idle.get(device_id, [])
+        for session in [s for s in idle_sessions if now - s.last_used > self.idle_timeout]:
+            idle_sessions.remove(session)
+            session.close()
+
+    @contextmanager
+    def lease(self, adb_path: str, device_id: str):
+        """
+        以上下文管理器的方式租借会话
+
+        用法：
+            with shell_session_pool.lease(adb_path, device_id) as session:
+                if session:
+                    result = session.run("getprop ro.build.version.sdk")
+        """
+        session = self._acquire(adb_path, device_id)
+        try:
+            yield session
+        finally:
+            if session is not None:
+                self._release(device_id, session)
+
+    def run(self, adb_path: str, device_id: str, command: str,
+            timeout: Optional[float] = None) -> Optional[subprocess.CompletedProcess]:
+        """
+        通过会话池执行设备端命令
+
+        会话在执行前或执行中断开时，会重建一次会话并重试；
+        无法获得会话时返回 None，由调用方回退到普通的子进程方式。
+        超时会抛出 subprocess.TimeoutExpired，与 subprocess.run 的行为一致。
+        """
+        for attempt in range(2):
+            with self.lease(adb_path, device_id) as session:
+                if session is None:
+                    return None
+                try:
+                    return session.run(command, timeout=timeout)
+                except ShellSessionError as e:
+                    logger.info(f"shell会话失效，准备重建 ({attempt + 1}/2): {e}")
+                    continue
+        return None
+
+    def invalidate_device(self, device_id: str):
+        """关闭指定设备的所有空闲会话（设备断开或重启时调用）"""
+        with self._condition:
+            for session in self._idle.pop(device_id, []):
+                session.close()
+
+    def close_all(self):
+        """关闭所有会话"""
+        with self._condition:
+            self._closed = True
+            for sessions in self._idle.values():
+                for session in sessions:
+                    session.close()
+            self._idle.clear()
+            self._condition.notify_all()
+
+    def get_statistics(self) -> Dict[str, Dict[str, int]]:
+        """获取各设备的会话统计信息"""
+        with self._condition:
+            return {
+                device_id: {
+                    "idle": len(self._idle.get(device_id, [])),
+                    "busy": self._busy_count.get(device_id, 0)
+                }
+                for device_id in set(self._idle) | set(self._busy_count)
+            }
+
+
+def _load_pool_settings():
+    """从配置文件读取会话池参数"""
+    try:
+        from config_manager import config_manager
+        return {
+            "max_sessions_per_device": config_manager.get("adb.shell_pool.max_sessions_per_device", 2),
+            "idle_timeout": config_manager.get("adb.shell_pool.idle_timeout", 300),
+            "lease_timeout": config_manager.get("adb.shell_pool.lease_timeout", 5),
+        }
+    except ImportError:
+        return {}
+
+
+# 全局会话池实例
+shell_session_pool = ShellSessionPool(**_load_pool_settings())
+atexit.register(shell_session_pool.close_all)
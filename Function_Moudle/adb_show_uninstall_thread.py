@@ -1,5 +1,15 @@
 from PyQt5.QtCore import QThread, pyqtSignal
 import subprocess
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from adb_utils import ADBUtils
+except ImportError:
+    ADBUtils = None
 
 class ADBShowUninstallThread(QThread):
     progress_signal = pyqtSignal(str)
@@ -21,7 +31,11 @@ class ADBShowUninstallThread(QThread):
             
             # 使用ADB命令卸载应用
             command = f"adb -s {self.device_id} uninstall {self.package_name}"
-            result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+            try:
+                result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+            finally:
+                if ADBUtils is not None:
+                    ADBUtils.notify_command_executed(f"uninstall {self.package_name}", self.device_id)
             
             if result.returncode == 0:
                 self.result_signal.emit("卸载完成!")
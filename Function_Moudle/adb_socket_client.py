@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+ADB 协议客户端 - 直接通过 TCP 与本地 adb server（默认 127.0.0.1:5037）通信
+
+功能：
+1. 实现 host 端 smart-socket 协议（4 位十六进制长度 + 请求，OKAY/FAIL 应答）
+2. host 服务：host:version、host:devices、host:track-devices、host-serial:<serial>:features
+3. 设备服务：host:transport:<serial> 之后的 shell,v2（带退出码）与旧版 shell:
+4. sync: 文件同步协议（STAT/LIST/RECV/SEND）
+
+与 `adb` 可执行文件相比，省去了每条命令的进程创建和本地 shell 解析开销。
+adb server 未启动时抛出 AdbServerUnavailable，由调用方回退到子进程方式（子进程会自动拉起 server）。
+"""
+
+import os
+import sys
+import stat
+import time
+import uuid
+import socket
+import struct
+import threading
+import subprocess
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+
+# 创建日志记录器
+logger = get_logger("ADBTools.AdbSocketClient")
+
+
+class AdbProtocolError(Exception):
+    """adb server 返回 FAIL 或数据格式不符合协议"""
+
+
+class AdbServerUnavailable(AdbProtocolError):
+    """无法连接到 adb server"""
+
+
+# shell v2 数据包类型
+SHELL_V2_STDIN = 0
+SHELL_V2_STDOUT = 1
+SHELL_V2_STDERR = 2
+SHELL_V2_EXIT = 3
+SHELL_V2_CLOSE_STDIN = 4
+
+# sync 协议单个 DATA 包的最大长度
+SYNC_DATA_MAX = 64 * 1024
+
+
+class AdbConnection:
+    """一条到 adb server 的 socket 连接，封装 smart-socket 协议的读写"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+
+    def send_request(self, request: str):
+        """发送 `<4位十六进制长度><请求>` 格式的请求"""
+        payload = request.encode('utf-8')
+        self.sock.sendall(f"{len(payload):04x}".encode('ascii') + payload)
+
+    def read_exact(self, size: int) -> bytes:
+        """读取固定长度的数据，连接提前关闭时抛出异常"""
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = self.sock.recv_into(view[received:], size - received)
+            if count == 0:
+                raise AdbProtocolError(f"连接已关闭（期望 {size} 字节，实际 {received} 字节）")
+            received += count
+        return bytes(buffer)
+
+    def read_into(self, view: memoryview) -> int:
+        """读满给定的缓冲区视图（不额外分配内存），连接提前关闭时抛出异常"""
+        size = len(view)
+        received = 0
+        while received < size:
+            count = self.sock.recv_into(view[received:], size - received)
+            if count == 0:
+                raise AdbProtocolError(f"连接已关闭（期望 {size} 字节，实际 {received} 字节）")
+            received += count
+        return received
+
+    def read_hex_string(self) -> str:
+        """读取 `<4位十六进制长度><内容>` 格式的数据"""
+        length = int(self.read_exact(4), 16)
+        return self.read_exact(length).decode('utf-8', errors='ignore') if length else ""
+
+    def read_status(self, request: str = ""):
+        """读取 OKAY/FAIL 应答，FAIL 时抛出 AdbProtocolError"""
+        status = self.read_exact(4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbProtocolError(self.read_hex_string() or f"请求失败: {request}")
+        raise AdbProtocolError(f"未知应答 {status!r}: {request}")
+
+    def request(self, request: str):
+        """发送请求并确认 OKAY"""
+        self.send_request(request)
+        self.read_status(request)
+
+    def read_until_close(self) -> bytes:
+        """读取数据直到对端关闭连接"""
+        chunks = []
+        while True:
+            chunk = self.sock.recv(SYNC_DATA_MAX)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def close(self):
+        """关闭连接"""
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class SyncConnection:
+    """
+    sync: 服务连接，用于文件的查询、列目录、上传和下载
+
+    同一连接可以连续传输多个文件；数据包通过会话内复用的缓冲区和 memoryview 切片收发，不为每个包分配内存。
+    """
+
+    def __init__(self, connection: AdbConnection):
+        self.connection = connection
+        # 8 字节包头 + 最大数据长度，上传时包头和数据在同一缓冲区中一次发送
+        self._buffer = bytearray(8 + SYNC_DATA_MAX)
+
+    def _send_request(self, request_id: bytes, path: str):
+        """发送 `<ID><长度(小端)><路径>` 格式的 sync 请求"""
+        data = path.encode('utf-8')
+        self.connection.sock.sendall(request_id + struct.pack('<I', len(data)) + data)
+
+    def _read_fail_message(self, length: int) -> str:
+        return self.connection.read_exact(length).decode('utf-8', errors='ignore')
+
+    def stat(self, path: str) -> Tuple[int, int, int]:
+        """
+        查询远程文件信息
+
+        Returns:
+            (mode, size, mtime)；文件不存在时 mode 为 0
+        """
+        self._send_request(b"STAT", path)
+        response = self.connection.read_exact(16)
+        if response[:4] != b"STAT":
+            raise AdbProtocolError(f"STAT 应答异常: {response[:4]!r}")
+        mode, size, mtime = struct.unpack('<III', response[4:])
+        return mode, size, mtime
+
+    def list(self, path: str) -> List[Dict[str, int]]:
+        """
+        列出远程目录内容
+
+        Returns:
+            [{'name', 'mode', 'size', 'mtime', 'is_dir', 'is_link'}, ...]（不含 . 和 ..）
+        """
+        self._send_request(b"LIST", path)
+        entries = []
+        while True:
+            header = self.connection.read_exact(20)
+            request_id = header[:4]
+            if request_id == b"DONE":
+                return entries
+            if request_id != b"DENT":
+                raise AdbProtocolError(f"LIST 应答异常: {request_id!r}")
+            mode, size, mtime, name_length = struct.unpack('<IIII', header[4:])
+            name = self.connection.read_exact(name_length).decode('utf-8', errors='ignore')
+            if name in ('.', '..'):
+                continue
+            entries.append({
+                'name': name,
+                'mode': mode,
+                'size': size,
+                'mtime': mtime,
+                'is_dir': stat.S_ISDIR(mode),
+                'is_link': stat.S_ISLNK(mode),
+            })
+
+    def pull(self, remote_path: str, local_path: str,
+             progress_callback: Optional[Callable[[int], None]] = None) -> int:
+        """
+        下载远程文件
+
+        Args:
+            remote_path: 设备端文件路径
+            local_path: 本地保存路径
+            progress_callback: 进度回调，参数为已接收的字节数
+
+        Returns:
+            接收的字节数
+        """
+        self._send_request(b"RECV", remote_path)
+        received = 0
+        view = memoryview(self._buffer)
+        with open(local_path, 'wb') as f:
+            while True:
+                header = self.connection.read_exact(8)
+                request_id = header[:4]
+                length = struct.unpack('<I', header[4:])[0]
+                if request_id == b"DATA":
+                    if length > SYNC_DATA_MAX:
+                        raise AdbProtocolError(f"DATA 包过大: {length}")
+                    self.connection.read_into(view[:length])
+                    f.write(view[:length])
+                    received += length
+                    if progress_callback:
+                        progress_callback(received)
+                elif request_id == b"DONE":
+                    return received
+                elif request_id == b"FAIL":
+                    raise AdbProtocolError(self._read_fail_message(length))
+                else:
+                    raise AdbProtocolError(f"RECV 应答异常: {request_id!r}")
+
+    def push(self, local_path: str, remote_path: str, mode: int = 0o644,
+             progress_callback: Optional[Callable[[int], None]] = None) -> int:
+        """
+        上传本地文件
+
+        Args:
+            local_path: 本地文件路径
+            remote_path: 设备端目标路径（必须是文件路径）
+            mode: 远程文件权限
+            progress_callback: 进度回调，参数为已发送的字节数
+
+        Returns:
+            发送的字节数
+        """
+        self._send_request(b"SEND", f"{remote_path},{stat.S_IFREG | mode}")
+        sent = 0
+        view = memoryview(self._buffer)
+        view[:4] = b"DATA"
+        with open(local_path, 'rb') as f:
+            while True:
+                count = f.readinto(view[8:])
+                if not count:
+                    break
+                struct.pack_into('<I', self._buffer, 4, count)
+                self.connection.sock.sendall(view[:8 + count])
+                sent += count
+                if progress_callback:
+                    progress_callback(sent)
+        mtime = int(os.path.getmtime(local_path))
+        self.connection.sock.sendall(b"DONE" + struct.pack('<I', mtime))
+
+        header = self.connection.read_exact(8)
+        request_id = header[:4]
+        length = struct.unpack('<I', header[4:])[0]
+        if request_id == b"OKAY":
+            return sent
+        if request_id == b"FAIL":
+            raise AdbProtocolError(self._read_fail_message(length))
+        raise AdbProtocolError(f"SEND 应答异常: {request_id!r}")
+
+    def close(self):
+        """结束 sync 会话"""
+        try:
+            self.connection.sock.sendall(b"QUIT" + struct.pack('<I', 0))
+        except OSError:
+            pass
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class AdbSocketClient:
+    """进程内 ADB 客户端"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 5037, connect_timeout: float = 3):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self._features_cache: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    # ---------- 连接 ----------
+
+    def _connect(self, timeout: Optional[float] = None) -> AdbConnection:
+        """建立到 adb server 的连接"""
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        except OSError as e:
+            raise AdbServerUnavailable(f"无法连接 adb server {self.host}:{self.port}: {e}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(timeout)
+        return AdbConnection(sock)
+
+    def open_transport(self, device_id: str, timeout: Optional[float] = None) -> AdbConnection:
+        """建立连接并切换到指定设备的传输通道"""
+        connection = self._connect(timeout)
+        try:
+            connection.request(f"host:transport:{device_id}")
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def open_service(self, device_id: str, service: str, timeout: Optional[float] = None) -> AdbConnection:
+        """打开设备端服务（如 shell:、exec:、sync:），返回已确认 OKAY 的连接"""
+        connection = self.open_transport(device_id, timeout)
+        try:
+            connection.request(service)
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    # ---------- host 服务 ----------
+
+    def host_query(self, request: str, timeout: Optional[float] = 10) -> str:
+        """执行返回 `<长度><内容>` 的 host 请求"""
+        with self._connect(timeout) as connection:
+            connection.request(request)
+            return connection.read_hex_string()
+
+    def server_version(self) -> int:
+        """获取 adb server 内部版本号"""
+        return int(self.host_query("host:version"), 16)
+
+    def is_server_available(self) -> bool:
+        """adb server 是否可连接"""
+        try:
+            self.server_version()
+            return True
+        except (AdbProtocolError, OSError, ValueError):
+            return False
+
+    def get_devices(self) -> List[Tuple[str, str]]:
+        """获取设备列表 [(serial, state), ...]"""
+        return parse_device_list(self.host_query("host:devices"))
+
+    def track_devices(self) -> AdbConnection:
+        """
+        打开 host:track-devices 长连接
+
+        server 先立即推送一次完整设备表，之后每当任一设备状态变化时再推送一次，
+        每条消息都是 `<长度><serial\tstate\n...>` 格式，可用 parse_device_list 解析。
+        连接不设超时，调用方通过关闭连接来结束阻塞读取。
+        """
+        connection = self._connect(None)
+        try:
+            connection.request("host:track-devices")
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def get_features(self, device_id: str, refresh: bool = False) -> set:
+        """获取设备与 adb server 共同支持的特性（如 shell_v2、cmd、abb_exec）"""
+        with self._lock:
+            if not refresh and device_id in self._features_cache:
+                return self._features_cache[device_id]
+        features = set(filter(None, self.host_query(f"host-serial:{device_id}:features").split(',')))
+        with self._lock:
+            self._features_cache[device_id] = features
+        return features
+
+    def forget_device(self, device_id: str):
+        """清除设备的特性缓存（设备断开或重启时调用）"""
+        with self._lock:
+            self._features_cache.pop(device_id, None)
+
+    # ---------- shell ----------
+
+    def shell(self, device_id: str, command: str, timeout: Optional[float] = None,
+              output_callback: Optional[Callable[[str], None]] = None) -> subprocess.CompletedProcess:
+        """
+        执行设备端 shell 命令
+
+        设备支持 shell_v2 时使用 `shell,v2,raw:`，可以分离 stdout/stderr 并取得退出码；
+        否则使用旧版 `shell:`，通过追加的哨兵行取得退出码（stderr 合并在 stdout 中）。
+
+        Args:
+            device_id: 设备ID
+            command: 设备端命令（不含 `shell` 前缀）
+            timeout: 超时时间（秒），超时抛出 subprocess.TimeoutExpired
+            output_callback: 实时输出回调，每收到一行调用一次
+
+        Returns:
+            subprocess.CompletedProcess 对象
+        """
+        try:
+            use_v2 = "shell_v2" in self.get_features(device_id)
+        except AdbServerUnavailable:
+            raise
+        except AdbProtocolError:
+            use_v2 = False
+
+        try:
+            if use_v2:
+                return self._shell_v2(device_id, command, timeout, output_callback)
+            return self._shell_legacy(device_id, command, timeout, output_callback)
+        except socket.timeout:
+            raise subprocess.TimeoutExpired(command, timeout)
+
+    def _shell_v2(self, device_id, command, timeout, output_callback):
+        """shell v2 协议：数据包 = 类型(1字节) + 长度(4字节小端) + 数据"""
+        stdout = bytearray()
+        stderr = bytearray()
+        returncode = None
+        line_splitter = _LineSplitter(output_callback)
+
+        with self.open_service(device_id, f"shell,v2,raw:{command}", timeout) as connection:
+            # 不向命令提供 stdin
+            connection.sock.sendall(struct.pack('<BI', SHELL_V2_CLOSE_STDIN, 0))
+            while returncode is None:
+                try:
+                    header = connection.read_exact(5)
+                except AdbProtocolError:
+                    break
+                packet_id, length = struct.unpack('<BI', header)
+                data = connection.read_exact(length) if length else b""
+                if packet_id == SHELL_V2_STDOUT:
+                    stdout += data
+                    line_splitter.feed(data)
+                elif packet_id == SHELL_V2_STDERR:
+                    stderr += data
+                    line_splitter.feed(data)
+                elif packet_id == SHELL_V2_EXIT:
+                    returncode = data[0] if data else 0
+
+        line_splitter.flush()
+        return subprocess.CompletedProcess(
+            command, 1 if returncode is None else returncode,
+            stdout.decode('utf-8', errors='ignore'), stderr.decode('utf-8', errors='ignore')
+        )
+
+    def _shell_legacy(self, device_id, command, timeout, output_callback):
+        """旧版 shell: 协议，读取到连接关闭为止（命令放在子 shell 中，保证哨兵行一定会输出）"""
+        marker = f"__ADBTOOLS_{uuid.uuid4().hex}__"
+        output = bytearray()
+        line_splitter = _LineSplitter(output_callback, skip_prefix=marker.encode('ascii'))
+
+        with self.open_service(device_id, f"shell:( {command}\n)\nprintf '\\n{marker}:%d\\n' $?", timeout) as connection:
+            while True:
+                chunk = connection.sock.recv(SYNC_DATA_MAX)
+                if not chunk:
+                    break
+                output += chunk
+                line_splitter.feed(chunk)
+
+        line_splitter.flush()
+        text = output.decode('utf-8', errors='ignore').replace('\r\n', '\n')
+        returncode = 1
+        marker_pos = text.rfind(f"\n{marker}:")
+        if marker_pos != -1:
+            line_end = text.find('\n', marker_pos + 1)
+            if line_end == -1:
+                line_end = len(text)
+            try:
+                returncode = int(text[marker_pos + len(marker) + 2:line_end].strip())
+            except ValueError:
+                pass
+            # 哨兵行之后可能还有迟到的 stderr 输出，保留下来
+            text = text[:marker_pos] + text[line_end + 1:]
+        return subprocess.CompletedProcess(command, returncode, text, "")
+
+    # ---------- sync ----------
+
+    def sync(self, device_id: str, timeout: Optional[float] = None) -> SyncConnection:
+        """打开 sync: 会话"""
+        return SyncConnection(self.open_service(device_id, "sync:", timeout))
+
+
+def parse_device_list(text: str) -> List[Tuple[str, str]]:
+    """解析 host:devices / host:track-devices 返回的设备表"""
+    devices = []
+    for line in text.splitlines():
+        parts = line.split('\t')
+        if len(parts) >= 2 and parts[0]:
+            devices.append((parts[0], parts[1].strip()))
+    return devices
+
+
+class _LineSplitter:
+    """把收到的字节流拆成行并回调（用于实时输出）"""
+
+    def __init__(self, callback, skip_prefix: bytes = b""):
+        self.callback = callback
+        self.skip_prefix = skip_prefix
+        self.pending = bytearray()
+
+    def feed(self, data: bytes):
+        if not self.callback:
+            return
+        self.pending += data
+        while True:
+            newline = self.pending.find(b"\n")
+            if newline == -1:
+                return
+            line = bytes(self.pending[:newline]).rstrip(b"\r")
+            del self.pending[:newline + 1]
+            self._emit(line)
+
+    def flush(self):
+        if self.callback and self.pending:
+            self._emit(bytes(self.pending).rstrip(b"\r"))
+            self.pending.clear()
+
+    def _emit(self, line: bytes):
+        if self.skip_prefix and line.startswith(self.skip_prefix):
+            return
+        self.callback(line.decode('utf-8', errors='ignore'))
+
+
+def _load_client_settings():
+    """从配置文件读取 adb server 地址"""
+    try:
+        from config_manager import config_manager
+        return {
+            "host": config_manager.get("adb.server_host", "127.0.0.1"),
+            "port": int(config_manager.get("adb.server_port", 5037)),
+        }
+    except ImportError:
+        return {}
+
+
+# 全局客户端实例
+adb_socket_client = AdbSocketClient(**_load_client_settings())
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+APK 清单解析器 - 不依赖 aapt，直接解析 APK 中的二进制 AndroidManifest.xml
+
+功能：
+1. 内存映射 APK 文件，通过 zipfile 读取 AndroidManifest.xml 条目
+2. 解析二进制 AXML（字符串池、资源ID表、START_ELEMENT 块）
+3. 提取 package、versionCode、versionName、minSdkVersion
+4. 根据 lib/<abi>/ 目录推断 native ABI
+
+versionName 引用资源（@string/xxx）时无法在不解析 resources.arsc 的情况下得到实际值，
+此时返回 None，由调用方回退到 aapt。
+"""
+
+import os
+import mmap
+import zlib
+import struct
+import zipfile
+from typing import Dict, List, Optional
+
+# AXML 块类型
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_TYPE = 0x0003
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+
+# 字符串池标志
+UTF8_FLAG = 0x00000100
+
+# Res_value 数据类型
+TYPE_REFERENCE = 0x01
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+
+# android: 属性的资源ID（属性名被混淆或去除时使用）
+ATTR_VERSION_CODE = 0x0101021b
+ATTR_VERSION_NAME = 0x0101021c
+ATTR_MIN_SDK_VERSION = 0x0101020c
+
+# 损坏的条目或 AXML 可能引发的异常，统一转换为 ManifestParseError，由调用方回退到 aapt
+_CORRUPT_DATA_ERRORS = (struct.error, zlib.error, IndexError, UnicodeDecodeError,
+                        NotImplementedError, RuntimeError)
+
+NO_INDEX = 0xFFFFFFFF
+MANIFEST_NAME = "AndroidManifest.xml"
+
+
+class ManifestParseError(Exception):
+    """APK 或二进制清单格式不正确"""
+
+
+class _MappedFile(mmap.mmap):
+    """只读内存映射文件，补充 zipfile 需要的 seekable()（Python 3.13 之前 mmap 没有该方法）"""
+
+    def seekable(self):
+        return True
+
+
+class _StringPool:
+    """AXML 字符串池（按需解码）"""
+
+    def __init__(self, data: bytes, offset: int):
+        header_size, chunk_size = struct.unpack_from('<HI', data, offset + 2)
+        (string_count, _style_count, flags,
+         strings_start, _styles_start) = struct.unpack_from('<IIIII', data, offset + 8)
+        self._data = data
+        self._utf8 = bool(flags & UTF8_FLAG)
+        self._strings_base = offset + strings_start
+        self._offsets = struct.unpack_from(f'<{string_count}I', data, offset + header_size)
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def get(self, index: int) -> Optional[str]:
+        if index == NO_INDEX or index >= len(self._offsets):
+            return None
+        value = self._cache.get(index)
+        if value is None:
+            position = self._strings_base + self._offsets[index]
+            value = self._decode_utf8(position) if self._utf8 else self._decode_utf16(position)
+            self._cache[index] = value
+        return value
+
+    def _decode_utf8(self, position: int) -> str:
+        data = self._data
+        # 先是 UTF-16 字符数，再是 UTF-8 字节数，最高位为 1 时占两个字节
+        position += 2 if data[position] & 0x80 else 1
+        length = data[position]
+        if length & 0x80:
+            length = ((length & 0x7F) << 8) | data[position + 1]
+            position += 2
+        else:
+            position += 1
+        return data[position:position + length].decode('utf-8', errors='replace')
+
+    def _decode_utf16(self, position: int) -> str:
+        length = struct.unpack_from('<H', self._data, position)[0]
+        position += 2
+        if length & 0x8000:
+            length = ((length & 0x7FFF) << 16) | struct.unpack_from('<H', self._data, position)[0]
+            position += 2
+        return self._data[position:position + length * 2].decode('utf-16-le', errors='replace')
+
+
+def _iter_start_elements(data: bytes):
+    """
+    遍历 AXML 中的 START_ELEMENT 块
+
+    Yields:
+        (元素名, 属性列表, 字符串池)，属性为 (属性名, 资源ID, 数据类型, 数据, 原始字符串)
+    """
+    if len(data) < 8:
+        raise ManifestParseError("清单数据过短")
+    chunk_type, header_size, total_size = struct.unpack_from('<HHI', data, 0)
+    if chunk_type != RES_XML_TYPE:
+        raise ManifestParseError(f"不是二进制 AXML（块类型 0x{chunk_type:04x}）")
+
+    strings = None
+    resource_ids = ()
+    offset = header_size
+    end = min(total_size, len(data))
+
+    while offset + 8 <= end:
+        chunk_type, header_size, chunk_size = struct.unpack_from('<HHI', data, offset)
+        if chunk_size < 8:
+            raise ManifestParseError(f"无效的块大小: {chunk_size}")
+
+        if chunk_type == RES_STRING_POOL_TYPE:
+            strings = _StringPool(data, offset)
+        elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+            count = (chunk_size - header_size) // 4
+            resource_ids = struct.unpack_from(f'<{count}I', data, offset + header_size)
+        elif chunk_type == RES_XML_START_ELEMENT_TYPE:
+            if strings is None:
+                raise ManifestParseError("START_ELEMENT 出现在字符串池之前")
+            ext = offset + header_size
+            (_ns, name_index, attribute_start,
+             attribute_size, attribute_count) = struct.unpack_from('<IIHHH', data, ext)
+            attributes = []
+            for i in range(attribute_count):
+                attr_offset = ext + attribute_start + i * attribute_size
+                (_attr_ns, attr_name, raw_value,
+                 _size, _res0, data_type, value) = struct.unpack_from('<IIIHBBI', data, attr_offset)
+                resource_id = resource_ids[attr_name] if attr_name < len(resource_ids) else None
+                attributes.append((strings.get(attr_name), resource_id, data_type, value, strings.get(raw_value)))
+            yield strings.get(name_index), attributes, strings
+
+        offset += chunk_size
+
+
+def _find_attribute(attributes, name: str, resource_id: Optional[int] = None):
+    for attr_name, attr_resource_id, data_type, value, raw in attributes:
+        if (resource_id is not None and attr_resource_id == resource_id) or attr_name == name:
+            return data_type, value, raw
+    return None
+
+
+def _attribute_as_string(attribute, strings) -> Optional[str]:
+    if attribute is None:
+        return None
+    data_type, value, raw = attribute
+    if data_type == TYPE_STRING:
+        return strings.get(value)
+    if raw is not None:
+        return raw
+    if data_type in (TYPE_INT_DEC, TYPE_INT_HEX):
+        return str(value)
+    # 资源引用等无法在此解析的值
+    return None
+
+
+def _attribute_as_int(attribute) -> Optional[int]:
+    if attribute is None:
+        return None
+    data_type, value, raw = attribute
+    if data_type in (TYPE_INT_DEC, TYPE_INT_HEX):
+        return value
+    if raw is not None and raw.strip().isdigit():
+        return int(raw.strip())
+    return None
+
+
+def parse_manifest(data: bytes) -> Dict:
+    """
+    解析二进制 AndroidManifest.xml
+
+    Returns:
+        包含 package_name / version_name / version_code / min_sdk 的字典，未找到的字段为 None
+    """
+    result = {
+        "package_name": None,
+        "version_name": None,
+        "version_code": None,
+        "min_sdk": None,
+    }
+
+    try:
+        for element, attributes, strings in _iter_start_elements(data):
+            if element == "manifest":
+                result["package_name"] = _attribute_as_string(_find_attribute(attributes, "package"), strings)
+                version_code = _attribute_as_int(_find_attribute(attributes, "versionCode", ATTR_VERSION_CODE))
+                result["version_code"] = str(version_code) if version_code is not None else None
+                result["version_name"] = _attribute_as_string(
+                    _find_attribute(attributes, "versionName", ATTR_VERSION_NAME), strings)
+            elif element == "uses-sdk":
+                min_sdk = _find_attribute(attributes, "minSdkVersion", ATTR_MIN_SDK_VERSION)
+                min_sdk_value = _attribute_as_int(min_sdk)
+                if min_sdk_value is None:
+                    # 预览版 SDK 以代号字符串表示
+                    min_sdk_value = _attribute_as_string(min_sdk, strings)
+                result["min_sdk"] = str(min_sdk_value) if min_sdk_value is not None else None
+                break
+            elif element == "application":
+                # uses-sdk 总在 application 之前，到这里说明没有声明
+                break
+    except _CORRUPT_DATA_ERRORS as e:
+        raise ManifestParseError(f"清单数据已损坏: {e}")
+
+    return result
+
+
+def _native_abis(names: List[str]) -> List[str]:
+    abis = []
+    for name in names:
+        parts = name.split('/')
+        if len(parts) >= 3 and parts[0] == "lib" and parts[1] and parts[2].endswith(".so"):
+            if parts[1] not in abis:
+                abis.append(parts[1])
+    return abis
+
+
+def read_apk_manifest(apk_path: str) -> Dict:
+    """
+    读取 APK 的清单信息
+
+    Returns:
+        包含 package_name / version_name / version_code / min_sdk / abis 的字典
+
+    Raises:
+        ManifestParseError: 文件不是有效的 APK 或清单无法解析
+    """
+    try:
+        with open(apk_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ManifestParseError("APK文件为空")
+            with _MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with zipfile.ZipFile(mapped) as apk:
+                    try:
+                        manifest = apk.read(MANIFEST_NAME)
+                    except KeyError:
+                        raise ManifestParseError(f"APK中没有 {MANIFEST_NAME}")
+                    names = apk.namelist()
+    except (OSError, ValueError, zipfile.BadZipFile) + _CORRUPT_DATA_ERRORS as e:
+        raise ManifestParseError(f"无法读取APK: {e}")
+
+    metadata = parse_manifest(manifest)
+    metadata["abis"] = _native_abis(names)
+    return metadata
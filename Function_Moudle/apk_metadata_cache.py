@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+APK 元数据缓存 - 缓存 APK 清单解析结果（默认使用内置解析器，aapt 作为回退）
+
+功能：
+1. 以 (路径, 大小, 修改时间) 作为缓存键，可选再校验文件内容哈希
+2. 记录包名、versionName、versionCode、minSdk 和 native ABI
+3. LRU 淘汰，缓存持久化到磁盘，下次启动仍然有效
+4. prefetch 并行解析整个文件夹中未命中的 APK
+
+同一个发布目录重复验证时，未变化的 APK 不再启动 aapt 进程。
+"""
+
+import os
+import re
+import sys
+import json
+import atexit
+import shutil
+import hashlib
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Optional
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+from Function_Moudle.apk_manifest_parser import read_apk_manifest, ManifestParseError
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+# 创建日志记录器
+logger = get_logger("ADBTools.ApkMetadataCache")
+
+CACHE_FILE_NAME = "apk_metadata_cache.json"
+CACHE_FORMAT_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ApkMetadataError(Exception):
+    """无法解析 APK 元数据（aapt 不可用、文件损坏等）"""
+
+
+def find_aapt_path() -> Optional[str]:
+    """查找 aapt 工具：优先 PATH，其次 adb 所在目录"""
+    aapt_path = shutil.which("aapt")
+    if aapt_path:
+        return aapt_path
+
+    try:
+        from adb_utils import ADBUtils
+        adb_dir = os.path.dirname(ADBUtils.get_adb_path())
+    except Exception:
+        return None
+
+    for name in ("aapt.exe", "aapt"):
+        path = os.path.join(adb_dir, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def parse_badging(output: str) -> Dict:
+    """解析 `aapt dump badging` 输出"""
+    metadata = {
+        "package_name": None,
+        "version_name": None,
+        "version_code": None,
+        "min_sdk": None,
+        "abis": [],
+    }
+
+    for line in output.splitlines():
+        if line.startswith("package:"):
+            for key, field in (("name", "package_name"),
+                               ("versionName", "version_name"),
+                               ("versionCode", "version_code")):
+                match = re.search(rf"\b{key}='([^']*)'", line)
+                if match:
+                    metadata[field] = match.group(1)
+        elif line.startswith("sdkVersion:") or line.startswith("minSdkVersion:"):
+            match = re.search(r"'([^']*)'", line)
+            if match:
+                metadata["min_sdk"] = match.group(1)
+        elif line.startswith("native-code:"):
+            metadata["abis"] = re.findall(r"'([^']+)'", line)
+
+    return metadata
+
+
+def read_apk_metadata(apk_path: str, aapt_path: Optional[str] = None, timeout: int = 60,
+                      parser: str = "python") -> Dict:
+    """
+    解析单个 APK，失败时抛出 ApkMetadataError
+
+    Args:
+        apk_path: APK 文件路径
+        aapt_path: aapt 路径，None 时自动查找
+        timeout: aapt 超时时间（秒）
+        parser: "python" 优先使用内置清单解析器，结果不完整时回退到 aapt；"aapt" 只使用 aapt
+    """
+    metadata = None
+    if parser == "python":
+        try:
+            metadata = read_apk_manifest(apk_path)
+            if metadata["package_name"] and metadata["version_name"] is not None:
+                return metadata
+            logger.debug(f"内置解析器结果不完整（versionName 可能引用资源），回退到aapt: {apk_path}")
+        except ManifestParseError as e:
+            logger.debug(f"内置解析器解析失败，回退到aapt: {apk_path} - {e}")
+
+    try:
+        aapt_metadata = read_apk_metadata_with_aapt(apk_path, aapt_path, timeout)
+        if metadata:
+            # aapt 未输出的字段（如没有 native-code 行）用内置解析器的结果补全
+            for key, value in metadata.items():
+                if not aapt_metadata.get(key) and value:
+                    aapt_metadata[key] = value
+        return aapt_metadata
+    except ApkMetadataError:
+        # aapt 不可用时，仍返回内置解析器拿到的部分信息（至少有包名）
+        if metadata and metadata["package_name"]:
+            return metadata
+        raise
+
+
+def read_apk_metadata_with_aapt(apk_path: str, aapt_path: Optional[str] = None, timeout: int = 60) -> Dict:
+    """调用 aapt 解析单个 APK，失败时抛出 ApkMetadataError"""
+    aapt_path = aapt_path or find_aapt_path()
+    if not aapt_path:
+        raise ApkMetadataError("未找到aapt工具，请安装Android SDK Build Tools或将aapt添加到PATH中")
+
+    try:
+        # 使用列表形式传递参数，避免路径解析问题
+        result = subprocess.run(
+            [aapt_path, 'dump', 'badging', apk_path],
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='ignore',
+            timeout=timeout
+        )
+    except (subprocess.SubprocessError, OSError) as e:
+        raise ApkMetadataError(f"执行aapt失败: {e}")
+
+    metadata = parse_badging(result.stdout)
+    if not metadata["package_name"]:
+        error_msg = result.stderr.strip() or "未找到包名信息"
+        raise ApkMetadataError(error_msg)
+    return metadata
+
+
+def _file_hash(path: str) -> str:
+    """计算文件内容哈希"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _get_cache_dir() -> str:
+    """缓存目录：打包后放在用户数据目录，开发环境放在项目根目录"""
+    if getattr(sys, 'frozen', False):
+        app_data_dir = os.environ.get('APPDATA')
+        base_dir = os.path.join(app_data_dir, 'ADBTools') if app_data_dir else os.path.dirname(sys.executable)
+    else:
+        base_dir = project_root
+    return os.path.join(base_dir, config_manager.get("apk_cache.cache_dir", "cache"))
+
+
+class ApkMetadataCache:
+    """APK 元数据缓存（线程安全）"""
+
+    def __init__(self, cache_file: Optional[str] = None, max_entries: int = 5000,
+                 verify_hash: bool = False, max_workers: int = 8, parser: str = "python"):
+        """
+        初始化缓存
+
+        Args:
+            cache_file: 缓存文件路径，None 表示只在内存中缓存
+            max_entries: 最大缓存条目数，超过后淘汰最久未使用的条目
+            verify_hash: 是否校验文件内容哈希（大小和修改时间未变也会重新计算哈希）
+            max_workers: prefetch 并行解析的最大任务数
+            parser: 解析方式，"python"（内置解析器，必要时回退 aapt）或 "aapt"
+        """
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.verify_hash = verify_hash
+        self.max_workers = max_workers
+        self.parser = parser
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._loaded = False
+        self._aapt_path = None
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- 持久化 ----------
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.cache_file or not os.path.exists(self.cache_file):
+                return
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") != CACHE_FORMAT_VERSION:
+                    logger.info("APK元数据缓存格式已变化，忽略旧缓存")
+                    return
+                for key, entry in data.get("entries", [])[-self.max_entries:]:
+                    self._entries[key] = entry
+                logger.info(f"加载APK元数据缓存: {len(self._entries)} 条")
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"加载APK元数据缓存失败，重新建立缓存: {e}")
+                self._entries.clear()
+
+    def save(self):
+        """将缓存写入磁盘（仅在有变化时写入）"""
+        with self._lock:
+            if not self.cache_file or not self._dirty:
+                return
+            payload = {
+                "version": CACHE_FORMAT_VERSION,
+                "entries": list(self._entries.items())
+            }
+            self._dirty = False
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temp_file = f"{self.cache_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            logger.warning(f"保存APK元数据缓存失败: {e}")
+
+    # ---------- 缓存读写 ----------
+
+    @staticmethod
+    def _make_key(apk_path: str) -> str:
+        return os.path.normcase(os.path.abspath(apk_path))
+
+    def _lookup(self, key: str, size: int, mtime_ns: int, content_hash: Optional[str]) -> Optional[Dict]:
+        """查找有效的缓存条目，命中时移动到 LRU 末尾"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["size"] != size or entry["mtime_ns"] != mtime_ns:
+                return None
+            if content_hash is not None and entry.get("hash") != content_hash:
+                return None
+            self._entries.move_to_end(key)
+            return entry["metadata"]
+
+    def _store(self, key: str, size: int, mtime_ns: int, content_hash: Optional[str], metadata: Dict):
+        with self._lock:
+            self._entries[key] = {
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "hash": content_hash,
+                "metadata": metadata
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def _file_signature(self, apk_path: str):
+        st = os.stat(apk_path)
+        content_hash = _file_hash(apk_path) if self.verify_hash else None
+        return st.st_size, st.st_mtime_ns, content_hash
+
+    def _get_aapt_path(self):
+        if self._aapt_path is None:
+            self._aapt_path = find_aapt_path()
+        return self._aapt_path
+
+    def get(self, apk_path: str) -> Dict:
+        """
+        获取 APK 元数据，未命中时调用 aapt 解析并写入缓存
+
+        Returns:
+            包含 package_name / version_name / version_code / min_sdk / abis 的字典（副本）
+
+        Raises:
+            ApkMetadataError: 解析失败
+        """
+        self._ensure_loaded()
+        key = self._make_key(apk_path)
+        try:
+            size, mtime_ns, content_hash = self._file_signature(apk_path)
+        except OSError as e:
+            raise ApkMetadataError(f"无法读取APK文件: {e}")
+
+        metadata = self._lookup(key, size, mtime_ns, content_hash)
+        if metadata is not None:
+            self.hits += 1
+            return dict(metadata)
+
+        self.misses += 1
+        metadata = read_apk_metadata(apk_path, self._get_aapt_path(), parser=self.parser)
+        self._store(key, size, mtime_ns, content_hash, metadata)
+        return dict(metadata)
+
+    def prefetch(self, apk_paths: Iterable[str],
+                 progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Dict]:
+        """
+        并行解析一组 APK，已缓存且未变化的直接跳过
+
+        Args:
+            apk_paths: APK 文件路径列表
+            progress_callback: 进度回调 (已完成数, 需解析总数)
+
+        Returns:
+            {apk_path: 元数据}，解析失败的文件不包含在结果中
+        """
+        self._ensure_loaded()
+        results = {}
+        pending = []
+
+        for apk_path in apk_paths:
+            try:
+                size, mtime_ns, content_hash = self._file_signature(apk_path)
+            except OSError:
+                continue
+            metadata = self._lookup(self._make_key(apk_path), size, mtime_ns, content_hash)
+            if metadata is not None:
+                self.hits += 1
+                results[apk_path] = dict(metadata)
+            else:
+                pending.append((apk_path, size, mtime_ns, content_hash))
+
+        if pending:
+            aapt_path = self._get_aapt_path()
+            logger.info(f"APK元数据缓存命中 {len(results)} 个，需解析 {len(pending)} 个")
+            # 内置解析器只读取清单条目，aapt 回退时解析在子进程中完成，线程池足以并行
+            workers = max(1, min(self.max_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ApkMetadata") as executor:
+                futures = {
+                    executor.submit(read_apk_metadata, apk_path, aapt_path, parser=self.parser): (apk_path, size, mtime_ns, content_hash)
+                    for apk_path, size, mtime_ns, content_hash in pending
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    apk_path, size, mtime_ns, content_hash = futures[future]
+                    self.misses += 1
+                    try:
+                        metadata = future.result()
+                    except ApkMetadataError as e:
+                        logger.warning(f"解析APK失败: {apk_path} - {e}")
+                    except Exception as e:
+                        # 单个文件的意外错误不影响其他文件，之后查询该文件时再报告失败
+                        logger.warning(f"解析APK出错: {apk_path} - {e}")
+                    else:
+                        self._store(self._make_key(apk_path), size, mtime_ns, content_hash, metadata)
+                        results[apk_path] = dict(metadata)
+                    if progress_callback:
+                        progress_callback(done, len(pending))
+            self.save()
+
+        return results
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+        self.save()
+
+    def get_statistics(self) -> Dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "cache_file": self.cache_file
+            }
+
+
+def _load_cache_settings():
+    """从配置文件读取缓存参数"""
+    enabled = config_manager.get("apk_cache.enabled", True)
+    return {
+        "cache_file": os.path.join(_get_cache_dir(), CACHE_FILE_NAME) if enabled else None,
+        "max_entries": config_manager.get("apk_cache.max_entries", 5000),
+        "verify_hash": config_manager.get("apk_cache.verify_hash", False),
+        "max_workers": config_manager.get("apk_cache.max_workers", 8),
+        "parser": config_manager.get("apk_cache.parser", "python"),
+    }
+
+
+# 全局APK元数据缓存
+apk_metadata_cache = ApkMetadataCache(**_load_cache_settings())
+atexit.register(apk_metadata_cache.save)
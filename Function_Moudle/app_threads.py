@@ -142,7 +142,7 @@ class ListPackageThread(DeviceBaseThread):
         try:
             from adb_utils import ADBUtils
             
-            result = ADBUtils.run_adb_command(
+            result = ADBUtils.run_adb_query(
                 command="shell pm list packages",
                 device_id=self.device_id,
                 timeout=30
@@ -1,4 +1,3 @@
-import time
 import os
 from typing import Dict, Optional, Tuple, List
 from collections import defaultdict
@@ -36,6 +35,8 @@ class AppVersionCheckThread(QThread):
             'mismatched': 0,
             'not_found': 0
         }
+        # 设备包信息快照 {包名: {"version_name", ...}}，获取失败时为 None，逐包查询
+        self._package_snapshot: Optional[Dict[str, Dict]] = None
 
     def _validate_file(self) -> bool:
         """校验版本清单文件是否有效"""
@@ -112,8 +113,29 @@ class AppVersionCheckThread(QThread):
             self.error_signal.emit(f"❌ 读取Excel失败：{str(e)}")
             return False
 
+    def _load_package_snapshot(self):
+        """一次 dumpsys 获取设备全部包的版本信息，对比时直接查表"""
+        device_id = self.device_id or getattr(self.d, 'serial', None)
+        if not device_id:
+            return
+        try:
+            from Function_Moudle.package_snapshot import package_snapshot_cache
+        except ImportError:
+            return
+
+        self.progress_signal.emit("正在获取设备应用版本快照...")
+        self._package_snapshot = package_snapshot_cache.get_snapshot(device_id, refresh=True)
+        if self._package_snapshot is None:
+            self.progress_signal.emit("  ⚠️ 获取版本快照失败，改为逐个应用查询")
+        else:
+            self.progress_signal.emit(f"  设备上共有 {len(self._package_snapshot)} 个应用")
+
     def _get_device_app_version(self, packagename: str) -> Optional[str]:
         """获取设备端已安装应用的版本号 - 支持u2和ADB两种模式"""
+        if self._package_snapshot is not None:
+            package_info = self._package_snapshot.get(packagename)
+            return package_info.get("version_name") if package_info else None
+
         try:
             if self.connection_mode == 'adb':
                 from Function_Moudle.adb_device_utils import get_app_version
@@ -167,9 +189,10 @@ class AppVersionCheckThread(QThread):
         total_packages = len(self.release_note_dict)
         current_index = 0
 
+        self._load_package_snapshot()
+
         for packagename, excel_version in self.release_note_dict.items():
             current_index += 1
-            time.sleep(0.1)
 
             progress_percent = int((current_index / total_packages) * 100)
             self.progress_signal.emit(
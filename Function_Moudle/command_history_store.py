@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+命令历史存储 - SQLite（WAL 模式）保存命令执行记录
+
+功能：
+1. 在 timestamp、device_id、result、命令动词（command 的第一个词）上建索引
+2. 读取最近 N 条只扫描 N 行；按设备/结果/动词/时间过滤走索引
+3. 关键字搜索优先使用 FTS5 trigram 全文索引（子串匹配语义不变），不可用时退回 SQL LIKE
+4. 超过最大条数后按自增ID整段删除最旧的记录
+5. 首次打开时导入旧版 JSONL 命令历史文件
+
+写入由 logger_manager 的后台写入器批量调用 insert_many，一批记录一个事务。
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+
+# 创建日志记录器
+logger = get_logger("ADBTools.CommandHistoryStore")
+
+# 记录字段（与 CommandLogger.log_command 的字典键一致）
+RECORD_FIELDS = (
+    "timestamp", "command", "device_id", "full_command", "adb_path", "returncode",
+    "stdout", "stderr", "execution_time", "result", "thread_id", "thread_name"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    command TEXT,
+    verb TEXT,
+    device_id TEXT,
+    full_command TEXT,
+    adb_path TEXT,
+    returncode INTEGER,
+    stdout TEXT,
+    stderr TEXT,
+    execution_time REAL,
+    result TEXT,
+    thread_id INTEGER,
+    thread_name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_commands_timestamp ON commands(timestamp);
+CREATE INDEX IF NOT EXISTS idx_commands_device ON commands(device_id, id);
+CREATE INDEX IF NOT EXISTS idx_commands_result ON commands(result, id);
+CREATE INDEX IF NOT EXISTS idx_commands_verb ON commands(verb, id);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS commands_fts USING fts5(
+    command, stdout, stderr, content='commands', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS commands_fts_insert AFTER INSERT ON commands BEGIN
+    INSERT INTO commands_fts(rowid, command, stdout, stderr)
+    VALUES (new.id, new.command, new.stdout, new.stderr);
+END;
+CREATE TRIGGER IF NOT EXISTS commands_fts_delete AFTER DELETE ON commands BEGIN
+    INSERT INTO commands_fts(commands_fts, rowid, command, stdout, stderr)
+    VALUES ('delete', old.id, old.command, old.stdout, old.stderr);
+END;
+"""
+
+# trigram 索引只能加速至少 3 个字符的子串
+FTS_MIN_KEYWORD_LENGTH = 3
+# 每插入多少条检查一次是否需要删除旧记录
+TRIM_CHECK_INTERVAL = 1000
+
+_FAILED_CONDITION = "(result IN ('failed', 'error') OR (returncode IS NOT NULL AND returncode != 0))"
+
+
+def command_verb(command: Optional[str]) -> str:
+    """命令动词（第一个词），如 shell、install、push"""
+    if not command:
+        return "unknown"
+    parts = command.split(None, 1)
+    return parts[0] if parts else "unknown"
+
+
+class CommandHistoryStore:
+    """命令历史 SQLite 存储（线程安全，每个线程独立连接）"""
+
+    def __init__(self, db_path: str, max_records: int = 200000, legacy_log_file: Optional[str] = None):
+        """
+        Args:
+            db_path: 数据库文件路径
+            max_records: 最多保留的记录数，0 表示不限制
+            legacy_log_file: 旧版 JSONL 历史文件，数据库为空时导入
+        """
+        self.db_path = db_path
+        self.max_records = max_records
+        self.legacy_log_file = legacy_log_file
+        self.fts_enabled = False
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._inserted_since_trim = 0
+
+    # ---------- 连接与建表 ----------
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self._ensure_schema()
+            connection = self._open()
+            self._local.connection = connection
+        return connection
+
+    def _open(self) -> sqlite3.Connection:
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            connection = self._open()
+            try:
+                connection.executescript(_SCHEMA)
+                try:
+                    connection.executescript(_FTS_SCHEMA)
+                    self.fts_enabled = True
+                except sqlite3.OperationalError as e:
+                    # 旧版 SQLite 不支持 FTS5 或 trigram 分词器
+                    logger.info(f"全文索引不可用，关键字搜索使用 LIKE: {e}")
+                self._import_legacy_log(connection)
+            finally:
+                connection.close()
+            self._initialized = True
+
+    def _import_legacy_log(self, connection: sqlite3.Connection):
+        """导入旧版 JSONL 命令历史，导入后重命名为 .migrated"""
+        legacy = self.legacy_log_file
+        if not legacy or not os.path.exists(legacy):
+            return
+        if connection.execute("SELECT 1 FROM commands LIMIT 1").fetchone():
+            return
+
+        def entries():
+            with open(legacy, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except (json.JSONDecodeError, ValueError):
+                        continue
+
+        try:
+            with connection:
+                count = self._insert(connection, entries())
+            os.replace(legacy, legacy + ".migrated")
+            logger.info(f"已导入旧版命令历史 {count} 条: {legacy}")
+        except Exception as e:
+            logger.warning(f"导入旧版命令历史失败: {e}")
+
+    # ---------- 写入 ----------
+
+    @staticmethod
+    def _insert(connection: sqlite3.Connection, records: Iterable[Dict[str, Any]]) -> int:
+        rows = (
+            (
+                record.get("timestamp"), record.get("command"), command_verb(record.get("command")),
+                record.get("device_id"), record.get("full_command"), record.get("adb_path"),
+                record.get("returncode"), record.get("stdout"), record.get("stderr"),
+                record.get("execution_time"), record.get("result"),
+                record.get("thread_id"), record.get("thread_name")
+            )
+            for record in records if isinstance(record, dict)
+        )
+        cursor = connection.executemany(
+            "INSERT INTO commands (timestamp, command, verb, device_id, full_command, adb_path, returncode,"
+            " stdout, stderr, execution_time, result, thread_id, thread_name)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        return cursor.rowcount
+
+    def insert_many(self, records: List[Dict[str, Any]]):
+        """批量写入记录（一个事务）"""
+        connection = self._connect()
+        with connection:
+            self._insert(connection, records)
+            self._inserted_since_trim += len(records)
+            if self.max_records and self._inserted_since_trim >= TRIM_CHECK_INTERVAL:
+                self._inserted_since_trim = 0
+                self._trim(connection)
+
+    def _trim(self, connection: sqlite3.Connection):
+        """删除超出 max_records 的最旧记录（按自增ID整段删除）"""
+        row = connection.execute("SELECT MAX(id) FROM commands").fetchone()
+        if row and row[0] and row[0] > self.max_records:
+            deleted = connection.execute("DELETE FROM commands WHERE id <= ?",
+                                         (row[0] - self.max_records,)).rowcount
+            if deleted:
+                logger.debug(f"命令历史超过 {self.max_records} 条，删除最旧的 {deleted} 条")
+
+    # ---------- 查询 ----------
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {field: row[field] for field in RECORD_FIELDS}
+
+    def _query(self, sql: str, params=()) -> List[Dict[str, Any]]:
+        return [self._to_dict(row) for row in self._connect().execute(sql, params)]
+
+    def tail(self, limit: int = 100, device_id: Optional[str] = None, result: Optional[str] = None,
+             verb: Optional[str] = None, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        获取最近的记录（按时间正序返回）
+
+        Args:
+            limit: 记录数
+            device_id / result / verb: 按设备、结果、命令动词过滤
+            since: 只返回该时间戳（含）之后的记录，格式与记录中的 timestamp 相同
+        """
+        conditions, params = [], []
+        for column, value in (("device_id", device_id), ("result", result), ("verb", verb)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._query(f"SELECT * FROM commands {where} ORDER BY id DESC LIMIT ?", (*params, limit))
+        rows.reverse()
+        return rows
+
+    def search(self, keyword: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """在命令、标准输出、错误输出中搜索关键字（不区分大小写，按时间正序）"""
+        if self.fts_enabled and len(keyword) >= FTS_MIN_KEYWORD_LENGTH:
+            # trigram 分词下短语查询即子串匹配，三列一起查
+            phrase = '"' + keyword.replace('"', '""') + '"'
+            return self._query(
+                "SELECT * FROM commands WHERE id IN (SELECT rowid FROM commands_fts WHERE commands_fts MATCH ?)"
+                " ORDER BY id LIMIT ?",
+                (phrase, limit)
+            )
+
+        pattern = "%" + keyword.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return self._query(
+            "SELECT * FROM commands"
+            " WHERE lower(command) LIKE ? ESCAPE '\\' OR lower(stdout) LIKE ? ESCAPE '\\'"
+            " OR lower(stderr) LIKE ? ESCAPE '\\'"
+            " ORDER BY id LIMIT ?",
+            (pattern, pattern, pattern, limit)
+        )
+
+    def failed(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """获取失败的命令（按时间正序）"""
+        return self._query(f"SELECT * FROM commands WHERE {_FAILED_CONDITION} ORDER BY id LIMIT ?", (limit,))
+
+    def summary(self, last: int = 1000) -> Dict[str, Any]:
+        """
+        统计最近 last 条记录
+
+        Returns:
+            {"total", "success", "failed", "verbs": [(动词, 次数), ...]（按次数降序）}
+        """
+        connection = self._connect()
+        recent = "(SELECT * FROM commands ORDER BY id DESC LIMIT ?)"
+        row = connection.execute(
+            f"SELECT COUNT(*), SUM(result = 'success'), SUM(result IN ('failed', 'error')) FROM {recent}",
+            (last,)
+        ).fetchone()
+        verbs = connection.execute(
+            f"SELECT verb, COUNT(*) AS count FROM {recent} GROUP BY verb ORDER BY count DESC",
+            (last,)
+        ).fetchall()
+        return {
+            "total": row[0] or 0,
+            "success": row[1] or 0,
+            "failed": row[2] or 0,
+            "verbs": [(verb_row[0], verb_row[1]) for verb_row in verbs]
+        }
+
+    def count(self) -> int:
+        """记录总数"""
+        return self._connect().execute("SELECT COUNT(*) FROM commands").fetchone()[0]
+
+    def clear(self):
+        """清空记录"""
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM commands")
+            if self.fts_enabled:
+                connection.execute("INSERT INTO commands_fts(commands_fts) VALUES ('delete-all')")
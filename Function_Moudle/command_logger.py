@@ -8,11 +8,12 @@
 3. 记录命令执行时间
 4. 支持命令搜索和过滤
 5. 生成命令执行报告
+6. 记录由后台线程批量写入，单条记录的输出长度可配置上限
+7. 记录保存在带索引的 SQLite 数据库中（见 command_history_store），读取最近记录和搜索不再扫描整个文件
 """
 
 import sys
 import os
-import json
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, List, Optional
@@ -23,7 +24,14 @@ project_root = os.path.dirname(current_dir)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from logger_manager import get_logger, log_operation
+from logger_manager import get_logger, log_operation, get_log_writer
+from Function_Moudle.command_history_store import CommandHistoryStore
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
 
 # 创建日志记录器
 logger = get_logger("ADBTools.CommandLogger")
@@ -32,9 +40,37 @@ logger = get_logger("ADBTools.CommandLogger")
 class CommandLogger:
     """命令执行日志记录器"""
     
-    def __init__(self, log_file: str = "command_history.log"):
+    def __init__(self, log_file: str = "command_history.log", max_output_chars: Optional[int] = None,
+                 max_records: Optional[int] = None):
+        """
+        Args:
+            log_file: 旧版命令历史文件（JSONL），数据库与其同名、扩展名为 .db，首次启动时导入旧记录
+            max_output_chars: 每条记录 stdout/stderr 的最大字符数，0 表示不限制，None 时读取配置
+            max_records: 最多保留的记录数，0 表示不限制，None 时读取配置
+        """
         self.log_file = log_file
+        if max_output_chars is None:
+            max_output_chars = config_manager.get("logging.command_output_max_chars", 4000)
+        self.max_output_chars = max_output_chars
+        if max_records is None:
+            max_records = config_manager.get("logging.command_history_max_records", 200000)
+        self._writer = get_log_writer()
         self._ensure_log_dir()
+        self.store = CommandHistoryStore(
+            os.path.splitext(log_file)[0] + ".db",
+            max_records=max_records,
+            legacy_log_file=log_file
+        )
+    
+    def _truncate_output(self, text: Optional[str]) -> Optional[str]:
+        """截断过长的输出，保留开头部分并注明截掉的字符数"""
+        if not text or not self.max_output_chars or len(text) <= self.max_output_chars:
+            return text
+        return text[:self.max_output_chars] + f"\n...(已截断 {len(text) - self.max_output_chars} 个字符)"
+    
+    def flush(self, timeout: float = 5) -> bool:
+        """等待已记录的命令全部写入数据库"""
+        return self._writer.flush(timeout)
     
     def _ensure_log_dir(self):
         """确保日志目录存在"""
@@ -83,18 +119,17 @@ class CommandLogger:
             "full_command": full_command,
             "adb_path": adb_path,
             "returncode": returncode,
-            "stdout": stdout,
-            "stderr": stderr,
+            "stdout": self._truncate_output(stdout),
+            "stderr": self._truncate_output(stderr),
             "execution_time": execution_time,
             "result": result,
             "thread_id": thread_id,
             "thread_name": thread_name
         }
         
-        # 同时记录到日志文件和操作历史
+        # 同时记录到命令历史库和操作历史（均由后台写入器批量落盘）
         try:
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
+            self._writer.submit(self.store.insert_many, log_entry)
         except Exception as e:
             logger.error(f"写入命令历史失败: {e}")
         
@@ -120,20 +155,9 @@ class CommandLogger:
         Returns:
             命令历史列表
         """
+        self.flush()
         try:
-            if not os.path.exists(self.log_file):
-                return []
-            
-            commands = []
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        commands.append(json.loads(line.strip()))
-                    except (json.JSONDecodeError, ValueError):
-                        pass
-            
-            # 返回最近的记录
-            return commands[-limit:] if len(commands) > limit else commands
+            return self.store.tail(limit)
         except Exception as e:
             logger.error(f"读取命令历史失败: {e}")
             return []
@@ -149,26 +173,9 @@ class CommandLogger:
         Returns:
             匹配的命令列表
         """
+        self.flush()
         try:
-            if not os.path.exists(self.log_file):
-                return []
-            
-            results = []
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        cmd = json.loads(line.strip())
-                        # 在命令、输出中搜索
-                        if (keyword.lower() in str(cmd.get('command', '')).lower() or
-                            keyword.lower() in str(cmd.get('stdout', '')).lower() or
-                            keyword.lower() in str(cmd.get('stderr', '')).lower()):
-                            results.append(cmd)
-                            if len(results) >= limit:
-                                break
-                    except (json.JSONDecodeError, ValueError, KeyError):
-                        pass
-            
-            return results
+            return self.store.search(keyword, limit)
         except Exception as e:
             logger.error(f"搜索命令历史失败: {e}")
             return []
@@ -183,23 +190,9 @@ class CommandLogger:
         Returns:
             失败的命令列表
         """
+        self.flush()
         try:
-            if not os.path.exists(self.log_file):
-                return []
-            
-            failed = []
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        cmd = json.loads(line.strip())
-                        if cmd.get('result') in ['failed', 'error'] or cmd.get('returncode', 0) != 0:
-                            failed.append(cmd)
-                            if len(failed) >= limit:
-                                break
-                    except (json.JSONDecodeError, ValueError, KeyError):
-                        pass
-            
-            return failed
+            return self.store.failed(limit)
         except Exception as e:
             logger.error(f"获取失败命令失败: {e}")
             return []
@@ -214,22 +207,23 @@ class CommandLogger:
         Returns:
             报告内容
         """
-        commands = self.get_command_history(1000)
+        self.flush()
+        try:
+            summary = self.store.summary(1000)
+            commands = self.store.tail(10)
+        except Exception as e:
+            logger.error(f"统计命令历史失败: {e}")
+            summary = {"total": 0}
+            commands = []
         
-        if not commands:
+        if not summary["total"]:
             report = "没有命令执行记录"
             return report
         
-        # 统计信息
-        total = len(commands)
-        success = sum(1 for cmd in commands if cmd.get('result') == 'success')
-        failed = sum(1 for cmd in commands if cmd.get('result') in ['failed', 'error'])
-        
-        # 按命令类型统计
-        command_types = {}
-        for cmd in commands:
-            cmd_type = cmd.get('command', '').split()[0] if cmd.get('command') else 'unknown'
-            command_types[cmd_type] = command_types.get(cmd_type, 0) + 1
+        # 统计信息（最近 1000 条）
+        total = summary["total"]
+        success = summary["success"]
+        failed = summary["failed"]
         
         # 生成报告
         report = []
@@ -244,14 +238,14 @@ class CommandLogger:
         report.append(f"  失败: {failed} ({failed/total*100:.1f}%)")
         report.append("")
         report.append("命令类型统计:")
-        for cmd_type, count in sorted(command_types.items(), key=lambda x: x[1], reverse=True):
+        for cmd_type, count in summary["verbs"]:
             report.append(f"  {cmd_type}: {count} 次")
         report.append("")
         report.append("=" * 80)
         report.append("最近的命令执行记录:")
         report.append("=" * 80)
         
-        for i, cmd in enumerate(commands[-10:], 1):
+        for i, cmd in enumerate(commands, 1):
             report.append(f"\n[{i}] {cmd.get('timestamp', '')}")
             report.append(f"    命令: {cmd.get('command', '')}")
             report.append(f"    设备: {cmd.get('device_id', 'N/A')}")
@@ -278,10 +272,10 @@ class CommandLogger:
     
     def clear_history(self):
         """清空命令历史"""
+        self.flush()
         try:
-            if os.path.exists(self.log_file):
-                os.remove(self.log_file)
-                logger.info("命令历史已清空")
+            self.store.clear()
+            logger.info("命令历史已清空")
         except Exception as e:
             logger.error(f"清空命令历史失败: {e}")
 
@@ -317,4 +311,9 @@ def search_commands(keyword: str, limit: int = 100) -> List[Dict[str, Any]]:
 
 def generate_command_report(output_file: Optional[str] = None) -> str:
     """生成命令报告（便捷函数）"""
-    return command_logger.generate_report(output_file)
\ No newline at end of file
+    return command_logger.generate_report(output_file)
+
+
+def get_command_log_statistics() -> Dict[str, int]:
+    """获取命令历史写入统计（已写入、背压等待、丢弃条数等）"""
+    return command_logger._writer.get_statistics()
\ No newline at end of file
@@ -259,20 +259,93 @@ class DatongManager:
         
         if reply == QMessageBox.Yes:
             device_id = self._get_selected_device()
-            from Function_Moudle.adb_batch_install_thread import ADBBatchInstallThread
-            self.batch_install_thread = ADBBatchInstallThread(
-                device_id,
-                folder_path,
-                connection_mode=self._get_connection_mode(),
-                u2_device=self._get_u2_device() if self._get_connection_mode() == 'u2' else None,
-                selected_files=selected_files
-            )
-            self._connect_thread_signals(self.batch_install_thread)
-            self.batch_install_thread.start()
-            log_method_result("datong_batch_install_action", True, f"批量安装线程已启动 ({len(selected_files)}个文件)")
+            
+            # 连接了多台设备时，询问是否并行安装到所有设备
+            device_ids = [device_id]
+            connected_devices = self._get_device_list()
+            if len(connected_devices) > 1:
+                multi_reply = QMessageBox.question(
+                    self.main_window,
+                    '多设备安装',
+                    f'当前连接了 {len(connected_devices)} 台设备，是否同时安装到所有设备？\n\n'
+                    f'设备列表:\n' + '\n'.join(connected_devices) + '\n\n'
+                    f'选择"否"仅安装到当前设备: {device_id}',
+                    QMessageBox.Yes | QMessageBox.No,
+                    QMessageBox.No
+                )
+                if multi_reply == QMessageBox.Yes:
+                    device_ids = connected_devices
+            
+            from config_manager import config_manager
+            if config_manager.get("batch_install.plan.skip_installed", True) and \
+                    config_manager.get("batch_install.plan.preview", True):
+                # 先计算安装计划，预览确认后再执行
+                self._start_batch_install(device_id, folder_path, selected_files, device_ids, plan_only=True)
+            else:
+                self._start_batch_install(device_id, folder_path, selected_files, device_ids)
         else:
             logger.info("用户取消批量安装")
     
+    def _start_batch_install(self, device_id, folder_path, selected_files, device_ids, plan_only=False, plan=None,
+                             **options):
+        """启动批量安装线程（plan_only 时只计算安装计划用于预览；options 传给线程，如恢复任务的参数）"""
+        from Function_Moudle.adb_batch_install_thread import ADBBatchInstallThread
+        thread = ADBBatchInstallThread(
+            device_id,
+            folder_path,
+            connection_mode=self._get_connection_mode(),
+            u2_device=self._get_u2_device() if self._get_connection_mode() == 'u2' else None,
+            selected_files=selected_files,
+            device_ids=device_ids,
+            plan_only=plan_only,
+            plan=plan,
+            **options
+        )
+        self._connect_thread_signals(thread)
+        if plan_only:
+            thread.plan_signal.connect(
+                lambda plans: self._on_batch_install_plan_ready(device_id, folder_path, selected_files, device_ids, plans))
+            self.batch_install_plan_thread = thread
+            thread.start()
+            log_method_result("datong_batch_install_action", True, f"正在计算安装计划 ({len(selected_files)}个文件)")
+            return
+        self.batch_install_thread = thread
+        thread.start()
+        log_method_result("datong_batch_install_action", True,
+                          f"批量安装线程已启动 ({len(selected_files)}个文件, {len(device_ids)}台设备)")
+    
+    def _on_batch_install_plan_ready(self, device_id, folder_path, selected_files, device_ids, plans):
+        """显示安装计划预览，确认后按计划执行"""
+        from PyQt5.QtWidgets import QMessageBox
+        from Function_Moudle.install_planner import format_plan, summarize_plan
+        
+        allow_downgrade = self.batch_install_plan_thread.allow_downgrade
+        execute_count = 0
+        skip_count = 0
+        for plan in plans.values():
+            if plan is None:
+                execute_count += len(selected_files)
+                continue
+            summary = summarize_plan(plan, allow_downgrade)
+            execute_count += summary["execute"]
+            skip_count += len(plan) - summary["execute"]
+        
+        if execute_count == 0:
+            self._append_output(f"所有APK均已是设备上的相同版本，无需安装（共跳过 {skip_count} 项）")
+            return
+        
+        box = QMessageBox(self.main_window)
+        box.setIcon(QMessageBox.Question)
+        box.setWindowTitle('安装计划预览')
+        box.setText(f'需要安装 {execute_count} 项，跳过 {skip_count} 项，是否执行？')
+        box.setDetailedText(format_plan(plans, allow_downgrade))
+        box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+        box.setDefaultButton(QMessageBox.Yes)
+        if box.exec_() == QMessageBox.Yes:
+            self._start_batch_install(device_id, folder_path, selected_files, device_ids, plan=plans)
+        else:
+            logger.info("用户取消按计划批量安装")
+    
     def batch_install_test_action(self):
         """测试批量安装功能"""
         log_button_click("datong_batch_install_test_button", "测试批量安装功能")
@@ -351,22 +424,84 @@ class DatongManager:
         )
         
         if reply == QMessageBox.Yes:
-            device_id = self._get_selected_device()
-            from Function_Moudle.adb_batch_verify_version_thread import ADBBatchVerifyVersionThread
-            self.batch_verify_thread = ADBBatchVerifyVersionThread(
-                device_id,
-                folder_path,
-                connection_mode=self._get_connection_mode(),
-                u2_device=self._get_u2_device() if self._get_connection_mode() == 'u2' else None,
-                selected_files=selected_files
-            )
-            self._connect_thread_signals(self.batch_verify_thread)
-            self.batch_verify_thread.debug_signal.connect(self._append_output)
-            self.batch_verify_thread.start()
-            log_method_result("datong_batch_verify_version_action", True, f"版本验证线程已启动 ({len(selected_files)}个文件)")
+            self._start_batch_verify(self._get_selected_device(), folder_path, selected_files)
         else:
             logger.info("用户取消版本验证")
     
+    def _start_batch_verify(self, device_id, folder_path, selected_files, resume_job=None):
+        """启动版本验证线程（resume_job 非 None 时恢复未完成的任务）"""
+        from Function_Moudle.adb_batch_verify_version_thread import ADBBatchVerifyVersionThread
+        self.batch_verify_thread = ADBBatchVerifyVersionThread(
+            device_id,
+            folder_path,
+            connection_mode=self._get_connection_mode(),
+            u2_device=self._get_u2_device() if self._get_connection_mode() == 'u2' else None,
+            selected_files=selected_files,
+            resume_job=resume_job
+        )
+        self._connect_thread_signals(self.batch_verify_thread)
+        self.batch_verify_thread.debug_signal.connect(self._append_output)
+        self.batch_verify_thread.start()
+        log_method_result("datong_batch_verify_version_action", True,
+                          f"版本验证线程已启动 ({len(selected_files or [])}个文件)")
+    
+    # ========== 恢复未完成的任务 ==========
+    
+    def check_unfinished_jobs(self):
+        """启动时检查上次中断的批量安装/版本验证任务，询问是否从检查点继续"""
+        import os
+        from PyQt5.QtWidgets import QMessageBox
+        from Function_Moudle.job_journal import find_unfinished_jobs
+        
+        jobs = find_unfinished_jobs("batch_install") + find_unfinished_jobs("batch_verify")
+        if not jobs:
+            return
+        connected_devices = self._get_device_list()
+        started_kinds = set()
+        for job in jobs:
+            if job.kind in started_kinds:
+                # 同类任务一次只恢复一个，其余的下次启动时再询问
+                continue
+            device_ids = [device_id for device_id in job.params.get("device_ids") or []
+                          if device_id in connected_devices]
+            reply = QMessageBox.question(
+                self.main_window,
+                '继续未完成的任务',
+                f'发现上次未完成的任务：\n\n{job.describe()}\n'
+                f'设备: {", ".join(job.params.get("device_ids") or [])}\n'
+                f'文件夹: {job.params.get("folder_path")}\n\n'
+                f'是否继续？选择“丢弃”将不再提示该任务。',
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Discard,
+                QMessageBox.Yes
+            )
+            if reply == QMessageBox.Discard:
+                job.discard()
+                logger.info(f"用户丢弃未完成的任务: {job.job_id}")
+                continue
+            if reply != QMessageBox.Yes:
+                continue
+            if not device_ids:
+                self._append_output(f"任务中的设备均未连接，连接设备后重新启动程序可继续该任务: {job.describe()}")
+                continue
+            if not os.path.isdir(job.params.get("folder_path") or ""):
+                self._append_output(f"APK文件夹不存在，无法继续任务: {job.params.get('folder_path')}")
+                continue
+            
+            started_kinds.add(job.kind)
+            self._append_output(f"继续未完成的任务: {job.describe()}")
+            if job.kind == "batch_install":
+                device_id = job.params.get("device_id")
+                self._start_batch_install(
+                    device_id if device_id in device_ids else device_ids[0],
+                    job.params["folder_path"], job.params.get("selected_files"), device_ids,
+                    allow_downgrade=job.params.get("allow_downgrade", False),
+                    install_mode=job.params.get("install_mode"),
+                    resume_job=job
+                )
+            else:
+                self._start_batch_verify(device_ids[0], job.params["folder_path"],
+                                         job.params.get("selected_files"), resume_job=job)
+    
     # ========== 密码输入 ==========
     
     def input_password_action(self):
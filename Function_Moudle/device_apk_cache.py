@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+设备端 APK 缓存 - 同一台设备重复安装同一个构建时不再重新传输 APK
+
+功能：
+1. 按内容寻址：APK 以 sha256 命名保存在设备的 /data/local/tmp/adbtools-cache/<sha256>.apk
+2. 每台设备在本地维护一份清单（哈希、大小，按最近使用排序），持久化到缓存目录
+3. 设备端缓存总大小超过上限时按 LRU 淘汰最久未使用的文件
+4. 清单在每次批量安装开始时与设备端目录核对一次（恢复出厂、手动删除后自动丢弃失效条目）
+5. 先上传为临时文件再 mv 为正式文件名，传输中断不会留下以哈希命名的不完整文件
+
+命中缓存时调用方直接执行 `pm install <缓存文件>`，不经过 USB 传输。
+
+支持 `adb install --streaming` 的设备（Android 10+）上，首次安装经缓存需要先 push 一份
+完整的 APK 再 pm install，比直接流式安装多写一次设备存储，因此默认只复用已有缓存、不为缓存
+上传（fill_on_streaming=False）。反复刷同一批 APK 的场景可以开启 fill_on_streaming，
+首次安装稍慢，之后的安装都不再传输。
+
+使用示例：
+    remote_path = device_apk_cache.lookup(device_id, "app.apk", streaming=False)
+    if remote_path:
+        run_device_shell(device_id, pm_install_command(remote_path))
+"""
+
+import os
+import re
+import sys
+import json
+import shlex
+import hashlib
+import threading
+import subprocess
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+from Function_Moudle.apk_metadata_cache import HASH_CHUNK_SIZE, _get_cache_dir
+from Function_Moudle.device_capabilities import device_capabilities
+from Function_Moudle.device_dir_cache import list_device_directory
+from Function_Moudle.folder_transfer import adb_executable, run_device_shell
+from Function_Moudle.sync_transfer import create_sync_engine, AdbProtocolError
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+# 创建日志记录器
+logger = get_logger("ADBTools.DeviceApkCache")
+
+MANIFEST_DIR_NAME = "device_apk_cache"
+MANIFEST_FORMAT_VERSION = 1
+CACHED_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}\.apk$")
+
+
+def file_sha256(path: str) -> str:
+    """计算文件的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pm_install_command(remote_path: str, allow_downgrade: bool = False, replace: bool = True,
+                       package_command: str = "pm") -> str:
+    """
+    生成安装设备端 APK 文件的命令
+
+    Args:
+        package_command: 包管理命令，"pm" 或 "cmd package"（见 device_capabilities.package_command）
+    """
+    options = (["-r"] if replace else []) + (["-d"] if allow_downgrade else [])
+    return " ".join([package_command, "install"] + options + [shlex.quote(remote_path)])
+
+
+def push_to_device(device_id: str, local_path: str, remote_path: str):
+    """
+    上传单个文件：先上传为临时文件再改名，改名之前的中断不会留下不完整的目标文件
+
+    优先使用 sync 协议（每次调用一条独立连接，可多线程并行），不可用时退回 adb push。
+    目标目录需已存在。
+
+    Raises:
+        OSError: 上传或改名失败
+    """
+    temp_path = f"{remote_path}.tmp"
+    engine = create_sync_engine(device_id)
+    pushed = False
+    if engine is not None:
+        try:
+            with engine:
+                engine.push(local_path, temp_path)
+            pushed = True
+        except (AdbProtocolError, OSError) as e:
+            logger.debug(f"sync 协议上传失败，改用 adb push: {e}")
+    if not pushed:
+        # 设备和本机 adb 支持时使用压缩传输
+        algorithm = device_capabilities.compressed_sync(device_id)
+        options = ['-z', algorithm] if algorithm else []
+        result = subprocess.run([adb_executable(), '-s', device_id, 'push'] + options + [local_path, temp_path],
+                                capture_output=True, text=True, encoding='utf-8', errors='ignore')
+        if result.returncode != 0:
+            raise OSError(result.stderr.strip() or result.stdout.strip())
+    output = run_device_shell(
+        device_id,
+        f"mv {shlex.quote(temp_path)} {shlex.quote(remote_path)} && echo OK", timeout=30
+    )
+    if "OK" not in output:
+        raise OSError(f"重命名设备文件失败: {output.strip()}")
+
+
+class DeviceApkCache:
+    """设备端 APK 缓存（线程安全）"""
+
+    def __init__(self, manifest_dir: Optional[str] = None,
+                 remote_dir: str = "/data/local/tmp/adbtools-cache",
+                 max_bytes: int = 2 * 1024 ** 3, enabled: bool = True,
+                 fill_on_streaming: bool = False):
+        """
+        Args:
+            manifest_dir: 本地清单目录，None 表示清单只保存在内存中
+            remote_dir: 设备端缓存目录
+            max_bytes: 每台设备缓存的最大总字节数
+            enabled: 是否启用缓存
+            fill_on_streaming: 支持 --streaming 安装的设备上未缓存的APK是否也上传到缓存
+        """
+        self.manifest_dir = manifest_dir
+        self.remote_dir = remote_dir.rstrip('/')
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.fill_on_streaming = fill_on_streaming
+        self._manifests: Dict[str, "OrderedDict[str, Dict]"] = {}  # 设备 -> {sha256: {size, name}}，末尾为最近使用
+        self._verified = set()  # 本轮已与设备端核对过清单的设备
+        self._hashes: Dict[tuple, str] = {}  # (路径, 大小, 修改时间) -> sha256
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._push_locks: Dict[tuple, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- 清单持久化 ----------
+
+    def _manifest_file(self, device_id: str) -> Optional[str]:
+        if not self.manifest_dir:
+            return None
+        return os.path.join(self.manifest_dir, re.sub(r'[^\w.-]', '_', device_id) + ".json")
+
+    def _manifest(self, device_id: str) -> "OrderedDict[str, Dict]":
+        with self._lock:
+            manifest = self._manifests.get(device_id)
+            if manifest is not None:
+                return manifest
+            manifest = OrderedDict()
+            self._manifests[device_id] = manifest
+            manifest_file = self._manifest_file(device_id)
+            if not manifest_file or not os.path.exists(manifest_file):
+                return manifest
+            try:
+                with open(manifest_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_FORMAT_VERSION and data.get("remote_dir") == self.remote_dir:
+                    for digest, entry in data.get("entries", []):
+                        manifest[digest] = entry
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"加载设备APK缓存清单失败，重新建立: {device_id} | {e}")
+                manifest.clear()
+            return manifest
+
+    def _save(self, device_id: str):
+        manifest_file = self._manifest_file(device_id)
+        if not manifest_file:
+            return
+        with self._lock:
+            payload = {
+                "version": MANIFEST_FORMAT_VERSION,
+                "remote_dir": self.remote_dir,
+                "entries": list(self._manifest(device_id).items())
+            }
+        try:
+            os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+            temp_file = f"{manifest_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(temp_file, manifest_file)
+        except OSError as e:
+            logger.warning(f"保存设备APK缓存清单失败: {device_id} | {e}")
+
+    # ---------- 与设备核对 ----------
+
+    def refresh(self, device_id: str):
+        """
+        与设备端缓存目录核对清单：丢弃设备上已不存在或大小不符的条目，
+        收录设备上有而清单中没有的完整缓存文件。批量安装开始时调用一次。
+        """
+        try:
+            files = list_device_directory(device_id, self.remote_dir)
+        except Exception as e:
+            logger.warning(f"读取设备APK缓存目录失败: {device_id} | {e}")
+            return
+        remote = {}
+        for info in files:
+            if not info['is_dir'] and CACHED_NAME_PATTERN.match(info['name']):
+                try:
+                    remote[info['name'][:-4]] = int(info['size'])
+                except ValueError:
+                    continue
+
+        with self._lock:
+            manifest = self._manifest(device_id)
+            stale = [digest for digest, entry in manifest.items() if remote.get(digest) != entry['size']]
+            for digest in stale:
+                del manifest[digest]
+            for digest, size in remote.items():
+                if digest not in manifest:
+                    # 正式文件名只在上传完成后才出现，可以直接收录；最近使用时间未知，排在最前面
+                    manifest[digest] = {"size": size, "name": ""}
+                    manifest.move_to_end(digest, last=False)
+            self._verified.add(device_id)
+        if stale:
+            logger.info(f"设备APK缓存清单移除 {len(stale)} 个失效条目: {device_id}")
+        if any(info['name'].endswith('.apk.tmp') for info in files):
+            # 上次中断的上传留下的临时文件
+            run_device_shell(device_id, f"rm -f {shlex.quote(self.remote_dir)}/*.apk.tmp", timeout=30)
+        self._save(device_id)
+
+    # ---------- 缓存读写 ----------
+
+    def remote_path(self, digest: str) -> str:
+        return f"{self.remote_dir}/{digest}.apk"
+
+    def apk_digest(self, apk_path: str) -> str:
+        """APK 的 sha256（文件大小和修改时间不变时复用上次的结果）"""
+        st = os.stat(apk_path)
+        key = (os.path.normcase(os.path.abspath(apk_path)), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(key)
+        if digest is None:
+            digest = file_sha256(apk_path)
+            with self._lock:
+                self._hashes[key] = digest
+        return digest
+
+    def _push_lock(self, device_id: str, digest: str) -> threading.Lock:
+        with self._lock:
+            return self._push_locks.setdefault((device_id, digest), threading.Lock())
+
+    def ensure(self, device_id: str, apk_path: str,
+               progress_callback: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        确保 APK 已在设备端缓存中，未缓存时上传
+
+        Args:
+            progress_callback: 进度消息回调
+
+        Returns:
+            设备端缓存文件路径；缓存未启用、APK 超过缓存上限或上传失败时返回 None（调用方改用普通安装）
+        """
+        if not self.enabled or not device_id:
+            return None
+        notify = progress_callback or (lambda message: None)
+        with self._refresh_lock:
+            # 核对在本设备的任何上传开始之前完成，清理临时文件不会影响进行中的上传
+            if device_id not in self._verified:
+                self.refresh(device_id)
+
+        digest = self.apk_digest(apk_path)
+        remote_path = self.remote_path(digest)
+        with self._push_lock(device_id, digest):
+            with self._lock:
+                manifest = self._manifest(device_id)
+                entry = manifest.get(digest)
+                if entry is not None:
+                    manifest.move_to_end(digest)
+                    entry["name"] = os.path.basename(apk_path)
+                    self.hits += 1
+            if entry is not None:
+                self._save(device_id)
+                notify(f"设备端已缓存该APK，跳过传输: {remote_path}")
+                return remote_path
+
+            self.misses += 1
+            size = os.path.getsize(apk_path)
+            if size > self.max_bytes:
+                notify("APK超过设备缓存上限，直接安装")
+                return None
+            self._evict(device_id, self.max_bytes - size)
+
+            notify(f"上传APK到设备缓存: {remote_path}")
+            try:
+                run_device_shell(device_id, f"mkdir -p {shlex.quote(self.remote_dir)}", timeout=30)
+                push_to_device(device_id, apk_path, remote_path)
+            except (OSError, subprocess.SubprocessError, AdbProtocolError) as e:
+                logger.warning(f"上传APK到设备缓存失败: {apk_path} | {e}")
+                notify(f"上传到设备缓存失败，直接安装: {e}")
+                return None
+
+            with self._lock:
+                self._manifest(device_id)[digest] = {"size": size, "name": os.path.basename(apk_path)}
+        self._save(device_id)
+        return remote_path
+
+    def cached_path(self, device_id: str, apk_path: str) -> Optional[str]:
+        """APK 已在设备端缓存中时返回缓存文件路径（不上传），否则返回 None"""
+        if not self.enabled or not device_id:
+            return None
+        with self._refresh_lock:
+            if device_id not in self._verified:
+                self.refresh(device_id)
+        with self._lock:
+            if not self._manifest(device_id):
+                # 设备上没有缓存时不必计算 sha256
+                return None
+        digest = self.apk_digest(apk_path)
+        with self._lock:
+            manifest = self._manifest(device_id)
+            if digest not in manifest:
+                return None
+            manifest.move_to_end(digest)
+            self.hits += 1
+        return self.remote_path(digest)
+
+    def lookup(self, device_id: str, apk_path: str, streaming: bool,
+               progress_callback: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        按设备的安装方式取得缓存文件：设备支持 --streaming 且未开启 fill_on_streaming 时
+        只复用已有缓存（cached_path），否则未缓存时上传（ensure）
+
+        Returns:
+            设备端缓存文件路径；None 表示调用方改用 adb install
+        """
+        if streaming and not self.fill_on_streaming:
+            return self.cached_path(device_id, apk_path)
+        return self.ensure(device_id, apk_path, progress_callback=progress_callback)
+
+    def _evict(self, device_id: str, budget: int):
+        """按 LRU 删除设备端缓存文件，直到总大小不超过 budget"""
+        with self._lock:
+            manifest = self._manifest(device_id)
+            total = sum(entry["size"] for entry in manifest.values())
+            victims = []
+            for digest, entry in manifest.items():
+                if total <= budget:
+                    break
+                victims.append(digest)
+                total -= entry["size"]
+            for digest in victims:
+                del manifest[digest]
+        if not victims:
+            return
+        paths = " ".join(shlex.quote(self.remote_path(digest)) for digest in victims)
+        run_device_shell(device_id, f"rm -f {paths}", timeout=60)
+        logger.info(f"设备APK缓存淘汰 {len(victims)} 个文件: {device_id}")
+        self._save(device_id)
+
+    def invalidate(self, device_id: str, apk_path: str):
+        """丢弃 APK 的缓存条目（设备端文件无法安装时调用）"""
+        try:
+            digest = self.apk_digest(apk_path)
+        except OSError:
+            return
+        with self._lock:
+            removed = self._manifest(device_id).pop(digest, None)
+        if removed is not None:
+            run_device_shell(device_id, f"rm -f {shlex.quote(self.remote_path(digest))}", timeout=30)
+            self._save(device_id)
+
+    def clear(self, device_id: str):
+        """删除设备端的全部缓存文件和本地清单"""
+        run_device_shell(device_id, f"rm -rf {shlex.quote(self.remote_dir)}", timeout=60)
+        with self._lock:
+            self._manifest(device_id).clear()
+            self._verified.discard(device_id)
+        self._save(device_id)
+
+    def begin_session(self, device_ids):
+        """新一轮安装开始：下次 ensure 时重新与设备核对清单"""
+        with self._lock:
+            self._verified.difference_update(device_ids)
+
+    def get_statistics(self, device_id: str) -> Dict:
+        """获取设备缓存统计信息"""
+        with self._lock:
+            manifest = self._manifest(device_id)
+            return {
+                "entries": len(manifest),
+                "bytes": sum(entry["size"] for entry in manifest.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _load_cache_settings():
+    """从配置文件读取设备端缓存参数"""
+    return {
+        "manifest_dir": os.path.join(_get_cache_dir(), MANIFEST_DIR_NAME),
+        "remote_dir": config_manager.get("batch_install.device_cache.remote_dir", "/data/local/tmp/adbtools-cache"),
+        "max_bytes": config_manager.get("batch_install.device_cache.max_bytes", 2 * 1024 ** 3),
+        "enabled": config_manager.get("batch_install.device_cache.enabled", True),
+        "fill_on_streaming": config_manager.get("batch_install.device_cache.fill_on_streaming", False),
+    }
+
+
+# 全局设备端APK缓存
+device_apk_cache = DeviceApkCache(**_load_cache_settings())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+设备能力缓存 - 每次连接探测一次设备支持的特性，调用方据此直接选择最快的执行方式
+
+探测内容：
+1. adb 特性（host-serial:<serial>:features）：cmd、abb_exec、shell_v2、sendrecv_v2_zstd、apex 等
+2. Android SDK 版本和设备端可用的工具命令（tar、gzip、zstd、base64 等），一条 shell 命令完成
+3. 运行中发现的不支持项（如 adb install 不支持 -r）记录在缓存中，同一连接内不再重复试错
+
+设备断开、重启、切换 root 时缓存失效，下次使用时重新探测。
+探测失败（设备未就绪）的结果只缓存 failure_ttl 秒，避免每条命令都重新探测；
+设备已知不可用（熔断中）时不探测，直接按不支持处理。
+
+使用示例：
+    if device_capabilities.supports_streaming_install(device_id):
+        ...
+    package_command = device_capabilities.package_command(device_id)  # "cmd package" 或 "pm"
+"""
+
+import os
+import sys
+import time
+import threading
+import subprocess
+from typing import Dict, Optional, Set
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+
+try:
+    from adb_utils import ADBUtils
+except ImportError:
+    ADBUtils = None
+
+try:
+    from Function_Moudle.device_health import device_health, REASON_TIMEOUT
+except ImportError:
+    device_health = None
+
+try:
+    from Function_Moudle.adb_socket_client import adb_socket_client, AdbProtocolError
+except ImportError:
+    adb_socket_client = None
+    AdbProtocolError = OSError
+
+# 创建日志记录器
+logger = get_logger("ADBTools.DeviceCapabilities")
+
+# 探测是否存在的设备端命令
+PROBED_COMMANDS = ("cmd", "tar", "gzip", "zstd", "base64", "dd", "stat", "md5sum", "sha256sum", "find")
+
+# 会重启 adbd 或设备、使已探测的能力可能变化的 adb 命令
+_RESETTING_COMMANDS = ("reboot", "root", "unroot", "remount", "disable-verity", "enable-verity")
+
+
+def _probe_shell_command() -> str:
+    checks = "; ".join(f"command -v {name} >/dev/null 2>&1 && echo cmd:{name}" for name in PROBED_COMMANDS)
+    return f"echo sdk:$(getprop ro.build.version.sdk); {checks}"
+
+
+def _adb_path() -> str:
+    return ADBUtils.get_adb_path() if ADBUtils is not None else 'adb'
+
+
+def _empty_capabilities() -> Dict:
+    return {"features": set(), "sdk": None, "commands": set(), "unsupported": set()}
+
+
+def parse_probe_output(output: str) -> Dict:
+    """解析探测命令输出 -> {"sdk": int 或 None, "commands": set}"""
+    sdk = None
+    commands = set()
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("sdk:"):
+            try:
+                sdk = int(line[4:])
+            except ValueError:
+                pass
+        elif line.startswith("cmd:"):
+            commands.add(line[4:])
+    return {"sdk": sdk, "commands": commands}
+
+
+class DeviceCapabilityCache:
+    """按设备缓存的能力信息（线程安全）"""
+
+    def __init__(self, timeout: int = 15, failure_ttl: float = 10):
+        """
+        Args:
+            timeout: 探测命令的超时时间（秒）
+            failure_ttl: 探测失败的结果缓存多久（秒），之后再次使用时重新探测
+        """
+        self.timeout = timeout
+        self.failure_ttl = failure_ttl
+        self._capabilities: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._device_locks: Dict[str, threading.Lock] = {}
+
+    def _get_device_lock(self, device_id: str) -> threading.Lock:
+        with self._lock:
+            return self._device_locks.setdefault(device_id, threading.Lock())
+
+    # ---------- 探测 ----------
+
+    def get(self, device_id: str, refresh: bool = False) -> Dict:
+        """
+        获取设备能力
+
+        Returns:
+            {"features": set, "sdk": int 或 None, "commands": set, "unsupported": set}；
+            探测失败的部分为空集合 / None，调用方按不支持处理
+        """
+        # 同一设备只允许一个线程探测，其他线程等待后直接使用结果
+        with self._get_device_lock(device_id):
+            if not refresh:
+                with self._lock:
+                    cached = self._capabilities.get(device_id)
+                if cached is not None and time.time() < cached.get("retry_after", float("inf")):
+                    return cached
+            if device_health is not None and not device_health.check(device_id)[0]:
+                # 设备已知不可用，探测只会等到超时
+                return _empty_capabilities()
+            capabilities = self._probe(device_id)
+            if capabilities["sdk"] is None:
+                # 设备未就绪时探测结果不完整，短时间内按此结果处理，之后重新探测
+                capabilities["retry_after"] = time.time() + self.failure_ttl
+            with self._lock:
+                self._capabilities[device_id] = capabilities
+            return capabilities
+
+    def _probe(self, device_id: str) -> Dict:
+        start_time = time.time()
+        capabilities = {"features": self._probe_features(device_id), "unsupported": set()}
+        try:
+            result = subprocess.run([_adb_path(), '-s', device_id, 'shell', _probe_shell_command()],
+                                    capture_output=True, text=True, encoding='utf-8',
+                                    errors='ignore', timeout=self.timeout)
+            capabilities.update(parse_probe_output(result.stdout))
+            if device_health is not None:
+                device_health.record_result(device_id, result.returncode, result.stderr)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"探测设备命令失败 [{device_id}]: {e}")
+            if isinstance(e, subprocess.TimeoutExpired) and device_health is not None:
+                device_health.record_failure(device_id, REASON_TIMEOUT)
+            capabilities.update({"sdk": None, "commands": set()})
+        logger.info(f"设备能力 [{device_id}]: SDK {capabilities['sdk']}，"
+                    f"特性 {','.join(sorted(capabilities['features'])) or '-'}，"
+                    f"命令 {','.join(sorted(capabilities['commands'])) or '-'}，"
+                    f"耗时 {time.time() - start_time:.3f}s")
+        return capabilities
+
+    def _probe_features(self, device_id: str) -> Set[str]:
+        """adb server 与设备共同支持的特性，优先通过协议客户端查询"""
+        if adb_socket_client is not None:
+            try:
+                return set(adb_socket_client.get_features(device_id, refresh=True))
+            except (AdbProtocolError, OSError) as e:
+                logger.debug(f"通过协议查询特性失败，改用 adb features: {e}")
+        try:
+            result = subprocess.run([_adb_path(), '-s', device_id, 'features'], capture_output=True, text=True,
+                                    encoding='utf-8', errors='ignore', timeout=self.timeout)
+        except (OSError, subprocess.SubprocessError):
+            return set()
+        return {line.strip() for line in result.stdout.splitlines() if line.strip()}
+
+    # ---------- 查询 ----------
+
+    def has_feature(self, device_id: str, feature: str) -> bool:
+        return feature in self.get(device_id)["features"]
+
+    def has_command(self, device_id: str, command: str) -> bool:
+        return command in self.get(device_id)["commands"]
+
+    def sdk_level(self, device_id: str) -> Optional[int]:
+        return self.get(device_id)["sdk"]
+
+    def is_supported(self, device_id: str, item: str) -> bool:
+        """运行中是否已发现 item 不被支持（见 mark_unsupported）"""
+        capabilities = self.get(device_id)
+        with self._lock:
+            return item not in capabilities["unsupported"]
+
+    def package_command(self, device_id: str) -> str:
+        """包管理命令：设备有 cmd 时用 `cmd package`（pm 在新系统上只是转调 cmd 的脚本）"""
+        capabilities = self.get(device_id)
+        if "cmd" in capabilities["features"] or "cmd" in capabilities["commands"]:
+            return "cmd package"
+        return "pm"
+
+    def supports_streaming_install(self, device_id: str) -> bool:
+        """
+        adb install 能否以流式方式直接写入安装会话（不先 push 到 /data/local/tmp）
+
+        需要设备支持 cmd；abb_exec 同时说明本机 adb 足够新，认识 --streaming 选项
+        """
+        features = self.get(device_id)["features"]
+        return "cmd" in features and "abb_exec" in features
+
+    def compressed_sync(self, device_id: str) -> Optional[str]:
+        """adb push/pull 可用的压缩算法（-z 参数），不支持时返回 None"""
+        features = self.get(device_id)["features"]
+        for algorithm in ("zstd", "lz4", "brotli"):
+            if f"sendrecv_v2_{algorithm}" in features:
+                return algorithm
+        return None
+
+    # ---------- 更新 ----------
+
+    def mark_unsupported(self, device_id: str, item: str):
+        """记录运行中发现的不支持项，同一连接内后续调用直接跳过"""
+        with self._lock:
+            capabilities = self._capabilities.get(device_id)
+            if capabilities is None:
+                return
+            capabilities["unsupported"].add(item)
+        logger.info(f"设备不支持 {item}，本次连接内不再尝试 [{device_id}]")
+
+    def forget(self, device_id: Optional[str] = None):
+        """清除设备的能力缓存，device_id 为 None 时清空所有设备"""
+        with self._lock:
+            if device_id is None:
+                self._capabilities.clear()
+            else:
+                self._capabilities.pop(device_id, None)
+
+    def on_adb_command(self, command: str, device_id: Optional[str]):
+        """ADBUtils 命令钩子：重启、切换 root 等命令执行后使对应设备的缓存失效"""
+        words = command.split(None, 2)
+        if words and (words[0] in _RESETTING_COMMANDS or words[:2] == ["shell", "reboot"]):
+            self.forget(device_id)
+
+
+# 全局设备能力缓存
+device_capabilities = DeviceCapabilityCache()
+if ADBUtils is not None:
+    ADBUtils.register_command_hook(device_capabilities.on_adb_command)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+设备目录列表缓存 - 文件管理器浏览设备目录时复用最近的 ls 结果
+
+功能：
+1. 按 (设备ID, 目录) 缓存解析后的目录列表，LRU 淘汰，超过有效期（TTL）后重新获取
+2. 删除、重命名、修改权限、上传等本程序发起的修改操作后按目录（含子目录）失效
+3. 打开目录后在后台预取其子目录的列表，进入子目录时直接命中缓存
+4. 失效操作发生在获取过程中时，旧的获取结果不写入缓存
+
+使用示例：
+    files = device_dir_cache.list(device_id, "/sdcard")
+    device_dir_cache.prefetch(device_id, "/sdcard", files)
+    device_dir_cache.invalidate(device_id, "/sdcard")
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+from Function_Moudle.folder_transfer import join_device_path, run_device_shell
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+# 创建日志记录器
+logger = get_logger("ADBTools.DeviceDirCache")
+
+
+def normalize_device_path(path: str) -> str:
+    """规范化设备目录路径（去掉末尾斜杠，根目录为 /）"""
+    path = path.rstrip('/')
+    return path or '/'
+
+
+def parse_ls_output(output: str) -> List[Dict]:
+    """
+    解析 ls -la 输出
+
+    Returns:
+        [{'permissions', 'owner', 'group', 'size'(字符串), 'date', 'name', 'is_dir', 'is_link', 'link_target'}]
+    """
+    files = []
+    # 用于去重的集合
+    seen_names = set()
+    for line in output.splitlines():
+        line = line.strip()
+        if not line or line.startswith('total '):
+            continue
+        # Android ls -la 格式: drwxr-xr-x  29 root root 820 2009-01-01 05:30 filename
+        # 符号链接格式: lrwxrwxrwx   1 root root   21 2009-01-01 00:00 sdcard -> /storage/self/primary
+        # 共8列: 权限 链接数 所有者 组 大小 日期 时间 文件名
+        parts = line.split(None, 7)  # 最多分割成8部分，文件名可能含空格
+        if len(parts) < 8:
+            continue
+        is_link = line.startswith('l')
+        name = parts[7]
+        link_target = None
+        if is_link and ' -> ' in name:
+            # 符号链接: 分离名称和目标
+            name, link_target = name.split(' -> ', 1)
+            name = name.strip()
+            link_target = link_target.strip()
+        # 跳过 . 和 .. 以及重复的文件名
+        if name in ('.', '..') or name in seen_names:
+            continue
+        seen_names.add(name)
+        files.append({
+            'permissions': parts[0],
+            'owner': parts[2],
+            'group': parts[3],
+            'size': parts[4],
+            'date': f"{parts[5]} {parts[6]}",  # 日期+时间
+            'name': name,
+            'is_dir': line.startswith('d'),
+            'is_link': is_link,
+            'link_target': link_target,  # 符号链接目标
+        })
+    return files
+
+
+def list_device_directory(device_id: str, path: str, d=None) -> List[Dict]:
+    """
+    执行一次 ls -la 获取设备目录列表（不经过缓存）
+
+    Args:
+        device_id: 设备ID
+        path: 设备目录
+        d: uiautomator2 设备对象，非 None 时通过 d.shell 执行
+    """
+    # 路径以斜杠结尾，列出目录内容而非链接本身；不使用 -L 避免跟随符号链接导致重复
+    path = path.rstrip('/') + '/'
+    return parse_ls_output(run_device_shell(device_id, f'ls -la "{path}" 2>/dev/null', d, timeout=30))
+
+
+class DeviceDirectoryCache:
+    """设备目录列表的 LRU 缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = 200, ttl: float = 30, prefetch_limit: int = 8):
+        """
+        Args:
+            max_entries: 最多缓存的目录数
+            ttl: 缓存有效期（秒），0 表示不缓存
+            prefetch_limit: 打开目录后最多预取的子目录数，0 表示不预取
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefetch_limit = prefetch_limit
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # (设备, 目录) -> (获取时间, 列表)
+        self._lock = threading.Lock()
+        # 每次失效递增；获取开始后发生过失效的结果不写入缓存
+        self._epoch = 0
+        # 每次预取递增；排队中的旧预取任务在导航到其他目录后直接放弃
+        self._prefetch_generation = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ---------- 读写 ----------
+
+    def get(self, device_id: str, path: str) -> Optional[List[Dict]]:
+        """返回未过期的缓存列表，没有时返回 None"""
+        key = (device_id, normalize_device_path(path))
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                return None
+            if time.monotonic() - cached[0] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return cached[1]
+
+    def _put(self, device_id: str, path: str, files: List[Dict], epoch: int):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            key = (device_id, normalize_device_path(path))
+            self._entries[key] = (time.monotonic(), files)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def list(self, device_id: str, path: str, d=None, refresh: bool = False) -> List[Dict]:
+        """
+        获取目录列表，优先使用缓存
+
+        Args:
+            refresh: 为 True 时忽略缓存重新获取
+        """
+        if not refresh:
+            cached = self.get(device_id, path)
+            if cached is not None:
+                return cached
+        with self._lock:
+            epoch = self._epoch
+        files = list_device_directory(device_id, path, d)
+        self._put(device_id, path, files, epoch)
+        return files
+
+    # ---------- 失效 ----------
+
+    def invalidate(self, device_id: str, path: str, recursive: bool = True):
+        """
+        使目录的缓存失效
+
+        Args:
+            recursive: 同时使其下所有子目录的缓存失效（删除、重命名、上传文件夹会改变子目录内容）
+        """
+        path = normalize_device_path(path)
+        prefix = path if path.endswith('/') else path + '/'
+        with self._lock:
+            self._epoch += 1
+            for key in list(self._entries):
+                if key[0] == device_id and (key[1] == path or (recursive and key[1].startswith(prefix))):
+                    del self._entries[key]
+
+    def clear(self, device_id: Optional[str] = None):
+        """清空缓存（指定设备时只清空该设备）"""
+        with self._lock:
+            self._epoch += 1
+            if device_id is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == device_id]:
+                    del self._entries[key]
+
+    # ---------- 预取 ----------
+
+    def prefetch(self, device_id: str, path: str, files: List[Dict], d=None):
+        """在后台获取目录下前 prefetch_limit 个子目录的列表（已缓存的跳过）"""
+        if self.prefetch_limit <= 0 or self.ttl <= 0:
+            return
+        children = [join_device_path(path, info['name']) for info in files if info.get('is_dir')]
+        children = [child for child in children[:self.prefetch_limit] if self.get(device_id, child) is None]
+        with self._lock:
+            self._prefetch_generation += 1
+            generation = self._prefetch_generation
+            if children and self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="DirPrefetch")
+        for child in children:
+            self._executor.submit(self._prefetch_one, device_id, child, d, generation)
+
+    def _prefetch_one(self, device_id: str, path: str, d, generation: int):
+        if generation != self._prefetch_generation or self.get(device_id, path) is not None:
+            return
+        try:
+            self.list(device_id, path, d, refresh=True)
+        except Exception as e:
+            logger.debug(f"预取目录失败: {path} | {e}")
+
+
+# 全局设备目录缓存实例
+device_dir_cache = DeviceDirectoryCache(
+    max_entries=config_manager.get("file_manager.dir_cache_max_entries", 200),
+    ttl=config_manager.get("file_manager.dir_cache_ttl", 30),
+    prefetch_limit=config_manager.get("file_manager.prefetch_children", 8)
+)
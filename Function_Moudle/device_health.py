@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+设备健康状态 - 按设备的熔断器，已知离线的设备上的命令立即失败，不再等待超时
+
+状态来源（被动获取，不额外执行探测命令）：
+1. ADBUtils 执行的每条命令的结果：device not found / offline / unauthorized 等错误立即熔断，
+   连续超时达到阈值后熔断；设备有任何正常响应即恢复
+2. 设备跟踪器推送的设备状态：变为 device 时立即恢复，断开、offline、unauthorized 时熔断
+
+熔断器状态：
+- closed：正常，命令照常执行
+- open：已知不可用，冷却时间内的命令直接返回失败
+- half_open：冷却时间到后放行一条命令作为探测，成功则恢复，失败则重新熔断并加倍冷却时间
+
+使用示例：
+    allowed, message = device_health.allow(device_id)
+    if not allowed:
+        return MockResult("", message, 1)
+    result = subprocess.run(...)
+    device_health.record_result(device_id, result.returncode, result.stderr)
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from typing import Dict, Optional, Tuple
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+# 创建日志记录器
+logger = get_logger("ADBTools.DeviceHealth")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+REASON_NOT_FOUND = "not_found"
+REASON_OFFLINE = "offline"
+REASON_UNAUTHORIZED = "unauthorized"
+REASON_TIMEOUT = "timeout"
+
+# adb 自身报告的连接错误 -> 原因（设备端命令的 "not found" 等输出不在此列）
+_ERROR_PATTERNS = (
+    (re.compile(r"device '[^']*' not found|device not found|no devices/emulators found"), REASON_NOT_FOUND),
+    (re.compile(r"device offline"), REASON_OFFLINE),
+    (re.compile(r"device unauthorized|device still authorizing"), REASON_UNAUTHORIZED),
+)
+
+
+class DeviceUnavailableError(OSError):
+    """设备已知不可用（熔断中），命令未执行"""
+
+
+def classify_error(output: Optional[str]) -> Optional[str]:
+    """从 adb 的错误输出判断是否为设备连接问题，返回原因；不是连接问题时返回 None"""
+    text = (output or "").lower()
+    for pattern, reason in _ERROR_PATTERNS:
+        if pattern.search(text):
+            return reason
+    return None
+
+
+def describe_reason(device_id: str, reason: Optional[str]) -> str:
+    """原因 -> 提示文本（与原来的连接检查提示一致）"""
+    if reason == REASON_NOT_FOUND:
+        return f"设备 {device_id} 未连接，请检查设备连接状态"
+    if reason == REASON_OFFLINE:
+        return f"设备 {device_id} 处于离线状态，请重新连接"
+    if reason == REASON_UNAUTHORIZED:
+        return f"设备 {device_id} 未授权，请在设备上允许USB调试"
+    if reason == REASON_TIMEOUT:
+        return f"设备 {device_id} 连续多次响应超时，请检查设备连接"
+    return f"设备 {device_id} 不可用"
+
+
+class DeviceHealthTracker:
+    """按设备的熔断器（线程安全）"""
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 5, max_cooldown: float = 60,
+                 probe_timeout: float = 30):
+        """
+        Args:
+            failure_threshold: 连续超时多少次后熔断（明确的离线错误立即熔断）
+            cooldown: 熔断后第一次放行探测前的冷却时间（秒），探测失败后加倍
+            max_cooldown: 冷却时间上限（秒）
+            probe_timeout: 探测命令超过该时间没有结果时，允许下一条命令重新探测（秒）
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self.probe_timeout = probe_timeout
+        self._devices: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, device_id: str) -> Dict:
+        entry = self._devices.get(device_id)
+        if entry is None:
+            entry = {"state": STATE_CLOSED, "reason": None, "failures": 0, "opened_at": 0.0,
+                     "cooldown": self.cooldown, "probe_started": 0.0}
+            self._devices[device_id] = entry
+        return entry
+
+    # ---------- 查询 ----------
+
+    def check(self, device_id: str) -> Tuple[bool, str]:
+        """
+        只读查询：设备处于熔断冷却期时返回 (False, 提示)，否则返回 (True, "")
+
+        不改变状态，适合替代执行命令前的连接检查（实际命令会经过 allow）。
+        """
+        with self._lock:
+            entry = self._devices.get(device_id)
+            if entry is None or entry["state"] != STATE_OPEN:
+                return True, ""
+            if time.time() - entry["opened_at"] >= entry["cooldown"]:
+                return True, ""
+            return False, describe_reason(device_id, entry["reason"])
+
+    def allow(self, device_id: str) -> Tuple[bool, str]:
+        """
+        执行命令前调用：是否放行
+
+        冷却时间到后转为 half_open 并放行这一条命令作为探测，探测结果出来前其他命令直接失败。
+        """
+        with self._lock:
+            entry = self._devices.get(device_id)
+            if entry is None or entry["state"] == STATE_CLOSED:
+                return True, ""
+            now = time.time()
+            if entry["state"] == STATE_OPEN and now - entry["opened_at"] >= entry["cooldown"]:
+                entry["state"] = STATE_HALF_OPEN
+                entry["probe_started"] = now
+                logger.info(f"设备熔断冷却结束，放行一条命令探测 [{device_id}]")
+                return True, ""
+            if entry["state"] == STATE_HALF_OPEN and now - entry["probe_started"] >= self.probe_timeout:
+                # 上一条探测命令没有结果（被取消或异常），重新探测
+                entry["probe_started"] = now
+                return True, ""
+            return False, describe_reason(device_id, entry["reason"])
+
+    def get_state(self, device_id: str) -> str:
+        with self._lock:
+            entry = self._devices.get(device_id)
+            return entry["state"] if entry else STATE_CLOSED
+
+    def get_statistics(self) -> Dict[str, Dict]:
+        """各设备的状态、原因和连续失败次数"""
+        with self._lock:
+            return {device_id: {"state": entry["state"], "reason": entry["reason"], "failures": entry["failures"]}
+                    for device_id, entry in self._devices.items()}
+
+    # ---------- 反馈 ----------
+
+    def record_success(self, device_id: str):
+        """设备有正常响应（包括命令本身失败但设备有回应的情况）"""
+        with self._lock:
+            entry = self._devices.get(device_id)
+            if entry is None:
+                return
+            if entry["state"] != STATE_CLOSED:
+                logger.info(f"设备恢复可用 [{device_id}]")
+            del self._devices[device_id]
+
+    def record_failure(self, device_id: str, reason: str):
+        """
+        记录连接类失败
+
+        超时需要连续达到阈值才熔断；其余原因（设备不存在、离线、未授权）立即熔断。
+        探测失败时冷却时间加倍。
+        """
+        with self._lock:
+            entry = self._entry(device_id)
+            entry["failures"] += 1
+            entry["reason"] = reason
+            if entry["state"] == STATE_HALF_OPEN:
+                entry["cooldown"] = min(entry["cooldown"] * 2, self.max_cooldown)
+            elif entry["state"] == STATE_CLOSED and reason == REASON_TIMEOUT \
+                    and entry["failures"] < self.failure_threshold:
+                return
+            if entry["state"] != STATE_OPEN:
+                logger.warning(f"设备不可用，{entry['cooldown']:.0f}s 内的命令直接返回失败 [{device_id}]: {reason}")
+            entry["state"] = STATE_OPEN
+            entry["opened_at"] = time.time()
+
+    def record_result(self, device_id: Optional[str], returncode: int, output: Optional[str] = None):
+        """根据命令返回码和错误输出更新状态"""
+        if not device_id:
+            return
+        reason = classify_error(output) if returncode != 0 else None
+        if reason:
+            self.record_failure(device_id, reason)
+        else:
+            self.record_success(device_id)
+
+    def on_device_state(self, device_id: str, state: str):
+        """设备跟踪器推送的状态变化（空字符串表示设备已断开）"""
+        if state == "device":
+            self.record_success(device_id)
+            return
+        reason = {"offline": REASON_OFFLINE, "unauthorized": REASON_UNAUTHORIZED,
+                  "authorizing": REASON_UNAUTHORIZED}.get(state, REASON_NOT_FOUND)
+        with self._lock:
+            entry = self._entry(device_id)
+            # 跟踪器的状态是确定的，从初始冷却时间重新开始
+            entry.update(state=STATE_OPEN, reason=reason, opened_at=time.time(), cooldown=self.cooldown)
+        logger.info(f"设备状态为 {state or '已断开'}，暂停向其发送命令 [{device_id}]")
+
+    def reset(self, device_id: Optional[str] = None):
+        """清除设备的健康状态，device_id 为 None 时清除所有设备"""
+        with self._lock:
+            if device_id is None:
+                self._devices.clear()
+            else:
+                self._devices.pop(device_id, None)
+
+
+# 全局设备健康状态
+device_health = DeviceHealthTracker(
+    failure_threshold=config_manager.get("adb.health.failure_threshold", 3),
+    cooldown=config_manager.get("adb.health.cooldown", 5),
+    max_cooldown=config_manager.get("adb.health.max_cooldown", 60),
+    probe_timeout=config_manager.get("adb.health.probe_timeout", 30),
+)
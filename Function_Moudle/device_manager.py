@@ -30,6 +30,18 @@ class DeviceManager:
             main_window: 主窗口实例 (ADB_Mainwindow)
         """
         self.main_window = main_window
+        self._start_device_tracker()
+    
+    def _start_device_tracker(self):
+        """启动后台设备跟踪，设备插拔时自动更新设备下拉框"""
+        try:
+            from .device_tracker import get_device_tracker
+            self.device_tracker = get_device_tracker()
+            self.device_tracker.devices_changed.connect(self._handle_tracked_devices)
+            self.device_tracker.start_tracking()
+        except Exception as e:
+            self.device_tracker = None
+            logger.warning(f"启动设备跟踪失败，将使用 adb devices 刷新: {e}")
     
     def get_selected_device(self):
         """获取当前选中的设备ID"""
@@ -262,6 +274,35 @@ class DeviceManager:
                     self.main_window.textBrowser.append(f"已使用{mode_text}模式连接到设备: {device_id}")
         # 无设备时不重复输出，由线程输出
     
+    def _handle_tracked_devices(self, device_ids):
+        """设备跟踪器推送设备变化（在主线程中执行）"""
+        combo = self.main_window.ComboxButton
+        current_items = [combo.itemText(i) for i in range(combo.count())]
+        if current_items == device_ids:
+            return
+        
+        previous_device = self.get_selected_device()
+        combo.blockSignals(True)
+        try:
+            combo.clear()
+            combo.addItems(device_ids)
+            if previous_device in device_ids:
+                combo.setCurrentIndex(device_ids.index(previous_device))
+        finally:
+            combo.blockSignals(False)
+        
+        added = [d for d in device_ids if d not in current_items]
+        removed = [d for d in current_items if d not in device_ids and d != "请点击刷新设备"]
+        for device_id in added:
+            self.main_window.textBrowser.append(f"设备已连接: {device_id}")
+        for device_id in removed:
+            self.main_window.textBrowser.append(f"设备已断开: {device_id}")
+        
+        # 当前设备被拔出或此前没有设备时，连接新的选中设备
+        device_id = self.get_selected_device()
+        if device_id and device_id != previous_device and device_id != self.main_window.device_id:
+            self._connect_device_with_current_mode(device_id)
+    
     def _try_u2_connection_in_thread(self, device_id):
         """在单独的线程中尝试u2连接"""
         log_device_operation("u2_connect_attempt", device_id, {"mode": "u2", "action": "尝试u2连接"})
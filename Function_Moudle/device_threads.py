@@ -23,6 +23,17 @@ class RefreshDevicesThread(BaseThread):
         try:
             self.progress_signal.emit("开始刷新设备列表...")
             
+            # 设备跟踪器就绪时直接使用缓存的设备表
+            from Function_Moudle.device_tracker import get_cached_device_list, AVAILABLE_STATES
+            cached_devices = get_cached_device_list(AVAILABLE_STATES)
+            if cached_devices is not None:
+                if cached_devices:
+                    self.progress_signal.emit(f"找到 {len(cached_devices)} 个设备")
+                else:
+                    self.progress_signal.emit("未检测到任何设备")
+                self.devices_signal.emit(cached_devices)
+                return
+            
             from adb_utils import ADBUtils
             
             # 使用性能监控
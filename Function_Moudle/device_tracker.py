@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+设备跟踪器 - 通过 host:track-devices 长连接实时维护设备状态表
+
+功能：
+1. 后台线程保持一条 host:track-devices 连接，adb server 推送设备变化时更新内存中的设备表
+2. 设备表线程安全，记录 device / offline / unauthorized 等状态
+3. 设备增删或状态变化时发出 Qt 信号
+4. get_new_device_lst 等调用方直接读取缓存，不再为每次点击启动 `adb devices` 进程
+
+跟踪连接断开（adb server 重启、被杀等）期间 is_ready() 返回 False，调用方应回退到 `adb devices`。
+"""
+
+import os
+import sys
+import threading
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import QThread, QCoreApplication, pyqtSignal
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger, log_operation
+
+try:
+    from Function_Moudle.adb_socket_client import (
+        adb_socket_client, parse_device_list, AdbProtocolError, AdbServerUnavailable
+    )
+except ImportError:
+    adb_socket_client = None
+
+try:
+    from Function_Moudle.adb_shell_pool import shell_session_pool
+except ImportError:
+    shell_session_pool = None
+
+try:
+    from Function_Moudle.device_capabilities import device_capabilities
+except ImportError:
+    device_capabilities = None
+
+try:
+    from Function_Moudle.device_health import device_health
+except ImportError:
+    device_health = None
+
+# 创建日志记录器
+logger = get_logger("ADBTools.DeviceTracker")
+
+# 设备表中视为“可用”的状态（与刷新设备列表的过滤条件一致）
+AVAILABLE_STATES = ("device", "offline")
+
+
+class DeviceTracker(QThread):
+    """设备跟踪线程"""
+
+    devices_changed = pyqtSignal(list)  # 可用设备ID列表（状态为 device / offline）
+    device_state_changed = pyqtSignal(str, str, str)  # 设备ID, 旧状态, 新状态（空字符串表示不存在）
+    tracking_changed = pyqtSignal(bool)  # 跟踪连接是否可用
+
+    RETRY_INTERVAL_MIN = 1
+    RETRY_INTERVAL_MAX = 10
+
+    def __init__(self, client=None):
+        super().__init__()
+        self.client = client or adb_socket_client
+        self._lock = threading.Lock()
+        self._devices: Dict[str, str] = {}
+        self._ready = False
+        self._stop_event = threading.Event()
+        self._connection = None
+
+    # ---------- 读取接口（任意线程可调用） ----------
+
+    def is_ready(self) -> bool:
+        """设备表是否与 adb server 保持同步"""
+        with self._lock:
+            return self._ready
+
+    def get_devices(self) -> Dict[str, str]:
+        """获取设备状态表副本 {serial: state}"""
+        with self._lock:
+            return dict(self._devices)
+
+    def get_device_state(self, device_id: str) -> Optional[str]:
+        """获取单个设备状态，不存在时返回 None"""
+        with self._lock:
+            return self._devices.get(device_id)
+
+    def get_device_ids(self, states=None) -> Optional[List[str]]:
+        """
+        获取设备ID列表
+
+        Args:
+            states: 需要的状态集合，None 表示全部状态
+
+        Returns:
+            设备ID列表；跟踪未就绪时返回 None，调用方应回退到 `adb devices`
+        """
+        with self._lock:
+            if not self._ready:
+                return None
+            return [serial for serial, state in self._devices.items()
+                    if states is None or state in states]
+
+    # ---------- 生命周期 ----------
+
+    def start_tracking(self):
+        """启动跟踪线程（重复调用无副作用）"""
+        if self.client is None:
+            logger.warning("adb 协议客户端不可用，设备跟踪未启动")
+            return False
+        if self.isRunning():
+            return True
+
+        self._stop_event.clear()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop_tracking)
+        self.start()
+        logger.info(f"设备跟踪已启动: {self.client.host}:{self.client.port}")
+        return True
+
+    def stop_tracking(self):
+        """停止跟踪线程"""
+        self._stop_event.set()
+        self._close_connection()
+        if self.isRunning():
+            self.wait(3000)
+        self._set_ready(False)
+        logger.info("设备跟踪已停止")
+
+    def _close_connection(self):
+        connection = self._connection
+        if connection is not None:
+            # 关闭 socket 以唤醒阻塞在 recv 上的跟踪线程
+            connection.close()
+
+    # ---------- 跟踪线程 ----------
+
+    def run(self):
+        """保持 track-devices 连接，断开后按退避间隔重连"""
+        retry_interval = self.RETRY_INTERVAL_MIN
+        server_start_attempted = False
+
+        while not self._stop_event.is_set():
+            try:
+                self._connection = self.client.track_devices()
+            except AdbServerUnavailable as e:
+                logger.debug(f"adb server 不可用: {e}")
+                if not server_start_attempted:
+                    server_start_attempted = True
+                    self._start_adb_server()
+                    continue
+                self._wait_retry(retry_interval)
+                retry_interval = min(retry_interval * 2, self.RETRY_INTERVAL_MAX)
+                continue
+            except (AdbProtocolError, OSError) as e:
+                logger.warning(f"建立设备跟踪连接失败: {e}")
+                self._wait_retry(retry_interval)
+                retry_interval = min(retry_interval * 2, self.RETRY_INTERVAL_MAX)
+                continue
+
+            retry_interval = self.RETRY_INTERVAL_MIN
+            server_start_attempted = False
+            logger.info("设备跟踪连接已建立")
+
+            try:
+                while not self._stop_event.is_set():
+                    self._apply_snapshot(parse_device_list(self._connection.read_hex_string()))
+            except (AdbProtocolError, OSError, ValueError) as e:
+                if not self._stop_event.is_set():
+                    logger.warning(f"设备跟踪连接断开: {e}")
+            finally:
+                self._connection.close()
+                self._connection = None
+                self._set_ready(False)
+
+            self._wait_retry(self.RETRY_INTERVAL_MIN)
+
+    def _wait_retry(self, interval):
+        self._stop_event.wait(interval)
+
+    def _start_adb_server(self):
+        """adb server 未运行时通过 `adb start-server` 拉起"""
+        try:
+            from adb_utils import ADBUtils
+            logger.info("adb server 未运行，尝试启动")
+            ADBUtils.run_adb_command("start-server", timeout=15)
+        except Exception as e:
+            logger.warning(f"启动 adb server 失败: {e}")
+
+    def _apply_snapshot(self, devices):
+        """用 server 推送的完整设备表替换缓存，并发出变化信号"""
+        new_table = dict(devices)
+        with self._lock:
+            old_table = self._devices
+            self._devices = new_table
+            was_ready = self._ready
+            self._ready = True
+
+        if not was_ready:
+            self.tracking_changed.emit(True)
+
+        changes = []
+        for serial in old_table.keys() | new_table.keys():
+            old_state = old_table.get(serial, "")
+            new_state = new_table.get(serial, "")
+            if old_state != new_state:
+                changes.append((serial, old_state, new_state))
+
+        for serial, old_state, new_state in changes:
+            logger.info(f"设备状态变化: {serial} {old_state or '-'} -> {new_state or '-'}")
+            if new_state != "device":
+                # 设备断开或不可用时，丢弃与之相关的缓存和会话
+                self.client.forget_device(serial)
+                if shell_session_pool is not None:
+                    shell_session_pool.invalidate_device(serial)
+                if device_capabilities is not None:
+                    device_capabilities.forget(serial)
+            if device_health is not None:
+                # 断开、离线的设备上的命令直接失败；重新变为 device 时立即恢复
+                device_health.on_device_state(serial, new_state)
+            self.device_state_changed.emit(serial, old_state, new_state)
+
+        if changes:
+            log_operation("device_tracker_update", {
+                "devices": new_table,
+                "changes": len(changes)
+            }, result="success")
+
+        device_ids = [serial for serial, state in new_table.items() if state in AVAILABLE_STATES]
+        old_device_ids = [serial for serial, state in old_table.items() if state in AVAILABLE_STATES]
+        if device_ids != old_device_ids or not was_ready:
+            self.devices_changed.emit(device_ids)
+
+    def _set_ready(self, ready):
+        with self._lock:
+            changed = self._ready != ready
+            self._ready = ready
+        if changed:
+            self.tracking_changed.emit(ready)
+
+
+_device_tracker = None
+_device_tracker_lock = threading.Lock()
+
+
+def get_device_tracker() -> DeviceTracker:
+    """获取全局设备跟踪器（首次调用时创建，需由调用方 start_tracking）"""
+    global _device_tracker
+    with _device_tracker_lock:
+        if _device_tracker is None:
+            _device_tracker = DeviceTracker()
+        return _device_tracker
+
+
+def get_cached_device_list(states=None) -> Optional[List[str]]:
+    """读取跟踪器缓存的设备ID列表，跟踪器未创建或未就绪时返回 None"""
+    tracker = _device_tracker
+    if tracker is None:
+        return None
+    return tracker.get_device_ids(states)
@@ -4,48 +4,372 @@
 """
 
 import os
-import stat
+import time
+import threading
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from PyQt5.QtWidgets import (
-    QDialog, QTreeWidget, QTreeWidgetItem,
+    QDialog, QTreeView,
     QPushButton, QLabel, QLineEdit, QComboBox, QMessageBox, QProgressBar,
     QHeaderView, QMenu, QAction, QInputDialog, QWidget, QFileDialog,
-    QTextEdit, QApplication, QSplitter
+    QTextEdit, QPlainTextEdit, QCheckBox, QApplication, QSplitter
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QMimeData, QUrl
-from PyQt5.QtGui import QIcon, QCursor, QDropEvent, QDrag
+from PyQt5.QtCore import (
+    Qt, QThread, pyqtSignal, QMimeData, QUrl, QAbstractTableModel, QModelIndex, QTimer, QFileSystemWatcher
+)
+from PyQt5.QtGui import QIcon, QCursor, QDropEvent, QDrag, QTextCursor
 from PyQt5 import uic
 
 from Function_Moudle.dialog_styles import apply_dialog_style, DIALOG_STYLE
 from logger_manager import get_logger
+from Function_Moudle.device_dir_cache import device_dir_cache
+from Function_Moudle.local_dir_listing import directory_mtime, local_listing_cache, scan_local_directory
+from Function_Moudle.remote_file_pager import RemoteFilePager
+from Function_Moudle.job_journal import find_unfinished_jobs, start_job
+from Function_Moudle.folder_transfer import (
+    ENTRY_DIR, ENTRY_FILE, ByteProgress, adb_executable, checksum_comparer, delete_local_entries,
+    delete_remote_entries, extract_tar_stream, iter_local_tree, join_device_path, list_remote_tree_shell,
+    list_remote_tree_sync, local_path_for, local_tree_manifest, plan_delta, probe_device_tar_tools,
+    remote_checksums, resolve_tar_compression, summarize, tar_create_command, tar_extract_command,
+    write_tar_stream
+)
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+try:
+    from Function_Moudle.sync_transfer import create_sync_engine, AdbProtocolError, AdbServerUnavailable
+except ImportError:
+    create_sync_engine = None
 
 logger = get_logger("ADBTools.FileManager")
 
 
-class LocalFileTree(QTreeWidget):
-    """本地文件树 - 支持拖拽文件到设备"""
+def folder_transfer_mode(connection_mode):
+    """文件夹传输方式：adb 模式下按配置使用 tar 数据流（tar）或逐个文件（files）"""
+    if connection_mode == 'u2':
+        return 'files'
+    return config_manager.get("file_transfer.folder_mode", "tar")
+
+
+class FileListModel(QAbstractTableModel):
+    """
+    文件列表模型基类 - 行按批加载，目录有数万个条目时也能立即显示
+    
+    条目为文件信息字典（UserRole 返回），子类提供列标题、单元格文字、图标和排序键。
+    """
+    
+    HEADERS = []
+    FETCH_BATCH = 500  # 每次滚动到底部时追加的行数
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._files = []
+        self._loaded = 0
+        self._icons = {}
+        self._sort_column = 0
+        self._sort_order = Qt.AscendingOrder
+    
+    def set_icons(self, **icons):
+        """设置图标，键与 icon_key 的返回值对应"""
+        self._icons = icons
+    
+    def set_files(self, files):
+        """替换整个列表（只创建第一批行）"""
+        self.beginResetModel()
+        self._files = list(files)
+        self._sort_files()
+        self._loaded = min(len(self._files), self.FETCH_BATCH)
+        self.endResetModel()
+    
+    def clear(self):
+        self.set_files([])
+    
+    def file_at(self, row):
+        """第 row 行的文件信息字典"""
+        return self._files[row]
+    
+    def row_of(self, name):
+        """名称为 name 的条目所在行，不存在时返回 -1"""
+        for row, file_info in enumerate(self._files):
+            if file_info['name'] == name:
+                return row
+        return -1
+    
+    # ---------- 增量更新 ----------
+    
+    def append_files(self, files):
+        """追加一批条目（追加到末尾，不足一批的部分立即显示）"""
+        if not files:
+            return
+        self._files.extend(files)
+        self._show_first_batch()
+    
+    def apply_files(self, files):
+        """
+        把列表更新为 files：只删除消失的行、刷新变化的行、插入新增的条目，
+        保留选中状态和滚动位置
+        """
+        new_by_name = {file_info['name']: file_info for file_info in files}
+        # 删除消失的条目（从后往前，行号不受影响）
+        for row in range(len(self._files) - 1, -1, -1):
+            if self._files[row]['name'] not in new_by_name:
+                if row < self._loaded:
+                    self.beginRemoveRows(QModelIndex(), row, row)
+                    del self._files[row]
+                    self._loaded -= 1
+                    self.endRemoveRows()
+                else:
+                    del self._files[row]
+        # 刷新属性有变化的条目
+        existing = set()
+        for row, file_info in enumerate(self._files):
+            existing.add(file_info['name'])
+            updated = new_by_name[file_info['name']]
+            if updated != file_info:
+                self._files[row] = updated
+                if row < self._loaded:
+                    self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+        # 新增的条目追加后按当前排序方式重排
+        added = [file_info for file_info in files if file_info['name'] not in existing]
+        if added:
+            self._files.extend(added)
+            self._show_first_batch()
+            self._resort()
+    
+    def _show_first_batch(self):
+        target = min(len(self._files), max(self._loaded, self.FETCH_BATCH))
+        if target > self._loaded:
+            self.beginInsertRows(QModelIndex(), self._loaded, target - 1)
+            self._loaded = target
+            self.endInsertRows()
+    
+    # ---------- 按需加载 ----------
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._loaded < len(self._files)
+    
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH, len(self._files) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+    
+    # ---------- 显示 ----------
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        file_info = self._files[index.row()]
+        if role == Qt.DisplayRole:
+            return self.display_text(file_info, index.column())
+        if role == Qt.DecorationRole and index.column() == 0:
+            return self._icons.get(self.icon_key(file_info))
+        if role == Qt.UserRole:
+            return file_info
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+    
+    def display_text(self, file_info, column):
+        """单元格文字（子类实现）"""
+        raise NotImplementedError
+    
+    def icon_key(self, file_info):
+        """图标键（子类实现）"""
+        raise NotImplementedError
+    
+    def sort_key(self, column):
+        """按第 column 列排序的键函数（子类实现）"""
+        raise NotImplementedError
+    
+    @staticmethod
+    def _format_size(size):
+        """格式化文件大小"""
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if size < 1024:
+                return f"{size:.1f} {unit}"
+            size /= 1024
+        return f"{size:.1f} TB"
+    
+    # ---------- 排序 ----------
+    
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self._resort()
+    
+    def _sort_files(self):
+        self._files.sort(key=self.sort_key(self._sort_column),
+                         reverse=self._sort_order == Qt.DescendingOrder)
+    
+    def _resort(self):
+        """重新排序，选中的行跟随条目移动"""
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        tracked = [self._files[index.row()] for index in old_indexes]
+        self._sort_files()
+        rows = {id(file_info): row for row, file_info in enumerate(self._files)}
+        new_indexes = []
+        for index, file_info in zip(old_indexes, tracked):
+            row = rows[id(file_info)]
+            new_indexes.append(self.index(row, index.column()) if row < self._loaded else QModelIndex())
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+
+class DeviceFileModel(FileListModel):
+    """设备文件列表模型"""
+    
+    HEADERS = ['名称', '大小', '权限', '修改日期']
+    
+    def display_text(self, file_info, column):
+        if column == 0:
+            # 显示名称：符号链接显示为 name -> target
+            if file_info['is_link'] and file_info.get('link_target'):
+                return f"{file_info['name']} -> {file_info['link_target']}"
+            return file_info['name']
+        if column == 1:
+            size = file_info['size']
+            # 符号链接的大小通常很小，如果是链接到目录，显示 <LINK>
+            if file_info['is_link']:
+                return '<LINK>' if not size.isdigit() or int(size) < 100 else self._format_size(int(size))
+            if file_info['is_dir']:
+                return '<DIR>'
+            return self._format_size(int(size) if size.isdigit() else 0)
+        if column == 2:
+            return file_info['permissions']
+        return file_info['date']
+    
+    def icon_key(self, file_info):
+        if file_info['is_link']:
+            return 'link'
+        return 'dir' if file_info['is_dir'] else 'file'
+    
+    def sort_key(self, column):
+        if column == 0:
+            return lambda info: info['name'].lower()
+        if column == 1:
+            return lambda info: int(info['size']) if info['size'].isdigit() and not info['is_dir'] else -1
+        if column == 2:
+            return lambda info: info['permissions']
+        return lambda info: info['date']
+
+
+class LocalFileModel(FileListModel):
+    """本地文件列表模型"""
+    
+    HEADERS = ['名称', '大小', '类型', '修改日期']
+    
+    def display_text(self, file_info, column):
+        if column == 0:
+            return file_info['name']
+        if column == 1:
+            return '<DIR>' if file_info['is_dir'] else self._format_size(file_info['size'])
+        if column == 2:
+            return self._file_type(file_info)
+        return datetime.fromtimestamp(file_info['mtime']).strftime('%Y-%m-%d %H:%M')
+    
+    def icon_key(self, file_info):
+        return 'dir' if file_info['is_dir'] else 'file'
+    
+    def sort_key(self, column):
+        if column == 0:
+            return lambda info: info['name'].lower()
+        if column == 1:
+            return lambda info: -1 if info['is_dir'] else info['size']
+        if column == 2:
+            return self._file_type
+        return lambda info: info['mtime']
+    
+    @staticmethod
+    def _file_type(file_info):
+        return '文件夹' if file_info['is_dir'] else os.path.splitext(file_info['name'])[1] or '文件'
+    
+    def flags(self, index):
+        flags = super().flags(index)
+        return flags | Qt.ItemIsDragEnabled if index.isValid() else flags
+
+
+class FileListView(QTreeView):
+    """基于 FileListModel 的文件列表视图"""
+    
+    model_class = FileListModel
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setRootIsDecorated(False)
+        # 所有行同高，滚动数万行时不逐行计算高度
+        self.setUniformRowHeights(True)
+        self.file_model = self.model_class(self)
+        self.setModel(self.file_model)
+    
+    def clear(self):
+        """清空列表"""
+        self.file_model.clear()
+    
+    def selected_files(self):
+        """选中行的文件信息字典列表（按行顺序）"""
+        rows = sorted({index.row() for index in self.selectionModel().selectedRows()})
+        return [self.file_model.file_at(row) for row in rows]
+    
+    def file_at(self, pos):
+        """视口坐标处的文件信息字典，空白处返回 None"""
+        index = self.indexAt(pos)
+        return self.file_model.file_at(index.row()) if index.isValid() else None
+    
+    def select_name(self, name):
+        """选中并滚动到名称为 name 的条目"""
+        row = self.file_model.row_of(name)
+        if row < 0:
+            return
+        while row >= self.file_model.rowCount() and self.file_model.canFetchMore(QModelIndex()):
+            self.file_model.fetchMore(QModelIndex())
+        index = self.file_model.index(row, 0)
+        self.setCurrentIndex(index)
+        self.scrollTo(index)
+
+
+class LocalFileTree(FileListView):
+    """本地文件列表 - 支持拖拽文件到设备"""
+    
+    model_class = LocalFileModel
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setDragEnabled(True)
-        self.setDragDropMode(QTreeWidget.DragOnly)
+        self.setDragDropMode(QTreeView.DragOnly)
     
     def startDrag(self, supportedActions):
         """重写拖拽开始事件 - 设置文件URL"""
-        selected_items = self.selectedItems()
-        if not selected_items:
+        selected_files = self.selected_files()
+        if not selected_files:
             return
         
         mime_data = QMimeData()
         urls = []
         
-        for item in selected_items:
-            data = item.data(0, Qt.UserRole)
-            if isinstance(data, dict) and 'path' in data:
-                file_path = data['path']
-                if os.path.exists(file_path):
-                    urls.append(QUrl.fromLocalFile(file_path))
+        for data in selected_files:
+            file_path = data['path']
+            if os.path.exists(file_path):
+                urls.append(QUrl.fromLocalFile(file_path))
         
         if urls:
             mime_data.setUrls(urls)
@@ -54,8 +378,10 @@ class LocalFileTree(QTreeWidget):
             drag.exec_(Qt.CopyAction)
 
 
-class DeviceFileTree(QTreeWidget):
-    """设备文件树 - 支持拖放上传"""
+class DeviceFileTree(FileListView):
+    """设备文件列表 - 支持拖放上传"""
+    
+    model_class = DeviceFileModel
     
     # 定义信号：拖放文件上传
     files_dropped = pyqtSignal(list)  # 传递文件路径列表
@@ -95,102 +421,69 @@ class DeviceFileTree(QTreeWidget):
 
 
 class DeviceListThread(QThread):
-    """获取设备文件列表的线程"""
+    """获取设备文件列表的线程（优先使用目录缓存，见 device_dir_cache）"""
     finished_signal = pyqtSignal(list)  # 返回文件列表
     error_signal = pyqtSignal(str)  # 返回错误信息
     
-    def __init__(self, device_id, path, connection_mode='adb', d=None):
+    def __init__(self, device_id, path, connection_mode='adb', d=None, refresh=False):
         super().__init__()
         self.device_id = device_id
         self.path = path
         self.connection_mode = connection_mode
         self.d = d  # uiautomator2设备对象
+        self.refresh = refresh  # 忽略缓存重新获取
     
     def run(self):
         try:
-            files = []
-            # 确保路径以斜杠结尾，以便正确显示目录内容而非链接本身
-            path = self.path.rstrip('/') + '/'
-            
             # 判断是否使用U2模式：必须是u2模式且有有效的d对象
             use_u2 = (self.connection_mode == 'u2' and self.d is not None)
-            
-            logger.info(f"DeviceListThread: device_id={self.device_id}, path={path}, mode={self.connection_mode}, use_u2={use_u2}")
-            
-            if use_u2:
-                # 使用uiautomator2方式，不使用-L避免跟随符号链接导致重复
-                result = self.d.shell(f'ls -la "{path}" 2>/dev/null')
-                output = result.output if hasattr(result, 'output') else str(result)
-            else:
-                # 使用ADB命令，不使用-L避免跟随符号链接导致重复
-                cmd = f'adb -s {self.device_id} shell ls -la "{path}"'
-                logger.info(f"执行命令: {cmd}")
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=30)
-                output = result.stdout
-                logger.info(f"命令输出长度: {len(output)}, stderr: {result.stderr[:100] if result.stderr else 'None'}")
-            
-            # 解析ls -la输出
-            lines = output.strip().split('\n')
-            logger.info(f"解析行数: {len(lines)}")
-            
-            # 用于去重的集合
-            seen_names = set()
-            
-            for line in lines:
-                line = line.strip()
-                if not line or line.startswith('total '):
-                    continue
-                # Android ls -la 格式: drwxr-xr-x  29 root root 820 2009-01-01 05:30 filename
-                # 符号链接格式: lrwxrwxrwx   1 root root   21 2009-01-01 00:00 sdcard -> /storage/self/primary
-                # 共8列: 权限 链接数 所有者 组 大小 日期 时间 文件名
-                parts = line.split(None, 7)  # 最多分割成8部分，文件名可能含空格
-                logger.info(f"解析行: '{line}' -> parts={len(parts)}: {parts}")
-                if len(parts) >= 8:
-                    is_link = line.startswith('l')
-                    is_dir = line.startswith('d')
-                    
-                    # 解析文件名（可能包含 -> 目标路径）
-                    name_part = parts[7] if len(parts) > 7 else ''
-                    
-                    if is_link and ' -> ' in name_part:
-                        # 符号链接: 分离名称和目标
-                        name, link_target = name_part.split(' -> ', 1)
-                        name = name.strip()
-                        link_target = link_target.strip()
-                    else:
-                        name = name_part
-                        link_target = None
-                    
-                    # 跳过 . 和 ..
-                    if name in ['.', '..']:
-                        continue
-                    
-                    # 去重：跳过已存在的文件名
-                    if name in seen_names:
-                        logger.info(f"跳过重复文件: {name}")
-                        continue
-                    seen_names.add(name)
-                    
-                    file_info = {
-                        'permissions': parts[0],
-                        'owner': parts[2] if len(parts) > 2 else '',
-                        'group': parts[3] if len(parts) > 3 else '',
-                        'size': parts[4] if len(parts) > 4 else '0',
-                        'date': ' '.join(parts[5:7]) if len(parts) > 6 else '',  # 日期+时间
-                        'name': name,
-                        'is_dir': is_dir,
-                        'is_link': is_link,
-                        'link_target': link_target,  # 符号链接目标
-                    }
-                    files.append(file_info)
-                    logger.info(f"添加文件: {file_info['name']}")
-            
-            logger.info(f"最终文件列表数量: {len(files)}")
+            logger.debug(f"DeviceListThread: device_id={self.device_id}, path={self.path}, "
+                         f"mode={self.connection_mode}, use_u2={use_u2}, refresh={self.refresh}")
+            files = device_dir_cache.list(self.device_id, self.path, self.d if use_u2 else None,
+                                          refresh=self.refresh)
             self.finished_signal.emit(files)
         except Exception as e:
             self.error_signal.emit(f"获取文件列表失败: {str(e)}")
 
 
+class LocalListThread(QThread):
+    """读取本地目录的线程（os.scandir，按批返回条目）"""
+    batch_signal = pyqtSignal(list)  # 一批条目
+    finished_signal = pyqtSignal(list)  # 完整列表
+    error_signal = pyqtSignal(str)  # 返回错误信息
+    
+    def __init__(self, path, incremental=False):
+        """
+        Args:
+            path: 本地目录
+            incremental: 为 True 时只在读完后返回完整列表（用于目录变化后的增量更新）
+        """
+        super().__init__()
+        self.path = path
+        self.incremental = incremental
+        self.mtime_ns = None  # 开始读取前的目录修改时间，用于缓存校验
+        self._cancelled = False
+    
+    def cancel(self):
+        """放弃读取（已切换到其他目录）"""
+        self._cancelled = True
+    
+    def run(self):
+        try:
+            self.mtime_ns = directory_mtime(self.path)
+            files = []
+            for batch in scan_local_directory(self.path):
+                if self._cancelled:
+                    return
+                files.extend(batch)
+                if not self.incremental:
+                    self.batch_signal.emit(batch)
+            if not self._cancelled:
+                self.finished_signal.emit(files)
+        except Exception as e:
+            self.error_signal.emit(f"读取本地目录失败: {str(e)}")
+
+
 class FileTransferThread(QThread):
     """文件传输线程（上传/下载）"""
     progress_signal = pyqtSignal(str)  # 进度信息
@@ -206,6 +499,7 @@ class FileTransferThread(QThread):
         self.transfer_type = transfer_type  # 'download' or 'upload'
         self.connection_mode = connection_mode
         self.d = d
+        self._last_percent = -1
     
     def run(self):
         try:
@@ -223,7 +517,7 @@ class FileTransferThread(QThread):
         if self.connection_mode == 'u2' and self.d:
             self.d.pull(self.src_path, self.dst_path)
             self.progress_percent.emit(100)
-        else:
+        elif not self._transfer_via_sync():
             # 使用 subprocess 实时读取进度
             cmd = f'adb -s {self.device_id} pull "{self.src_path}" "{self.dst_path}"'
             self._run_with_progress(cmd)
@@ -237,13 +531,55 @@ class FileTransferThread(QThread):
         if self.connection_mode == 'u2' and self.d:
             self.d.push(self.src_path, self.dst_path)
             self.progress_percent.emit(100)
-        else:
+        elif not self._transfer_via_sync():
             # 使用 subprocess 实时读取进度
             cmd = f'adb -s {self.device_id} push "{self.src_path}" "{self.dst_path}"'
             self._run_with_progress(cmd)
         
         self.finished_signal.emit(True, f"上传成功: {os.path.basename(self.src_path)}")
     
+    def _transfer_via_sync(self):
+        """
+        通过 sync 协议在进程内传输，按实际字节数回报进度
+        
+        Returns:
+            True 表示已传输完成；False 表示需要改用 adb 命令（目录、符号链接、adb server 不可用等）
+        """
+        if create_sync_engine is None:
+            return False
+        engine = create_sync_engine(self.device_id)
+        if engine is None:
+            return False
+        
+        try:
+            with engine:
+                if self.transfer_type == 'upload':
+                    if not os.path.isfile(self.src_path):
+                        return False
+                    engine.push(self.src_path, self.dst_path, self._on_sync_progress)
+                else:
+                    size = engine.remote_file_size(self.src_path)
+                    if size is None:
+                        return False
+                    engine.pull(self.src_path, self.dst_path, self._on_sync_progress, size=size)
+        except AdbServerUnavailable as e:
+            logger.debug(f"adb server 不可用，改用 adb 命令传输: {e}")
+            return False
+        except AdbProtocolError as e:
+            raise Exception(f"传输失败: {e}")
+        return True
+    
+    def _on_sync_progress(self, transferred, file_size):
+        """sync 传输进度回调（百分比变化时才发信号）"""
+        percent = transferred * 100 // file_size if file_size else 100
+        if percent == self._last_percent:
+            return
+        self._last_percent = percent
+        self.progress_percent.emit(percent)
+        self.progress_signal.emit(
+            f"传输中 {percent}% ({self._format_size(transferred)}/{self._format_size(file_size)})"
+        )
+    
     def _run_with_progress(self, cmd):
         """运行命令并解析进度"""
         import re
@@ -320,6 +656,17 @@ class BatchFileTransferThread(QThread):
         fail_count = 0
         total = len(self.file_paths)
         
+        # adb 模式下所有文件共用一条 sync 会话，按字节计算总体进度
+        engine = None
+        if not (self.connection_mode == 'u2' and self.d) and create_sync_engine is not None:
+            engine = create_sync_engine(self.device_id)
+        sizes = self._collect_sizes(engine) if engine is not None else None
+        if sizes is None:
+            engine = None
+        self._total_bytes = sum(size or 0 for size in sizes) if sizes else 0
+        self._done_bytes = 0
+        self._last_percent = -1
+        
         for i, src_path in enumerate(self.file_paths):
             file_name = os.path.basename(src_path)
             
@@ -327,49 +674,108 @@ class BatchFileTransferThread(QThread):
             self.file_progress_signal.emit(i + 1, total, file_name)
             
             # 计算总体进度百分比
-            base_percent = int((i / total) * 100)
-            self.progress_percent.emit(base_percent)
+            if not self._total_bytes:
+                self._emit_percent(int((i / total) * 100))
             
             if self.transfer_type == 'upload':
                 # 上传：src_path 是本地文件，dst 是设备路径
                 dst_path = self.dst_dir.rstrip('/') + '/' + file_name
                 self.progress_signal.emit(f"上传中 ({i+1}/{total}): {file_name}")
-                
-                try:
-                    if self.connection_mode == 'u2' and self.d:
-                        self.d.push(src_path, dst_path)
-                    else:
-                        cmd = f'adb -s {self.device_id} push "{src_path}" "{dst_path}"'
-                        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300)
-                        if result.returncode != 0:
-                            raise Exception(result.stderr)
-                    success_count += 1
-                    logger.info(f"上传成功: {file_name}")
-                except Exception as e:
-                    fail_count += 1
-                    logger.error(f"上传失败: {file_name} - {str(e)}")
+                action = "上传"
             else:
                 # 下载：src_path 是设备文件，dst 是本地路径
                 dst_path = os.path.join(self.dst_dir, file_name)
                 self.progress_signal.emit(f"下载中 ({i+1}/{total}): {file_name}")
-                
-                try:
-                    if self.connection_mode == 'u2' and self.d:
-                        self.d.pull(src_path, dst_path)
+                action = "下载"
+            
+            size = sizes[i] if sizes else None
+            try:
+                if self.connection_mode == 'u2' and self.d:
+                    if self.transfer_type == 'upload':
+                        self.d.push(src_path, dst_path)
                     else:
-                        cmd = f'adb -s {self.device_id} pull "{src_path}" "{dst_path}"'
-                        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300)
-                        if result.returncode != 0:
-                            raise Exception(result.stderr)
-                    success_count += 1
-                    logger.info(f"下载成功: {file_name}")
-                except Exception as e:
-                    fail_count += 1
-                    logger.error(f"下载失败: {file_name} - {str(e)}")
+                        self.d.pull(src_path, dst_path)
+                elif not (engine is not None and size is not None
+                          and self._transfer_via_sync(engine, src_path, dst_path, size)):
+                    verb = 'push' if self.transfer_type == 'upload' else 'pull'
+                    cmd = f'adb -s {self.device_id} {verb} "{src_path}" "{dst_path}"'
+                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300)
+                    if result.returncode != 0:
+                        raise Exception(result.stderr)
+                success_count += 1
+                logger.info(f"{action}成功: {file_name}")
+            except Exception as e:
+                fail_count += 1
+                logger.error(f"{action}失败: {file_name} - {str(e)}")
+            finally:
+                if size:
+                    self._done_bytes += size
+                    self._emit_byte_progress(0)
+        
+        if engine is not None:
+            engine.close()
         
         # 完成时发送100%
         self.progress_percent.emit(100)
         self.finished_signal.emit(success_count, fail_count)
+    
+    def _collect_sizes(self, engine):
+        """
+        获取每个文件的大小（下载时在同一 sync 会话上逐个 STAT）
+        
+        Returns:
+            与 file_paths 对应的大小列表，目录、符号链接等不走 sync 的项为 None；
+            adb server 不可用时返回 None
+        """
+        sizes = []
+        try:
+            for path in self.file_paths:
+                if self.transfer_type == 'upload':
+                    sizes.append(os.path.getsize(path) if os.path.isfile(path) else None)
+                else:
+                    sizes.append(engine.remote_file_size(path))
+        except AdbServerUnavailable as e:
+            logger.debug(f"adb server 不可用，改用 adb 命令传输: {e}")
+            return None
+        except AdbProtocolError as e:
+            # 单个文件查询失败不影响其余文件，交给 adb 命令处理
+            logger.warning(f"查询文件信息失败: {e}")
+            sizes.extend([None] * (len(self.file_paths) - len(sizes)))
+        return sizes
+    
+    def _transfer_via_sync(self, engine, src_path, dst_path, size):
+        """
+        通过 sync 会话传输一个文件
+        
+        Returns:
+            True 表示已传输；False 表示 adb server 不可用，需要改用 adb 命令
+        """
+        try:
+            if self.transfer_type == 'upload':
+                engine.push(src_path, dst_path, self._on_sync_progress)
+            else:
+                engine.pull(src_path, dst_path, self._on_sync_progress, size=size)
+        except AdbServerUnavailable as e:
+            logger.debug(f"adb server 不可用，改用 adb 命令传输: {e}")
+            return False
+        except AdbProtocolError as e:
+            raise Exception(str(e))
+        return True
+    
+    def _on_sync_progress(self, transferred, file_size):
+        """当前文件的字节进度回调"""
+        self._emit_byte_progress(transferred)
+    
+    def _emit_byte_progress(self, current_file_bytes):
+        if self._total_bytes:
+            self._emit_percent((self._done_bytes + current_file_bytes) * 100 // self._total_bytes)
+    
+    def _emit_percent(self, percent):
+        """总体进度百分比变化时才发信号"""
+        percent = min(percent, 100)
+        if percent != self._last_percent:
+            self._last_percent = percent
+            self.progress_percent.emit(percent)
 
 
 class FileDeleteThread(QThread):
@@ -472,13 +878,25 @@ class FolderUploadThread(QThread):
     file_progress_signal = pyqtSignal(int, int)  # 当前文件数, 总文件数
     finished_signal = pyqtSignal(int, int, int)  # 成功数, 失败数, 跳过数
     
-    def __init__(self, device_id, local_folder, device_folder, connection_mode='adb', d=None):
+    def __init__(self, device_id, local_folder, device_folder, connection_mode='adb', d=None,
+                 delta=False, delete_extraneous=False, compare=None, resume_job=None):
+        """
+        Args:
+            delta: 增量同步，只上传设备上不存在或有变化的文件
+            delete_extraneous: 增量同步时删除设备上本地没有的文件和目录
+            compare: 判断文件是否变化的方式 size_mtime/checksum，None 时读取配置
+            resume_job: 要恢复的未完成任务（任务日志），上次已上传且设备上大小一致的文件不再上传
+        """
         super().__init__()
         self.device_id = device_id
         self.local_folder = local_folder
         self.device_folder = device_folder
         self.connection_mode = connection_mode
         self.d = d
+        self.delta = delta
+        self.delete_extraneous = delete_extraneous
+        self.compare = compare or config_manager.get("file_transfer.sync_compare", "size_mtime")
+        self.resume_job = resume_job
     
     def run(self):
         success_count = 0
@@ -490,64 +908,206 @@ class FolderUploadThread(QThread):
         target_folder = self.device_folder.rstrip('/') + '/' + folder_name
         
         # 统计总文件数
-        total_files = sum(len(files) for _, _, files in os.walk(self.local_folder))
+        local_files = [(path, rel_path) for path, rel_path in iter_local_tree(self.local_folder)
+                       if os.path.isfile(path)]
+        total_files = len(local_files)
         current_file = 0
-        
-        self.progress_signal.emit(f"准备上传文件夹: {folder_name} ({total_files} 个文件)")
+        journal = self._open_journal(local_files)
+        
+        if self.delta:
+            # 增量同步：只上传设备上不存在或有变化的文件（恢复任务时同样适用）
+            self.progress_signal.emit(f"正在比较本地与设备上的文件: {folder_name}")
+            local_files, skip_count = self._plan_delta(target_folder, local_files)
+            total_files = len(local_files)
+            self.progress_signal.emit(f"准备同步文件夹: {folder_name} ({total_files} 个文件需要上传, {skip_count} 个未变化)")
+        elif self.resume_job is not None:
+            self.progress_signal.emit(f"正在核对上次已上传的文件: {folder_name}")
+            local_files, skip_count = self._skip_uploaded(target_folder, local_files)
+            total_files = len(local_files)
+            self.progress_signal.emit(f"继续上传文件夹: {folder_name} ({total_files} 个文件需要上传, {skip_count} 个已上传)")
+        else:
+            self.progress_signal.emit(f"准备上传文件夹: {folder_name} ({total_files} 个文件)")
         
         # 在设备上创建根目录
         if not self._create_device_dir(target_folder):
             self.finished_signal.emit(0, 0, 0)
             return
         
-        # 递归遍历本地文件夹
-        for root, dirs, files in os.walk(self.local_folder):
-            # 计算相对路径
-            rel_path = os.path.relpath(root, self.local_folder)
-            if rel_path == '.':
-                rel_path = ''
-            
-            # 在设备上创建子目录
-            for dir_name in dirs:
-                if rel_path:
-                    device_subdir = f"{target_folder}/{rel_path}/{dir_name}".replace('\\', '/')
-                else:
-                    device_subdir = f"{target_folder}/{dir_name}"
-                self._create_device_dir(device_subdir)
+        # tar 模式：整个文件夹作为一个数据流上传，没有传上去的文件再逐个上传
+        pending = None
+        if local_files and folder_transfer_mode(self.connection_mode) == 'tar':
+            subset = self.delta or self.resume_job is not None
+            include = {rel_path for _, rel_path in local_files} if subset else None
+            pending = self._upload_via_tar(folder_name, target_folder, local_files, include)
+            if pending is not None:
+                success_count = current_file = total_files - len(pending)
+                pending_paths = {rel_path for _, rel_path in pending}
+                for _, rel_path in local_files:
+                    if rel_path not in pending_paths:
+                        journal.record(rel_path, "成功")
+        
+        if pending is None and not self.delta and self.resume_job is None:
+            # 逐个上传：先按本地目录结构在设备上创建全部子目录
+            for local_path, rel_path in iter_local_tree(self.local_folder):
+                if os.path.isdir(local_path):
+                    self._create_device_dir(f"{target_folder}/{rel_path}")
+            pending = local_files
+        else:
+            # 只为需要逐个上传的文件创建所在目录
+            pending = local_files if pending is None else pending
+            for rel_dir in sorted({rel_path.rsplit('/', 1)[0] for _, rel_path in pending if '/' in rel_path}):
+                self._create_device_dir(f"{target_folder}/{rel_dir}")
+        
+        # 上传文件
+        for local_file, rel_path in pending:
+            current_file += 1
+            file_name = os.path.basename(local_file)
+            device_file = f"{target_folder}/{rel_path}"
             
-            # 上传文件
-            for file_name in files:
-                current_file += 1
-                local_file = os.path.join(root, file_name)
-                
-                if rel_path:
-                    device_file = f"{target_folder}/{rel_path}/{file_name}".replace('\\', '/')
+            self.file_progress_signal.emit(current_file, total_files)
+            # 计算进度百分比
+            percent = int((current_file / total_files) * 100) if total_files > 0 else 0
+            self.progress_percent.emit(percent)
+            self.progress_signal.emit(f"上传中 ({current_file}/{total_files}): {file_name}")
+            
+            try:
+                if self.connection_mode == 'u2' and self.d:
+                    self.d.push(local_file, device_file)
                 else:
-                    device_file = f"{target_folder}/{file_name}"
-                
-                self.file_progress_signal.emit(current_file, total_files)
-                # 计算进度百分比
-                percent = int((current_file / total_files) * 100) if total_files > 0 else 0
-                self.progress_percent.emit(percent)
-                self.progress_signal.emit(f"上传中 ({current_file}/{total_files}): {file_name}")
-                
-                try:
-                    if self.connection_mode == 'u2' and self.d:
-                        self.d.push(local_file, device_file)
-                    else:
-                        cmd = f'adb -s {self.device_id} push "{local_file}" "{device_file}"'
-                        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300)
-                        if result.returncode != 0:
-                            raise Exception(result.stderr)
-                    success_count += 1
-                    logger.info(f"上传成功: {file_name}")
-                except Exception as e:
-                    fail_count += 1
-                    logger.error(f"上传失败: {file_name} - {str(e)}")
+                    cmd = f'adb -s {self.device_id} push "{local_file}" "{device_file}"'
+                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300)
+                    if result.returncode != 0:
+                        raise Exception(result.stderr)
+                success_count += 1
+                journal.record(rel_path, "成功")
+                logger.info(f"上传成功: {file_name}")
+            except Exception as e:
+                fail_count += 1
+                journal.record(rel_path, "失败", ok=False)
+                logger.error(f"上传失败: {file_name} - {str(e)}")
         
+        journal.finish({"success": success_count, "fail": fail_count, "skip": skip_count})
         self.progress_percent.emit(100)
         self.finished_signal.emit(success_count, fail_count, skip_count)
     
+    def _open_journal(self, local_files):
+        """创建任务日志（恢复任务时沿用原日志），每个文件上传后记录一次检查点"""
+        if self.resume_job is not None:
+            return self.resume_job
+        params = {
+            "title": f"上传文件夹 {os.path.basename(self.local_folder)}（{len(local_files)} 个文件）",
+            "device_id": self.device_id,
+            "device_ids": [self.device_id],
+            "local_folder": self.local_folder,
+            "device_folder": self.device_folder,
+            "delta": self.delta,
+            "delete_extraneous": self.delete_extraneous,
+            "compare": self.compare,
+        }
+        return start_job("folder_upload", params, [rel_path for _, rel_path in local_files])
+    
+    def _skip_uploaded(self, target_folder, local_files):
+        """
+        恢复任务：上次已上传的文件用一次设备端清单核对大小，一致的不再上传
+        
+        Returns:
+            (仍需上传的 (本地路径, 相对路径) 列表, 核对通过的文件数)
+        """
+        done = self.resume_job.done_units()
+        d = self.d if self.connection_mode == 'u2' else None
+        try:
+            remote_sizes = {entry['rel_path']: entry['size']
+                            for entry in list_remote_tree_shell(self.device_id, target_folder, d, missing_ok=True)
+                            if entry['type'] == ENTRY_FILE}
+        except Exception as e:
+            logger.warning(f"核对已上传的文件失败，重新上传全部文件: {e}")
+            return local_files, 0
+        pending = [(path, rel_path) for path, rel_path in local_files
+                   if rel_path not in done or remote_sizes.get(rel_path) != os.path.getsize(path)]
+        return pending, len(local_files) - len(pending)
+    
+    def _plan_delta(self, target_folder, local_files):
+        """
+        增量同步：一次取得设备端清单（需要时再用一条 md5sum 命令取得校验和）与本地比较
+        
+        Returns:
+            (需要上传的 (本地路径, 相对路径) 列表, 未变化的文件数)
+        """
+        d = self.d if self.connection_mode == 'u2' else None
+        try:
+            # 目标目录还不存在时按空目录比较
+            remote_entries = list_remote_tree_shell(self.device_id, target_folder, d, missing_ok=True)
+            same_content = None
+            if self.compare == 'checksum':
+                same_content = checksum_comparer(remote_checksums(self.device_id, target_folder, d),
+                                                 self.local_folder)
+        except Exception as e:
+            logger.warning(f"读取设备端清单失败，上传全部文件且不删除设备上的文件: {e}")
+            self.progress_signal.emit(f"读取设备端文件失败，改为上传全部文件: {e}")
+            return local_files, 0
+        plan = plan_delta(local_tree_manifest(self.local_folder), remote_entries,
+                          self.delete_extraneous, same_content)
+        if plan['delete']:
+            try:
+                delete_remote_entries(self.device_id, target_folder, plan['delete'], d)
+                self.progress_signal.emit(f"已删除设备上多余的 {len(plan['delete'])} 项")
+            except Exception as e:
+                logger.warning(f"删除设备上多余的条目失败: {e}")
+                self.progress_signal.emit(f"删除设备上多余的条目失败: {e}")
+        changed = {entry['rel_path'] for entry in plan['transfer']}
+        return [(path, rel_path) for path, rel_path in local_files if rel_path in changed], len(plan['unchanged'])
+    
+    def _upload_via_tar(self, folder_name, target_folder, local_files, include=None):
+        """
+        边打包边通过 `adb exec-in tar x` 上传整个文件夹，完成后用一条 find 命令核对文件大小
+        
+        Args:
+            include: 只打包这些相对路径的文件，None 表示全部
+        
+        Returns:
+            仍需逐个上传的 (本地路径, 相对路径) 列表；设备没有 tar 时返回 None
+        """
+        tools = probe_device_tar_tools(self.device_id)
+        if 'tar' not in tools:
+            logger.info("设备上没有 tar 命令，逐个上传文件")
+            return None
+        compression = resolve_tar_compression(config_manager.get("file_transfer.tar_compression", "none"), tools)
+        self.progress_signal.emit(f"正在以 tar 数据流上传 (压缩: {compression})...")
+        
+        sizes = {rel_path: os.path.getsize(path) for path, rel_path in local_files}
+        progress = ByteProgress(sum(sizes.values()), self.progress_percent.emit)
+        try:
+            process = subprocess.Popen(
+                [adb_executable(), '-s', self.device_id, 'exec-in', tar_extract_command(self.device_folder, compression)],
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        except OSError as e:
+            logger.warning(f"无法启动 adb，逐个上传文件: {e}")
+            return None
+        try:
+            write_tar_stream(process.stdin, self.local_folder, folder_name, compression, progress.add, include)
+            process.wait(timeout=config_manager.get("file_transfer.timeout", 60))
+        except Exception as e:
+            logger.warning(f"tar 数据流上传中断，其余文件逐个上传: {e}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        
+        # 核对设备上的文件
+        try:
+            remote_sizes = {entry['rel_path']: entry['size']
+                            for entry in list_remote_tree_shell(self.device_id, target_folder, missing_ok=True)
+                            if entry['type'] == ENTRY_FILE}
+        except Exception as e:
+            logger.warning(f"核对上传结果失败: {e}")
+            remote_sizes = {}
+        pending = [(path, rel_path) for path, rel_path in local_files
+                   if remote_sizes.get(rel_path) != sizes[rel_path]]
+        if pending:
+            logger.info(f"tar 数据流未传上 {len(pending)} 个文件，逐个上传")
+        return pending
+    
     def _create_device_dir(self, dir_path):
         """在设备上创建目录"""
         try:
@@ -568,167 +1128,269 @@ class FolderUploadThread(QThread):
 
 
 class FolderDownloadThread(QThread):
-    """文件夹下载线程 - 从设备递归下载文件夹到本地"""
+    """文件夹下载线程 - 一次读取设备目录树清单，再用有限并发的线程池下载全部文件"""
     progress_signal = pyqtSignal(str)  # 进度信息
-    progress_percent = pyqtSignal(int)  # 进度百分比 (0-100)
+    progress_percent = pyqtSignal(int)  # 进度百分比 (0-100)，按字节计算
     file_progress_signal = pyqtSignal(int, int)  # 当前文件数, 总文件数
     finished_signal = pyqtSignal(int, int, int)  # 成功数, 失败数, 跳过数
     
-    def __init__(self, device_id, device_folder, local_folder, connection_mode='adb', d=None):
+    def __init__(self, device_id, device_folder, local_folder, connection_mode='adb', d=None,
+                 max_workers=None, delta=False, delete_extraneous=False, compare=None):
+        """
+        Args:
+            max_workers: 并发下载数，None 时读取配置
+            delta: 增量同步，只下载本地不存在或有变化的文件
+            delete_extraneous: 增量同步时删除本地有而设备上没有的文件和目录
+            compare: 判断文件是否变化的方式 size_mtime/checksum，None 时读取配置
+        """
         super().__init__()
         self.device_id = device_id
         self.device_folder = device_folder
         self.local_folder = local_folder
         self.connection_mode = connection_mode
         self.d = d
+        self.delta = delta
+        self.delete_extraneous = delete_extraneous
+        self.compare = compare or config_manager.get("file_transfer.sync_compare", "size_mtime")
+        self.max_workers = max_workers or config_manager.get("file_transfer.parallel_workers", 4)
+        self._sync_available = create_sync_engine is not None and connection_mode != 'u2'
+        self._local = threading.local()
+        self._engines = []
+        self._engines_lock = threading.Lock()
     
     def run(self):
         success_count = 0
         fail_count = 0
-        skip_count = 0
         
         # 获取文件夹名称
         folder_name = self.device_folder.rstrip('/').split('/')[-1]
         target_folder = os.path.join(self.local_folder, folder_name)
         
-        # 统计总文件数
-        total_files = self._count_files_recursive(self.device_folder)
-        current_file = 0
+        # 一次遍历得到整个目录树
+        self.progress_signal.emit(f"正在读取文件夹结构: {folder_name}")
+        try:
+            entries = self._list_tree()
+        except Exception as e:
+            logger.error(f"读取目录树失败: {self.device_folder} - {str(e)}")
+            self.progress_signal.emit(f"读取文件夹失败: {str(e)}")
+            self.finished_signal.emit(0, 0, 0)
+            return
         
-        self.progress_signal.emit(f"准备下载文件夹: {folder_name} ({total_files} 个文件)")
+        summary = summarize(entries)
+        files = [entry for entry in entries if entry['type'] == ENTRY_FILE]
+        skip_count = summary['skipped']  # 符号链接等跳过
+        
+        if self.delta:
+            # 增量同步：只下载本地不存在或有变化的文件
+            self.progress_signal.emit(f"正在比较设备与本地的文件: {folder_name}")
+            files, unchanged_count = self._plan_delta(entries, target_folder)
+            skip_count += unchanged_count
+        total_files = len(files)
+        total_bytes = sum(entry['size'] for entry in files)
+        
+        if self.delta:
+            self.progress_signal.emit(
+                f"准备同步文件夹: {folder_name} ({total_files} 个文件需要下载, "
+                f"{self._format_size(total_bytes)}, {unchanged_count} 个未变化)"
+            )
+        else:
+            self.progress_signal.emit(
+                f"准备下载文件夹: {folder_name} ({total_files} 个文件, {self._format_size(total_bytes)})"
+            )
         
-        # 在本地创建根目录
+        # 先在本地建好全部目录
         os.makedirs(target_folder, exist_ok=True)
+        for entry in entries:
+            if entry['type'] == ENTRY_DIR:
+                os.makedirs(local_path_for(target_folder, entry['rel_path']), exist_ok=True)
         
-        # 递归下载
-        success_count, fail_count, skip_count, current_file = self._download_recursive(
-            self.device_folder, target_folder, current_file, total_files
-        )
+        progress = ByteProgress(total_bytes, self.progress_percent.emit)
+        
+        # tar 模式：整个文件夹作为一个数据流下载，没取到的文件再逐个下载（增量同步只在全部文件都要下载时使用）
+        current_file = 0
+        if (files and total_files == summary['files']
+                and folder_transfer_mode(self.connection_mode) == 'tar'):
+            files = self._download_via_tar(target_folder, files, progress)
+            current_file = total_files - len(files)
+            success_count = current_file
+        
+        def download_job(entry):
+            device_file = join_device_path(self.device_folder, entry['rel_path'])
+            local_file = local_path_for(target_folder, entry['rel_path'])
+            self._download_file(device_file, local_file, entry['size'], progress)
+            # 保留设备端的修改时间，增量同步据此判断文件是否变化
+            os.utime(local_file, (entry['mtime'], entry['mtime']))
+            return entry
+        
+        # 大文件先下载，避免最后只剩一个大文件在传
+        files.sort(key=lambda entry: entry['size'], reverse=True)
+        workers = max(1, min(self.max_workers, len(files)))
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="FolderDownload") as executor:
+                futures = {executor.submit(download_job, entry): entry for entry in files}
+                for future in as_completed(futures):
+                    name = futures[future]['rel_path']
+                    current_file += 1
+                    try:
+                        future.result()
+                        success_count += 1
+                        logger.info(f"下载成功: {name}")
+                    except Exception as e:
+                        fail_count += 1
+                        logger.error(f"下载失败: {name} - {str(e)}")
+                    self.file_progress_signal.emit(current_file, total_files)
+                    self.progress_signal.emit(f"下载中 ({current_file}/{total_files}): {name}")
+                    if not total_bytes:
+                        self.progress_percent.emit(int((current_file / total_files) * 100))
+        finally:
+            for engine in self._engines:
+                engine.close()
         
         self.progress_percent.emit(100)
         self.finished_signal.emit(success_count, fail_count, skip_count)
     
-    def _count_files_recursive(self, device_path):
-        """递归统计设备文件夹中的文件数量"""
-        count = 0
-        try:
-            if self.connection_mode == 'u2' and self.d:
-                result = self.d.shell(f'ls -la "{device_path}"')
-                output = result.output if hasattr(result, 'output') else str(result)
-            else:
-                cmd = f'adb -s {self.device_id} shell ls -la "{device_path}"'
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=30)
-                output = result.stdout
-            
-            lines = output.strip().split('\n')
-            for line in lines:
-                line = line.strip()
-                if not line or line.startswith('total '):
-                    continue
-                
-                parts = line.split(None, 7)
-                if len(parts) >= 8:
-                    is_dir = line.startswith('d')
-                    name_part = parts[7] if len(parts) > 7 else ''
-                    
-                    # 处理符号链接
-                    if ' -> ' in name_part:
-                        name = name_part.split(' -> ')[0].strip()
-                    else:
-                        name = name_part
-                    
-                    if name in ['.', '..']:
-                        continue
-                    
-                    full_path = f"{device_path.rstrip('/')}/{name}"
-                    
-                    if is_dir:
-                        count += self._count_files_recursive(full_path)
-                    else:
-                        count += 1
-        except Exception as e:
-            logger.error(f"统计文件数失败: {device_path} - {str(e)}")
+    def _plan_delta(self, entries, target_folder):
+        """
+        增量同步：与本地已有文件比较，并按需删除本地多余的条目
         
-        return count
-    
-    def _download_recursive(self, device_path, local_path, current_file, total_files):
-        """递归下载文件夹"""
-        success_count = 0
-        fail_count = 0
-        skip_count = 0
+        Returns:
+            (需要下载的清单条目, 未变化的文件数)
+        """
+        same_content = None
+        if self.compare == 'checksum':
+            d = self.d if self.connection_mode == 'u2' else None
+            try:
+                same_content = checksum_comparer(remote_checksums(self.device_id, self.device_folder, d),
+                                                 target_folder)
+            except Exception as e:
+                logger.warning(f"读取设备端校验和失败，下载全部文件且不删除本地文件: {e}")
+                self.progress_signal.emit(f"读取设备端校验和失败，改为下载全部文件: {e}")
+                return [entry for entry in entries if entry['type'] == ENTRY_FILE], 0
+        plan = plan_delta(entries, local_tree_manifest(target_folder), self.delete_extraneous, same_content)
+        if plan['delete']:
+            deleted = delete_local_entries(target_folder, plan['delete'])
+            self.progress_signal.emit(f"已删除本地多余的 {deleted} 项")
+        return plan['transfer'], len(plan['unchanged'])
+    
+    def _download_via_tar(self, target_folder, files, progress):
+        """
+        通过 `adb exec-out tar c` 把整个文件夹作为一个数据流下载，边接收边解包
+        
+        Returns:
+            仍需逐个下载的文件（设备没有 tar、数据流中断或解包后大小不符的）
+        """
+        tools = probe_device_tar_tools(self.device_id)
+        if 'tar' not in tools:
+            logger.info("设备上没有 tar 命令，逐个下载文件")
+            return files
+        compression = resolve_tar_compression(config_manager.get("file_transfer.tar_compression", "none"), tools)
+        self.progress_signal.emit(f"正在以 tar 数据流下载 (压缩: {compression})...")
+        
+        total_files = len(files)
+        extracted = [0]
+        last_update = [0.0]
+        
+        def on_file(rel_path, size):
+            extracted[0] += 1
+            progress.add(size)
+            self.file_progress_signal.emit(extracted[0], total_files)
+            now = time.monotonic()
+            if now - last_update[0] >= 0.2:
+                last_update[0] = now
+                self.progress_signal.emit(f"下载中 ({extracted[0]}/{total_files}): {rel_path}")
         
         try:
-            if self.connection_mode == 'u2' and self.d:
-                result = self.d.shell(f'ls -la "{device_path}"')
-                output = result.output if hasattr(result, 'output') else str(result)
-            else:
-                cmd = f'adb -s {self.device_id} shell ls -la "{device_path}"'
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=30)
-                output = result.stdout
-            
-            lines = output.strip().split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line or line.startswith('total '):
-                    continue
-                
-                parts = line.split(None, 7)
-                if len(parts) >= 8:
-                    is_dir = line.startswith('d')
-                    is_link = line.startswith('l')
-                    name_part = parts[7] if len(parts) > 7 else ''
-                    
-                    # 处理符号链接
-                    if ' -> ' in name_part:
-                        name = name_part.split(' -> ')[0].strip()
-                    else:
-                        name = name_part
-                    
-                    if name in ['.', '..']:
-                        continue
-                    
-                    device_full_path = f"{device_path.rstrip('/')}/{name}"
-                    local_full_path = os.path.join(local_path, name)
-                    
-                    if is_dir:
-                        # 创建本地目录并递归下载
-                        os.makedirs(local_full_path, exist_ok=True)
-                        s, f, sk, current_file = self._download_recursive(
-                            device_full_path, local_full_path, current_file, total_files
-                        )
-                        success_count += s
-                        fail_count += f
-                        skip_count += sk
-                    elif not is_link:  # 跳过符号链接
-                        # 下载文件
-                        current_file += 1
-                        self.file_progress_signal.emit(current_file, total_files)
-                        # 计算进度百分比
-                        percent = int((current_file / total_files) * 100) if total_files > 0 else 0
-                        self.progress_percent.emit(percent)
-                        self.progress_signal.emit(f"下载中 ({current_file}/{total_files}): {name}")
-                        
-                        try:
-                            if self.connection_mode == 'u2' and self.d:
-                                self.d.pull(device_full_path, local_full_path)
-                            else:
-                                cmd = f'adb -s {self.device_id} pull "{device_full_path}" "{local_full_path}"'
-                                result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300)
-                                if result.returncode != 0:
-                                    raise Exception(result.stderr)
-                            success_count += 1
-                            logger.info(f"下载成功: {name}")
-                        except Exception as e:
-                            fail_count += 1
-                            logger.error(f"下载失败: {name} - {str(e)}")
-                    else:
-                        # 符号链接跳过
-                        skip_count += 1
+            process = subprocess.Popen(
+                [adb_executable(), '-s', self.device_id, 'exec-out', tar_create_command(self.device_folder, compression)],
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+        except OSError as e:
+            logger.warning(f"无法启动 adb，逐个下载文件: {e}")
+            return files
+        try:
+            extract_tar_stream(process.stdout, target_folder, compression, on_file)
         except Exception as e:
-            logger.error(f"遍历目录失败: {device_path} - {str(e)}")
+            logger.warning(f"tar 数据流下载中断，其余文件逐个下载: {e}")
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+        
+        remaining = []
+        for entry in files:
+            local_file = local_path_for(target_folder, entry['rel_path'])
+            try:
+                if os.path.getsize(local_file) == entry['size']:
+                    continue
+            except OSError:
+                pass
+            remaining.append(entry)
+        if remaining:
+            logger.info(f"tar 数据流未取得 {len(remaining)} 个文件，逐个下载")
+        return remaining
+    
+    def _list_tree(self):
+        """
+        获取目录树清单：adb 模式优先在 sync 会话上逐目录 LIST，否则执行一条 find 命令
         
-        return success_count, fail_count, skip_count, current_file
+        同步并删除本地多余条目时只用 find：sync LIST 读不了的子目录也返回空，会被当作空目录
+        """
+        if self._sync_available and not (self.delta and self.delete_extraneous):
+            engine = self._worker_engine()
+            if engine is not None:
+                try:
+                    return list_remote_tree_sync(engine, self.device_folder)
+                except AdbServerUnavailable as e:
+                    logger.debug(f"adb server 不可用，改用 adb 命令: {e}")
+                    self._sync_available = False
+        
+        d = self.d if self.connection_mode == 'u2' else None
+        return list_remote_tree_shell(self.device_id, self.device_folder, d)
+    
+    def _worker_engine(self):
+        """当前线程的 sync 传输引擎（每个工作线程一条 sync 会话）"""
+        engine = getattr(self._local, 'engine', None)
+        if engine is None:
+            engine = create_sync_engine(self.device_id)
+            self._local.engine = engine
+            if engine is not None:
+                with self._engines_lock:
+                    self._engines.append(engine)
+        return engine
+    
+    def _download_file(self, device_file, local_file, size, progress):
+        """下载单个文件，失败时抛出异常"""
+        if self.connection_mode == 'u2' and self.d:
+            self.d.pull(device_file, local_file)
+            progress.add(size)
+            return
+        
+        if self._sync_available:
+            engine = self._worker_engine()
+            if engine is not None:
+                try:
+                    engine.pull(device_file, local_file, progress.file_callback(), size=size)
+                    return
+                except AdbServerUnavailable as e:
+                    logger.debug(f"adb server 不可用，改用 adb 命令: {e}")
+                    self._sync_available = False
+                except AdbProtocolError as e:
+                    raise Exception(str(e))
+        
+        cmd = f'adb -s {self.device_id} pull "{device_file}" "{local_file}"'
+        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300)
+        if result.returncode != 0:
+            raise Exception(result.stderr)
+        progress.add(size)
+    
+    def _format_size(self, size):
+        """格式化文件大小"""
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if size < 1024:
+                return f"{size:.1f} {unit}"
+            size /= 1024
+        return f"{size:.1f} TB"
 
 
 class TextReadThread(QThread):
@@ -842,6 +1504,9 @@ class FileManagerDialog(QDialog):
         
         # 线程引用
         self.list_thread = None
+        self.local_list_thread = None
+        self._pending_local_selection = None  # 本地目录读取完成后要选中的文件名
+        self._running_list_threads = set()  # 被新请求替换但仍在运行的列表线程，结束前保持引用
         self.transfer_thread = None
         self.batch_transfer_thread = None
         self.delete_thread = None
@@ -853,6 +1518,7 @@ class FileManagerDialog(QDialog):
         self.folder_download_thread = None
         self.refresh_devices_thread = None
         self.u2_connect_thread = None
+        self._resume_offered = set()  # 已询问过是否继续未完成上传任务的设备
         
         # 动态加载UI文件
         import sys
@@ -925,6 +1591,7 @@ class FileManagerDialog(QDialog):
             self._init_from_parent_connection(device_id, connection_mode, d)
             self._refresh_device_files()
             self._refresh_local_files()
+            QTimer.singleShot(0, self._offer_resume_uploads)
     
     def _init_device_controls(self):
         """初始化独立的设备管理控件"""
@@ -1181,18 +1848,34 @@ class FileManagerDialog(QDialog):
         self.localPathEdit.setText(self.local_current_path)
         
         # 设置树形控件属性
-        self.deviceTree.setHeaderLabels(['名称', '大小', '权限', '修改日期'])
+        self.deviceTree.file_model.set_icons(
+            link=self.style().standardIcon(self.style().SP_FileLinkIcon),
+            dir=self.style().standardIcon(self.style().SP_DirIcon),
+            file=self.style().standardIcon(self.style().SP_FileIcon)
+        )
         self.deviceTree.setColumnWidth(0, 200)
         self.deviceTree.setSortingEnabled(True)
-        self.deviceTree.setSelectionMode(QTreeWidget.ExtendedSelection)
+        self.deviceTree.sortByColumn(0, Qt.AscendingOrder)
+        self.deviceTree.setSelectionMode(QTreeView.ExtendedSelection)
         self.deviceTree.setContextMenuPolicy(Qt.CustomContextMenu)
         
-        self.localTree.setHeaderLabels(['名称', '大小', '类型', '修改日期'])
+        self.localTree.file_model.set_icons(
+            dir=self.style().standardIcon(self.style().SP_DirIcon),
+            file=self.style().standardIcon(self.style().SP_FileIcon)
+        )
         self.localTree.setColumnWidth(0, 200)
         self.localTree.setSortingEnabled(True)
-        self.localTree.setSelectionMode(QTreeWidget.ExtendedSelection)
+        self.localTree.sortByColumn(0, Qt.AscendingOrder)
+        self.localTree.setSelectionMode(QTreeView.ExtendedSelection)
         self.localTree.setContextMenuPolicy(Qt.CustomContextMenu)
         
+        # 本地目录变化后增量更新（合并 200ms 内的多次变化）
+        self._local_update_timer = QTimer(self)
+        self._local_update_timer.setSingleShot(True)
+        self._local_update_timer.setInterval(200)
+        # 监视当前本地目录，其他程序修改后也能自动更新
+        self._local_watcher = QFileSystemWatcher(self) if config_manager.get("file_manager.watch_local_dir", True) else None
+        
         # 设置分割器比例
         self.splitter.setSizes([500, 500])
         
@@ -1371,24 +2054,27 @@ class FileManagerDialog(QDialog):
         
         # 设备文件操作
         self.btnDeviceUp.clicked.connect(self._device_go_up)
-        self.btnRefreshDevice.clicked.connect(self._refresh_device_files)
+        self.btnRefreshDevice.clicked.connect(self._reload_device_files)
         self.btnDownload.clicked.connect(self._download_selected)
         self.btnNewFolderDevice.clicked.connect(self._create_folder_on_device)
         
         # 本地文件操作
         self.btnLocalUp.clicked.connect(self._local_go_up)
-        self.btnRefreshLocal.clicked.connect(self._refresh_local_files)
+        self.btnRefreshLocal.clicked.connect(self._reload_local_files)
         self.btnUpload.clicked.connect(self._upload_selected)
         self.btnSelectFile.clicked.connect(self._select_local_file)
         self.btnBrowseDir.clicked.connect(self._browse_local_directory)
         
         # 树形控件事件
-        self.deviceTree.itemDoubleClicked.connect(self._on_device_item_double_clicked)
+        self.deviceTree.doubleClicked.connect(self._on_device_item_double_clicked)
         self.deviceTree.customContextMenuRequested.connect(self._show_device_context_menu)
         self.deviceTree.files_dropped.connect(self._on_files_dropped)
         
-        self.localTree.itemDoubleClicked.connect(self._on_local_item_double_clicked)
+        self.localTree.doubleClicked.connect(self._on_local_item_double_clicked)
         self.localTree.customContextMenuRequested.connect(self._show_local_context_menu)
+        self._local_update_timer.timeout.connect(self._update_local_files)
+        if self._local_watcher is not None:
+            self._local_watcher.directoryChanged.connect(self._on_local_directory_changed)
     
     def _refresh_devices(self):
         """刷新设备列表(复用主窗口的逻辑)"""
@@ -1494,6 +2180,7 @@ class FileManagerDialog(QDialog):
                 self.fm_status_label.setText(f"已连接 (ADB): {device_id}")
             # 刷新文件列表
             self._refresh_device_files()
+            self._offer_resume_uploads()
     
     def _try_u2_connection(self, device_id):
         """尝试U2连接（异步）"""
@@ -1550,8 +2237,20 @@ class FileManagerDialog(QDialog):
             else:
                 self.fm_status_label.setText(message)
     
-    def _refresh_device_files(self):
-        """刷新设备文件列表"""
+    def _refresh_device_files(self, refresh=False):
+        """
+        刷新设备文件列表
+        
+        Args:
+            refresh: 忽略目录缓存重新获取
+        """
+        self.list_thread = None
+        cached = None if refresh else device_dir_cache.get(self.device_id, self.device_current_path)
+        if cached is not None:
+            # 缓存命中（返回上级目录、已预取的子目录）直接显示
+            self._on_device_list_ready(cached)
+            return
+        
         self.deviceTree.clear()
         self.statusLabel.setText("正在获取设备文件列表...")
         
@@ -1559,104 +2258,144 @@ class FileManagerDialog(QDialog):
             self.device_id, 
             self.device_current_path,
             self.connection_mode,
-            self.d
+            self.d,
+            refresh=refresh
         )
         self.list_thread.finished_signal.connect(self._on_device_list_ready)
         self.list_thread.error_signal.connect(self._on_list_error)
-        self.list_thread.start()
+        thread = self.list_thread
+        self._running_list_threads.add(thread)
+        thread.finished.connect(lambda: self._running_list_threads.discard(thread))
+        thread.start()
+    
+    def _reload_device_files(self):
+        """当前目录（含子目录）的缓存失效后重新获取，用于刷新按钮和本程序修改设备文件之后"""
+        device_dir_cache.invalidate(self.device_id, self.device_current_path)
+        self._refresh_device_files(refresh=True)
     
     def _on_device_list_ready(self, files):
         """设备文件列表准备好"""
-        logger.info(f"_on_device_list_ready 被调用，文件数量: {len(files)}")
-        self.deviceTree.clear()
-        
-        for file_info in files:
-            name = file_info['name']
-            is_dir = file_info['is_dir']
-            is_link = file_info['is_link']
-            link_target = file_info.get('link_target')
-            
-            # 显示名称：符号链接显示为 name -> target
-            display_name = f"{name} -> {link_target}" if is_link and link_target else name
-            
-            # 符号链接的大小通常很小，如果是链接到目录，显示 <LINK>
-            if is_link:
-                size_str = '<LINK>' if not file_info['size'].isdigit() or int(file_info['size']) < 100 else self._format_size(int(file_info['size']))
-            else:
-                size_str = '<DIR>' if is_dir else self._format_size(int(file_info['size']) if file_info['size'].isdigit() else 0)
-            
-            item = QTreeWidgetItem([
-                display_name,
-                size_str,
-                file_info['permissions'],
-                file_info['date']
-            ])
-            item.setData(0, Qt.UserRole, file_info)
-            
-            # 设置图标
-            if is_link:
-                # 符号链接使用链接图标
-                item.setIcon(0, self.style().standardIcon(self.style().SP_FileLinkIcon))
-            elif is_dir:
-                item.setIcon(0, self.style().standardIcon(self.style().SP_DirIcon))
-            else:
-                item.setIcon(0, self.style().standardIcon(self.style().SP_FileIcon))
-            
-            self.deviceTree.addTopLevelItem(item)
+        # 忽略已切换到其他目录的旧请求结果
+        if isinstance(self.sender(), DeviceListThread) and self.sender() is not self.list_thread:
+            return
+        self.deviceTree.file_model.set_files(files)
         
         self.devicePathEdit.setText(self.device_current_path)
         self.statusLabel.setText(f"已加载 {len(files)} 个项目")
+        
+        # 后台预取子目录，进入时直接命中缓存
+        use_u2 = (self.connection_mode == 'u2' and self.d is not None)
+        device_dir_cache.prefetch(self.device_id, self.device_current_path, files, self.d if use_u2 else None)
     
     def _on_list_error(self, error_msg):
         """列表获取错误"""
+        if self.sender() is not self.list_thread:
+            return
         self.statusLabel.setText(error_msg)
         QMessageBox.warning(self, "错误", error_msg)
     
-    def _refresh_local_files(self):
-        """刷新本地文件列表"""
-        self.localTree.clear()
+    def _refresh_local_files(self, refresh=False):
+        """
+        刷新本地文件列表（后台读取，边读边显示）
         
-        try:
-            # 添加返回上级目录
-            # if self.local_current_path != os.path.dirname(self.local_current_path):
-            #     parent_item = QTreeWidgetItem(['.. (上级目录)', '', '', ''])
-            #     parent_item.setData(0, Qt.UserRole, 'parent')
-            #     parent_item.setIcon(0, self.style().standardIcon(self.style().SP_DirIcon))
-            #     self.localTree.addTopLevelItem(parent_item)
-            
-            items = os.listdir(self.local_current_path)
-            for item_name in items:
-                item_path = os.path.join(self.local_current_path, item_name)
-                try:
-                    stat_info = os.stat(item_path)
-                    is_dir = stat.S_ISDIR(stat_info.st_mode)
-                    size = stat_info.st_size if not is_dir else 0
-                    mod_time = datetime.fromtimestamp(stat_info.st_mtime).strftime('%Y-%m-%d %H:%M')
-                    
-                    size_str = '<DIR>' if is_dir else self._format_size(size)
-                    file_type = '文件夹' if is_dir else os.path.splitext(item_name)[1] or '文件'
-                    
-                    item = QTreeWidgetItem([
-                        item_name,
-                        size_str,
-                        file_type,
-                        mod_time
-                    ])
-                    item.setData(0, Qt.UserRole, {'path': item_path, 'is_dir': is_dir, 'name': item_name})
-                    
-                    if is_dir:
-                        item.setIcon(0, self.style().standardIcon(self.style().SP_DirIcon))
-                    else:
-                        item.setIcon(0, self.style().standardIcon(self.style().SP_FileIcon))
-                    
-                    self.localTree.addTopLevelItem(item)
-                except PermissionError:
-                    continue
-            
-            self.localPathEdit.setText(self.local_current_path)
-            self.statusLabel.setText(f"本地: {len(items)} 个项目")
-        except Exception as e:
-            self.statusLabel.setText(f"读取本地目录失败: {str(e)}")
+        Args:
+            refresh: 忽略目录列表缓存重新读取
+        """
+        path = self.local_current_path
+        self._watch_local_directory(path)
+        self.localPathEdit.setText(path)
+        
+        cached = None if refresh else local_listing_cache.get(path)
+        if cached is not None:
+            self._stop_local_list_thread()
+            self.localTree.file_model.set_files(cached)
+            self._on_local_list_shown(len(cached))
+            return
+        
+        self.localTree.clear()
+        self._start_local_list_thread(path, incremental=False)
+    
+    def _reload_local_files(self):
+        """忽略缓存重新读取当前本地目录（刷新按钮）"""
+        self._refresh_local_files(refresh=True)
+    
+    def _schedule_local_update(self):
+        """当前本地目录有变化，稍后增量更新（合并短时间内的多次变化）"""
+        self._local_update_timer.start()
+    
+    def _update_local_files(self):
+        """重新读取当前本地目录，只更新有变化的行"""
+        if self.local_list_thread is not None and self.local_list_thread.isRunning():
+            # 正在读取时等读完再更新，读取开始前的变化可能没有包含在结果中
+            self._schedule_local_update()
+            return
+        local_listing_cache.invalidate(self.local_current_path)
+        self._start_local_list_thread(self.local_current_path, incremental=True)
+    
+    def _start_local_list_thread(self, path, incremental):
+        self._stop_local_list_thread()
+        self.local_list_thread = LocalListThread(path, incremental)
+        self.local_list_thread.batch_signal.connect(self._on_local_batch_ready)
+        self.local_list_thread.finished_signal.connect(self._on_local_list_ready)
+        self.local_list_thread.error_signal.connect(self._on_local_list_error)
+        thread = self.local_list_thread
+        self._running_list_threads.add(thread)
+        thread.finished.connect(lambda: self._running_list_threads.discard(thread))
+        thread.start()
+    
+    def _stop_local_list_thread(self):
+        if self.local_list_thread is not None:
+            self.local_list_thread.cancel()
+            self.local_list_thread = None
+    
+    def _on_local_batch_ready(self, files):
+        """一批本地条目读取完成"""
+        if self.sender() is not self.local_list_thread:
+            return
+        self.localTree.file_model.append_files(files)
+        self.statusLabel.setText(f"正在读取本地目录: {self.localTree.file_model.rowCount()} 个项目...")
+    
+    def _on_local_list_ready(self, files):
+        """本地目录读取完成"""
+        thread = self.sender()
+        if thread is not self.local_list_thread:
+            return
+        local_listing_cache.put(thread.path, files, thread.mtime_ns)
+        if thread.incremental:
+            self.localTree.file_model.apply_files(files)
+        else:
+            # 分批追加的条目读完后统一排序
+            self.localTree.file_model.set_files(files)
+        self._on_local_list_shown(len(files))
+    
+    def _on_local_list_shown(self, count):
+        self.statusLabel.setText(f"本地: {count} 个项目")
+        if self._pending_local_selection:
+            self.localTree.select_name(self._pending_local_selection)
+            self._pending_local_selection = None
+    
+    def _on_local_list_error(self, error_msg):
+        """本地目录读取错误"""
+        if self.sender() is not self.local_list_thread:
+            return
+        self.statusLabel.setText(error_msg)
+    
+    def _watch_local_directory(self, path):
+        """只监视当前显示的本地目录"""
+        if self._local_watcher is None:
+            return
+        watched = self._local_watcher.directories()
+        if watched == [path]:
+            return
+        if watched:
+            self._local_watcher.removePaths(watched)
+        if os.path.isdir(path):
+            self._local_watcher.addPath(path)
+    
+    def _on_local_directory_changed(self, path):
+        """监视的本地目录有变化（包括其他程序的修改）"""
+        if os.path.normcase(path) == os.path.normcase(self.local_current_path):
+            self._schedule_local_update()
     
     def _format_size(self, size):
         """格式化文件大小"""
@@ -1709,9 +2448,9 @@ class FileManagerDialog(QDialog):
             self.localPathEdit.setText(dir_path)
             self._refresh_local_files()
     
-    def _on_device_item_double_clicked(self, item, column):
+    def _on_device_item_double_clicked(self, index):
         """设备文件双击事件"""
-        data = item.data(0, Qt.UserRole)
+        data = index.data(Qt.UserRole)
         
         if isinstance(data, dict):
             is_dir = data.get('is_dir')
@@ -1726,9 +2465,9 @@ class FileManagerDialog(QDialog):
                     self.device_current_path = self.device_current_path + '/' + data['name']
                 self._refresh_device_files()
     
-    def _on_local_item_double_clicked(self, item, column):
+    def _on_local_item_double_clicked(self, index):
         """本地文件双击事件"""
-        data = item.data(0, Qt.UserRole)
+        data = index.data(Qt.UserRole)
         
         if isinstance(data, dict) and data.get('is_dir'):
             # 进入目录
@@ -1737,7 +2476,7 @@ class FileManagerDialog(QDialog):
     
     def _show_device_context_menu(self, pos):
         """显示设备文件右键菜单"""
-        selected_items = self.deviceTree.selectedItems()
+        selected_files = self.deviceTree.selected_files()
         
         menu = QMenu(self)
         
@@ -1748,14 +2487,13 @@ class FileManagerDialog(QDialog):
             menu.addAction(go_up_action)
             menu.addSeparator()
         
-        if not selected_items:
+        if not selected_files:
             menu.exec_(self.deviceTree.viewport().mapToGlobal(pos))
             return
         
         # 单选模式
-        if len(selected_items) == 1:
-            item = selected_items[0]
-            data = item.data(0, Qt.UserRole)
+        if len(selected_files) == 1:
+            data = selected_files[0]
             if not isinstance(data, dict):
                 return
             
@@ -1766,6 +2504,12 @@ class FileManagerDialog(QDialog):
             download_action.triggered.connect(lambda: self._download_selected())
             menu.addAction(download_action)
             
+            # 增量同步到本地（仅文件夹）
+            if is_dir:
+                sync_action = QAction("🔄 同步到本地（只传输有变化的文件）", self)
+                sync_action.triggered.connect(lambda: self._sync_folder_to_local(data))
+                menu.addAction(sync_action)
+            
             menu.addSeparator()
             
             # 重命名
@@ -1799,14 +2543,14 @@ class FileManagerDialog(QDialog):
         else:
             # 多选模式
             # 批量下载
-            batch_download_action = QAction(f"⬇ 批量下载 ({len(selected_items)}项)", self)
+            batch_download_action = QAction(f"⬇ 批量下载 ({len(selected_files)}项)", self)
             batch_download_action.triggered.connect(self._download_selected)
             menu.addAction(batch_download_action)
             
             menu.addSeparator()
             
             # 批量删除
-            batch_delete_action = QAction(f"🗑 批量删除 ({len(selected_items)}项)", self)
+            batch_delete_action = QAction(f"🗑 批量删除 ({len(selected_files)}项)", self)
             batch_delete_action.triggered.connect(self._delete_selected_device_items)
             menu.addAction(batch_delete_action)
         
@@ -1814,7 +2558,7 @@ class FileManagerDialog(QDialog):
     
     def _show_local_context_menu(self, pos):
         """显示本地文件右键菜单"""
-        item = self.localTree.itemAt(pos)
+        data = self.localTree.file_at(pos)
         
         menu = QMenu(self)
         
@@ -1826,7 +2570,7 @@ class FileManagerDialog(QDialog):
             menu.addAction(go_up_action)
             menu.addSeparator()
         
-        if not item:
+        if data is None:
             # 空白处右键 - 显示新建选项
             new_folder_action = QAction("📁 新建文件夹", self)
             new_folder_action.triggered.connect(self._create_local_folder)
@@ -1846,10 +2590,6 @@ class FileManagerDialog(QDialog):
             menu.exec_(self.localTree.viewport().mapToGlobal(pos))
             return
         
-        data = item.data(0, Qt.UserRole)
-        if data == 'parent':
-            return
-        
         if isinstance(data, dict):
             is_dir = data.get('is_dir', False)
             file_path = data.get('path', '')
@@ -1859,6 +2599,12 @@ class FileManagerDialog(QDialog):
             upload_action.triggered.connect(lambda: self._upload_item(data))
             menu.addAction(upload_action)
             
+            # 增量同步到设备（仅文件夹）
+            if is_dir:
+                sync_action = QAction("🔄 同步到设备（只传输有变化的文件）", self)
+                sync_action.triggered.connect(lambda: self._sync_folder_to_device(data))
+                menu.addAction(sync_action)
+            
             menu.addSeparator()
             
             # 打开文件/文件夹
@@ -1899,16 +2645,15 @@ class FileManagerDialog(QDialog):
     
     def _download_selected(self):
         """下载选中的设备文件或文件夹"""
-        selected_items = self.deviceTree.selectedItems()
-        if not selected_items:
+        selected_files = self.deviceTree.selected_files()
+        if not selected_files:
             QMessageBox.information(self, "提示", "请先选择要下载的文件或文件夹")
             return
         
         # 分离文件和文件夹
         file_paths = []
         folder_items = []
-        for item in selected_items:
-            data = item.data(0, Qt.UserRole)
+        for data in selected_files:
             if isinstance(data, dict):
                 if data.get('is_dir'):
                     folder_items.append(data)
@@ -1938,7 +2683,7 @@ class FileManagerDialog(QDialog):
             if file_paths:
                 if len(file_paths) == 1:
                     # 单文件使用单文件下载
-                    self._download_item(selected_items[0].data(0, Qt.UserRole))
+                    self._download_item(selected_files[0])
                 else:
                     # 多文件批量下载
                     self._download_files_batch(file_paths)
@@ -1984,16 +2729,15 @@ class FileManagerDialog(QDialog):
     
     def _upload_selected(self):
         """上传选中的本地文件或文件夹"""
-        selected_items = self.localTree.selectedItems()
-        if not selected_items:
+        selected_files = self.localTree.selected_files()
+        if not selected_files:
             QMessageBox.information(self, "提示", "请先选择要上传的文件或文件夹")
             return
         
         # 分离文件和文件夹
         file_paths = []
         folder_paths = []
-        for item in selected_items:
-            data = item.data(0, Qt.UserRole)
+        for data in selected_files:
             if isinstance(data, dict):
                 if data.get('is_dir'):
                     folder_paths.append(data['path'])
@@ -2102,38 +2846,103 @@ class FileManagerDialog(QDialog):
         self.batch_transfer_thread.finished_signal.connect(self._on_batch_upload_finished)
         self.batch_transfer_thread.start()
     
-    def _do_upload_folder(self, folder_path):
-        """执行文件夹上传"""
+    def _ask_delete_extraneous(self, target_desc):
+        """
+        询问增量同步时是否删除目标端多余的文件
+        
+        Returns:
+            True/False；用户取消时返回 None
+        """
+        reply = QMessageBox.question(
+            self, "同步文件夹",
+            f"只传输新增或有变化的文件。\n\n是否同时删除{target_desc}中多余的文件和文件夹？",
+            QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
+            QMessageBox.No
+        )
+        if reply == QMessageBox.Cancel:
+            return None
+        return reply == QMessageBox.Yes
+    
+    def _sync_folder_to_device(self, file_info):
+        """把本地文件夹增量同步到设备当前目录"""
+        delete_extraneous = self._ask_delete_extraneous("设备上同名文件夹")
+        if delete_extraneous is None:
+            return
+        self._do_upload_folder(file_info['path'], delta=True, delete_extraneous=delete_extraneous)
+    
+    def _sync_folder_to_local(self, file_info):
+        """把设备文件夹增量同步到本地当前目录"""
+        delete_extraneous = self._ask_delete_extraneous("本地同名文件夹")
+        if delete_extraneous is None:
+            return
+        device_folder = self._join_device_path(self.device_current_path, file_info['name'])
+        self._do_download_folder(device_folder, self.local_current_path,
+                                 delta=True, delete_extraneous=delete_extraneous)
+    
+    def _do_upload_folder(self, folder_path, delta=False, delete_extraneous=False,
+                          device_folder=None, resume_job=None):
+        """执行文件夹上传（delta 为 True 时增量同步；resume_job 非 None 时恢复未完成的任务）"""
         self.progressBar.setVisible(True)
         self.progressBar.setRange(0, 100)
         self.progressBar.setValue(0)
-        self.statusLabel.setText(f"正在上传文件夹...")
+        self.statusLabel.setText(f"正在同步文件夹..." if delta else f"正在上传文件夹...")
         
         self.folder_upload_thread = FolderUploadThread(
-            self.device_id, folder_path, self.device_current_path,
-            self.connection_mode, self.d
+            self.device_id, folder_path, device_folder or self.device_current_path,
+            self.connection_mode, self.d, delta=delta, delete_extraneous=delete_extraneous,
+            resume_job=resume_job
         )
         self.folder_upload_thread.progress_signal.connect(self.statusLabel.setText)
         self.folder_upload_thread.progress_percent.connect(self.progressBar.setValue)
         self.folder_upload_thread.finished_signal.connect(self._on_folder_upload_finished)
         self.folder_upload_thread.start()
     
+    def _offer_resume_uploads(self):
+        """当前设备有未完成的文件夹上传任务时，询问是否继续（每台设备每次打开只询问一次）"""
+        if not self.device_id or self.device_id in self._resume_offered:
+            return
+        self._resume_offered.add(self.device_id)
+        if self.folder_upload_thread is not None and self.folder_upload_thread.isRunning():
+            return
+        jobs = find_unfinished_jobs("folder_upload", self.device_id)
+        if not jobs:
+            return
+        # 同一时间只运行一个上传线程，先恢复最近的任务
+        job = jobs[-1]
+        reply = QMessageBox.question(
+            self, "继续上传",
+            f"发现未完成的文件夹上传任务：\n\n{job.describe()}\n"
+            f"{job.params.get('local_folder')} → {job.params.get('device_folder')}\n\n"
+            f"是否继续上传？选择“丢弃”将不再提示该任务。",
+            QMessageBox.Yes | QMessageBox.No | QMessageBox.Discard,
+            QMessageBox.Yes
+        )
+        if reply == QMessageBox.Discard:
+            job.discard()
+        elif reply == QMessageBox.Yes:
+            if not os.path.isdir(job.params.get('local_folder') or ''):
+                QMessageBox.warning(self, "继续上传", f"本地文件夹不存在: {job.params.get('local_folder')}")
+                return
+            self._do_upload_folder(job.params['local_folder'], delta=job.params.get('delta', False),
+                                   delete_extraneous=job.params.get('delete_extraneous', False),
+                                   device_folder=job.params.get('device_folder'), resume_job=job)
+    
     def _on_folder_upload_finished(self, success_count, fail_count, skip_count):
         """文件夹上传完成"""
         self.progressBar.setVisible(False)
-        self.statusLabel.setText(f"文件夹上传完成: 成功 {success_count} 个, 失败 {fail_count} 个")
-        self._refresh_device_files()
+        self.statusLabel.setText(f"文件夹上传完成: 成功 {success_count} 个, 失败 {fail_count} 个, 跳过 {skip_count} 个")
+        self._reload_device_files()
     
-    def _do_download_folder(self, device_folder, local_folder):
-        """执行文件夹下载"""
+    def _do_download_folder(self, device_folder, local_folder, delta=False, delete_extraneous=False):
+        """执行文件夹下载（delta 为 True 时增量同步）"""
         self.progressBar.setVisible(True)
         self.progressBar.setRange(0, 100)
         self.progressBar.setValue(0)
-        self.statusLabel.setText(f"正在下载文件夹...")
+        self.statusLabel.setText(f"正在同步文件夹..." if delta else f"正在下载文件夹...")
         
         self.folder_download_thread = FolderDownloadThread(
             self.device_id, device_folder, local_folder,
-            self.connection_mode, self.d
+            self.connection_mode, self.d, delta=delta, delete_extraneous=delete_extraneous
         )
         self.folder_download_thread.progress_signal.connect(self.statusLabel.setText)
         self.folder_download_thread.progress_percent.connect(self.progressBar.setValue)
@@ -2144,19 +2953,19 @@ class FileManagerDialog(QDialog):
         """文件夹下载完成"""
         self.progressBar.setVisible(False)
         self.statusLabel.setText(f"文件夹下载完成: 成功 {success_count} 个, 失败 {fail_count} 个, 跳过 {skip_count} 个")
-        self._refresh_local_files()
+        self._schedule_local_update()
     
     def _on_batch_upload_finished(self, success_count, fail_count):
         """批量上传完成"""
         self.progressBar.setVisible(False)
         self.statusLabel.setText(f"上传完成: 成功 {success_count} 个, 失败 {fail_count} 个")
-        self._refresh_device_files()
+        self._reload_device_files()
     
     def _on_batch_transfer_finished(self, success_count, fail_count):
         """批量下载完成"""
         self.progressBar.setVisible(False)
         self.statusLabel.setText(f"下载完成: 成功 {success_count} 个, 失败 {fail_count} 个")
-        self._refresh_local_files()
+        self._schedule_local_update()
     
     def _select_local_file(self):
         """选择本地文件或文件夹"""
@@ -2180,13 +2989,9 @@ class FileManagerDialog(QDialog):
             )
             if file_path:
                 self.local_current_path = os.path.dirname(file_path)
+                # 读取完成后选中刚选择的文件
+                self._pending_local_selection = os.path.basename(file_path)
                 self._refresh_local_files()
-                # 选中刚选择的文件
-                for i in range(self.localTree.topLevelItemCount()):
-                    item = self.localTree.topLevelItem(i)
-                    if item.text(0) == os.path.basename(file_path):
-                        self.localTree.setCurrentItem(item)
-                        break
         elif action == folder_action:
             # 选择文件夹
             folder_path = QFileDialog.getExistingDirectory(
@@ -2208,7 +3013,10 @@ class FileManagerDialog(QDialog):
         self.statusLabel.setText(message)
         
         if success:
-            self._refresh_local_files()
+            if self.transfer_thread is not None and self.transfer_thread.transfer_type == 'upload':
+                self._reload_device_files()
+            else:
+                self._schedule_local_update()
         else:
             QMessageBox.warning(self, "传输失败", message)
     
@@ -2301,7 +3109,7 @@ class FileManagerDialog(QDialog):
                 self._clipboard_files = []
             
             self.statusLabel.setText(f"粘贴完成: 成功 {success_count} 个, 失败 {fail_count} 个")
-            self._refresh_local_files()
+            self._schedule_local_update()
         except Exception as e:
             QMessageBox.warning(self, "粘贴失败", str(e))
     
@@ -2317,7 +3125,7 @@ class FileManagerDialog(QDialog):
             try:
                 os.rename(old_path, new_path)
                 self.statusLabel.setText(f"重命名成功: {old_name} -> {new_name}")
-                self._refresh_local_files()
+                self._schedule_local_update()
             except Exception as e:
                 QMessageBox.warning(self, "重命名失败", f"无法重命名: {str(e)}")
     
@@ -2342,7 +3150,7 @@ class FileManagerDialog(QDialog):
                     os.remove(path)
                 
                 self.statusLabel.setText(f"删除成功: {name}")
-                self._refresh_local_files()
+                self._schedule_local_update()
             except Exception as e:
                 QMessageBox.warning(self, "删除失败", f"无法删除: {str(e)}")
     
@@ -2356,7 +3164,7 @@ class FileManagerDialog(QDialog):
             try:
                 os.makedirs(folder_path, exist_ok=False)
                 self.statusLabel.setText(f"文件夹创建成功: {folder_name}")
-                self._refresh_local_files()
+                self._schedule_local_update()
             except FileExistsError:
                 QMessageBox.warning(self, "创建失败", f"文件夹已存在: {folder_name}")
             except Exception as e:
@@ -2379,7 +3187,7 @@ class FileManagerDialog(QDialog):
                     pass
                 
                 self.statusLabel.setText(f"文件创建成功: {file_name}")
-                self._refresh_local_files()
+                self._schedule_local_update()
                 
                 # 自动打开编辑
                 file_info = {'path': file_path, 'name': file_name, 'is_dir': False}
@@ -2401,7 +3209,7 @@ class FileManagerDialog(QDialog):
             
             # 显示编辑对话框
             dialog = LocalTextEditorDialog(self, file_path, file_name, content)
-            dialog.saved_signal.connect(self._refresh_local_files)
+            dialog.saved_signal.connect(self._schedule_local_update)
             dialog.exec_()
         except Exception as e:
             QMessageBox.warning(self, "打开失败", f"无法打开文件: {str(e)}")
@@ -2429,7 +3237,7 @@ class FileManagerDialog(QDialog):
         """删除完成"""
         self.statusLabel.setText(message)
         if success:
-            self._refresh_device_files()
+            self._reload_device_files()
         else:
             QMessageBox.warning(self, "删除失败", message)
     
@@ -2520,7 +3328,7 @@ class FileManagerDialog(QDialog):
         """权限修改完成"""
         self.statusLabel.setText(message)
         if success:
-            self._refresh_device_files()
+            self._reload_device_files()
             QMessageBox.information(self, "操作成功", message)
         else:
             QMessageBox.warning(self, "权限修改失败", message)
@@ -2543,7 +3351,7 @@ class FileManagerDialog(QDialog):
                         raise Exception(result.stderr)
                 
                 self.statusLabel.setText(f"文件夹创建成功: {folder_name}")
-                self._refresh_device_files()
+                self._reload_device_files()
             except Exception as e:
                 QMessageBox.warning(self, "创建失败", f"创建文件夹失败: {str(e)}")
     
@@ -2569,18 +3377,18 @@ class FileManagerDialog(QDialog):
         """重命名完成"""
         self.statusLabel.setText(message)
         if success:
-            self._refresh_device_files()
+            self._reload_device_files()
         else:
             QMessageBox.warning(self, "重命名失败", message)
     
     def _delete_selected_device_items(self):
         """批量删除选中的设备文件"""
-        selected_items = self.deviceTree.selectedItems()
-        if not selected_items:
+        selected_files = self.deviceTree.selected_files()
+        if not selected_files:
             return
         
         # 确认删除
-        count = len(selected_items)
+        count = len(selected_files)
         reply = QMessageBox.question(
             self, '确认批量删除',
             f"确定要删除选中的 {count} 个项目吗？\n此操作不可撤销！",
@@ -2594,8 +3402,7 @@ class FileManagerDialog(QDialog):
         success_count = 0
         fail_count = 0
         
-        for item in selected_items:
-            data = item.data(0, Qt.UserRole)
+        for data in selected_files:
             if not isinstance(data, dict):
                 continue
             
@@ -2625,13 +3432,21 @@ class FileManagerDialog(QDialog):
                 logger.error(f"删除失败: {file_name} - {str(e)}")
         
         self.statusLabel.setText(f"删除完成: 成功 {success_count} 个, 失败 {fail_count} 个")
-        self._refresh_device_files()
+        self._reload_device_files()
     
     def _preview_text_file(self, file_info):
-        """预览/编辑文本文件"""
+        """预览/编辑文本文件（超过 file_manager.preview_full_load_max 的文件分页只读预览）"""
         file_name = file_info.get('name', '')
         file_path = self._join_device_path(self.device_current_path, file_name)
         
+        size = file_info.get('size', '')
+        if size.isdigit() and int(size) > config_manager.get("file_manager.preview_full_load_max", 1024 * 1024):
+            self.statusLabel.setText(f"分页预览: {file_name}")
+            dialog = PagedTextViewerDialog(self, file_path, file_name,
+                                           self.device_id, self.connection_mode, self.d)
+            dialog.exec_()
+            return
+        
         self.statusLabel.setText(f"正在读取文件: {file_name}")
         
         self.text_read_thread = TextReadThread(
@@ -2657,7 +3472,7 @@ class FileManagerDialog(QDialog):
         # 显示文本编辑对话框
         dialog = TextPreviewDialog(self, file_path, file_name, content, 
                                    self.device_id, self.connection_mode, self.d)
-        dialog.saved_signal.connect(self._refresh_device_files)
+        dialog.saved_signal.connect(self._reload_device_files)
         dialog.exec_()
     
     def closeEvent(self, event):
@@ -2803,6 +3618,236 @@ class TextPreviewDialog(QDialog):
         event.accept()
 
 
+class FilePagerTask(QThread):
+    """在后台执行一次分页读取操作（打开、翻页、跟踪末尾、搜索）"""
+    finished_signal = pyqtSignal(object)  # 操作结果
+    error_signal = pyqtSignal(str)  # 错误信息
+    progress_signal = pyqtSignal(int)  # 搜索进度百分比
+    
+    def __init__(self, operation, *args):
+        super().__init__()
+        self.operation = operation
+        self.args = args
+        self.cancelled = False
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def report_progress(self, done, total):
+        self.progress_signal.emit(int(done * 100 / total) if total else 100)
+    
+    def run(self):
+        try:
+            self.finished_signal.emit(self.operation(*self.args))
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
+
+class PagedTextViewerDialog(QDialog):
+    """大文件分页预览对话框（只读）- 按页读取设备文件，支持跟踪末尾和逐块搜索"""
+    
+    def __init__(self, parent, file_path, file_name, device_id, connection_mode, d):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.file_name = file_name
+        use_u2 = (connection_mode == 'u2' and d is not None)
+        self.pager = RemoteFilePager(device_id, file_path, d if use_u2 else None)
+        self.current_page = 0
+        self.task = None
+        self._search_from = 0  # 下一次搜索的起始偏移
+        
+        self.setWindowTitle(f"预览: {file_name}")
+        self.setMinimumSize(700, 500)
+        self.resize(900, 600)
+        apply_dialog_style(self)
+        
+        from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout
+        layout = QVBoxLayout(self)
+        
+        # 文件路径显示
+        path_label = QLabel(f"📄 {file_path}")
+        path_label.setStyleSheet("color: #5a9bd5; font-size: 11px;")
+        layout.addWidget(path_label)
+        
+        # 搜索栏
+        search_layout = QHBoxLayout()
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("搜索内容")
+        self.search_edit.returnPressed.connect(self._search_next)
+        self.search_edit.textChanged.connect(self._reset_search)
+        search_layout.addWidget(self.search_edit, 1)
+        self.ignore_case_check = QCheckBox("忽略大小写")
+        search_layout.addWidget(self.ignore_case_check)
+        btn_search = QPushButton("🔍 查找下一个")
+        btn_search.clicked.connect(self._search_next)
+        search_layout.addWidget(btn_search)
+        layout.addLayout(search_layout)
+        
+        # 文本显示（只读）
+        self.text_edit = QPlainTextEdit()
+        self.text_edit.setReadOnly(True)
+        self.text_edit.setLineWrapMode(QPlainTextEdit.NoWrap)
+        font = self.text_edit.font()
+        font.setFamily("Consolas")
+        font.setPointSize(10)
+        self.text_edit.setFont(font)
+        layout.addWidget(self.text_edit, 1)
+        
+        # 翻页栏
+        page_layout = QHBoxLayout()
+        for text, slot in (("⏮ 首页", self._first_page), ("◀ 上一页", self._prev_page),
+                           ("▶ 下一页", self._next_page), ("⏭ 末页", self._last_page)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            page_layout.addWidget(button)
+        self.page_label = QLabel("")
+        page_layout.addWidget(self.page_label)
+        page_layout.addStretch()
+        self.follow_check = QCheckBox("跟踪末尾")
+        self.follow_check.setToolTip("定时检查文件是否增长，显示最后一页")
+        self.follow_check.toggled.connect(self._on_follow_toggled)
+        page_layout.addWidget(self.follow_check)
+        btn_close = QPushButton("关闭")
+        btn_close.clicked.connect(self.close)
+        page_layout.addWidget(btn_close)
+        layout.addLayout(page_layout)
+        
+        # 状态栏
+        self.status_label = QLabel("正在读取...")
+        self.status_label.setStyleSheet("color: #909090;")
+        layout.addWidget(self.status_label)
+        
+        self.follow_timer = QTimer(self)
+        self.follow_timer.setInterval(config_manager.get("file_manager.preview_follow_interval_ms", 2000))
+        self.follow_timer.timeout.connect(self._follow_tick)
+        
+        self._run(self._open, self._on_page_loaded)
+    
+    # ---------- 后台操作 ----------
+    
+    def _run(self, operation, on_finished, *args):
+        """在后台执行读取操作，同一时间只执行一个；返回是否已开始"""
+        if self.task is not None and self.task.isRunning():
+            return False
+        self.task = FilePagerTask(operation, *args)
+        self.task.finished_signal.connect(on_finished)
+        self.task.error_signal.connect(self._on_task_error)
+        self.task.start()
+        return True
+    
+    def _on_task_error(self, error_msg):
+        self.status_label.setText(f"读取失败: {error_msg}")
+    
+    def _open(self):
+        self.pager.refresh_size()
+        return self._load_page(0)
+    
+    def _load_page(self, page):
+        return page, self.pager.read_page(page)
+    
+    def _show_page(self, page):
+        page = max(0, min(page, self.pager.page_count - 1))
+        if not self._run(self._load_page, self._on_page_loaded, page):
+            self.status_label.setText("正在读取，请稍候...")
+    
+    def _on_page_loaded(self, result, scroll_to_end=False):
+        page, data = result
+        self.current_page = page
+        self.text_edit.setPlainText(self.pager.decode(data))
+        if scroll_to_end:
+            self.text_edit.moveCursor(QTextCursor.End)
+        self.page_label.setText(f"第 {page + 1} / {self.pager.page_count} 页")
+        self.status_label.setText(f"文件大小: {self.pager.size} 字节")
+    
+    # ---------- 翻页 ----------
+    
+    def _first_page(self):
+        self._show_page(0)
+    
+    def _prev_page(self):
+        self._show_page(self.current_page - 1)
+    
+    def _next_page(self):
+        self._show_page(self.current_page + 1)
+    
+    def _last_page(self):
+        self._show_page(self.pager.page_count - 1)
+    
+    # ---------- 跟踪末尾 ----------
+    
+    def _on_follow_toggled(self, checked):
+        if checked:
+            self._follow_tick()
+            self.follow_timer.start()
+        else:
+            self.follow_timer.stop()
+    
+    def _follow(self):
+        grown = self.pager.refresh_size()
+        last_page = self.pager.page_count - 1
+        if not grown and self.current_page == last_page:
+            return None
+        return self._load_page(last_page)
+    
+    def _follow_tick(self):
+        self._run(self._follow, self._on_follow_loaded)
+    
+    def _on_follow_loaded(self, result):
+        if result is not None:
+            self._on_page_loaded(result, scroll_to_end=True)
+    
+    # ---------- 搜索 ----------
+    
+    def _reset_search(self):
+        self._search_from = 0
+    
+    def _search_next(self):
+        text = self.search_edit.text()
+        if not text:
+            return
+        pattern = text.encode('utf-8')
+        started = self._run(self._search, self._on_search_finished,
+                            pattern, self._search_from, self.ignore_case_check.isChecked())
+        if started:
+            self.task.progress_signal.connect(lambda percent: self.status_label.setText(f"正在搜索... {percent}%"))
+            self.status_label.setText("正在搜索...")
+    
+    def _search(self, pattern, start, ignore_case):
+        task = self.task
+        offset = self.pager.search(pattern, start, ignore_case,
+                                   progress_callback=task.report_progress, cancelled=lambda: task.cancelled)
+        if offset < 0:
+            return offset, pattern, None
+        return offset, pattern, self._load_page(offset // self.pager.chunk_size)
+    
+    def _on_search_finished(self, result):
+        offset, pattern, page_result = result
+        if page_result is None:
+            self.status_label.setText("已搜索到文件末尾，未找到" if self._search_from == 0 else "已搜索到文件末尾，下次从头开始")
+            self._search_from = 0
+            return
+        self._on_page_loaded(page_result)
+        self._search_from = offset + 1
+        # 选中匹配的文字
+        page_start = page_result[0] * self.pager.chunk_size
+        position = len(self.pager.decode(page_result[1][:offset - page_start]))
+        cursor = self.text_edit.textCursor()
+        cursor.setPosition(position)
+        cursor.setPosition(position + len(pattern.decode('utf-8')), QTextCursor.KeepAnchor)
+        self.text_edit.setTextCursor(cursor)
+        self.text_edit.centerCursor()
+        self.status_label.setText(f"找到匹配: 偏移 {offset}")
+    
+    def closeEvent(self, event):
+        """关闭事件"""
+        self.follow_timer.stop()
+        if self.task and self.task.isRunning():
+            self.task.cancel()
+            self.task.wait(3000)
+        self.pager.close()
+        event.accept()
+
+
 class LocalTextEditorDialog(QDialog):
     """本地文本文件编辑对话框"""
     
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+文件夹传输规划 - 一次取得设备目录树清单，再按清单传输
+
+功能：
+1. 一次遍历得到整个目录树（含大小）：优先在同一 sync 会话上逐目录 LIST，
+   不可用时用一条 `find ... -exec stat` 命令输出全部条目
+2. 清单条目格式统一为 {'rel_path', 'type', 'size', 'mtime'}，rel_path 以 / 分隔
+3. ByteProgress 汇总多个并行任务的已传输字节数，按字节计算总体进度
+4. tar 流式传输：设备端 `tar c`/`tar x` 经 adb exec-out/exec-in 与本地 tarfile 边读边解包、边打包边发送，
+   两端都不生成临时归档；可选 gzip/zstd 压缩（zstd 需要安装 zstandard）
+5. 增量同步：比较两端清单（大小 + 修改时间，可选 MD5），只传输新增或变化的文件，可选删除目标端多余的条目
+"""
+
+import os
+import sys
+import stat
+import shlex
+import hashlib
+import shutil
+import tarfile
+import threading
+import subprocess
+from collections import deque
+from itertools import chain
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+from Function_Moudle.device_capabilities import device_capabilities
+
+try:
+    from adb_utils import ADBUtils
+except ImportError:
+    ADBUtils = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 创建日志记录器
+logger = get_logger("ADBTools.FolderTransfer")
+
+ENTRY_FILE = 'file'
+ENTRY_DIR = 'dir'
+ENTRY_LINK = 'link'
+ENTRY_OTHER = 'other'
+
+# 目录不存在时 list_remote_tree_shell 输出的标记行
+_MISSING_DIR_MARKER = '__ADBTOOLS_NO_SUCH_DIR__'
+
+
+class DeviceShellError(Exception):
+    """设备端命令执行失败（退出码非 0）"""
+
+
+class RemoteListingError(DeviceShellError):
+    """无法取得设备端目录清单（目录不存在、不可读或遍历出错）"""
+
+
+def entry_type(mode: int) -> str:
+    """根据 st_mode 判断条目类型"""
+    if stat.S_ISDIR(mode):
+        return ENTRY_DIR
+    if stat.S_ISLNK(mode):
+        return ENTRY_LINK
+    if stat.S_ISREG(mode):
+        return ENTRY_FILE
+    return ENTRY_OTHER
+
+
+def join_device_path(root: str, rel_path: str) -> str:
+    """拼接设备端路径"""
+    if not rel_path:
+        return root
+    return root.rstrip('/') + '/' + rel_path
+
+
+def local_path_for(root: str, rel_path: str) -> str:
+    """清单中的相对路径对应的本地路径"""
+    return os.path.join(root, *rel_path.split('/')) if rel_path else root
+
+
+def list_remote_tree_sync(engine, root: str, missing_ok: bool = False) -> List[Dict]:
+    """
+    在同一 sync 会话上广度优先 LIST 整个目录树（不跟随符号链接）
+
+    sync LIST 对不存在或不可读的目录也只返回空列表，因此先 STAT 根目录确认其存在；
+    子目录不可读时无法察觉，需要可靠清单（如同步删除）时应使用 list_remote_tree_shell。
+
+    Args:
+        engine: SyncTransferEngine
+        root: 设备端目录
+        missing_ok: 根目录不存在时返回空列表，否则抛出 RemoteListingError
+
+    Returns:
+        清单条目列表（不含根目录本身）
+    """
+    mode, _, _ = engine.stat(root)
+    if not stat.S_ISDIR(mode):
+        if mode == 0 and missing_ok:
+            return []
+        raise RemoteListingError(f"设备上没有该目录: {root}")
+    entries = []
+    pending = deque([''])
+    while pending:
+        rel_dir = pending.popleft()
+        for item in engine.list(join_device_path(root, rel_dir)):
+            rel_path = f"{rel_dir}/{item['name']}" if rel_dir else item['name']
+            kind = entry_type(item['mode'])
+            entries.append({'rel_path': rel_path, 'type': kind, 'size': item['size'], 'mtime': item['mtime']})
+            if kind == ENTRY_DIR:
+                pending.append(rel_path)
+    return entries
+
+
+def remote_tree_command(root: str) -> str:
+    """一次列出整个目录树的设备端命令，每行输出: <十六进制 mode> <大小> <mtime> <路径>"""
+    return f"find {shlex.quote(root)} -exec stat -c '%f %s %Y %n' {{}} +"
+
+
+def parse_remote_tree_listing(output: str, root: str) -> List[Dict]:
+    """
+    解析 remote_tree_command 的输出
+
+    Returns:
+        清单条目列表（不含根目录本身）；无法解析的行（如权限错误提示）被忽略
+    """
+    prefix = root.rstrip('/') + '/'
+    entries = []
+    for line in output.splitlines():
+        parts = line.split(' ', 3)
+        if len(parts) != 4 or not parts[3].startswith(prefix):
+            continue
+        try:
+            mode = int(parts[0], 16)
+            size = int(parts[1])
+            mtime = int(parts[2])
+        except ValueError:
+            continue
+        entries.append({
+            'rel_path': parts[3][len(prefix):],
+            'type': entry_type(mode),
+            'size': size,
+            'mtime': mtime,
+        })
+    return entries
+
+
+class ByteProgress:
+    """线程安全的字节进度汇总，百分比变化时回调"""
+
+    def __init__(self, total_bytes: int, on_percent: Callable[[int], None]):
+        self.total_bytes = total_bytes
+        self.done_bytes = 0
+        self._on_percent = on_percent
+        self._last_percent = -1
+        self._lock = threading.Lock()
+
+    def add(self, count: int):
+        """累加已传输的字节数"""
+        if not count:
+            return
+        with self._lock:
+            self.done_bytes += count
+            percent = min(self.done_bytes * 100 // self.total_bytes, 100) if self.total_bytes else 0
+            if percent == self._last_percent:
+                return
+            self._last_percent = percent
+        self._on_percent(percent)
+
+    def file_callback(self) -> Callable[[int, int], None]:
+        """生成单个文件的进度回调（参数为该文件累计已传输字节数），转换为增量后累加"""
+        last = [0]
+
+        def callback(transferred: int, _total: int):
+            self.add(transferred - last[0])
+            last[0] = transferred
+        return callback
+
+
+def summarize(entries: List[Dict]) -> Dict[str, int]:
+    """统计清单：文件数、总字节数、目录数、跳过的条目数（符号链接等）"""
+    files = [entry for entry in entries if entry['type'] == ENTRY_FILE]
+    return {
+        'files': len(files),
+        'bytes': sum(entry['size'] for entry in files),
+        'dirs': sum(1 for entry in entries if entry['type'] == ENTRY_DIR),
+        'skipped': sum(1 for entry in entries if entry['type'] in (ENTRY_LINK, ENTRY_OTHER)),
+    }
+
+
+# ---------- 设备端命令 ----------
+
+def adb_executable() -> str:
+    """adb 可执行文件路径（与 ADBUtils 使用同一个，打包的 adb 不在 PATH 中时也能找到）"""
+    return ADBUtils.get_adb_path() if ADBUtils is not None else 'adb'
+
+
+def run_device_shell(device_id: str, command: str, d=None, timeout: float = 120, check: bool = False) -> str:
+    """
+    执行设备端 shell 命令并返回标准输出（u2 模式使用 d.shell）
+
+    Args:
+        check: 退出码非 0 时抛出 DeviceShellError（旧设备的 adb shell 不传回退出码，总是视为成功）
+    """
+    if d is not None:
+        result = d.shell(command)
+        output = result.output if hasattr(result, 'output') else str(result)
+        returncode, error = getattr(result, 'exit_code', 0) or 0, output
+    else:
+        result = subprocess.run([adb_executable(), '-s', device_id, 'shell', command],
+                                capture_output=True, text=True, encoding='utf-8',
+                                errors='ignore', timeout=timeout)
+        output, returncode, error = result.stdout, result.returncode, result.stderr
+    if check and returncode != 0:
+        raise DeviceShellError(f"设备命令失败 (退出码 {returncode}): {(error or '').strip()[:500]}")
+    return output
+
+
+def list_remote_tree_shell(device_id: str, root: str, d=None, missing_ok: bool = False) -> List[Dict]:
+    """
+    用一条 find 命令获取目录树清单
+
+    先确认根目录存在，find 遍历出错（如目录不可读）时抛出 RemoteListingError，
+    不会把读取失败当作空目录返回。
+
+    Args:
+        missing_ok: 根目录不存在时返回空列表，否则抛出 RemoteListingError
+    """
+    command = (f"if [ -d {shlex.quote(root)} ]; then {remote_tree_command(root)}; "
+               f"else echo {_MISSING_DIR_MARKER}; fi")
+    try:
+        output = run_device_shell(device_id, command, d, check=True)
+    except DeviceShellError as e:
+        raise RemoteListingError(f"读取设备目录失败: {root} | {e}")
+    if output.strip() == _MISSING_DIR_MARKER:
+        if missing_ok:
+            return []
+        raise RemoteListingError(f"设备上没有该目录: {root}")
+    return parse_remote_tree_listing(output, root)
+
+
+# ---------- tar 流式传输 ----------
+
+TAR_COMPRESSIONS = ('none', 'gzip', 'zstd')
+
+# 设备端压缩/解压命令（通过管道，不依赖 tar 内置的压缩选项）
+_DEVICE_COMPRESS = {'gzip': 'gzip -c', 'zstd': 'zstd -q -c'}
+_DEVICE_DECOMPRESS = {'gzip': 'gzip -dc', 'zstd': 'zstd -q -dc'}
+
+
+def probe_device_tar_tools(device_id: str) -> Set[str]:
+    """查询设备上可用的 tar、gzip、zstd 命令（来自设备能力缓存，每次连接只探测一次）"""
+    commands = device_capabilities.get(device_id)["commands"]
+    return {name for name in ('tar', 'gzip', 'zstd') if name in commands}
+
+
+def resolve_tar_compression(requested: str, device_tools: Set[str]) -> str:
+    """根据设备和本地环境选择实际使用的压缩方式，不支持时退回不压缩"""
+    if requested not in TAR_COMPRESSIONS or requested == 'none':
+        return 'none'
+    if requested not in device_tools:
+        logger.info(f"设备上没有 {requested}，tar 传输不压缩")
+        return 'none'
+    if requested == 'zstd' and zstandard is None:
+        logger.info("未安装 zstandard，tar 传输不压缩")
+        return 'none'
+    return requested
+
+
+def tar_create_command(device_folder: str, compression: str = 'none') -> str:
+    """设备端打包命令：归档内的根目录为文件夹名；错误输出丢弃，避免混入 exec-out 的数据流"""
+    parent, name = device_folder.rstrip('/').rsplit('/', 1)
+    command = f"tar cf - -C {shlex.quote(parent or '/')} {shlex.quote(name)} 2>/dev/null"
+    if compression in _DEVICE_COMPRESS:
+        command += f" | {_DEVICE_COMPRESS[compression]}"
+    return command
+
+
+def tar_extract_command(device_parent: str, compression: str = 'none') -> str:
+    """设备端解包命令（从标准输入读取归档，解包到 device_parent）"""
+    target = shlex.quote(device_parent)
+    extract = f"tar xf - -C {target}"
+    if compression in _DEVICE_DECOMPRESS:
+        extract = f"{_DEVICE_DECOMPRESS[compression]} | {extract}"
+    return f"mkdir -p {target} && {extract}"
+
+
+def _extract_kwargs() -> Dict:
+    # 支持解包过滤器的 Python 版本拒绝绝对路径、指向目录外的链接等危险条目
+    return {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+
+
+def _is_safe_member(member: tarfile.TarInfo) -> bool:
+    name = member.name.replace('\\', '/')
+    return not (name.startswith('/') or '..' in name.split('/'))
+
+
+def iter_tar_stream(stream, compression: str = 'none') -> Iterator[Tuple[tarfile.TarFile, tarfile.TarInfo]]:
+    """
+    边读边迭代 tar 数据流中的条目
+
+    Args:
+        stream: 可读的二进制流（如 adb exec-out 的标准输出）
+        compression: none/gzip/zstd
+
+    Yields:
+        (TarFile, TarInfo)，调用方须在取下一个条目前处理（解包）当前条目
+    """
+    mode = 'r|gz' if compression == 'gzip' else 'r|'
+    if compression == 'zstd':
+        stream = zstandard.ZstdDecompressor().stream_reader(stream)
+    with tarfile.open(fileobj=stream, mode=mode) as tar:
+        for member in tar:
+            yield tar, member
+
+
+def extract_tar_stream(stream, target_dir: str, compression: str = 'none',
+                       on_file: Optional[Callable[[str, int], None]] = None) -> Tuple[int, int]:
+    """
+    把 tar 数据流解包到 target_dir（归档内的第一级目录即 target_dir 本身）
+
+    Args:
+        stream: 可读的二进制流
+        target_dir: 本地目标目录
+        compression: none/gzip/zstd
+        on_file: 每解包一个普通文件后回调 (相对路径, 字节数)
+
+    Returns:
+        (解包的文件数, 跳过的条目数)，符号链接和其他特殊文件跳过
+    """
+    extracted = skipped = 0
+    kwargs = _extract_kwargs()
+    for tar, member in iter_tar_stream(stream, compression):
+        # 去掉归档内的根目录名，解包到 target_dir 下
+        parts = member.name.replace('\\', '/').strip('/').split('/', 1)
+        if len(parts) == 1:
+            continue
+        if not (member.isfile() or member.isdir()) or not _is_safe_member(member):
+            skipped += 1
+            continue
+        rel_path = parts[1]
+        member.name = rel_path
+        tar.extract(member, target_dir, **kwargs)
+        if member.isfile():
+            extracted += 1
+            if on_file:
+                on_file(rel_path, member.size)
+    return extracted, skipped
+
+
+class _CountingReader:
+    """读取本地文件时回报读到的字节数"""
+
+    def __init__(self, f, on_read: Callable[[int], None]):
+        self._f = f
+        self._on_read = on_read
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        if data:
+            self._on_read(len(data))
+        return data
+
+
+def iter_local_tree(local_folder: str) -> Iterator[Tuple[str, str]]:
+    """按 os.walk 顺序产出 (本地路径, 以 / 分隔的相对路径)，目录在其内容之前"""
+    for root, dirs, files in os.walk(local_folder):
+        rel_root = os.path.relpath(root, local_folder)
+        rel_root = '' if rel_root == '.' else rel_root.replace(os.sep, '/')
+        for name in dirs + files:
+            yield os.path.join(root, name), f"{rel_root}/{name}" if rel_root else name
+
+
+def write_tar_stream(stream, local_folder: str, arc_root: str, compression: str = 'none',
+                     on_bytes: Optional[Callable[[int], None]] = None,
+                     include: Optional[Set[str]] = None) -> int:
+    """
+    把本地文件夹边打包边写入数据流（如 adb exec-in 的标准输入），不生成临时归档
+
+    Args:
+        stream: 可写的二进制流，写完后由本函数关闭
+        local_folder: 本地文件夹
+        arc_root: 归档内的根目录名
+        compression: none/gzip/zstd
+        on_bytes: 读取文件内容时回报字节数
+        include: 只打包相对路径在其中的普通文件，None 表示全部（目录总是打包）
+
+    Returns:
+        打包的文件数（只打包普通文件和目录，符号链接等不打包）
+    """
+    mode = 'w|gz' if compression == 'gzip' else 'w|'
+    target = zstandard.ZstdCompressor().stream_writer(stream) if compression == 'zstd' else stream
+    count = 0
+    try:
+        with tarfile.open(fileobj=target, mode=mode, format=tarfile.PAX_FORMAT) as tar:
+            entries = chain([(local_folder, '')], iter_local_tree(local_folder))
+            for local_path, rel_path in entries:
+                info = tar.gettarinfo(local_path, arcname=f"{arc_root}/{rel_path}" if rel_path else arc_root)
+                if info is None or not (info.isfile() or info.isdir()):
+                    continue
+                info.uid = info.gid = 0
+                info.uname = info.gname = ''
+                if info.isdir():
+                    tar.addfile(info)
+                    continue
+                if include is not None and rel_path not in include:
+                    continue
+                with open(local_path, 'rb') as f:
+                    tar.addfile(info, _CountingReader(f, on_bytes) if on_bytes else f)
+                count += 1
+    finally:
+        if target is not stream:
+            target.close()
+        try:
+            stream.close()
+        except OSError:
+            pass
+    return count
+
+
+# ---------- 增量同步 ----------
+
+SYNC_COMPARE_MODES = ('size_mtime', 'checksum')
+# 修改时间允许的误差（秒），FAT/exFAT 只能精确到 2 秒
+MTIME_TOLERANCE = 1
+# 单条删除命令的最大长度
+_DELETE_COMMAND_LIMIT = 8000
+
+
+def local_tree_manifest(local_folder: str) -> List[Dict]:
+    """本地目录树清单（格式与设备端清单相同，不跟随符号链接）；目录不存在时返回空列表"""
+    entries = []
+    if not os.path.isdir(local_folder):
+        return entries
+    for local_path, rel_path in iter_local_tree(local_folder):
+        try:
+            st = os.lstat(local_path)
+        except OSError:
+            continue
+        entries.append({'rel_path': rel_path, 'type': entry_type(st.st_mode),
+                        'size': st.st_size, 'mtime': int(st.st_mtime)})
+    return entries
+
+
+def remote_checksums(device_id: str, root: str, d=None) -> Dict[str, str]:
+    """
+    用一条 md5sum 命令取得设备目录下全部普通文件的 MD5
+
+    Returns:
+        {相对路径: md5}；设备没有 md5sum 时为空字典（此时按内容不同处理）
+    """
+    output = run_device_shell(
+        device_id, f"cd {shlex.quote(root)} && find . -type f -exec md5sum {{}} + 2>/dev/null", d, timeout=600)
+    checksums = {}
+    for line in output.splitlines():
+        parts = line.split(None, 1)
+        if len(parts) == 2 and len(parts[0]) == 32 and parts[1].startswith('./'):
+            checksums[parts[1][2:]] = parts[0].lower()
+    return checksums
+
+
+def local_md5(path: str) -> str:
+    """计算本地文件的 MD5"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def checksum_comparer(checksums: Dict[str, str], local_root: str) -> Callable[[Dict, Dict], bool]:
+    """生成按 MD5 判断内容是否相同的回调（设备端 MD5 已批量取得，本地文件只在大小相同时计算）"""
+    def same_content(source: Dict, destination: Dict) -> bool:
+        remote = checksums.get(source['rel_path'])
+        if remote is None:
+            return False
+        try:
+            return local_md5(local_path_for(local_root, source['rel_path'])) == remote
+        except OSError:
+            return False
+    return same_content
+
+
+def plan_delta(source: List[Dict], destination: List[Dict], delete_extraneous: bool = False,
+               same_content: Optional[Callable[[Dict, Dict], bool]] = None) -> Dict[str, List[Dict]]:
+    """
+    比较源端与目标端清单
+
+    Args:
+        source / destination: 清单条目列表
+        delete_extraneous: 是否列出目标端多余的条目（源端清单为空时不列出，避免读取失败清空目标端）
+        same_content: 大小相同时判断内容是否相同的回调 (源条目, 目标条目)；None 时比较修改时间
+
+    Returns:
+        {'transfer': 需要传输的源端文件, 'unchanged': 无需传输的源端文件,
+         'delete': 目标端多余的条目（目录只列出最上层，其中的内容随目录一起删除）}
+    """
+    destination_map = {entry['rel_path']: entry for entry in destination}
+    transfer, unchanged = [], []
+    for entry in source:
+        if entry['type'] != ENTRY_FILE:
+            continue
+        existing = destination_map.get(entry['rel_path'])
+        if existing is None or existing['type'] != ENTRY_FILE or existing['size'] != entry['size']:
+            transfer.append(entry)
+        elif same_content is not None:
+            (unchanged if same_content(entry, existing) else transfer).append(entry)
+        elif abs(existing['mtime'] - entry['mtime']) <= MTIME_TOLERANCE:
+            unchanged.append(entry)
+        else:
+            transfer.append(entry)
+
+    delete = []
+    if delete_extraneous and not source and destination:
+        # 源端为空而目标端不为空，多半是源端读取失败，不能据此清空目标端
+        logger.warning(f"源端清单为空，不删除目标端的 {len(destination)} 个条目")
+    elif delete_extraneous:
+        source_types = {entry['rel_path']: entry['type'] for entry in source}
+        removed_dirs = set()
+        # 按层级从浅到深处理，已删除目录中的条目不再单独列出
+        for entry in sorted(destination, key=lambda item: item['rel_path'].count('/')):
+            rel_path = entry['rel_path']
+            parts = rel_path.split('/')
+            if any('/'.join(parts[:depth]) in removed_dirs for depth in range(1, len(parts))):
+                continue
+            source_type = source_types.get(rel_path)
+            if source_type is None or (source_type == ENTRY_DIR) != (entry['type'] == ENTRY_DIR):
+                delete.append(entry)
+                if entry['type'] == ENTRY_DIR:
+                    removed_dirs.add(rel_path)
+    return {'transfer': transfer, 'unchanged': unchanged, 'delete': delete}
+
+
+def delete_remote_entries(device_id: str, root: str, entries: List[Dict], d=None) -> int:
+    """在设备上删除清单条目（按命令长度分批执行 rm -rf），返回提交删除的条目数"""
+    prefix = f"cd {shlex.quote(root)} && rm -rf --"
+    batch, length = [], len(prefix)
+    for index, entry in enumerate(entries):
+        quoted = shlex.quote(entry['rel_path'])
+        batch.append(quoted)
+        length += len(quoted) + 1
+        if length >= _DELETE_COMMAND_LIMIT or index == len(entries) - 1:
+            run_device_shell(device_id, f"{prefix} {' '.join(batch)}", d)
+            batch, length = [], len(prefix)
+    return len(entries)
+
+
+def delete_local_entries(root: str, entries: List[Dict]) -> int:
+    """删除本地清单条目，返回删除成功的条目数"""
+    deleted = 0
+    for entry in entries:
+        path = local_path_for(root, entry['rel_path'])
+        try:
+            if entry['type'] == ENTRY_DIR:
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            deleted += 1
+        except OSError as e:
+            logger.warning(f"删除本地文件失败: {path} - {e}")
+    return deleted
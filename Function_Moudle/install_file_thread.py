@@ -12,6 +12,14 @@ if project_root not in sys.path:
 # 导入日志管理器
 from logger_manager import get_logger, log_operation, measure_performance, log_exception
 
+try:
+    from adb_utils import ADBUtils
+except ImportError:
+    ADBUtils = None
+
+from Function_Moudle.device_apk_cache import device_apk_cache, pm_install_command
+from Function_Moudle.device_capabilities import device_capabilities
+
 # 创建日志记录器
 logger = get_logger("ADBTools.InstallFileThread")
 
@@ -25,6 +33,45 @@ class InstallFileThread(QThread):
         self.package_path = package_path
         logger.info(f"安装文件线程初始化: {package_path}, 设备: {device_id}")
 
+    @staticmethod
+    def _adb_path():
+        return ADBUtils.get_adb_path() if ADBUtils is not None else "adb"
+
+    def _install_from_device_cache(self):
+        """
+        通过设备端APK缓存安装，同一APK再次安装时不重新传输
+        
+        Returns:
+            安装成功时返回 CompletedProcess；无法使用缓存时返回 None
+        
+        Raises:
+            subprocess.CalledProcessError: 系统拒绝安装
+        """
+        try:
+            device_apk_cache.begin_session([self.device_id])
+            remote_path = device_apk_cache.lookup(self.device_id, self.package_path,
+                                                  device_capabilities.supports_streaming_install(self.device_id),
+                                                  progress_callback=logger.info)
+        except Exception as e:
+            logger.warning(f"设备APK缓存不可用，直接安装: {e}")
+            return None
+        if not remote_path:
+            return None
+        
+        self.signal_status.emit("正在从设备缓存安装...")
+        install_cmd = [self._adb_path(), "-s", self.device_id, "shell",
+                       pm_install_command(remote_path, package_command=device_capabilities.package_command(self.device_id))]
+        logger.info(f"执行安装命令: {' '.join(install_cmd)}")
+        result = subprocess.run(install_cmd, capture_output=True, text=True)
+        if "Success" in result.stdout:
+            return result
+        if "Failure [" in result.stdout:
+            raise subprocess.CalledProcessError(result.returncode or 1, install_cmd, result.stdout, result.stderr)
+        # 缓存文件无法读取，丢弃该条目后改用 adb install
+        logger.warning(f"设备缓存文件不可用，改用 adb install: {result.stdout.strip()} {result.stderr.strip()}")
+        device_apk_cache.invalidate(self.device_id, self.package_path)
+        return None
+
     def run(self):
         logger.info("=" * 80)
         logger.info("开始安装应用")
@@ -43,16 +90,21 @@ class InstallFileThread(QThread):
                 self.signal_status.emit("正在开始安装...")
                 logger.info("发送状态信号: 正在开始安装...")
                 
-                # 构建安装命令，使用 -s 指定设备
-                install_cmd = ["adb", "-s", self.device_id, "install", "-r", self.package_path]
-                logger.info(f"执行安装命令: {' '.join(install_cmd)}")
-                
-                result = subprocess.run(
-                    install_cmd,
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
+                result = self._install_from_device_cache()
+                if result is None:
+                    # 构建安装命令，使用 -s 指定设备
+                    install_cmd = ["adb", "-s", self.device_id, "install", "-r", self.package_path]
+                    if device_capabilities.supports_streaming_install(self.device_id):
+                        # 流式写入安装会话，不先 push 到设备临时目录
+                        install_cmd.insert(-1, "--streaming")
+                    logger.info(f"执行安装命令: {' '.join(install_cmd)}")
+                    
+                    result = subprocess.run(
+                        install_cmd,
+                        capture_output=True,
+                        text=True,
+                        check=True
+                    )
                 
                 logger.info("=" * 80)
                 logger.info("安装命令执行结果")
@@ -127,4 +179,9 @@ class InstallFileThread(QThread):
                     "error_message": str(e)
                 }, result="error")
                 
-                logger.error("=" * 80)
\ No newline at end of file
+                logger.error("=" * 80)
+            
+            finally:
+                # 直接调用 adb 安装，未经过 ADBUtils，需要手动通知（如使包信息快照失效）
+                if ADBUtils is not None:
+                    ADBUtils.notify_command_executed(f'install -r "{self.package_path}"', self.device_id)
\ No newline at end of file
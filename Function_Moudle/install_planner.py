@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+批量安装计划 - 安装前比较本地 APK 与设备已安装版本，只执行需要的安装
+
+功能：
+1. 本地 APK 的包名 / versionCode / versionName 来自 APK 元数据缓存
+2. 设备已安装版本来自包信息快照（一次 dumpsys package 查询全部应用）
+3. 每个 APK 标记为 install（未安装或升级）、skip（已是相同版本）或 downgrade（设备版本更高）
+4. 未允许降级时 downgrade 条目不执行（执行也会被系统以 VERSION_DOWNGRADE 拒绝）
+
+versionCode 相同但 versionName 不同（如开发构建未修改 versionCode）时仍然安装。
+"""
+
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from Function_Moudle.apk_metadata_cache import apk_metadata_cache
+from Function_Moudle.package_snapshot import package_snapshot_cache
+
+ACTION_INSTALL = "install"
+ACTION_SKIP = "skip"
+ACTION_DOWNGRADE = "downgrade"
+
+ACTION_LABELS = {
+    ACTION_INSTALL: "安装",
+    ACTION_SKIP: "跳过",
+    ACTION_DOWNGRADE: "降级",
+}
+
+
+def _version_code(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def plan_entry(apk_path: str, metadata: Optional[Dict], installed: Optional[Dict]) -> Dict:
+    """
+    决定单个 APK 的动作
+
+    Args:
+        metadata: APK 元数据，解析失败时为 None
+        installed: 设备上同包名应用的信息（包信息快照条目），未安装时为 None
+
+    Returns:
+        {"apk_path", "file_name", "package_name", "version_code", "version_name",
+         "installed_version_code", "installed_version_name", "action", "reason"}
+    """
+    metadata = metadata or {}
+    installed = installed or {}
+    entry = {
+        "apk_path": apk_path,
+        "file_name": os.path.basename(apk_path),
+        "package_name": metadata.get("package_name"),
+        "version_code": metadata.get("version_code"),
+        "version_name": metadata.get("version_name"),
+        "installed_version_code": installed.get("version_code"),
+        "installed_version_name": installed.get("version_name"),
+        "action": ACTION_INSTALL,
+        "reason": "",
+    }
+
+    local_code = _version_code(entry["version_code"])
+    device_code = _version_code(entry["installed_version_code"])
+    if not entry["package_name"]:
+        entry["reason"] = "无法解析APK信息"
+    elif not installed:
+        entry["reason"] = "设备未安装"
+    elif local_code is None or device_code is None:
+        entry["reason"] = "版本号未知"
+    elif local_code > device_code:
+        entry["reason"] = "升级"
+    elif local_code < device_code:
+        entry["action"] = ACTION_DOWNGRADE
+        entry["reason"] = "设备版本更高"
+    elif (entry["version_name"] and entry["installed_version_name"]
+          and entry["version_name"] != entry["installed_version_name"]):
+        entry["reason"] = "versionCode 相同但 versionName 不同"
+    else:
+        entry["action"] = ACTION_SKIP
+        entry["reason"] = "已是相同版本"
+    return entry
+
+
+def compute_plan(device_id: str, apk_files: Iterable[str], refresh: bool = True) -> Optional[List[Dict]]:
+    """
+    计算一台设备的安装计划
+
+    Args:
+        refresh: 重新获取设备包信息（设备可能在上次查询后被其他工具修改）
+
+    Returns:
+        计划条目列表（顺序与 apk_files 一致）；无法获取设备包信息时返回 None
+    """
+    snapshot = package_snapshot_cache.get_snapshot(device_id, refresh=refresh)
+    if snapshot is None:
+        return None
+    plan = []
+    for apk_path in apk_files:
+        try:
+            metadata = apk_metadata_cache.get(apk_path)
+        except Exception:
+            metadata = None
+        installed = snapshot.get(metadata["package_name"]) if metadata else None
+        plan.append(plan_entry(apk_path, metadata, installed))
+    return plan
+
+
+def should_execute(entry: Dict, allow_downgrade: bool) -> bool:
+    """条目是否需要执行"""
+    if entry["action"] == ACTION_SKIP:
+        return False
+    if entry["action"] == ACTION_DOWNGRADE:
+        return allow_downgrade
+    return True
+
+
+def summarize_plan(plan: List[Dict], allow_downgrade: bool = False) -> Dict[str, int]:
+    """统计各动作的条目数，以及实际需要执行的条目数"""
+    summary = {action: 0 for action in ACTION_LABELS}
+    for entry in plan:
+        summary[entry["action"]] += 1
+    summary["execute"] = sum(1 for entry in plan if should_execute(entry, allow_downgrade))
+    return summary
+
+
+def format_plan(plans: Dict[str, Optional[List[Dict]]], allow_downgrade: bool = False) -> str:
+    """生成计划预览文本 {设备ID: 计划}"""
+    lines = []
+    for device_id, plan in plans.items():
+        if plan is None:
+            lines.append(f"[{device_id}] 无法获取设备包信息，将安装全部APK")
+            continue
+        summary = summarize_plan(plan, allow_downgrade)
+        lines.append(f"[{device_id}] 安装 {summary[ACTION_INSTALL]}，跳过 {summary[ACTION_SKIP]}，"
+                     f"降级 {summary[ACTION_DOWNGRADE]}{'' if allow_downgrade else '（未允许降级，不执行）'}")
+        for entry in plan:
+            installed = entry["installed_version_code"] or "-"
+            lines.append(f"  {ACTION_LABELS[entry['action']]}  {entry['file_name']}  "
+                         f"{installed} -> {entry['version_code'] or '?'}  ({entry['reason']})")
+    return "\n".join(lines)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+批量任务日志 - 每个批量任务一个只追加的日志文件，USB 断开或程序崩溃后可以从最后的检查点继续
+
+日志文件位于日志目录的 jobs 子目录，每行一条 JSON 记录：
+    {"type": "start", "job_id", "kind", "created", "params", "units"}   任务参数和全部工作单元
+    {"type": "unit", "unit", "status", "ok", "time", ...}               每完成一个单元追加一条
+    {"type": "finish", "time", "summary"}                                任务结束
+任务正常结束后删除日志文件；启动时仍然存在、没有 finish 记录的就是未完成的任务。
+写入时崩溃留下的不完整的最后一行在读取时忽略。
+
+使用示例：
+    journal = start_job("batch_install", {"folder_path": path}, units)
+    journal.record(unit_key(device_id, apk_path), "成功")
+    journal.finish()
+
+    for journal in find_unfinished_jobs("batch_install"):
+        done = journal.done_units()
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger, logger_manager
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+# 创建日志记录器
+logger = get_logger("ADBTools.JobJournal")
+
+JOBS_DIR_NAME = "jobs"
+
+
+def jobs_dir() -> str:
+    """任务日志目录（日志目录下的 jobs 子目录）"""
+    return os.path.join(getattr(logger_manager, "log_dir", None) or ".", JOBS_DIR_NAME)
+
+
+def unit_key(*parts) -> str:
+    """由多个部分（如设备ID、APK路径）组成工作单元标识"""
+    return "\t".join(str(part) for part in parts)
+
+
+class JobJournal:
+    """一个批量任务的日志（线程安全，多个工作线程可以同时记录）"""
+
+    def __init__(self, path: Optional[str], job_id: str, kind: str, params: Dict,
+                 units: List[str], created: Optional[float] = None):
+        """
+        Args:
+            path: 日志文件路径，None 表示不写入（未启用任务日志或目录不可写）
+            job_id: 任务ID
+            kind: 任务类型，如 batch_install / batch_verify / folder_upload
+            params: 恢复任务所需的参数
+            units: 全部工作单元标识
+        """
+        self.path = path
+        self.job_id = job_id
+        self.kind = kind
+        self.params = params
+        self.units = units
+        self.created = created or time.time()
+        self.records: Dict[str, Dict] = {}  # 工作单元 -> 最后一条记录
+        self.finished = False
+        self._lock = threading.Lock()
+
+    # ---------- 写入 ----------
+
+    def _append(self, record: Dict):
+        if self.path is None:
+            return
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            # 任务日志只用于恢复，写入失败不影响任务本身
+            logger.warning(f"写入任务日志失败，本任务不再记录检查点: {self.path} | {e}")
+            self.path = None
+
+    def record(self, unit: str, status: str, ok: bool = True, **details):
+        """
+        记录一个工作单元已完成
+
+        Args:
+            status: 显示用的结果状态
+            ok: 恢复任务时是否可以跳过该单元（失败的单元应为 False，恢复时重新执行）
+            details: 其他需要保存的结果信息
+        """
+        record = dict(details, type="unit", unit=unit, status=status, ok=ok, time=time.time())
+        with self._lock:
+            self.records[unit] = record
+            self._append(record)
+
+    def finish(self, summary: Optional[Dict] = None):
+        """任务结束：写入结束记录并删除日志文件"""
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+            self._append({"type": "finish", "time": time.time(), "summary": summary or {}})
+            self._remove()
+
+    def discard(self):
+        """放弃未完成的任务（不再恢复）"""
+        with self._lock:
+            self.finished = True
+            self._remove()
+
+    def _remove(self):
+        if self.path is None:
+            return
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            logger.debug(f"删除任务日志失败: {self.path} | {e}")
+
+    # ---------- 查询 ----------
+
+    def done_units(self) -> Set[str]:
+        """最后一次记录为可跳过的工作单元"""
+        with self._lock:
+            return {unit for unit, record in self.records.items() if record.get("ok")}
+
+    def describe(self) -> str:
+        """任务的简短描述（用于恢复提示）"""
+        done = len(self.done_units())
+        created = datetime.fromtimestamp(self.created).strftime("%Y-%m-%d %H:%M:%S")
+        return f"{created}  {self.params.get('title', self.kind)}：已完成 {done}/{len(self.units)}"
+
+
+def start_job(kind: str, params: Dict, units: Iterable[str]) -> JobJournal:
+    """
+    创建任务日志并写入开始记录
+
+    未启用任务日志或无法创建文件时返回不写入的日志对象，调用方无需区分。
+    """
+    job_id = f"{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    units = list(units)
+    path = None
+    if config_manager.get("logging.job_journal", True):
+        try:
+            os.makedirs(jobs_dir(), exist_ok=True)
+            path = os.path.join(jobs_dir(), f"{job_id}.jsonl")
+        except OSError as e:
+            logger.warning(f"无法创建任务日志目录，本任务不记录检查点: {e}")
+    journal = JobJournal(path, job_id, kind, params, units)
+    journal._append({"type": "start", "job_id": job_id, "kind": kind, "created": journal.created,
+                     "params": params, "units": units})
+    return journal
+
+
+def load_job(path: str) -> Optional[JobJournal]:
+    """
+    读取任务日志，之后的记录继续追加到同一文件
+
+    Returns:
+        未完成的任务；文件无法读取、没有开始记录或已结束时返回 None
+    """
+    journal = None
+    line = ""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 写入时崩溃留下的不完整行
+                    continue
+                record_type = record.get("type")
+                if record_type == "start" and journal is None:
+                    journal = JobJournal(path, record["job_id"], record["kind"], record.get("params", {}),
+                                         record.get("units", []), record.get("created"))
+                elif journal is None:
+                    continue
+                elif record_type == "unit":
+                    journal.records[record["unit"]] = record
+                elif record_type == "finish":
+                    journal.finished = True
+    except (OSError, KeyError) as e:
+        logger.warning(f"读取任务日志失败: {path} | {e}")
+        return None
+    if journal is None or journal.finished:
+        return None
+    if line and not line.endswith("\n"):
+        # 补上不完整行的换行，之后追加的记录从新的一行开始
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n")
+        except OSError as e:
+            logger.warning(f"任务日志不可写，恢复后不再记录检查点: {path} | {e}")
+            journal.path = None
+    return journal
+
+
+def find_unfinished_jobs(kind: Optional[str] = None, device_id: Optional[str] = None) -> List[JobJournal]:
+    """
+    查找未完成的任务（按创建时间排序）
+
+    Args:
+        kind: 只返回该类型的任务
+        device_id: 只返回参数中包含该设备的任务
+    """
+    directory = jobs_dir()
+    if not os.path.isdir(directory):
+        return []
+    jobs = []
+    for file_name in os.listdir(directory):
+        if not file_name.endswith(".jsonl"):
+            continue
+        if kind is not None and not file_name.startswith(f"{kind}_"):
+            continue
+        journal = load_job(os.path.join(directory, file_name))
+        if journal is None:
+            continue
+        if kind is not None and journal.kind != kind:
+            continue
+        if device_id is not None and device_id not in (journal.params.get("device_ids") or []):
+            continue
+        jobs.append(journal)
+    jobs.sort(key=lambda job: job.created)
+    return jobs
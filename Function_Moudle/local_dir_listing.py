@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+本地目录列表 - 文件管理器本地面板的目录读取与缓存
+
+功能：
+1. 用 os.scandir 读取目录，按批返回条目，界面可以边读边显示
+2. 按目录路径缓存列表（LRU），目录修改时间不变时直接复用，不再逐个 stat
+3. 单个条目无法读取（权限不足、失效的符号链接）时跳过，不影响整个目录
+
+条目格式：{'path', 'name', 'is_dir', 'size', 'mtime'}
+"""
+
+import os
+import sys
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+# 每批返回的条目数
+SCAN_BATCH_SIZE = 500
+
+
+def local_entry(dir_entry: os.DirEntry) -> Optional[Dict]:
+    """把 os.DirEntry 转换为条目字典，无法读取时返回 None"""
+    try:
+        # Windows 上 scandir 已带回属性，不会再次访问文件系统
+        stat_info = dir_entry.stat()
+        is_dir = dir_entry.is_dir()
+    except OSError:
+        return None
+    return {
+        'path': dir_entry.path,
+        'name': dir_entry.name,
+        'is_dir': is_dir,
+        'size': 0 if is_dir else stat_info.st_size,
+        'mtime': stat_info.st_mtime,
+    }
+
+
+def scan_local_directory(path: str, batch_size: int = SCAN_BATCH_SIZE) -> Iterator[List[Dict]]:
+    """按批读取目录条目（目录本身无法打开时抛出 OSError）"""
+    batch = []
+    with os.scandir(path) as entries:
+        for dir_entry in entries:
+            entry = local_entry(dir_entry)
+            if entry is None:
+                continue
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def directory_mtime(path: str) -> Optional[int]:
+    """目录的修改时间（纳秒），无法访问时返回 None"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class LocalListingCache:
+    """本地目录列表缓存（只在界面线程使用）"""
+
+    def __init__(self, max_entries: int = 32):
+        """
+        Args:
+            max_entries: 最多缓存的目录数，0 表示不缓存
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # 路径 -> (目录修改时间, 列表)
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def get(self, path: str) -> Optional[List[Dict]]:
+        """目录修改时间与缓存时一致时返回缓存的列表，否则返回 None"""
+        key = self._key(path)
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        if cached[0] is None or directory_mtime(path) != cached[0]:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return cached[1]
+
+    def put(self, path: str, files: List[Dict], mtime_ns: Optional[int]):
+        """
+        缓存目录列表
+
+        Args:
+            mtime_ns: 开始读取前的目录修改时间，读取期间目录有变化时下次 get 不会命中
+        """
+        if self.max_entries <= 0 or mtime_ns is None:
+            return
+        key = self._key(path)
+        self._entries[key] = (mtime_ns, files)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, path: str):
+        """使目录的缓存失效"""
+        self._entries.pop(self._key(path), None)
+
+
+# 全局本地目录列表缓存实例
+local_listing_cache = LocalListingCache(config_manager.get("file_manager.local_cache_max_entries", 32))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+多包原子安装 - 一个 `pm install-create --multi-package` 会话安装一组 APK
+
+流程（与 `adb install-multi-package` 相同）：
+1. 创建父会话：pm install-create --multi-package
+2. 每个 APK 创建一个子会话，通过 `adb exec-in pm install-write ... -` 从标准输入写入（设备端不落临时文件）；
+   APK 已在设备端缓存中时直接从缓存文件写入，不经过 USB 传输
+3. pm install-add-session 把子会话加入父会话，最后 pm install-commit 一次提交
+
+整组 APK 只触发一次包扫描和广播；任一步骤失败时放弃父会话，设备上的应用保持安装前的状态。
+
+使用示例：
+    installer = MultiPackageInstaller(device_id, allow_downgrade=False, output_callback=print)
+    installer.install(["a.apk", "b.apk"])
+"""
+
+import os
+import re
+import sys
+import subprocess
+from typing import Callable, List, Optional
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+
+try:
+    from adb_utils import ADBUtils
+except ImportError:
+    ADBUtils = None
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+try:
+    from Function_Moudle.device_apk_cache import device_apk_cache
+except ImportError:
+    device_apk_cache = None
+
+from Function_Moudle.device_capabilities import device_capabilities
+
+# 创建日志记录器
+logger = get_logger("ADBTools.MultiPackageInstall")
+
+_SESSION_ID_RE = re.compile(r'\[(\d+)\]')
+
+
+class MultiPackageInstallError(Exception):
+    """多包安装失败（会话已放弃，设备上的应用未改变）"""
+
+
+class MultiPackageNotSupported(MultiPackageInstallError):
+    """设备不支持多包会话（Android 10 以下），调用方应改为逐个安装"""
+
+
+class MultiPackageInstaller:
+    """单台设备的多包原子安装"""
+
+    def __init__(self, device_id: str, allow_downgrade: bool = False,
+                 output_callback: Optional[Callable[[str], None]] = None,
+                 timeout: Optional[float] = None):
+        """
+        Args:
+            device_id: 设备ID
+            allow_downgrade: 是否允许降级安装（-d）
+            output_callback: 每条命令及其输出的回调
+            timeout: 单条命令的超时时间（秒），写入 APK 的超时按文件大小另外放宽
+        """
+        self.device_id = device_id
+        self.allow_downgrade = allow_downgrade
+        self.output_callback = output_callback or (lambda line: None)
+        self.timeout = timeout or config_manager.get("batch_install.multi_package.timeout", 300)
+        self.package_command = device_capabilities.package_command(device_id).split()
+
+    def _install_options(self) -> List[str]:
+        return ["-r"] + (["-d"] if self.allow_downgrade else [])
+
+    def _pm(self, args: List[str], stdin=None, timeout: Optional[float] = None) -> str:
+        """执行包管理命令（pm 或 cmd package），返回标准输出和标准错误合并后的文本"""
+        adb_path = ADBUtils.get_adb_path() if ADBUtils is not None else "adb"
+        command = [adb_path, "-s", self.device_id, "exec-in" if stdin is not None else "exec-out"] + \
+            self.package_command + args
+        self.output_callback(f"执行命令: {' '.join(command[1:])}")
+        result = subprocess.run(command, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                timeout=timeout or self.timeout)
+        output = result.stdout.decode('utf-8', errors='replace').strip()
+        self.output_callback(f"命令返回: {output}")
+        return output
+
+    def _create_session(self, args: List[str]) -> Optional[str]:
+        output = self._pm(["install-create"] + args)
+        match = _SESSION_ID_RE.search(output)
+        if "Success" not in output or not match:
+            return None
+        return match.group(1)
+
+    def _write_apk(self, session_id: str, index: int, apk_path: str):
+        """把 APK 写入子会话：已在设备缓存中时从缓存文件写入，否则经 exec-in 标准输入流式写入"""
+        size = os.path.getsize(apk_path)
+        name = f"{index}_{os.path.basename(apk_path)}".replace(' ', '_')
+        remote_path = device_apk_cache.cached_path(self.device_id, apk_path) if device_apk_cache else None
+        if remote_path:
+            output = self._pm(["install-write", "-S", str(size), session_id, name, remote_path])
+        else:
+            # 大文件按 1 MB/s 的最低速度放宽超时
+            with open(apk_path, 'rb') as f:
+                output = self._pm(["install-write", "-S", str(size), session_id, name, "-"],
+                                  stdin=f, timeout=self.timeout + size / (1024 * 1024))
+        if "Success" not in output:
+            raise MultiPackageInstallError(f"写入 {os.path.basename(apk_path)} 失败: {output}")
+
+    def _abandon(self, session_ids: List[str]):
+        for session_id in session_ids:
+            try:
+                self._pm(["install-abandon", session_id], timeout=60)
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.warning(f"放弃安装会话 {session_id} 失败: {e}")
+
+    def install(self, apk_paths: List[str],
+                progress_callback: Optional[Callable[[str, str], None]] = None) -> str:
+        """
+        在一个多包会话中安装全部 APK
+
+        Args:
+            progress_callback: 单个 APK 的进度回调 (APK 路径, 状态)
+
+        Returns:
+            install-commit 的输出
+
+        Raises:
+            MultiPackageNotSupported: 无法创建多包会话（未做任何修改）
+            MultiPackageInstallError: 写入或提交失败，会话已放弃
+        """
+        notify = progress_callback or (lambda apk_path, status: None)
+        try:
+            parent_id = self._create_session(["--multi-package"] + self._install_options())
+        except (OSError, subprocess.SubprocessError) as e:
+            raise MultiPackageNotSupported(f"创建多包会话失败: {e}")
+        if parent_id is None:
+            raise MultiPackageNotSupported("设备不支持多包安装会话")
+
+        child_ids = []
+        committed = False
+        try:
+            for index, apk_path in enumerate(apk_paths):
+                notify(apk_path, "传输中")
+                child_id = self._create_session(
+                    self._install_options() + ["-S", str(os.path.getsize(apk_path))])
+                if child_id is None:
+                    raise MultiPackageInstallError(f"创建 {os.path.basename(apk_path)} 的子会话失败")
+                child_ids.append(child_id)
+                self._write_apk(child_id, index, apk_path)
+                notify(apk_path, "已写入")
+
+            output = self._pm(["install-add-session", parent_id] + child_ids)
+            if "Success" not in output:
+                raise MultiPackageInstallError(f"添加子会话失败: {output}")
+
+            output = self._pm(["install-commit", parent_id])
+            committed = True
+            if "Success" not in output:
+                # 提交失败时系统已回滚整个会话
+                raise MultiPackageInstallError(f"提交失败，已回滚: {output}")
+            return output
+        except (OSError, subprocess.SubprocessError) as e:
+            raise MultiPackageInstallError(f"多包安装中断: {e}")
+        finally:
+            if not committed:
+                # 子会话已加入父会话时随父会话一起放弃，否则逐个放弃
+                self._abandon([parent_id] + child_ids)
+            elif ADBUtils is not None:
+                # 直接启动 adb 进程，需要手动通知（如使包信息快照失效）
+                ADBUtils.notify_command_executed("install-multi-package", self.device_id)
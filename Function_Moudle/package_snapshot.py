@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+设备包信息快照 - 一次 `dumpsys package packages` 获取全部应用的版本信息
+
+功能：
+1. 一条命令获取设备上所有包的 versionName / versionCode / codePath，流式逐行解析建立索引
+2. dumpsys 输出为空时回退到 `pm list packages -f --show-versioncode`（无 versionName）
+3. 按设备缓存快照，通过 ADBUtils 命令钩子在安装、卸载、重启后自动失效，另有过期时间兜底
+4. 所有按包名查询版本的地方都从索引读取，不再为每个包启动一次 dumpsys
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+import subprocess
+from typing import Dict, Iterable, Optional
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+
+try:
+    from adb_utils import ADBUtils
+except ImportError:
+    ADBUtils = None
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+# 创建日志记录器
+logger = get_logger("ADBTools.PackageSnapshot")
+
+_PACKAGE_HEADER_RE = re.compile(r'^\s+Package \[([^\]]+)\]')
+_VERSION_CODE_RE = re.compile(r'\bversionCode=(\d+)')
+_VERSION_NAME_RE = re.compile(r'\bversionName=(\S*)')
+_CODE_PATH_RE = re.compile(r'\bcodePath=(\S+)')
+_PM_LIST_RE = re.compile(r'^package:(.*)=([^\s=]+)(?:\s+versionCode:(\d+))?')
+
+# 会改变设备包信息的 adb 命令
+_MUTATING_ADB_COMMANDS = ('install', 'install-multiple', 'install-multi-package', 'uninstall', 'reboot', 'root', 'unroot')
+_MUTATING_SHELL_RE = re.compile(r'^shell\s+(?:pm\s+(?:install|uninstall|enable|disable)|cmd\s+package\s+(?:install|uninstall|enable|disable)|reboot)\b')
+
+
+def parse_dumpsys_packages(lines: Iterable[str]) -> Dict[str, Dict]:
+    """
+    逐行解析 `dumpsys package packages` 输出
+
+    只解析 "Packages:" 段；其后的 "Hidden system packages:" 段是被更新覆盖的旧系统包，忽略。
+
+    Returns:
+        {包名: {"version_name", "version_code", "code_path"}}
+    """
+    packages = {}
+    current = None
+    in_packages = False
+
+    for line in lines:
+        if not in_packages:
+            if line.startswith("Packages:"):
+                in_packages = True
+            continue
+
+        # 遇到下一个顶层段落，Packages 段结束
+        if line and not line[0].isspace():
+            break
+
+        match = _PACKAGE_HEADER_RE.match(line)
+        if match:
+            current = packages.setdefault(match.group(1), {
+                "version_name": None,
+                "version_code": None,
+                "code_path": None
+            })
+            continue
+
+        if current is None:
+            continue
+
+        if current["code_path"] is None and "codePath=" in line:
+            match = _CODE_PATH_RE.search(line)
+            if match:
+                current["code_path"] = match.group(1)
+        if current["version_code"] is None and "versionCode=" in line:
+            match = _VERSION_CODE_RE.search(line)
+            if match:
+                current["version_code"] = match.group(1)
+        if current["version_name"] is None and "versionName=" in line:
+            match = _VERSION_NAME_RE.search(line)
+            if match:
+                current["version_name"] = match.group(1)
+
+    return packages
+
+
+def parse_pm_list_packages(lines: Iterable[str]) -> Dict[str, Dict]:
+    """解析 `pm list packages -f --show-versioncode` 输出（不含 versionName）"""
+    packages = {}
+    for line in lines:
+        match = _PM_LIST_RE.match(line.strip())
+        if match:
+            apk_path, package_name, version_code = match.groups()
+            packages[package_name] = {
+                "version_name": None,
+                "version_code": version_code,
+                "code_path": os.path.dirname(apk_path) if apk_path.endswith('.apk') else apk_path
+            }
+    return packages
+
+
+def is_mutating_command(command: str) -> bool:
+    """判断 adb 命令是否可能改变设备上的包信息"""
+    command = command.strip()
+    first_word = command.split(None, 1)[0] if command else ""
+    return first_word in _MUTATING_ADB_COMMANDS or bool(_MUTATING_SHELL_RE.match(command))
+
+
+class PackageSnapshotCache:
+    """按设备缓存的包信息快照（线程安全）"""
+
+    def __init__(self, ttl: float = 60, timeout: int = 60):
+        """
+        初始化快照缓存
+
+        Args:
+            ttl: 快照有效期（秒），超过后下次查询重新获取
+            timeout: 获取快照的命令超时时间（秒）
+        """
+        self.ttl = ttl
+        self.timeout = timeout
+        self._snapshots: Dict[str, tuple] = {}  # device_id -> (获取时间, 索引)
+        self._lock = threading.Lock()
+        self._device_locks: Dict[str, threading.Lock] = {}
+
+    def _get_device_lock(self, device_id: str) -> threading.Lock:
+        with self._lock:
+            return self._device_locks.setdefault(device_id, threading.Lock())
+
+    def get_snapshot(self, device_id: str, refresh: bool = False) -> Optional[Dict[str, Dict]]:
+        """
+        获取设备的包信息索引
+
+        Args:
+            device_id: 设备ID
+            refresh: 是否强制重新获取
+
+        Returns:
+            {包名: {"version_name", "version_code", "code_path"}}；获取失败时返回 None
+        """
+        if not device_id:
+            return None
+
+        # 同一设备只允许一个线程去获取快照，其他线程等待后直接使用结果
+        with self._get_device_lock(device_id):
+            if not refresh:
+                with self._lock:
+                    cached = self._snapshots.get(device_id)
+                if cached and time.time() - cached[0] < self.ttl:
+                    return cached[1]
+
+            packages = self._fetch(device_id)
+            if packages is None:
+                return None
+
+            with self._lock:
+                self._snapshots[device_id] = (time.time(), packages)
+            return packages
+
+    def _fetch(self, device_id: str) -> Optional[Dict[str, Dict]]:
+        """从设备获取包信息"""
+        if ADBUtils is None:
+            return None
+
+        start_time = time.time()
+        packages = self._fetch_dumpsys(device_id)
+        if packages is None:
+            return None
+        source = "dumpsys"
+        if not packages:
+            # 部分定制系统限制了 dumpsys 输出，退回 pm list
+            result = ADBUtils.run_adb_command("shell pm list packages -f --show-versioncode", device_id, timeout=self.timeout)
+            if result.returncode != 0:
+                logger.warning(f"获取包列表失败 [{device_id}]: {result.stderr}")
+                return None
+            packages = parse_pm_list_packages(result.stdout.splitlines())
+            source = "pm list"
+
+        logger.info(f"包信息快照 [{device_id}]: {len(packages)} 个包，来源 {source}，耗时 {time.time() - start_time:.3f}s")
+        return packages
+
+    def _fetch_dumpsys(self, device_id: str) -> Optional[Dict[str, Dict]]:
+        """流式解析 `dumpsys package packages`，不缓存数 MB 的完整输出；流式读取不可用时退回一次性读取"""
+        command = "shell dumpsys package packages"
+        try:
+            # 解析到 Packages 段结束即停止读取，命令随之终止（returncode 为 None）
+            with ADBUtils.stream_adb_command(command, device_id, timeout=self.timeout) as stream:
+                packages = parse_dumpsys_packages(stream)
+            if stream.returncode not in (0, None):
+                logger.warning(f"获取包信息快照失败 [{device_id}]: {stream.error_text()}")
+                return None
+            return packages
+        except subprocess.TimeoutExpired:
+            logger.warning(f"获取包信息快照超时 [{device_id}]")
+            return None
+        except Exception as e:
+            logger.debug(f"流式读取 dumpsys 不可用，改用一次性读取 [{device_id}]: {e}")
+
+        result = ADBUtils.run_adb_command(command, device_id, timeout=self.timeout)
+        if result.returncode != 0:
+            logger.warning(f"获取包信息快照失败 [{device_id}]: {result.stderr}")
+            return None
+        return parse_dumpsys_packages(result.stdout.splitlines())
+
+    def get_package(self, device_id: str, package_name: str) -> Optional[Dict]:
+        """获取单个包的信息，包不存在时返回 None"""
+        snapshot = self.get_snapshot(device_id)
+        if snapshot is None:
+            return None
+        return snapshot.get(package_name)
+
+    def get_version_name(self, device_id: str, package_name: str) -> Optional[str]:
+        """获取包的 versionName，包不存在或无版本信息时返回 None"""
+        package_info = self.get_package(device_id, package_name)
+        return package_info.get("version_name") if package_info else None
+
+    def invalidate(self, device_id: Optional[str] = None):
+        """使快照失效，device_id 为 None 时清空所有设备"""
+        with self._lock:
+            if device_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(device_id, None)
+
+    def on_adb_command(self, command: str, device_id: Optional[str]):
+        """ADBUtils 命令钩子：安装、卸载、重启等命令执行后使对应设备的快照失效"""
+        if is_mutating_command(command):
+            logger.debug(f"命令可能改变包信息，快照失效 [{device_id or '全部'}]: {command}")
+            self.invalidate(device_id)
+
+
+# 全局包信息快照缓存
+package_snapshot_cache = PackageSnapshotCache(
+    ttl=config_manager.get("adb.package_snapshot_ttl", 60)
+)
+if ADBUtils is not None:
+    ADBUtils.register_command_hook(package_snapshot_cache.on_adb_command)
@@ -25,6 +25,11 @@ except ImportError:
     spec.loader.exec_module(adb_utils_module)
     ADBUtils = adb_utils_module.ADBUtils
 
+try:
+    from Function_Moudle.device_tracker import get_cached_device_list, AVAILABLE_STATES
+except ImportError:
+    get_cached_device_list = None
+
 class RefreshDevicesThread(QThread):
     """刷新设备列表线程（多线程执行，避免阻塞主界面）"""
     progress_signal = pyqtSignal(str)
@@ -47,6 +52,23 @@ class RefreshDevicesThread(QThread):
         # 使用性能监控
         with measure_performance("refresh_devices"):
             try:
+                # 设备跟踪器就绪时直接使用缓存的设备表
+                cached_devices = get_cached_device_list(AVAILABLE_STATES) if get_cached_device_list else None
+                if cached_devices is not None:
+                    logger.info(f"使用设备跟踪器缓存，共 {len(cached_devices)} 个设备")
+                    self.device_ids = cached_devices
+                    if cached_devices:
+                        self.progress_signal.emit(f"✓ 找到 {len(cached_devices)} 个设备")
+                    else:
+                        self.progress_signal.emit("✗ 未检测到任何设备")
+                    self.devices_signal.emit(cached_devices)
+                    log_operation("refresh_devices_success", {
+                        "device_count": len(cached_devices),
+                        "device_ids": cached_devices,
+                        "source": "device_tracker"
+                    }, result="success")
+                    return
+                
                 logger.info("准备执行 ADB 命令: devices")
                 result = ADBUtils.run_adb_command(
                     command="devices",
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+设备文件分页读取 - 文件管理器预览大文件时按需读取字节范围，不再整个 cat 到内存
+
+功能：
+1. 按块（默认 256 KB）用设备端 dd 读取指定范围，写入本地稀疏缓存文件的对应位置
+2. 缓存文件通过 mmap 读取，已读过的块再次查看时不访问设备
+3. 跟踪末尾：重新查询文件大小，只读取新增部分（文件变小视为被截断/轮转，清空缓存）
+4. 搜索逐块读取并匹配（块之间保留重叠部分），不把整个文件读入内存
+
+使用示例：
+    with RemoteFilePager(device_id, "/data/log/main.log") as pager:
+        text = pager.decode(pager.read_page(0))
+        offset = pager.search(b"FATAL")
+"""
+
+import os
+import sys
+import mmap
+import base64
+import codecs
+import shlex
+import tempfile
+import threading
+import subprocess
+from typing import Callable, Optional
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+from Function_Moudle.folder_transfer import adb_executable, run_device_shell
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+# 创建日志记录器
+logger = get_logger("ADBTools.RemoteFilePager")
+
+# 搜索时一次 dd 读取的块数
+SEARCH_BATCH_CHUNKS = 16
+
+
+class RemoteFilePager:
+    """设备文件的分页读取器（线程安全，同一时间只执行一个读取操作）"""
+
+    def __init__(self, device_id: str, remote_path: str, d=None, chunk_size: Optional[int] = None):
+        """
+        Args:
+            device_id: 设备ID
+            remote_path: 设备端文件路径
+            d: uiautomator2 设备对象，非 None 时通过 d.shell 读取（数据经 base64 传输）
+            chunk_size: 块大小（字节），默认读取配置 file_manager.preview_page_size
+        """
+        self.device_id = device_id
+        self.remote_path = remote_path
+        self.d = d
+        self.chunk_size = chunk_size or config_manager.get("file_manager.preview_page_size", 256 * 1024)
+        self.size = 0
+        self._lock = threading.RLock()
+        self._fetched = set()  # 已完整读取的块号
+        self._map: Optional[mmap.mmap] = None
+        fd, self._cache_path = tempfile.mkstemp(prefix="adbtools_preview_", suffix=".cache")
+        self._cache = os.fdopen(fd, 'r+b')
+
+    # ---------- 大小 ----------
+
+    def refresh_size(self) -> int:
+        """
+        重新查询文件大小并调整缓存文件
+
+        Returns:
+            新增的字节数（文件变小时为负数）
+        """
+        output = run_device_shell(self.device_id, f"stat -L -c %s {shlex.quote(self.remote_path)}", self.d, timeout=15)
+        try:
+            size = int(output.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            raise OSError(f"无法获取文件大小: {self.remote_path} {output.strip()}")
+        with self._lock:
+            grown = size - self.size
+            if grown < 0:
+                # 文件被截断或轮转，已缓存的内容不再可信
+                self._fetched.clear()
+            elif grown > 0 and self.size % self.chunk_size:
+                # 原来的最后一块不完整，需要重新读取
+                self._fetched.discard(self.size // self.chunk_size)
+            if grown:
+                self._close_map()
+                self._cache.truncate(size)
+                self.size = size
+            return grown
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.size // self.chunk_size))
+
+    # ---------- 读取 ----------
+
+    def _read_remote(self, first_chunk: int, count: int) -> bytes:
+        """用一次 dd 读取从 first_chunk 开始的 count 个块"""
+        command = (f"dd if={shlex.quote(self.remote_path)} bs={self.chunk_size} "
+                   f"skip={first_chunk} count={count} 2>/dev/null")
+        if self.d is not None:
+            # u2 的 shell 输出是文本，二进制数据经 base64 传输
+            return base64.b64decode(run_device_shell(self.device_id, f"{command} | base64", self.d, timeout=120))
+        result = subprocess.run([adb_executable(), '-s', self.device_id, 'exec-out', command],
+                                capture_output=True, timeout=120)
+        if result.returncode != 0:
+            raise OSError(f"读取文件失败: {result.stderr.decode('utf-8', errors='replace').strip()}")
+        return result.stdout
+
+    def _ensure_chunks(self, first_chunk: int, last_chunk: int):
+        """读取 [first_chunk, last_chunk] 中尚未缓存的块（连续的缺失块合并为一次读取）"""
+        chunk = first_chunk
+        while chunk <= last_chunk:
+            if chunk in self._fetched:
+                chunk += 1
+                continue
+            end = chunk
+            while end + 1 <= last_chunk and end + 1 not in self._fetched:
+                end += 1
+            data = self._read_remote(chunk, end - chunk + 1)
+            self._close_map()
+            self._cache.seek(chunk * self.chunk_size)
+            self._cache.write(data[:self.size - chunk * self.chunk_size])
+            self._cache.flush()
+            # 只把读满的块（以及文件末尾的块）标记为已缓存
+            for index in range(chunk, end + 1):
+                chunk_end = min((index + 1) * self.chunk_size, self.size)
+                if chunk * self.chunk_size + len(data) >= chunk_end:
+                    self._fetched.add(index)
+            chunk = end + 1
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def read(self, offset: int, length: int) -> bytes:
+        """读取 [offset, offset + length) 范围（超出文件末尾的部分被截掉）"""
+        with self._lock:
+            end = min(offset + length, self.size)
+            if offset >= end:
+                return b""
+            self._ensure_chunks(offset // self.chunk_size, (end - 1) // self.chunk_size)
+            if self._map is None:
+                self._map = mmap.mmap(self._cache.fileno(), self.size, access=mmap.ACCESS_READ)
+            return self._map[offset:end]
+
+    def read_page(self, page: int) -> bytes:
+        """读取第 page 页（从 0 开始，每页一个块）"""
+        return self.read(page * self.chunk_size, self.chunk_size)
+
+    def tail(self, length: int) -> bytes:
+        """读取文件末尾 length 字节"""
+        return self.read(max(0, self.size - length), length)
+
+    # ---------- 搜索 ----------
+
+    def search(self, pattern: bytes, start: int = 0, ignore_case: bool = False,
+               progress_callback: Optional[Callable[[int, int], None]] = None,
+               cancelled: Optional[Callable[[], bool]] = None) -> int:
+        """
+        从 start 开始逐块查找 pattern
+
+        Args:
+            ignore_case: 忽略大小写（仅 ASCII 字母）
+            progress_callback: 进度回调 (已搜索到的偏移, 文件大小)
+            cancelled: 返回 True 时停止搜索
+
+        Returns:
+            第一处匹配的偏移，未找到或被取消时返回 -1
+        """
+        if not pattern:
+            return -1
+        if ignore_case:
+            pattern = pattern.lower()
+        overlap = len(pattern) - 1
+        batch = self.chunk_size * SEARCH_BATCH_CHUNKS
+        offset = start
+        while offset < self.size:
+            if cancelled and cancelled():
+                return -1
+            # 与上一段重叠 len(pattern)-1 字节，跨块的匹配不会漏掉
+            window_start = max(start, offset - overlap)
+            data = self.read(window_start, offset + batch - window_start)
+            if ignore_case:
+                data = data.lower()
+            found = data.find(pattern)
+            if found != -1:
+                return window_start + found
+            offset += batch
+            if progress_callback:
+                progress_callback(min(offset, self.size), self.size)
+        return -1
+
+    # ---------- 显示 ----------
+
+    @staticmethod
+    def decode(data: bytes) -> str:
+        """
+        解码为文本：优先 utf-8（页首页尾被切断的多字节字符丢弃），
+        不是 utf-8 时尝试 gbk，都失败时替换无法解码的字节
+        """
+        start = 0
+        while start < min(3, len(data)) and 0x80 <= data[start] <= 0xBF:
+            start += 1
+        try:
+            # final=False：末尾不完整的字符留在解码器中，不报错
+            return codecs.getincrementaldecoder('utf-8')().decode(data[start:], final=False)
+        except UnicodeDecodeError:
+            pass
+        try:
+            return data.decode('gbk')
+        except UnicodeDecodeError:
+            return data.decode('utf-8', errors='replace')
+
+    # ---------- 生命周期 ----------
+
+    def close(self):
+        """关闭并删除本地缓存文件"""
+        with self._lock:
+            self._close_map()
+            if not self._cache.closed:
+                self._cache.close()
+            try:
+                os.remove(self._cache_path)
+            except OSError as e:
+                logger.debug(f"删除预览缓存失败: {self._cache_path} | {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,4 +1,14 @@
 from PyQt5.QtCore import QThread, pyqtSignal
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from adb_utils import ADBUtils
+except ImportError:
+    ADBUtils = None
 
 
 class ShowUninstallThread(QThread):
@@ -19,7 +29,11 @@ class ShowUninstallThread(QThread):
                 return
             
             self.progress_signal.emit("正在卸载...")
-            self.d.app_uninstall(self.package_name)
+            try:
+                self.d.app_uninstall(self.package_name)
+            finally:
+                if ADBUtils is not None:
+                    ADBUtils.notify_command_executed(f"uninstall {self.package_name}", getattr(self.d, 'serial', None))
             self.result_signal.emit("卸载完成!")
         except Exception as e:
             self.error_signal.emit(str(e))
\ No newline at end of file
@@ -198,7 +198,7 @@ class StartAppThread(QThread):
         """在ADB模式下获取应用的主Activity"""
         try:
             # 先检查应用是否安装
-            result = adb_utils.run_adb_command(
+            result = adb_utils.run_adb_query(
                 f"shell pm list packages {self.package_name}", 
                 self.device_id
             )
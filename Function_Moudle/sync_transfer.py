@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+sync 协议文件传输引擎 - 在进程内通过 adb server 的 sync: 服务上传/下载文件
+
+功能：
+1. 每台设备一条 sync 会话，多个文件依次在同一连接上传输，不再每个文件启动一个 adb 进程
+2. 数据包经会话内复用的缓冲区收发（见 adb_socket_client.SyncConnection），按字节回报进度
+3. 传输出错后关闭会话，下一个文件自动重新建立连接
+4. 配置关闭时 create_sync_engine 返回 None；adb server 不可用时首次传输抛出 AdbServerUnavailable，
+   调用方据此退回 adb 可执行文件
+
+使用示例：
+    engine = create_sync_engine(device_id)
+    if engine is not None:
+        with engine:
+            engine.push("a.txt", "/sdcard/a.txt", progress_callback=lambda done, total: ...)
+"""
+
+import os
+import sys
+import stat
+from typing import Callable, Optional, Tuple
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from logger_manager import get_logger
+
+try:
+    from config_manager import config_manager
+except ImportError:
+    from fallbacks import ConfigManagerFallback
+    config_manager = ConfigManagerFallback()
+
+try:
+    from Function_Moudle.adb_socket_client import (
+        adb_socket_client, AdbProtocolError, AdbServerUnavailable, SyncConnection
+    )
+except ImportError:
+    adb_socket_client = None
+    AdbProtocolError = AdbServerUnavailable = OSError
+    SyncConnection = None
+
+# 创建日志记录器
+logger = get_logger("ADBTools.SyncTransfer")
+
+# 进度回调: (当前文件已传输字节数, 当前文件总字节数)
+ProgressCallback = Callable[[int, int], None]
+
+
+class SyncTransferEngine:
+    """单台设备的 sync 协议传输引擎（非线程安全，一个线程使用一个实例）"""
+
+    def __init__(self, device_id: str, client=None, timeout: Optional[float] = None):
+        """
+        Args:
+            device_id: 设备ID
+            client: AdbSocketClient 实例，默认使用全局客户端
+            timeout: 单次读写的超时时间（秒）
+        """
+        self.device_id = device_id
+        self.client = client or adb_socket_client
+        self.timeout = timeout
+        self._sync: Optional[SyncConnection] = None
+
+    # ---------- 会话管理 ----------
+
+    def _session(self) -> SyncConnection:
+        if self._sync is None:
+            self._sync = self.client.sync(self.device_id, self.timeout)
+        return self._sync
+
+    def _reset(self):
+        """出错后丢弃会话（adbd 在 FAIL 后会结束 sync 服务），下次使用时重新连接"""
+        if self._sync is not None:
+            self._sync.connection.close()
+            self._sync = None
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            return method(self._session(), *args, **kwargs)
+        except (AdbProtocolError, OSError):
+            self._reset()
+            raise
+
+    def close(self):
+        """结束 sync 会话"""
+        if self._sync is not None:
+            self._sync.close()
+            self._sync = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ---------- 查询 ----------
+
+    def stat(self, remote_path: str) -> Tuple[int, int, int]:
+        """查询远程文件 (mode, size, mtime)，不存在时 mode 为 0"""
+        return self._call(SyncConnection.stat, remote_path)
+
+    def remote_file_size(self, remote_path: str) -> Optional[int]:
+        """远程普通文件的大小；不是普通文件（目录、符号链接、不存在）时返回 None"""
+        mode, size, _ = self.stat(remote_path)
+        return size if stat.S_ISREG(mode) else None
+
+    def list(self, remote_path: str):
+        """列出远程目录内容，格式见 SyncConnection.list"""
+        return self._call(SyncConnection.list, remote_path)
+
+    # ---------- 传输 ----------
+
+    def push(self, local_path: str, remote_path: str,
+             progress_callback: Optional[ProgressCallback] = None) -> int:
+        """
+        上传单个本地文件
+
+        Args:
+            local_path: 本地文件路径
+            remote_path: 设备端路径；以 / 结尾或是已存在的目录时保存为其中的同名文件
+            progress_callback: 进度回调 (已发送字节数, 文件大小)
+
+        Returns:
+            发送的字节数
+        """
+        local_stat = os.stat(local_path)
+        if remote_path.endswith('/') or stat.S_ISDIR(self.stat(remote_path)[0]):
+            remote_path = remote_path.rstrip('/') + '/' + os.path.basename(local_path)
+        # Windows 上的权限位没有意义，按普通文件处理
+        mode = 0o644 if sys.platform == 'win32' else local_stat.st_mode & 0o777
+        callback = self._wrap_progress(progress_callback, local_stat.st_size)
+        return self._call(SyncConnection.push, local_path, remote_path, mode=mode,
+                          progress_callback=callback)
+
+    def pull(self, remote_path: str, local_path: str,
+             progress_callback: Optional[ProgressCallback] = None, size: Optional[int] = None) -> int:
+        """
+        下载单个远程文件
+
+        Args:
+            remote_path: 设备端文件路径
+            local_path: 本地路径；是已存在的目录时保存为其中的同名文件
+            progress_callback: 进度回调 (已接收字节数, 文件大小)
+            size: 已知的文件大小，为 None 时先 STAT 查询
+
+        Returns:
+            接收的字节数
+        """
+        if os.path.isdir(local_path):
+            local_path = os.path.join(local_path, remote_path.rstrip('/').split('/')[-1])
+        if size is None and progress_callback is not None:
+            size = self.stat(remote_path)[1]
+        callback = self._wrap_progress(progress_callback, size or 0)
+        try:
+            return self._call(SyncConnection.pull, remote_path, local_path, progress_callback=callback)
+        except (AdbProtocolError, OSError):
+            # 不留下不完整的文件
+            if os.path.isfile(local_path):
+                try:
+                    os.remove(local_path)
+                except OSError:
+                    pass
+            raise
+
+    @staticmethod
+    def _wrap_progress(progress_callback: Optional[ProgressCallback], total: int):
+        if progress_callback is None:
+            return None
+        progress_callback(0, total)
+        return lambda done: progress_callback(done, max(total, done))
+
+
+def create_sync_engine(device_id: str, timeout: Optional[float] = None) -> Optional[SyncTransferEngine]:
+    """
+    创建 sync 传输引擎
+
+    Returns:
+        SyncTransferEngine；协议客户端不可用或配置 file_transfer.sync_protocol 为 false 时返回 None
+    """
+    if adb_socket_client is None or not device_id:
+        return None
+    if not config_manager.get("file_transfer.sync_protocol", True):
+        return None
+    if timeout is None:
+        timeout = config_manager.get("file_transfer.timeout", 60)
+    return SyncTransferEngine(device_id, timeout=timeout)
@@ -2,6 +2,9 @@
 """ADB工具类，解决PyInstaller打包后的ADB路径问题"""
 
 import os
+import re
+import shlex
+import stat
 import subprocess
 import sys
 import time
@@ -21,6 +24,38 @@ except ImportError:
     def log_command_execution(*args, **kwargs):
         pass
 
+# 导入shell会话池
+try:
+    from Function_Moudle.adb_shell_pool import shell_session_pool
+except ImportError:
+    shell_session_pool = None
+
+# 导入进程内ADB协议客户端
+try:
+    from Function_Moudle.adb_socket_client import (
+        adb_socket_client, AdbProtocolError, AdbServerUnavailable
+    )
+except ImportError:
+    adb_socket_client = None
+
+# 导入流式输出
+try:
+    from Function_Moudle.adb_output_stream import ProcessOutputStream, SocketShellStream
+except ImportError:
+    ProcessOutputStream = SocketShellStream = None
+
+# 导入设备健康状态（按设备的熔断器）
+try:
+    from Function_Moudle.device_health import device_health, DeviceUnavailableError, REASON_TIMEOUT
+except ImportError:
+    device_health = None
+
+# 导入查询去重缓存（同一设备上相同的只读查询只执行一次）
+try:
+    from Function_Moudle.adb_query_cache import adb_query_cache
+except ImportError:
+    adb_query_cache = None
+
 # 导入配置管理器
 try:
     from config_manager import config_manager
@@ -62,12 +97,32 @@ except ImportError:
     
     config_manager = ConfigManagerFallback()
 
+
+def config_manager_get(key, default=None):
+    """读取配置项，配置管理器不支持 get 时返回默认值"""
+    getter = getattr(config_manager, 'get', None)
+    if getter is None:
+        return default
+    return getter(key, default)
+
+
 class ADBUtils:
     """ADB工具类，统一管理ADB命令执行"""
     
     # ADB路径缓存
     _adb_path = None
     
+    # 会话池/协议客户端只接管这些 subprocess 参数，其他参数（如 check、cwd）仍走子进程
+    _IN_PROCESS_KWARGS = {'timeout'}
+    # 含有这些字符的命令可能依赖本地 shell 的管道/重定向/变量展开，不交给会话池
+    _HOST_SHELL_META_CHARS = set('|&;<>()$`^%!*?\\\n')
+    # 可以改用 `cmd package` 执行的 `shell pm` 命令
+    _PM_SHELL_RE = re.compile(r'^\s*shell\s+pm\s+(?!instrument\b)')
+    # 不受设备熔断状态限制的命令（不经过设备，或用于等待、恢复连接）
+    _HEALTH_EXEMPT_COMMANDS = ("connect", "disconnect", "reconnect", "get-state", "start-server", "kill-server")
+    # 命令执行后的回调，签名为 hook(command, device_id)，用于安装/卸载后刷新缓存等
+    _command_hooks = []
+    
     @classmethod
     def get_adb_path(cls):
         """获取ADB可执行文件路径"""
@@ -125,6 +180,12 @@ class ADBUtils:
         from datetime import datetime
         
         adb_path = cls.get_adb_path()
+        # 已知不可用的设备直接返回失败，不等待命令超时（在改写命令之前，不为此探测设备能力）
+        blocked_message = cls._health_gate(command, device_id)
+        if blocked_message:
+            from fallbacks import MockResult
+            return MockResult("", blocked_message, 1)
+        command = cls._prefer_package_command(command, device_id)
         
         # 构建完整命令
         if device_id:
@@ -156,8 +217,17 @@ class ADBUtils:
         try:
             import time
             start_time = time.time()
-            result = subprocess.run(full_command, **default_kwargs)
+            result = cls._run_via_socket(command, device_id, kwargs)
+            if result is not None:
+                full_command = f"[socket] {full_command}"
+            else:
+                result = cls._run_via_shell_pool(adb_path, command, device_id, kwargs)
+                if result is not None:
+                    full_command = f"[shell-pool] {full_command}"
+                else:
+                    result = subprocess.run(full_command, **default_kwargs)
             elapsed_time = time.time() - start_time
+            cls._report_health(device_id, result.returncode, result.stderr)
             
             # 只在失败时记录详细信息
             if result.returncode != 0:
@@ -190,13 +260,225 @@ class ADBUtils:
                 timestamp=timestamp
             )
             
+            cls.notify_command_executed(command, device_id)
             return result
         except Exception as e:
             logger.error(f"[{timestamp}] [Thread-{thread_id}] ADB命令执行异常: {command} | 错误: {str(e)}")
+            if isinstance(e, subprocess.TimeoutExpired) and device_health is not None and device_id:
+                device_health.record_failure(device_id, REASON_TIMEOUT)
             # 创建模拟的subprocess结果对象
             from fallbacks import MockResult
             return MockResult("", str(e), 1)
     
+    @classmethod
+    def run_adb_query(cls, command, device_id=None, ttl=None, **kwargs):
+        """
+        执行幂等的只读查询（getprop、settings get、pm path 等）
+        
+        同一设备上同时发起的相同查询只执行一次并共享结果，成功的结果缓存 ttl 秒
+        （None 使用配置的默认值，0 只合并不缓存）。设备上执行了非只读命令后缓存自动失效。
+        返回的结果对象可能被多个调用方共享，不要修改。
+        """
+        if adb_query_cache is None or not config_manager_get("adb.query_cache.enabled", True):
+            return cls.run_adb_command(command, device_id, **kwargs)
+        # 超时时间不影响结果，不区分
+        key = (command, tuple(sorted((k, repr(v)) for k, v in kwargs.items() if k != 'timeout')))
+        return adb_query_cache.call(device_id, key, lambda: cls.run_adb_command(command, device_id, **kwargs),
+                                    ttl=ttl, cacheable=lambda result: result.returncode == 0)
+    
+    @classmethod
+    def invalidate_query_cache(cls, device_id=None):
+        """使设备的查询缓存失效（绕过 ADBUtils 改变了设备状态时调用），device_id 为 None 时清空全部"""
+        if adb_query_cache is not None:
+            adb_query_cache.invalidate(device_id)
+    
+    @classmethod
+    def _health_gate(cls, command, device_id):
+        """设备已知不可用（熔断中）时返回失败提示，放行时返回 None"""
+        if device_health is None or not device_id:
+            return None
+        words = command.split(None, 1)
+        first_word = words[0] if words else ""
+        if first_word in cls._HEALTH_EXEMPT_COMMANDS or first_word.startswith("wait-for"):
+            return None
+        allowed, message = device_health.allow(device_id)
+        if allowed:
+            return None
+        logger.debug(f"设备不可用，命令直接返回失败 [{device_id}]: {command}")
+        return message
+    
+    @classmethod
+    def _report_health(cls, device_id, returncode, output):
+        """用命令结果更新设备健康状态"""
+        if device_health is not None and device_id:
+            device_health.record_result(device_id, returncode, output)
+    
+    @classmethod
+    def _prefer_package_command(cls, command, device_id):
+        """
+        设备支持 cmd 时把 `shell pm xxx` 改写为 `shell cmd package xxx`
+        
+        新系统上 pm 只是转调 cmd 的脚本，旧系统上每次都要启动一个 app_process；
+        instrument 等只有 pm 支持的子命令保持不变。
+        """
+        if not device_id or not cls._PM_SHELL_RE.match(command) \
+                or not config_manager_get("adb.prefer_cmd_package", True):
+            return command
+        try:
+            # 延迟导入：device_capabilities 在导入时依赖本模块
+            from Function_Moudle.device_capabilities import device_capabilities
+        except ImportError:
+            return command
+        if device_capabilities.package_command(device_id) != "cmd package":
+            return command
+        return cls._PM_SHELL_RE.sub("shell cmd package ", command, count=1)
+    
+    @classmethod
+    def _to_device_shell_command(cls, command):
+        """
+        将 `shell xxx` 形式的命令转换为设备端命令字符串
+        
+        模拟本地 shell 拆分参数、adb 再用空格拼接的过程；
+        无法安全转换的命令（交互式 shell、带选项、含本地 shell 元字符等）返回 None。
+        """
+        stripped = command.strip()
+        if not stripped.startswith('shell '):
+            return None
+        
+        remainder = stripped[len('shell '):].strip()
+        if not remainder or remainder.startswith('-'):
+            return None
+        if any(char in cls._HOST_SHELL_META_CHARS for char in remainder):
+            return None
+        # Windows 上子进程经 cmd.exe 执行，单引号原样传给设备，与这里按 POSIX 规则拆分的结果不同
+        if sys.platform == "win32" and "'" in remainder:
+            return None
+        
+        try:
+            device_command = ' '.join(shlex.split(remainder))
+            # 设备端引号不成对时，常驻会话会一直等待输入，这类命令交给子进程处理
+            shlex.split(device_command)
+        except ValueError:
+            return None
+        return device_command or None
+    
+    @classmethod
+    def _run_via_shell_pool(cls, adb_path, command, device_id, kwargs):
+        """
+        尝试通过常驻 shell 会话执行命令
+        
+        Returns:
+            subprocess.CompletedProcess 对象；不适用会话池或会话不可用时返回 None
+        """
+        if shell_session_pool is None or not device_id:
+            return None
+        if not config_manager_get("adb.shell_pool.enabled", True):
+            return None
+        if set(kwargs) - cls._IN_PROCESS_KWARGS:
+            return None
+        
+        device_command = cls._to_device_shell_command(command)
+        if device_command is None:
+            return None
+        
+        return shell_session_pool.run(adb_path, device_id, device_command,
+                                      timeout=kwargs.get('timeout'))
+    
+    @classmethod
+    def _run_via_socket(cls, command, device_id, kwargs, output_callback=None):
+        """
+        尝试通过进程内协议客户端直接与 adb server 通信执行命令
+        
+        仅在配置 adb.backend 为 "socket" 时启用，支持 devices、shell、单文件 push/pull。
+        
+        Returns:
+            subprocess.CompletedProcess 对象；不支持的命令或 adb server 不可用时返回 None
+        """
+        if adb_socket_client is None or config_manager_get("adb.backend", "subprocess") != "socket":
+            return None
+        if set(kwargs) - cls._IN_PROCESS_KWARGS:
+            return None
+        
+        timeout = kwargs.get('timeout')
+        stripped = command.strip()
+        try:
+            if stripped == 'devices':
+                lines = ["List of devices attached"]
+                lines.extend(f"{serial}\t{state}" for serial, state in adb_socket_client.get_devices())
+                return subprocess.CompletedProcess(command, 0, '\n'.join(lines) + '\n', '')
+            
+            if not device_id:
+                return None
+            
+            device_command = cls._to_device_shell_command(command)
+            if device_command is not None:
+                return adb_socket_client.shell(device_id, device_command, timeout=timeout,
+                                               output_callback=output_callback)
+            
+            transfer = cls._parse_transfer_command(stripped)
+            if transfer is not None:
+                return cls._transfer_via_sync(command, device_id, transfer, timeout, output_callback)
+        except AdbServerUnavailable as e:
+            logger.debug(f"adb server 不可用，回退到子进程方式: {e}")
+            return None
+        except AdbProtocolError as e:
+            return subprocess.CompletedProcess(command, 1, '', f"error: {e}")
+        return None
+    
+    @staticmethod
+    def _parse_transfer_command(command):
+        """
+        解析不带选项的 `push <本地> <远程>` / `pull <远程> <本地>` 命令
+        
+        Returns:
+            (动作, 源路径, 目标路径) 或 None
+        """
+        # 不处理反斜杠转义，保留 Windows 路径原样
+        lexer = shlex.shlex(command, posix=True)
+        lexer.whitespace_split = True
+        lexer.escape = ''
+        try:
+            parts = list(lexer)
+        except ValueError:
+            return None
+        if len(parts) != 3 or parts[0] not in ('push', 'pull'):
+            return None
+        if parts[1].startswith('-') or parts[2].startswith('-'):
+            return None
+        return parts[0], parts[1], parts[2]
+    
+    @classmethod
+    def _transfer_via_sync(cls, command, device_id, transfer, timeout, output_callback):
+        """通过 sync 协议传输单个文件，输出格式与 adb push/pull 保持一致"""
+        action, src_path, dst_path = transfer
+        start_time = time.time()
+        
+        with adb_socket_client.sync(device_id, timeout) as sync:
+            if action == 'push':
+                if not os.path.isfile(src_path):
+                    return None
+                mode, _, _ = sync.stat(dst_path)
+                if dst_path.endswith('/') or stat.S_ISDIR(mode):
+                    dst_path = dst_path.rstrip('/') + '/' + os.path.basename(src_path)
+                size = sync.push(src_path, dst_path, mode=os.stat(src_path).st_mode & 0o777)
+                verb = "pushed"
+            else:
+                mode, _, _ = sync.stat(src_path)
+                if not stat.S_ISREG(mode):
+                    # 目录或不存在的文件交给 adb 可执行文件处理
+                    return None
+                if os.path.isdir(dst_path):
+                    dst_path = os.path.join(dst_path, src_path.rstrip('/').split('/')[-1])
+                size = sync.pull(src_path, dst_path)
+                verb = "pulled"
+        
+        elapsed = max(time.time() - start_time, 0.001)
+        message = (f"{src_path}: 1 file {verb}, 0 skipped. "
+                   f"{size / elapsed / 1024 / 1024:.1f} MB/s ({size} bytes in {elapsed:.3f}s)")
+        if output_callback:
+            output_callback(message)
+        return subprocess.CompletedProcess(command, 0, message + '\n', '')
+    
     @classmethod
     def run_adb_command_realtime(cls, command, device_id=None, output_callback=None, **kwargs):
         """
@@ -212,6 +494,13 @@ class ADBUtils:
             subprocess.CompletedProcess对象
         """
         adb_path = cls.get_adb_path()
+        blocked_message = cls._health_gate(command, device_id)
+        if blocked_message:
+            if output_callback:
+                output_callback(blocked_message)
+            # 与子进程模式一致：错误输出合并在 stdout 中
+            return subprocess.CompletedProcess(command, 1, blocked_message, "")
+        command = cls._prefer_package_command(command, device_id)
         
         logger.info(f"========== 开始执行ADB实时命令 ==========")
         logger.info(f"设备ID: {device_id if device_id else '无'}")
@@ -305,6 +594,25 @@ class ADBUtils:
         
         try:
             if output_callback:
+                # 配置为协议客户端时，shell/push/pull 直接与 adb server 通信
+                if not is_install_cmd:
+                    socket_result = cls._run_via_socket(command, device_id, kwargs, output_callback=output_callback)
+                    if socket_result is not None:
+                        logger.info(f"通过 adb server 协议执行完成，返回码: {socket_result.returncode}")
+                        log_operation("adb_command_realtime_success" if socket_result.returncode == 0 else "adb_command_realtime_failed", {
+                            "command": command,
+                            "device_id": device_id,
+                            "returncode": socket_result.returncode,
+                            "backend": "socket"
+                        }, device_id, "success" if socket_result.returncode == 0 else "failed")
+                        cls._report_health(device_id, socket_result.returncode, socket_result.stderr)
+                        cls.notify_command_executed(command, device_id)
+                        # 与子进程模式一致：stderr 合并到 stdout
+                        return subprocess.CompletedProcess(
+                            command, socket_result.returncode,
+                            (socket_result.stdout or '') + (socket_result.stderr or ''), ""
+                        )
+                
                 # 实时输出模式
                 logger.info(f"启动实时输出进程...")
                 
@@ -363,6 +671,8 @@ class ADBUtils:
                 
                 logger.info(f"========== 命令执行结束 ==========")
                 
+                cls._report_health(device_id, returncode, '\n'.join(output_lines[-5:]))
+                
                 # 创建结果对象
                 class RealtimeResult:
                     def __init__(self):
@@ -370,6 +680,7 @@ class ADBUtils:
                         self.stdout = '\n'.join(output_lines)
                         self.stderr = ""
                 
+                cls.notify_command_executed(command, device_id)
                 return RealtimeResult()
             else:
                 # 非实时模式，使用原来的方法
@@ -395,6 +706,111 @@ class ADBUtils:
             from fallbacks import MockResult
             return MockResult("", str(e), 1)
     
+    @classmethod
+    def stream_adb_command(cls, command, device_id=None, timeout=None):
+        """
+        流式执行ADB命令，边执行边逐行读取输出
+        
+        适合 dumpsys、logcat 等输出很大、只关心其中几行的命令：
+        调用方找到需要的内容后 break 或 close()，命令立即被终止，不必等待和缓存完整输出。
+        
+        Args:
+            command: ADB命令
+            device_id: 设备ID
+            timeout: 超时时间（秒），超时抛出 subprocess.TimeoutExpired
+        
+        Returns:
+            AdbOutputStream 对象（可迭代，支持 with 语句、search() 行匹配）
+        """
+        from datetime import datetime
+        import threading
+        
+        if ProcessOutputStream is None:
+            raise RuntimeError("流式输出模块不可用")
+        
+        blocked_message = cls._health_gate(command, device_id)
+        if blocked_message:
+            raise DeviceUnavailableError(blocked_message)
+        
+        adb_path = cls.get_adb_path()
+        thread = threading.current_thread()
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        start_time = time.time()
+        logger.debug(f"[{timestamp}] [Thread-{thread.ident}] 流式执行ADB命令 [{device_id or '全局'}]: {command}")
+        
+        def on_finish(stream):
+            elapsed_time = time.time() - start_time
+            if stream.terminated:
+                result = "terminated"
+            else:
+                result = "success" if stream.returncode == 0 else "failed"
+            logger.debug(f"流式命令结束 [{device_id or '全局'}]: {command} | {result}, {stream.line_count} 行, 耗时 {elapsed_time:.3f}s")
+            if not stream.terminated:
+                cls._report_health(device_id, stream.returncode, stream.error_text())
+            elif stream.line_count:
+                # 提前结束（已读到需要的内容）说明设备有响应
+                cls._report_health(device_id, 0, "")
+            log_command_execution(
+                command=command,
+                device_id=device_id,
+                full_command=full_command,
+                adb_path=adb_path,
+                returncode=stream.returncode,
+                stdout=f"(流式读取 {stream.line_count} 行)",
+                stderr=stream.error_text() if result == "failed" else "",
+                execution_time=elapsed_time,
+                result=result,
+                thread_id=thread.ident,
+                thread_name=thread.name,
+                timestamp=timestamp
+            )
+            cls.notify_command_executed(command, device_id)
+        
+        # 配置为协议客户端时，shell 命令直接与 adb server 通信
+        device_command = cls._to_device_shell_command(command)
+        if (device_id and device_command is not None and adb_socket_client is not None
+                and config_manager_get("adb.backend", "subprocess") == "socket"):
+            full_command = f"[socket] shell:{device_command}"
+            try:
+                return SocketShellStream(adb_socket_client, device_id, device_command, command,
+                                         timeout=timeout, on_finish=on_finish)
+            except AdbServerUnavailable as e:
+                logger.debug(f"adb server 不可用，回退到子进程方式: {e}")
+        
+        # 不经过本地 shell 启动 adb，提前结束时能直接结束 adb 进程本身
+        # （Windows 上含单引号的命令仍交给 cmd.exe，保持单引号原样传给设备）
+        stripped = command.strip()
+        if any(char in cls._HOST_SHELL_META_CHARS for char in stripped) \
+                or (sys.platform == "win32" and "'" in stripped):
+            args = f'"{adb_path}" -s {device_id} {command}' if device_id else f'"{adb_path}" {command}'
+            full_command = args
+            use_shell = True
+        else:
+            args = [adb_path] + (['-s', device_id] if device_id else []) + shlex.split(stripped)
+            full_command = subprocess.list2cmdline(args)
+            use_shell = False
+        return ProcessOutputStream(args, command, shell=use_shell, timeout=timeout, on_finish=on_finish)
+    
+    @classmethod
+    def register_command_hook(cls, hook):
+        """注册命令执行后的回调 hook(command, device_id)，重复注册只保留一个"""
+        if hook not in cls._command_hooks:
+            cls._command_hooks.append(hook)
+    
+    @classmethod
+    def notify_command_executed(cls, command, device_id=None):
+        """
+        通知回调某条ADB命令已执行
+        
+        run_adb_command / run_adb_command_realtime 会自动调用；
+        绕过 ADBUtils 直接启动 adb 进程的代码（如安装、卸载线程）需要手动调用。
+        """
+        for hook in list(cls._command_hooks):
+            try:
+                hook(command, device_id)
+            except Exception as e:
+                logger.warning(f"命令回调执行失败: {e}")
+    
     @classmethod
     def check_adb_available(cls):
         """检查ADB是否可用"""
@@ -423,7 +839,7 @@ class ADBUtils:
     @classmethod
     def check_app_installed(cls, device_id, package_name):
         """检查应用是否已安装"""
-        result = cls.run_adb_command(f"shell pm list packages {package_name}", device_id)
+        result = cls.run_adb_query(f"shell pm list packages {package_name}", device_id)
         if result.returncode != 0:
             return False
         
@@ -436,21 +852,44 @@ class ADBUtils:
     @classmethod
     def get_app_version(cls, device_id, package_name):
         """获取应用版本信息"""
-        result = cls.run_adb_command(f"shell dumpsys package {package_name}", device_id)
-        if result.returncode != 0:
-            return False, "获取版本信息失败"
+        # 优先从设备包信息快照读取，避免每个包单独执行 dumpsys
+        try:
+            from Function_Moudle.package_snapshot import package_snapshot_cache
+            snapshot = package_snapshot_cache.get_snapshot(device_id)
+        except ImportError:
+            snapshot = None
+        if snapshot is not None:
+            package_info = snapshot.get(package_name)
+            if package_info and package_info.get("version_name"):
+                return True, package_info["version_name"]
+            return False, "未找到版本信息"
         
-        # 解析版本信息 - 在 Python 中过滤，不使用 grep
+        # 流式读取，找到第一处 versionName 即结束命令
         import re
-        version_match = re.search(r'versionName=(\S+)', result.stdout)
+        try:
+            with cls.stream_adb_command(f"shell dumpsys package {package_name}", device_id, timeout=30) as stream:
+                version_match = stream.first_match(re.compile(r'versionName=(\S+)'))
+        except Exception as e:
+            logger.error(f"获取版本信息异常 [{device_id}] {package_name}: {e}")
+            return False, "获取版本信息失败"
         if version_match:
             return True, version_match.group(1)
+        if stream.returncode not in (0, None):
+            return False, "获取版本信息失败"
         
         return False, "未找到版本信息"
     
     @classmethod
     def get_device_list(cls):
         """获取设备ID列表 - 从 ADB_module.py 移入"""
+        # 设备跟踪器就绪时直接读取缓存的设备表，避免每次点击都启动 adb 进程
+        try:
+            from Function_Moudle.device_tracker import get_cached_device_list
+            cached_devices = get_cached_device_list()
+            if cached_devices is not None:
+                return cached_devices
+        except ImportError:
+            pass
         try:
             result = cls.run_adb_command("devices")
             devices = result.stdout.strip().split('\n')[1:]  # 获取设备列表
@@ -509,49 +948,18 @@ class ADBUtils:
     
     @classmethod
     def aapt_get_package_name(cls, apk_path):
-        """使用aapt获取APK包名 - 从 ADB_module.py 移入"""
-        import shutil
-        import re
-        
-        # 查找aapt工具
-        aapt_path = shutil.which("aapt")
-        if not aapt_path:
-            # 尝试在常用位置查找
-            possible_paths = [
-                os.path.join(os.path.dirname(cls.get_adb_path()), "aapt.exe"),
-                os.path.join(os.path.dirname(cls.get_adb_path()), "aapt"),
-            ]
-            for path in possible_paths:
-                if os.path.isfile(path):
-                    aapt_path = path
-                    break
-        
-        if not aapt_path:
-            return "获取包名失败: 未找到aapt工具"
+        """使用aapt获取APK包名 - 从 ADB_module.py 移入（结果由APK元数据缓存提供）"""
+        from Function_Moudle.apk_metadata_cache import apk_metadata_cache, ApkMetadataError
         
         try:
-            # 使用列表形式传递参数，避免路径解析问题
-            result = subprocess.run(
-                [aapt_path, 'dump', 'badging', apk_path],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='ignore'
-            )
-            if result.returncode == 0:
-                # 解析包名
-                for line in result.stdout.split('\n'):
-                    if "package: name=" in line:
-                        # 提取包名
-                        match = re.search(r"name='([^']+)'", line)
-                        if match:
-                            return match.group(1)
-                return "获取包名失败: 未找到包名信息"
-            else:
-                return f"获取包名失败: {result.stderr}"
+            return apk_metadata_cache.get(apk_path)["package_name"]
+        except ApkMetadataError as e:
+            return f"获取包名失败: {e}"
         except Exception as e:
             return f"获取包名失败: {e}"
 
 
 # 全局实例
-adb_utils = ADBUtils()
\ No newline at end of file
+adb_utils = ADBUtils()
+if adb_query_cache is not None:
+    ADBUtils.register_command_hook(adb_query_cache.on_adb_command)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+APK 清单解析性能对比脚本
+
+功能：
+1. 对目录中的所有 APK 分别使用内置解析器和 aapt 解析
+2. 输出两种方式的总耗时、平均耗时和加速比
+3. 校验两者解析出的包名、versionName、versionCode 是否一致
+
+使用方法：
+python benchmark_apk_parser.py <APK目录> [--rounds 3] [--aapt <aapt路径>]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# 项目根目录
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Function_Moudle.apk_manifest_parser import read_apk_manifest, ManifestParseError
+from Function_Moudle.apk_metadata_cache import (
+    read_apk_metadata_with_aapt, find_aapt_path, ApkMetadataError
+)
+
+COMPARED_FIELDS = ("package_name", "version_name", "version_code")
+
+
+def collect_apks(folder):
+    """递归收集目录中的 APK 文件"""
+    apk_files = []
+    for root, _dirs, files in os.walk(folder):
+        for file in files:
+            if file.lower().endswith('.apk'):
+                apk_files.append(os.path.join(root, file))
+    return sorted(apk_files)
+
+
+def run_parser(name, parse, apk_files, rounds):
+    """多轮解析所有 APK，返回 (最后一轮结果, 最快一轮耗时)"""
+    best = None
+    results = {}
+    for round_index in range(rounds):
+        results = {}
+        start = time.perf_counter()
+        for apk_path in apk_files:
+            try:
+                results[apk_path] = parse(apk_path)
+            except (ManifestParseError, ApkMetadataError) as e:
+                results[apk_path] = e
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        print(f"  {name} 第 {round_index + 1} 轮: {elapsed:.3f}s")
+    return results, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比内置APK清单解析器与aapt的性能和结果")
+    parser.add_argument("folder", help="APK所在目录")
+    parser.add_argument("--rounds", type=int, default=3, help="每种方式的解析轮数（取最快一轮），默认3")
+    parser.add_argument("--aapt", default=None, help="aapt路径，默认自动查找")
+    args = parser.parse_args()
+
+    apk_files = collect_apks(args.folder)
+    if not apk_files:
+        print(f"目录中没有APK文件: {args.folder}")
+        return 1
+    print(f"共 {len(apk_files)} 个APK文件")
+
+    print("\n[内置解析器]")
+    python_results, python_time = run_parser("python", read_apk_manifest, apk_files, args.rounds)
+
+    aapt_path = args.aapt or find_aapt_path()
+    if not aapt_path:
+        print("\n未找到aapt工具，仅输出内置解析器结果")
+        print(f"内置解析器: 总耗时 {python_time:.3f}s, 平均 {python_time / len(apk_files) * 1000:.2f}ms/个")
+        return 0
+
+    print(f"\n[aapt] {aapt_path}")
+    aapt_results, aapt_time = run_parser(
+        "aapt", lambda path: read_apk_metadata_with_aapt(path, aapt_path), apk_files, args.rounds)
+
+    # 校验结果
+    mismatches = []
+    for apk_path in apk_files:
+        python_result = python_results[apk_path]
+        aapt_result = aapt_results[apk_path]
+        if isinstance(python_result, Exception) or isinstance(aapt_result, Exception):
+            mismatches.append((apk_path, "error", python_result, aapt_result))
+            continue
+        for field in COMPARED_FIELDS:
+            if python_result.get(field) != aapt_result.get(field):
+                mismatches.append((apk_path, field, python_result.get(field), aapt_result.get(field)))
+
+    print("\n" + "=" * 60)
+    print(f"内置解析器: 总耗时 {python_time:.3f}s, 平均 {python_time / len(apk_files) * 1000:.2f}ms/个")
+    print(f"aapt:       总耗时 {aapt_time:.3f}s, 平均 {aapt_time / len(apk_files) * 1000:.2f}ms/个")
+    if python_time > 0:
+        print(f"加速比: {aapt_time / python_time:.1f}x")
+
+    if mismatches:
+        print(f"\n结果不一致: {len(mismatches)} 项（versionName 引用资源时内置解析器返回 None，会回退到aapt）")
+        for apk_path, field, python_value, aapt_value in mismatches:
+            print(f"  {os.path.basename(apk_path)} [{field}] 内置: {python_value!r} / aapt: {aapt_value!r}")
+    else:
+        print("\n两种方式解析结果一致")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -33,6 +33,28 @@ class EnhancedConfigManager:
             "auto_detect": True,  # 是否自动检测
             "timeout": 30,  # ADB命令超时时间（秒）
             "retry_count": 3,  # ADB命令重试次数
+            "backend": "subprocess",  # 命令执行方式: subprocess/socket（直接与adb server通信）
+            "server_host": "127.0.0.1",  # adb server 地址
+            "server_port": 5037,  # adb server 端口
+            "shell_pool": {
+                "enabled": True,  # 复用常驻 adb shell 会话执行 shell 命令
+                "max_sessions_per_device": 2,  # 每个设备最多同时存在的会话数
+                "idle_timeout": 300,  # 空闲会话保留时间(秒)
+                "lease_timeout": 5,  # 等待空闲会话的最长时间(秒)
+            },
+            "package_snapshot_ttl": 60,  # 设备包信息快照有效期(秒)，经本工具安装/卸载后立即失效，其他途径的改动最多延迟这么久
+            "prefer_cmd_package": True,  # 设备支持时 shell pm 命令改用 cmd package 执行
+            "health": {
+                "failure_threshold": 3,  # 连续超时多少次后暂停向设备发送命令（离线/未连接错误立即暂停）
+                "cooldown": 5,  # 暂停后多久放行一条命令探测设备是否恢复(秒)，探测失败后加倍
+                "max_cooldown": 60,  # 探测间隔上限(秒)
+                "probe_timeout": 30,  # 探测命令超过该时间没有结果时允许重新探测(秒)
+            },
+            "query_cache": {
+                "enabled": True,  # 同一设备上同时发起的相同只读查询只执行一次
+                "ttl": 2,  # 只读查询结果的缓存时间(秒)，设备上执行非只读命令后立即失效
+                "max_entries": 256,  # 最多缓存的查询结果数
+            },
         },
         "ui": {
             "theme": "dark",  # dark/light/auto
@@ -58,6 +80,24 @@ class EnhancedConfigManager:
             "max_size": 10485760,  # 最大10MB
             "backup_count": 5,  # 备份文件数量
             "console_output": True,  # 控制台输出
+            "command_output_max_chars": 4000,  # 命令历史中每条 stdout/stderr 最多保留的字符数，0 表示不限制
+            "command_history_max_records": 200000,  # 命令历史库最多保留的记录数，超出后删除最旧的，0 表示不限制
+            "job_journal": True,  # 批量任务写入任务日志（logs/jobs），中断后可从检查点继续
+            "async_writer": {
+                "enabled": True,  # 操作/命令历史由后台线程批量写入
+                "queue_size": 10000,  # 待写入队列容量（条）
+                "batch_size": 200,  # 每批最多写入条数
+                "flush_interval_ms": 500,  # 最长攒批时间(毫秒)
+                "block_timeout_ms": 50,  # 队列满时调用线程最长等待时间(毫秒)，超时丢弃该条
+            },
+        },
+        "apk_cache": {
+            "enabled": True,  # 是否将APK元数据缓存持久化到磁盘
+            "cache_dir": "cache",  # 缓存目录（相对程序数据目录）
+            "max_entries": 5000,  # 最大缓存条目数（LRU淘汰）
+            "verify_hash": False,  # 是否额外校验文件内容哈希
+            "max_workers": 8,  # 并行解析APK的最大任务数
+            "parser": "python"  # 解析方式: python（内置解析器，必要时回退aapt）/aapt
         },
         "batch_install": {
             "special_packages": {
@@ -74,6 +114,49 @@ class EnhancedConfigManager:
             "verify_after_install": True,  # 安装后验证
             "stop_before_install": True,  # 安装前停止应用
             "clear_cache_before_install": False,  # 安装前清除缓存
+            "parallel": {
+                "max_workers": 8,  # 多设备安装时的最大并发任务数
+                "per_device_concurrency": 1,  # 单台设备同时进行的安装任务数
+                "sort_by_size": True  # 按APK大小从大到小调度
+            },
+            "device_cache": {
+                "enabled": True,  # 在设备端按 sha256 缓存已传输的APK，再次安装同一APK时不重新传输
+                "remote_dir": "/data/local/tmp/adbtools-cache",  # 设备端缓存目录
+                "max_bytes": 2147483648,  # 每台设备缓存的最大总字节数（LRU淘汰）
+                # 支持 --streaming 安装的设备（Android 10+）默认只复用已有缓存：为缓存上传会比流式安装多写一次设备存储，
+                # 首次安装更慢。反复刷同一批APK时开启，首次之后的安装不再传输
+                "fill_on_streaming": False
+            },
+            "plan": {
+                "skip_installed": True,  # 安装前比较设备已安装的 versionCode，跳过相同版本的APK
+                "preview": True  # 批量安装前显示安装计划预览
+            },
+            "install_mode": "per_apk",  # 安装方式: per_apk（逐个 adb install）/multi_package（每台设备一个多包会话原子安装，Android 10+）/pipeline（并行传输与依次安装重叠）
+            "multi_package": {
+                "timeout": 300  # 多包安装单条 pm 命令的超时(秒)，写入APK时按文件大小另外放宽
+            },
+            "pipeline": {
+                "transfer_streams": 2,  # 流水线安装时单台设备的并行传输数
+                "max_total_streams": 4  # 所有设备合计的并行传输数上限（共享主机 USB 带宽）
+            },
+        },
+        "file_transfer": {
+            "sync_protocol": True,  # 文件管理器通过 sync 协议在进程内传输文件（adb server 不可用时回退 adb 命令）
+            "timeout": 60,  # sync 传输单次读写超时(秒)
+            "parallel_workers": 4,  # 文件夹下载的并发传输数
+            "folder_mode": "tar",  # 文件夹传输方式: tar（整个文件夹作为一个 tar 数据流，设备无 tar 时逐个传输）/files
+            "tar_compression": "none",  # tar 数据流压缩: none/gzip/zstd（zstd 需要安装 zstandard）
+            "sync_compare": "size_mtime",  # 文件夹同步判断文件变化的方式: size_mtime（大小+修改时间）/checksum（MD5）
+        },
+        "file_manager": {
+            "dir_cache_ttl": 30,  # 设备目录列表缓存有效期(秒)，0 表示不缓存
+            "dir_cache_max_entries": 200,  # 最多缓存的设备目录数（LRU淘汰）
+            "prefetch_children": 8,  # 打开目录后后台预取的子目录数，0 表示不预取
+            "local_cache_max_entries": 32,  # 最多缓存的本地目录列表数（目录修改时间变化后失效）
+            "watch_local_dir": True,  # 监视当前本地目录，变化后增量更新列表
+            "preview_full_load_max": 1048576,  # 预览时整个读入并可编辑的最大文件大小(字节)，更大的文件分页只读预览
+            "preview_page_size": 262144,  # 分页预览每页（每次从设备读取）的字节数
+            "preview_follow_interval_ms": 2000,  # 分页预览跟踪末尾时检查文件增长的间隔(毫秒)
         },
         "network": {
             "proxy_enabled": False,  # 是否启用代理
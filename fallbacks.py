@@ -53,6 +53,15 @@ class ADBUtilsFallback:
         """模拟运行ADB命令"""
         return MockResult("", f"Fallback: Command not executed: {command}", 1)
     
+    @staticmethod
+    def run_adb_query(command, device_id=None, ttl=None, **kwargs):
+        """模拟执行只读查询"""
+        return ADBUtilsFallback.run_adb_command(command, device_id, **kwargs)
+    
+    @staticmethod
+    def notify_command_executed(command, device_id=None):
+        """回退实现没有命令钩子，忽略"""
+    
     @staticmethod
     def get_adb_path():
         """获取ADB路径的默认值"""
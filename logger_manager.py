@@ -10,6 +10,7 @@
 5. 异常堆栈跟踪
 6. 操作历史记录
 7. 性能监控
+8. 操作/命令历史由后台线程批量写入，调用线程不再同步打开文件
 """
 
 import os
@@ -19,6 +20,8 @@ import logging.handlers
 import json
 import traceback
 import time
+import queue
+import atexit
 import threading
 from pathlib import Path
 from datetime import datetime
@@ -43,12 +46,234 @@ except ImportError:
                 "logging.enable_operation_history": True,
                 "logging.enable_performance_monitoring": True,
                 "logging.format": "detailed",
+                "logging.async_writer.enabled": True,
+                "logging.async_writer.queue_size": 10000,
+                "logging.async_writer.batch_size": 200,
+                "logging.async_writer.flush_interval_ms": 500,
+                "logging.async_writer.block_timeout_ms": 50,
             }
             return defaults.get(key, default)
     
     config_manager = ConfigManagerFallback()
 
 
+class BatchedLogWriter:
+    """
+    历史日志后台批量写入器
+
+    调用线程只把记录放入有界队列；后台线程攒够 batch_size 条或等待 flush_interval 后
+    按目标分组一次性写入（文件目标追加文本行，可调用目标一次收到整批记录）。
+    队列满时调用线程最多等待 block_timeout，仍然写不进去则丢弃该条并计数。
+    """
+
+    def __init__(self, queue_size: int = 10000, batch_size: int = 200,
+                 flush_interval: float = 0.5, block_timeout: float = 0.05, enabled: bool = True):
+        """
+        初始化写入器
+
+        Args:
+            queue_size: 队列容量（条）
+            batch_size: 每批最多写入的条数
+            flush_interval: 最长攒批时间（秒）
+            block_timeout: 队列满时调用线程的最长等待时间（秒）
+            enabled: False 时退化为同步写入
+        """
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.enabled = enabled
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._stats = {"written": 0, "batches": 0, "blocked": 0, "dropped": 0, "errors": 0}
+
+    def write(self, file_path: str, line: str) -> bool:
+        """
+        追加一行到文件（异步）
+
+        Returns:
+            是否成功放入队列（或同步写入成功）
+        """
+        return self.submit(file_path, line)
+
+    def submit(self, target, record) -> bool:
+        """
+        提交一条记录（异步）
+
+        Args:
+            target: 文件路径（record 为文本行），或接收记录列表的可调用对象（如数据库批量插入）
+            record: 记录
+
+        Returns:
+            是否成功放入队列（或同步写入成功）
+        """
+        if not self.enabled or self._closed or not self._ensure_thread():
+            return self._deliver(target, [record])
+
+        try:
+            self._queue.put_nowait((target, record))
+            return True
+        except queue.Full:
+            pass
+
+        # 背压：短暂等待后台线程消化队列
+        self._count("blocked")
+        try:
+            self._queue.put((target, record), timeout=self.block_timeout)
+            return True
+        except queue.Full:
+            self._count("dropped")
+            return False
+
+    def flush(self, timeout: float = 5) -> bool:
+        """等待队列中已有的记录全部写入文件"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5):
+        """写完剩余记录并停止后台线程，之后的写入改为同步"""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            thread.join(timeout)
+
+    def get_statistics(self) -> Dict[str, int]:
+        """获取写入统计（已写入、批次数、背压等待次数、丢弃条数、写入错误次数、当前队列长度）"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _ensure_thread(self) -> bool:
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                try:
+                    self._thread = threading.Thread(target=self._run, name="BatchedLogWriter", daemon=True)
+                    self._thread.start()
+                except RuntimeError:
+                    # 解释器退出阶段无法再创建线程
+                    return False
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get()
+            except Exception:
+                return
+
+            pending = {}
+            waiters = []
+            count = 0
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    # flush 请求：先写完它之前的记录再通知
+                    waiters.append(item)
+                else:
+                    target, record = item
+                    pending.setdefault(target, []).append(record)
+                    count += 1
+
+                if stop or waiters or count >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            for target, records in pending.items():
+                self._deliver(target, records)
+            if count:
+                self._count("batches")
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _deliver(self, target, records) -> bool:
+        if isinstance(target, str):
+            return self._write_lines(target, records)
+        try:
+            target(records)
+            self._count("written", len(records))
+            return True
+        except Exception as e:
+            print(f"写入历史记录失败: {e}")
+            self._count("errors")
+            return False
+
+    def _write_lines(self, file_path: str, lines) -> bool:
+        try:
+            with open(file_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            self._count("written", len(lines))
+            return True
+        except FileNotFoundError:
+            try:
+                Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+                with open(file_path, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(lines) + '\n')
+                self._count("written", len(lines))
+                return True
+            except Exception as e:
+                print(f"写入历史日志失败: {e}")
+        except Exception as e:
+            print(f"写入历史日志失败: {e}")
+        self._count("errors")
+        return False
+
+
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> BatchedLogWriter:
+    """获取全局历史日志写入器（首次调用时按配置创建，程序退出时自动写完剩余记录）"""
+    global _log_writer
+    if _log_writer is None:
+        with _log_writer_lock:
+            if _log_writer is None:
+                writer = BatchedLogWriter(
+                    queue_size=config_manager.get("logging.async_writer.queue_size", 10000),
+                    batch_size=config_manager.get("logging.async_writer.batch_size", 200),
+                    flush_interval=config_manager.get("logging.async_writer.flush_interval_ms", 500) / 1000,
+                    block_timeout=config_manager.get("logging.async_writer.block_timeout_ms", 50) / 1000,
+                    enabled=config_manager.get("logging.async_writer.enabled", True)
+                )
+                atexit.register(writer.close)
+                _log_writer = writer
+    return _log_writer
+
+
 class OperationLogger:
     """操作日志记录器 - 记录用户操作历史"""
     
@@ -84,17 +309,13 @@ class OperationLogger:
         
         with self._lock:
             self.operations.append(operation)
-            # 保存到文件
-            self._save_to_file(operation)
+        # 保存到文件（入队即返回，不在锁内做文件IO）
+        self._save_to_file(operation)
     
     def _save_to_file(self, operation: Dict[str, Any]):
-        """保存操作到文件"""
+        """保存操作到文件（由后台写入器批量写入）"""
         try:
-            log_dir = Path(self.log_file).parent
-            log_dir.mkdir(parents=True, exist_ok=True)
-            
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(operation, ensure_ascii=False) + '\n')
+            get_log_writer().write(self.log_file, json.dumps(operation, ensure_ascii=False, default=str))
         except Exception as e:
             print(f"保存操作日志失败: {e}")
     
@@ -105,6 +326,7 @@ class OperationLogger:
     
     def clear_history(self):
         """清空操作历史"""
+        get_log_writer().flush()
         with self._lock:
             self.operations = []
             try: